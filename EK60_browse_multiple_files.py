@@ -11,6 +11,7 @@ from scipy.interpolate import griddata
 from matplotlib.patches import Polygon
 from matplotlib.collections import PatchCollection
 from echonix import ek60, echogram, imaging, raw
+import pfile_tools as p
 
 ## ------------------- Parameters to be edited ----------------- ##
 
@@ -86,17 +87,16 @@ keyboard
     O2 = np.array(profile['oxigen_ml_L'])
     PH= np.array(profile['ph'])
    
-    Ibtm = np.argmax(P)    
-    digitized = np.digitize(P[0:Ibtm], Pbin) #<- this is awesome!
+    Xbin = p.bin_pressure(P, np.c_[T, S, P, C, SIG, F, O2, PH], Pbin)
     
-    Tlist.append([T[0:Ibtm][digitized == i].mean() for i in range(0, len(Pbin))])
-    Slist.append([S[0:Ibtm][digitized == i].mean() for i in range(0, len(Pbin))])
-    Plist.append([P[0:Ibtm][digitized == i].mean() for i in range(0, len(Pbin))])
-    Clist.append([C[0:Ibtm][digitized == i].mean() for i in range(0, len(Pbin))])
-    SIGlist.append([SIG[0:Ibtm][digitized == i].mean() for i in range(0, len(Pbin))])
-    Flist.append([F[0:Ibtm][digitized == i].mean() for i in range(0, len(Pbin))])
-    O2list.append([O2[0:Ibtm][digitized == i].mean() for i in range(0, len(Pbin))])
-    PHlist.append([PH[0:Ibtm][digitized == i].mean() for i in range(0, len(Pbin))])
+    Tlist.append(list(Xbin[0]))
+    Slist.append(list(Xbin[1]))
+    Plist.append(list(Xbin[2]))
+    Clist.append(list(Xbin[3]))
+    SIGlist.append(list(Xbin[4]))
+    Flist.append(list(Xbin[5]))
+    O2list.append(list(Xbin[6]))
+    PHlist.append(list(Xbin[7]))
 
 
 # List2Array
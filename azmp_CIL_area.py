@@ -16,6 +16,7 @@ import numpy as  np
 from scipy.interpolate import interp1d  # to remove NaNs in profiles
 from scipy.interpolate import griddata
 import azmp_sections_tools as azst
+import azmp_catalog_tools as azc
 
 
 ## ---- Region parameters ---- ## <-------------------------------Would be nice to pass this in a config file '2017.report'
@@ -27,18 +28,6 @@ dlon = 2
 dz = 1 # vertical bins
 dc = .1 # grid resolution
 
-# CIL surface (Note that there is a bias because )
-def area(vs):
-    a = 0
-    x0,y0 = vs[0]
-    for [x1,y1] in vs[1:]:
-        dx = x1-x0
-        dy = y1-y0
-        a += 0.5*(y0*dx - x0*dy)
-        x0 = x1
-        y0 = y1
-    return a
-
 ## ---- Get Stations ---- ## 
 df_stn = pd.read_excel('/home/cyrf0006/github/AZMP-NL/data/STANDARD_SECTIONS.xlsx')
 df_stn = df_stn.drop(['SECTION', 'LONG'], axis=1)
@@ -93,11 +82,9 @@ year_file = '/home/cyrf0006/data/dev_database/netCDF/' + str(YEAR) + '.nc'
 print('Get ' + year_file)
 ds = xr.open_mfdataset(year_file)
 
-# Remame problematic datasets
+# Remome GTS datasets (BATHY & TESAC messages, removed by index)
 print('!!Remove MEDBA & MEDTE data!!')
-print('  ---> I Should be improme because I remove good data!!!!')
-ds = ds.where(ds.instrument_ID!='MEDBA', drop=True)
-ds = ds.where(ds.instrument_ID!='MEDTE', drop=True)
+ds = azc.remove_gts(ds)
 
 # Select Region
 ds = ds.where((ds.longitude>lonLims[0]) & (ds.longitude<lonLims[1]), drop=True)
@@ -203,14 +190,14 @@ VV = V.reshape(temp_coords.shape[0],V.shape[2])
 ZZ = Zitp.reshape(temp_coords.shape[0],1)
 section_only = []
 df_section_itp = pd.DataFrame(index=stn_list, columns=z)
+stn_nodes = azst.station_grid_index(df_stn, lon_reg, lat_reg)
 for stn in stn_list:
     # 1. Section only (by station name)
     ds_tmp = ds.where(ds.comments == stn, drop=True)  
     section_only.append(ds_tmp)
 
     #2.  From interpolated field (closest to station)
-    station = df_stn[df_stn.STATION==stn]
-    idx_opti = np.argmin(np.sum(np.abs(temp_coords - np.array(list(zip(station.LAT,station.LON)))), axis=1))
+    idx_opti = stn_nodes[stn]
     Tprofile = VV[idx_opti,:]
     # remove data below bottom
     bottom_depth = -ZZ[idx_opti]
@@ -249,12 +236,9 @@ if df_section_stn.index.size > 0:
     plt.colorbar(c)
     fig.savefig('method1.png', dpi=150)
     plt.close()
-    # CIL area
-    cil_vol_stn = 0
-    CIL = c_cil_stn.collections[0]
-    for path in CIL.get_paths()[:]:
-        vs = path.vertices
-        cil_vol_stn = cil_vol_stn + np.abs(area(vs))/1000
+    # CIL area (repeated stations averaged, sorted by distance)
+    df_tmp = df_section_stn.groupby(distance_stn).mean()
+    cil_vol_stn = azst.cil_metrics(df_tmp.values.astype(float), df_tmp.index, df_tmp.columns)['area'][0]
 else:
     cil_vol_stn = np.nan
 
@@ -271,11 +255,7 @@ if df_section_itp.index.size > 0:
     fig.savefig('method2.png', dpi=150)
     plt.close()
     # CIL area
-    cil_vol_itp = 0
-    CIL = c_cil_itp.collections[0]
-    for path in CIL.get_paths()[:]:
-        vs = path.vertices
-        cil_vol_itp = cil_vol_itp + np.abs(area(vs))/1000
+    cil_vol_itp = azst.cil_metrics(df_section_itp.values.astype(float), distance_itp, df_section_itp.columns)['area'][0]
 else:
     cil_vol_itp = np.nan
 
@@ -1,154 +1,186 @@
-# Preliminary attempt to build an "all inclusive" function
-# that would generate all figures for AZMP resDoc.
+"""Generate all figures for the AZMP ResDoc (and other yearly products)
+
+Each product (script or function) declares the files it reads and writes. Products are run
+in parallel (pool of processes) as soon as the products they depend on are done, and skipped
+if up to date, i.e. if their outputs exist and their inputs and arguments did not change since
+the last run (see azmp_modules/azmp_pipeline_tools.py). Scripts downloading remote data
+(NAO, AO, AMO, Nuuk air temperature, SSTs) are always run.
+
+usage:
+$ python azmp_genReport.py                      # ResDoc figures
+$ python azmp_genReport.py -n 8 --dry-run       # list what would be run
+$ python azmp_genReport.py --force bottomT_spring bottom_scorecards
+$ python azmp_genReport.py csas sections_history density
+
+----------
+Frederic.Cyr@dfo-mpo.gc.ca
+
+"""
 
-import os
-import matplotlib.pyplot as plt
 import numpy as np
-import azmp_sections_tools as azst
-import azmp_report_tools as azrt  
-            
-
-# 1.  NAO (should be a function with year as input)
-%my_run azmp_nao.py   
-%my_run azmp_ao.py   
-%my_run azmp_amo.py
-os.system('cp NAO_winter_1950-2020.png ../2020/')
-
-# 2. Air temperature (need to update Excel files and download NUUK update)
-%my_run azmp_dmi_nuukAirT.py
-%my_run azmp_airTemp_fromExcel.py 
-os.system('cp air_temp_2020.png air_temp_2020_FR.png air_temp_anom.png air_temp_anom_FR.png ../2020/')
-
-%my_run azmp_air_scorecards.py
-os.system('cp scorecards_air.png scorecards_air_FR.png ../2020/')
-
-# 3. SSTs
-# wget -m ftp://ftp.dfo-mpo.gc.ca/bometrics/noaa/stats/boxes/*.stat 
-# (in /home/cyrf0006/data/BIO_remote/bometrics/noaa/stats/boxes)
-%my_run azmp_SSTs.py # to update bometrics data
-%my_run azmp_SSTs_fromExcel.py # To merge with Eugene's historical Excel data
-os.system('cp SST_index.png ../2020/')
-%my_run azmp_SSTs_scorecards.py # to generate monthly anom, scorecards, etc.
-os.system('cp scorecards_sst_yearly.png scorecards_sst_monthly.png ../2020/')
-
-
-# 4. Station 27
-%my_run viking2020.py  
-os.system('cp Viking2020.png Viking2020_FR.png ../2020')
-
-# 5. Sea Ice (/home/cyrf0006/AZMP/state_reports/ice)
-%my_run azmp_ice_index.py
-os.system('cp ice_index.png ice_index_FR.png ../2020/')
-
-
-# 5. bottom temperature maps
-azrt.bottom_temperature(season='spring', year='2020') 
-azrt.bottom_temperature(season='fall', year='2020')
-# For NAFO STACFEN and STACFIS input:
-azrt.bottom_temperature(season='summer', year='2020', climato_file='Tbot_climato_SA4_summer_0.10.h5')
-
-# bottom salinity maps
-azrt.bottom_salinity(season='spring', year='2020') 
-azrt.bottom_salinity(season='fall', year='2020')
-
-# bottom stats and scorecards
-azrt.bottom_stats(years=np.arange(1980, 2020), season='spring')
-azrt.bottom_stats(years=np.arange(1980, 2020), season='fall')
-azrt.bottom_stats(years=np.arange(1980, 2020), season='summer')
-azrt.bottom_scorecards(years=[1980, 2020])
-os.system('cp scorecards_botT_spring.png scorecards_botT_spring_FR.png scorecards_botT_fall_FR.png scorecards_botT_fall.png ../2020')
-# For NAFO STACFEN and STACFIS input (for azmp_composite_index.py):
-azrt.bottom_stats(years=np.arange(1980, 2020), season='summer', climato_file='Tbot_climato_SA4_summer_0.10.h5')
-
-# bottom temperature bar plots
-%my_run azmp_bottomT_mean_anomaly.py # same as previous
-os.system('cp mean_anomalies_fall.png mean_anomalies_spring.png ../2020')
-os.system('cp mean_anomalies_fall_FR.png mean_anomalies_spring_FR.png ../2020')
-
-# Sections plots
-year = 2020
-sections = ['SI', 'BB', 'FC', 'MB']
-sections = ['MB']
-
-seasons = ['summer']
-variables = ['temperature', 'salinity']
-for section in sections:
-    for season in seasons:
-        for var in variables:
-            azst.seasonal_section_plot(VAR=var, SECTION=section, SEASON=season, YEAR=year, ZMAX=500, STATION_BASED=True) 
-            plt.close('all')
-
-        command = 'montage temperature_' + section + '_' + season + '_' + str(year) + '.png salinity_' + section + '_' + season + '_' + str(year) + '.png  -tile 2x1 -geometry +10+10  -background white ' + section + '_stn_' + season + '_' + str(year) + '.png'
-        os.system(command)
-        command = 'montage temperature_' + section + '_' + season + '_' + str(year) + '_FR.png salinity_' + section + '_' + season + '_' + str(year) + '_FR.png  -tile 2x1 -geometry +10+10  -background white ' + section + '_stn_' + season + '_' + str(year) + '_FR.png'
-        os.system(command)
-
-        os.system('rm temperature*.png salinity*.png')
-        os.system('cp ' + section + '_stn_' + season + '_' + str(year) + '.png ../2020')
-        os.system('cp ' + section + '_stn_' + season + '_' + str(year) + '_FR.png ../2020')
-
-
-
-## ----------- CSAS DATA ---------------- ##
-%my_run csas_crab_stats.py
-%my_run azmp_bottomT_habitat.py    
-%my_run NSRF_bottomT.py 
-%my_run NSRF_bottomS.py 
-%my_run NSRF_bottomT_habitat.py 
-%my_run azmp_bottomT_shrimp_habitat.py 
-#azrt.bottom_stats(years=np.arange(1980, 2020), season='summer') # for crab 4R
-azrt.bottom_temperature(season='summer', year='2020') # for crab 4R
-
-## ----------- VIKING BUOY ---------------- ##
-%my_run viking2017.py # <--- should make a function taking spring/fall and year as input (must run twice now)
-os.system('cp Viking2017_sal.png Viking2017_temp.png ~/to_windows/')
-os.system('cp Viking2017_sal_FR.png Viking2017_temp_FR.png ~/to_windows/')
-
-
-
-## ----------- SECTION PLOT ---------------- ##
-# (** or look at azmp_section_report_plot.py)
-years = np.arange(1980, 2020)
-sections = ['SI', 'BB', 'WB', 'FC', 'SEGB', 'SESPB']
-
-seasons = ['spring', 'summer', 'fall']
-variables = ['temperature', 'salinity']
-
-# For MB/BI:
-years = np.arange(2000, 2020)
-sections = ['MB', 'BI']
-seasons = ['summer']
-variables = ['temperature', 'salinity']
-
-for year in years:
-    for section in sections:
-        for season in seasons:
-            for var in variables:
-                azst.seasonal_section_plot(VAR=var, SECTION=section, SEASON=season, YEAR=year, ZMAX=500, STATION_BASED=True) 
-                plt.close('all')
-
-            command = 'montage temperature_' + section + '_' + season + '_' + str(year) + '.png salinity_' + section + '_' + season + '_' + str(year) + '.png  -tile 2x1 -geometry +10+10  -background white ' + section + '_stn_' + season + '_' + str(year) + '.png'                 
-            os.system(command)
-            os.system('rm temperature*.png salinity*.png')
-
-            for var in variables:            
-                azst.seasonal_section_plot(VAR=var, SECTION=section, SEASON=season, YEAR=year, ZMAX=500, STATION_BASED=False) 
-                plt.close('all')
-
-            command = 'montage temperature_' + section + '_' + season + '_' + str(year) + '.png salinity_' + section + '_' + season + '_' + str(year) + '.png  -tile 2x1 -geometry +10+10  -background white ' + section + '_itp_' + season + '_' + str(year) + '.png'                 
-            os.system(command)
-            os.system('rm temperature*.png salinity*.png')
-
-            
-## ----------- DENSITY SECTION PLOT ---------------- ##
-years = np.arange(1999, 2020)
-sections = ['BB']
-seasons = ['summer']
-variables = ['sigma-t']
-
-for year in years:
+import argparse
+import azmp_report_tools as azrt
+import azmp_pipeline_tools as azpl
+
+## ---- Report parameters ---- ##
+YEAR = 2020
+NETCDF_PATH = '/home/cyrf0006/data/dev_database/netCDF/'
+SECTIONS = ['SI', 'BB', 'FC', 'MB']
+
+
+def resdoc_products(year=YEAR, sections=SECTIONS):
+    """ Products of the ResDoc """
+    year_str = str(year)
+    netcdf_file = NETCDF_PATH + year_str + '.nc'
+    report_dir = '../' + year_str # figures for the ResDoc are copied there
+    products = []
+
+    # 1. NAO, AO, AMO (download updated indices)
+    products.append(azpl.product('nao', script='azmp_nao.py', outputs=['NAO_winter_1950-' + year_str + '.png'], copy_to=report_dir, always=True))
+    products.append(azpl.product('ao', script='azmp_ao.py', always=True))
+    products.append(azpl.product('amo', script='azmp_amo.py', always=True))
+
+    # 2. Air temperature (need to update Excel files and download NUUK update)
+    products.append(azpl.product('nuuk_airT', script='azmp_dmi_nuukAirT.py', always=True))
+    products.append(azpl.product('air_temp', script='azmp_airTemp_fromExcel.py', deps=['nuuk_airT', 'nao'],
+                                 inputs=['/home/cyrf0006/research/PeopleStuff/ColbourneStuff/AZMP_AIR_TEMP_COMPOSITE_*.xlsx', 'Nuuk_air_temp.pkl', 'winterNAO_1951-2019.pkl'],
+                                 outputs=['air_temp_' + year_str + '.png', 'air_temp_' + year_str + '_FR.png', 'air_temp_anom.png', 'air_temp_anom_FR.png'], copy_to=report_dir))
+    products.append(azpl.product('air_scorecards', script='azmp_air_scorecards.py', deps=['air_temp', 'nao', 'ao', 'amo'],
+                                 inputs=['/home/cyrf0006/AZMP/state_reports/NAO/*_annual.pkl', '/home/cyrf0006/AZMP/state_reports/NAO/NAO_winter.pkl',
+                                         '/home/cyrf0006/AZMP/state_reports/airTemp/airT_monthly.pkl'],
+                                 outputs=['scorecards_air.png', 'scorecards_air_FR.png'], copy_to=report_dir))
+
+    # 3. SSTs
+    # wget -m ftp://ftp.dfo-mpo.gc.ca/bometrics/noaa/stats/boxes/*.stat
+    # (in /home/cyrf0006/data/BIO_remote/bometrics/noaa/stats/boxes)
+    products.append(azpl.product('sst', script='azmp_SSTs.py', always=True)) # to update bometrics data
+    products.append(azpl.product('sst_excel', script='azmp_SSTs_fromExcel.py', deps=['sst'], # To merge with Eugene's historical Excel data
+                                 inputs=['/home/cyrf0006/data/BIO_remote/bometrics/noaa/stats/boxes/*_sst.stat', '/home/cyrf0006/data/SSTs/SST_*.xlsx',
+                                         '/home/cyrf0006/github/AZMP-NL/utils/SST_boxes.xslx'],
+                                 outputs=['SST_index.png'], copy_to=report_dir))
+    products.append(azpl.product('sst_scorecards', script='azmp_SSTs_scorecards.py', deps=['sst_excel'], # monthly anom, scorecards, etc.
+                                 inputs=['/home/cyrf0006/AZMP/state_reports/SSTs/SSTs_merged_monthly.pkl'],
+                                 outputs=['scorecards_sst_yearly.png', 'scorecards_sst_monthly.png'], copy_to=report_dir))
+
+    # 4. Station 27 (viking<year>.py should be a function taking year as input)
+    products.append(azpl.product('viking', script='viking' + year_str + '.py', inputs=['/home/cyrf0006/data/dev_database/viking_nc/' + year_str + '_viking.nc'],
+                                 outputs=['Viking' + year_str + '.png', 'Viking' + year_str + '_FR.png'], copy_to=report_dir))
+
+    # 5. Sea Ice (/home/cyrf0006/AZMP/state_reports/ice)
+    products.append(azpl.product('ice', script='azmp_ice_index.py',
+                                 inputs=['/home/cyrf0006/data/seaIce_IML/*.GEC.dat', '/home/cyrf0006/AZMP/state_reports/bergs/bergs_annual.pkl'],
+                                 outputs=['ice_index.png', 'ice_index_FR.png'], copy_to=report_dir))
+
+    # 6. bottom temperature and salinity maps (copied to ../<year> by azrt)
+    for season in ['spring', 'fall']:
+        products.append(azpl.product('bottomT_' + season, azrt.bottom_temperature, kwargs={'season' : season, 'year' : year_str},
+                                     inputs=['Tbot_climato_' + season + '_0.10.h5', netcdf_file],
+                                     outputs=['bottomT_' + season + year_str + '.png', 'bottomT_' + season + year_str + '_FR.png']))
+        products.append(azpl.product('bottomS_' + season, azrt.bottom_salinity, kwargs={'season' : season, 'year' : year_str},
+                                     inputs=['Sbot_climato_' + season + '_0.10.h5', netcdf_file],
+                                     outputs=['bottomS_' + season + year_str + '.png', 'bottomS_' + season + year_str + '_FR.png']))
+    # For NAFO STACFEN and STACFIS input:
+    products.append(azpl.product('bottomT_summer_SA4', azrt.bottom_temperature,
+                                 kwargs={'season' : 'summer', 'year' : year_str, 'climato_file' : 'Tbot_climato_SA4_summer_0.10.h5'},
+                                 inputs=['Tbot_climato_SA4_summer_0.10.h5', netcdf_file],
+                                 outputs=['bottomT_summer' + year_str + '.png', 'bottomT_summer' + year_str + '_FR.png']))
+
+    # 7. bottom stats and scorecards
+    stats_years = np.arange(1980, year)
+    for season in ['spring', 'fall', 'summer']:
+        products.append(azpl.product('bottom_stats_' + season, azrt.bottom_stats, kwargs={'years' : stats_years, 'season' : season},
+                                     inputs=['Tbot_climato_' + season + '_0.10.h5', NETCDF_PATH + '*.nc'],
+                                     outputs=['stats_3LNO_' + season + '.pkl', season + '_bottom_temperature.pkl']))
+    products.append(azpl.product('bottom_scorecards', azrt.bottom_scorecards, kwargs={'years' : [1980, year]},
+                                 deps=['bottom_stats_spring', 'bottom_stats_fall', 'bottom_stats_summer'],
+                                 inputs=['stats_*_spring.pkl', 'stats_*_fall.pkl'],
+                                 outputs=['scorecards_botT_spring.png', 'scorecards_botT_spring_FR.png', 'scorecards_botT_fall.png', 'scorecards_botT_fall_FR.png'],
+                                 copy_to=report_dir))
+    # For NAFO STACFEN and STACFIS input (for azmp_composite_index.py):
+    # (overwrites summer stats, so after all products using them)
+    products.append(azpl.product('bottom_stats_summer_SA4', azrt.bottom_stats,
+                                 kwargs={'years' : stats_years, 'season' : 'summer', 'climato_file' : 'Tbot_climato_SA4_summer_0.10.h5'},
+                                 deps=['bottom_scorecards'],
+                                 inputs=['Tbot_climato_SA4_summer_0.10.h5', NETCDF_PATH + '*.nc'],
+                                 outputs=['summer_bottom_temperature.pkl']))
+
+    # bottom temperature bar plots
+    products.append(azpl.product('bottomT_mean_anomaly', script='azmp_bottomT_mean_anomaly.py', deps=['bottom_stats_spring', 'bottom_stats_fall'],
+                                 inputs=['stats_*_spring.pkl', 'stats_*_fall.pkl'],
+                                 outputs=['mean_anomalies_fall.png', 'mean_anomalies_spring.png', 'mean_anomalies_fall_FR.png', 'mean_anomalies_spring_FR.png'],
+                                 copy_to=report_dir))
+
+    # 8. Sections plots
     for section in sections:
-        for season in seasons:
-            for var in variables:
-                azst.seasonal_section_plot(VAR=var, SECTION=section, SEASON=season, YEAR=year, ZMAX=2000, STATION_BASED=True) 
-                plt.close('all')
+        for season in ['summer']:
+            products.append(azpl.product('section_' + section + '_' + season, azpl.section_figures, args=(section, season, year),
+                                         inputs=[netcdf_file],
+                                         outputs=[section + '_stn_' + season + '_' + year_str + '.png', section + '_stn_' + season + '_' + year_str + '_FR.png'],
+                                         copy_to=report_dir))
+
+    return products
+
+
+def csas_products(year=YEAR):
+    """ Products for CSAS (crab, shrimp, NSRF) """
+    products = []
+    for script in ['csas_crab_stats.py', 'azmp_bottomT_habitat.py', 'NSRF_bottomT.py', 'NSRF_bottomS.py', 'NSRF_bottomT_habitat.py', 'azmp_bottomT_shrimp_habitat.py']:
+        products.append(azpl.product(script.replace('.py', ''), script=script))
+    # for crab 4R (same figures as bottomT_summer_SA4 of the ResDoc, run after it if both pipelines are run, see main)
+    products.append(azpl.product('bottomT_summer', azrt.bottom_temperature, kwargs={'season' : 'summer', 'year' : str(year)},
+                                 inputs=['Tbot_climato_summer_0.10.h5', NETCDF_PATH + str(year) + '.nc'],
+                                 outputs=['bottomT_summer' + str(year) + '.png', 'bottomT_summer' + str(year) + '_FR.png']))
+    return products
+
+
+def sections_history_products(years=np.arange(2000, 2020), sections=['MB', 'BI'], seasons=['summer']):
+    """ Station-based and interpolated section plots for all years (** or look at azmp_section_report_plot.py)
+    (for others: years = np.arange(1980, 2020), sections = ['SI', 'BB', 'WB', 'FC', 'SEGB', 'SESPB'], seasons = ['spring', 'summer', 'fall'])
+    """
+    products = []
+    for year in years:
+        for section in sections:
+            for season in seasons:
+                outputs = [section + '_' + kind + '_' + season + '_' + str(year) + '.png' for kind in ['stn', 'itp']]
+                products.append(azpl.product('section_' + section + '_' + season + '_' + str(year), azpl.section_figures, args=(section, season, int(year)),
+                                             kwargs={'station_based' : [True, False]},
+                                             inputs=[NETCDF_PATH + str(year) + '.nc'], outputs=outputs))
+    return products
+
+
+def density_products(years=np.arange(1999, 2020), sections=['BB'], seasons=['summer']):
+    """ Density sections """
+    import azmp_sections_tools as azst
+    products = []
+    for year in years:
+        for section in sections:
+            for season in seasons:
+                products.append(azpl.product('sigma-t_' + section + '_' + season + '_' + str(year), azst.seasonal_section_plot,
+                                             kwargs={'VAR' : 'sigma-t', 'SECTION' : section, 'SEASON' : season, 'YEAR' : int(year), 'ZMAX' : 2000, 'STATION_BASED' : True},
+                                             inputs=[NETCDF_PATH + str(year) + '.nc'], outputs=['sigma-t_' + section + '_' + season + '_' + str(year) + '.png']))
+    return products
+
+
+if __name__ == '__main__':
+
+    pipelines = {'resdoc' : resdoc_products, 'csas' : csas_products, 'sections_history' : sections_history_products, 'density' : density_products}
+
+    parser = argparse.ArgumentParser(description='Generate AZMP report figures.')
+    parser.add_argument('pipelines', nargs='*', default=['resdoc'], choices=list(pipelines.keys()), help='products to generate (default: resdoc)')
+    parser.add_argument('-n', '--nprocs', type=int, default=4, help='number of processes')
+    parser.add_argument('--force', nargs='*', default=[], help='products re-done even if up to date')
+    parser.add_argument('--dry-run', action='store_true', help='only list products that would be run')
+    parser.add_argument('--state-file', default=azpl.PIPELINE_STATE_FILE, help='signatures of products done')
+    args = parser.parse_args()
+
+    products = []
+    for name in args.pipelines:
+        products = products + pipelines[name]()
+    # bottomT_summer (csas) overwrites the figures of bottomT_summer_SA4 (resdoc)
+    names = [prod['name'] for prod in products]
+    if ('bottomT_summer' in names) & ('bottomT_summer_SA4' in names):
+        products[names.index('bottomT_summer')]['deps'].append('bottomT_summer_SA4')
+
+    status = azpl.run_pipeline(products, nprocs=args.nprocs, state_file=args.state_file, force=args.force, dry_run=args.dry_run)
+    if len(status['failed']) > 0:
+        print('!! failed: ' + ', '.join(status['failed']))
@@ -28,6 +28,8 @@ import pandas as pd
 import xarray as xr
 import datetime
 import os
+## AZMP custom imports
+import azmp_catalog_tools as azc
 
 #import water_masses as wm
 
@@ -37,15 +39,9 @@ font = {'family' : 'normal',
 plt.rc('font', **font)
 
 
-ds = xr.open_mfdataset('/home/cyrf0006/data/dev_database/*.nc')
-
-# Select a depth range
-ds = ds.sel(level=ds['level']<200)
-ds = ds.sel(level=ds['level']>0)
-
-
-da = ds['comments']
-df = da.to_pandas()
+# Station names are in the cast catalog (no need to open the netCDF files)
+catalog = azc.load_cast_catalog()
+df = catalog.set_index('time').comments.sort_index()
 
 df = df[df.index.year>=1950]
 
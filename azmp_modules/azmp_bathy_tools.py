@@ -0,0 +1,198 @@
+"""Bathymetry tools (GEBCO) shared by the AZMP climatologies, sections and maps
+
+Contains following functions:
+- read_gebco_window(lonLims, latLims, dataFile=GEBCO_FILE, chunk_rows=200, use_file_range=False)
+- regrid_bathymetry(lon, lat, Z, lon_reg, lat_reg, method='linear')
+- get_bathymetry(lon_reg, lat_reg, method='linear', dataFile=GEBCO_FILE, store=BATHY_STORE)
+- get_gebco_subset(lonLims, latLims, dataFile=GEBCO_FILE, store=BATHY_STORE, use_file_range=False)
+
+The global 30'' GEBCO file stores 'z' as a 1D vector (rows from north to south). Instead of
+loading the whole vector (several GB once reshaped), only the rows covering the region are read.
+Results are kept in a single HDF5 store (BATHY_STORE), one group per grid / region, replacing
+the former *_bathy.npy and cc_bathymetry.h5 files. The store is updated on a copy that replaces
+it, so it can be used by several processes at once (e.g. report pipeline).
+
+----------
+
+Atlantic Zone Monitoring Program @NAFC:
+https://azmp-nl.github.io/
+
+"""
+
+__author__ = 'Frederic.Cyr@dfo-mpo.gc.ca'
+__version__ = '0.1'
+
+import os
+import shutil
+import hashlib
+import h5py
+import netCDF4
+import numpy as np
+from scipy.interpolate import RegularGridInterpolator
+## AZMP custom imports
+import azmp_grid_tools as azg
+
+GEBCO_FILE = '/home/cyrf0006/data/GEBCO/GEBCO_2014_1D.nc'
+BATHY_STORE = '/home/cyrf0006/data/GEBCO/bathymetry_store.h5'
+
+
+def read_gebco_window(lonLims, latLims, dataFile=GEBCO_FILE, chunk_rows=200, use_file_range=False):
+    """ Read the GEBCO 30'' bathymetry inside lonLims/latLims.
+
+    Only the rows of the 1D 'z' variable covering latLims are read (by blocks of chunk_rows
+    rows), and only the columns covering lonLims are kept.
+    use_file_range=True takes the grid limits from the file ('x_range', 'y_range'), as needed
+    for GRIDONE_1D.nc, instead of the corrected limits of the 30'' dataset.
+
+    Output:
+    lon, lat - coordinates of the subset (lat from south to north)
+    Z - bathymetry (lat.size x lon.size), negative below sea level
+
+    Usage ex:
+    import azmp_bathy_tools as azb
+    lon, lat, Z = azb.read_gebco_window([-60, -45], [42, 56])
+
+    """
+    dataset = netCDF4.Dataset(dataFile)
+    if use_file_range:
+        x = dataset.variables['x_range'][:]
+        y = dataset.variables['y_range'][:]
+    else:
+        x = [-179-59.75/60, 179+59.75/60] # to correct bug in 30'' dataset?
+        y = [-89-59.75/60, 89+59.75/60]
+    spacing = dataset.variables['spacing'][:]
+    # Compute Lat/Lon
+    nx = int((x[-1]-x[0])/spacing[0]) + 1  # num pts in x-dir
+    ny = int((y[-1]-y[0])/spacing[1]) + 1  # num pts in y-dir
+    lon = np.linspace(x[0],x[-1],nx)
+    lat = np.linspace(y[0],y[-1],ny) # south to north (flipped data)
+    idx_lon = np.where((lon>=lonLims[0]) & (lon<=lonLims[1]))[0]
+    idx_lat = np.where((lat>=latLims[0]) & (lat<=latLims[1]))[0]
+
+    # Rows are stored from north to south in the file
+    row_first = ny-1 - idx_lat[-1]
+    row_last = ny-1 - idx_lat[0]
+    zz = dataset.variables['z']
+    Z = np.full((row_last-row_first+1, idx_lon.size), np.nan)
+    for row in range(row_first, row_last+1, chunk_rows):
+        row_end = np.min([row+chunk_rows, row_last+1])
+        block = zz[row*nx:row_end*nx]
+        block = np.ma.filled(block.astype(float), np.nan).reshape(row_end-row, nx)
+        Z[row-row_first:row_end-row_first, :] = block[:, idx_lon[0]:idx_lon[-1]+1]
+    dataset.close()
+    Z = np.flipud(Z) # <------------ important!!!
+
+    return lon[idx_lon], lat[idx_lat], Z
+
+
+def regrid_bathymetry(lon, lat, Z, lon_reg, lat_reg, method='linear'):
+    """ Regrid bathymetry given on a regular grid (e.g. from read_gebco_window) onto lon_reg/lat_reg.
+
+    method:
+    'linear' - bilinear interpolation on the (regular) source grid
+    'mean' - block average of all source points falling in each cell (for coarse grids)
+
+    Since the source grid is regular, there is no need for griddata (Delaunay triangulation
+    of millions of points).
+
+    """
+    if method == 'linear':
+        itp = RegularGridInterpolator((lat, lon), Z, method='linear', bounds_error=False, fill_value=np.nan)
+        lon_grid, lat_grid = np.meshgrid(lon_reg, lat_reg)
+        Zitp = itp(np.c_[lat_grid.ravel(), lon_grid.ravel()]).reshape(lon_grid.shape)
+    elif method == 'mean':
+        lon_grid, lat_grid = np.meshgrid(lon, lat)
+        Zitp = azg.bin_casts_to_grid(lon_grid.ravel(), lat_grid.ravel(), Z.ravel(), lon_reg, lat_reg)[:,:,0]
+    else:
+        raise ValueError('method should be \'linear\' or \'mean\'')
+
+    return Zitp
+
+
+def _read_store(store, key, names):
+    """ Return the datasets 'names' of group 'key' in store (None if not there or not readable) """
+    if not os.path.isfile(store):
+        return None
+    try:
+        with h5py.File(store, 'r') as h5f:
+            if key not in h5f:
+                return None
+            return [h5f[key][name][:] for name in names]
+    except (OSError, IOError, KeyError) as err: # (e.g. locked by another process) recomputed
+        print(' -> could not read ' + store + ' (' + str(err) + ')')
+        return None
+
+
+def _write_store(store, key, data):
+    """ Save the dict data in group 'key' of store (not fatal if the store cannot be written)
+
+    The store is never modified in place: a copy is updated and replaces the store
+    (os.replace), so other processes always read a complete file.
+
+    """
+    tmp_file = store + '.' + str(os.getpid()) # (other processes may write the same store)
+    try:
+        if os.path.isfile(store):
+            shutil.copyfile(store, tmp_file)
+        with h5py.File(tmp_file, 'a') as h5f:
+            if key in h5f:
+                del h5f[key]
+            grp = h5f.create_group(key)
+            for name in data.keys():
+                grp.create_dataset(name, data=data[name])
+        os.replace(tmp_file, store)
+    except (OSError, IOError) as err:
+        print(' -> could not save in ' + store + ' (' + str(err) + ')')
+        if os.path.isfile(tmp_file):
+            os.remove(tmp_file)
+
+
+def get_bathymetry(lon_reg, lat_reg, method='linear', dataFile=GEBCO_FILE, store=BATHY_STORE):
+    """ Return GEBCO bathymetry (lat_reg.size x lon_reg.size, negative below sea level) on the
+    regular grid lon_reg/lat_reg.
+
+    The result is saved in store (one group per source file, grid and method), so it is computed only once.
+
+    Usage ex:
+    import azmp_bathy_tools as azb
+    Zitp = azb.get_bathymetry(lon_reg, lat_reg)
+
+    """
+    key = 'grid_' + os.path.splitext(os.path.basename(dataFile))[0] + '_' + method + '_' + azg.grid_hash(lon_reg, lat_reg)
+    saved = _read_store(store, key, ['Zitp'])
+    if saved is not None:
+        print('Load saved bathymetry!')
+        return saved[0]
+
+    print('Get bathy...')
+    # Read one extra cell around the grid to interpolate up to its edges
+    dlon = np.abs(lon_reg[1]-lon_reg[0])
+    dlat = np.abs(lat_reg[1]-lat_reg[0])
+    lon, lat, Z = read_gebco_window([lon_reg.min()-dlon, lon_reg.max()+dlon], [lat_reg.min()-dlat, lat_reg.max()+dlat], dataFile)
+    Zitp = regrid_bathymetry(lon, lat, Z, lon_reg, lat_reg, method)
+    _write_store(store, key, {'Zitp' : Zitp, 'lon_reg' : lon_reg, 'lat_reg' : lat_reg})
+    print(' -> Done!')
+
+    return Zitp
+
+
+def get_gebco_subset(lonLims, latLims, dataFile=GEBCO_FILE, store=BATHY_STORE, use_file_range=False):
+    """ Same as read_gebco_window() (native 30'' resolution, e.g. for map contours),
+    but the subset is saved in store for the next calls.
+
+    Usage ex:
+    import azmp_bathy_tools as azb
+    lon, lat, Z = azb.get_gebco_subset([-60, -45], [42, 56])
+
+    """
+    key_str = os.path.basename(dataFile) + str(np.array([lonLims, latLims], dtype=float).tolist())
+    key = 'native_' + hashlib.sha1(key_str.encode()).hexdigest()[:12]
+    saved = _read_store(store, key, ['lon', 'lat', 'Z'])
+    if saved is not None:
+        print('Load saved bathymetry!')
+        return saved[0], saved[1], saved[2]
+
+    lon, lat, Z = read_gebco_window(lonLims, latLims, dataFile, use_file_range=use_file_range)
+    _write_store(store, key, {'lon' : lon, 'lat' : lat, 'Z' : Z})
+
+    return lon, lat, Z
@@ -0,0 +1,182 @@
+"""Pre-binned profiles of the hydrographic database, partitioned by year and season
+
+Contains following functions:
+- bin_edges(dz=BINNED_DZ, zmax=BINNED_ZMAX)
+- rebin_profiles(X, levels, edges)
+- build_binned_profiles(nc_files=azc.NC_FILES, binned_dir=BINNED_DIR, dz=BINNED_DZ, ...)
+- load_binned_profiles(year_lims, season=None, variables=None, ...)
+- binned_dataframe(ds, var_name, zmax=None)
+
+Climatologies and sections average the casts in vertical bins of dz (levels in
+(edge, edge+dz], labeled by 'edge' as in da.groupby_bins('level', bins)). Instead of
+re-binning the whole database at every call, the binned profiles are written once per
+year and season (see azmp_catalog_tools.SEASONS) in binned_dir/<year>_<season>_dz<dz>.nc,
+and only the partitions needed are read.
+
+----------
+
+Atlantic Zone Monitoring Program @NAFC:
+https://azmp-nl.github.io/
+
+"""
+
+__author__ = 'Frederic.Cyr@dfo-mpo.gc.ca'
+__version__ = '0.1'
+
+import os
+import glob
+import numpy as np
+import pandas as pd
+import netCDF4 as nc
+import xarray as xr
+## AZMP custom imports
+import azmp_catalog_tools as azc
+
+BINNED_DIR = '/home/cyrf0006/data/dev_database/binned/'
+BINNED_DZ = 5
+BINNED_ZMAX = 2000
+BINNED_VARIABLES = ['temperature', 'salinity', 'sigma-t']
+
+
+def bin_edges(dz=BINNED_DZ, zmax=BINNED_ZMAX):
+    """ Bin edges (same as the climatologies: np.arange(dz/2.0, zmax, dz))
+
+    """
+    return np.arange(dz/2.0, zmax, dz)
+
+
+def rebin_profiles(X, levels, edges):
+    """ Average profiles X (ncasts x levels) in the bins (edges[k], edges[k+1]]
+
+    NaNs are ignored (bins without data are NaN). Returns ncasts x (edges.size-1).
+
+    """
+    idx_bin = np.searchsorted(edges, levels, side='left') - 1 # level in (edges[k], edges[k+1]]
+    W = np.zeros((levels.size, edges.size-1))
+    good = (idx_bin >= 0) & (idx_bin < edges.size-1)
+    W[np.where(good)[0], idx_bin[good]] = 1
+    valid = np.isfinite(X)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        Xbin = np.where(valid, X, 0).dot(W) / valid.dot(W)
+
+    return Xbin
+
+
+def build_binned_profiles(nc_files=azc.NC_FILES, binned_dir=BINNED_DIR, dz=BINNED_DZ, zmax=BINNED_ZMAX,
+                          variables=BINNED_VARIABLES, overwrite=False):
+    """ Write the binned profiles of each yearly netCDF file in one file per season
+    (binned_dir/<year>_<season>_dz<dz>.nc). Files are re-done only if the netCDF file is
+    more recent (or overwrite=True).
+
+    Usage ex:
+    import azmp_binned_tools as azbt
+    azbt.build_binned_profiles('/home/cyrf0006/data/dev_database/netCDF/*.nc')
+
+    """
+    if isinstance(nc_files, str):
+        nc_files = sorted(glob.glob(nc_files))
+    if not os.path.isdir(binned_dir):
+        os.makedirs(binned_dir)
+    edges = bin_edges(dz, zmax)
+
+    for nc_file in nc_files:
+        year = os.path.splitext(os.path.basename(nc_file))[0]
+        outfiles = [os.path.join(binned_dir, year + '_' + season + '_dz' + str(dz) + '.nc') for season in azc.SEASONS.keys()]
+        if (not overwrite) & np.all([os.path.isfile(f) and (os.path.getmtime(f) > os.path.getmtime(nc_file)) for f in outfiles]):
+            continue
+        print(' -> ' + nc_file)
+
+        nc_in = nc.Dataset(nc_file, 'r')
+        levels = np.array(nc_in.variables['level'][:], dtype=float)
+        times = nc_in.variables['time']
+        time = pd.to_datetime([str(t) for t in nc.num2date(times[:], units=times.units, calendar=times.calendar)])
+        dict = {}
+        for var in ['latitude', 'longitude']:
+            dict[var] = ('time', np.ma.filled(nc_in.variables[var][:].astype(float), np.nan))
+        for var in ['instrument_ID', 'comments']:
+            dict[var] = ('time', np.array(nc_in.variables[var][:], dtype=object).astype(str))
+        dict['instrument_class'] = ('time', azc.read_instrument_class(nc_in))
+        for var in variables:
+            X = np.ma.filled(nc_in.variables[var][:].astype(float), np.nan)
+            dict[var] = (('time', 'level'), rebin_profiles(X, levels, edges).astype(np.float32))
+        nc_in.close()
+        ds = xr.Dataset(dict, coords={'time' : time, 'level' : edges[0:-1]})
+        ds.attrs['source'] = nc_file
+        ds.attrs['dz'] = dz
+
+        seasons = azc.season_of_month(time.month)
+        for season, outfile in zip(azc.SEASONS.keys(), outfiles):
+            ds_season = ds.isel(time=np.where(seasons == season)[0])
+            # remove empty bins at the bottom
+            has_data = np.zeros(ds_season.level.size, dtype=bool)
+            for var in variables:
+                has_data = has_data | np.isfinite(ds_season[var].values).any(axis=0)
+            nlevels = np.max(np.append(np.where(has_data)[0], 0)) + 1
+            ds_season = ds_season.isel(level=slice(0, nlevels))
+            encoding = {var : {'zlib' : True} for var in variables}
+            ds_season.to_netcdf(outfile, encoding=encoding)
+
+    return None
+
+
+def load_binned_profiles(year_lims, season=None, variables=None, lonLims=None, latLims=None, zmax=None,
+                         exclude_gts=True, binned_dir=BINNED_DIR, dz=BINNED_DZ):
+    """ Read the binned profiles (see build_binned_profiles) of years year_lims[0] to year_lims[1]
+    for a season (all seasons if not in azmp_catalog_tools.SEASONS).
+
+    Returns an xarray Dataset (time x level) in memory.
+
+    Usage ex:
+    import azmp_binned_tools as azbt
+    ds = azbt.load_binned_profiles([1981, 2010], 'summer', ['temperature'], lonLims=[-60, -45], latLims=[42, 56])
+
+    """
+    if isinstance(season, str) and (season in azc.SEASONS.keys()):
+        seasons = [season]
+    else:
+        print('!! no season specified, used them all! !!')
+        seasons = list(azc.SEASONS.keys())
+
+    datasets = []
+    for year in range(year_lims[0], year_lims[-1]+1):
+        for ss in seasons:
+            binned_file = os.path.join(binned_dir, str(year) + '_' + ss + '_dz' + str(dz) + '.nc')
+            if not os.path.isfile(binned_file):
+                continue
+            ds = xr.open_dataset(binned_file)
+            if variables is not None:
+                ds = ds.drop_vars([var for var in ds.data_vars if ('level' in ds[var].dims) and (var not in variables)])
+            keep = np.ones(ds.time.size, dtype=bool)
+            if exclude_gts:
+                keep = keep & (ds['instrument_class'].values == 0)
+            if lonLims is not None:
+                keep = keep & (ds['longitude'].values > lonLims[0]) & (ds['longitude'].values < lonLims[1])
+            if latLims is not None:
+                keep = keep & (ds['latitude'].values > latLims[0]) & (ds['latitude'].values < latLims[1])
+            datasets.append(ds.isel(time=np.where(keep)[0]).load())
+            ds.close()
+
+    if len(datasets) == 0:
+        return xr.Dataset()
+    ds = xr.concat(datasets, dim='time').sortby('time')
+    if zmax is not None:
+        ds = ds.sel(level=ds['level']+dz < zmax)
+
+    return ds
+
+
+def binned_dataframe(ds, var_name, zmax=None):
+    """ DataFrame (casts x bins) of var_name from load_binned_profiles, without empty casts,
+    with the position of the casts (as in the climatology functions).
+
+    Returns df, lons, lats
+
+    """
+    df = ds[var_name].to_pandas()
+    if zmax is not None:
+        df = df.loc[:, df.columns < zmax]
+    keep = ~df.isnull().all(axis=1).values
+    lons = np.array(ds.longitude)[keep]
+    lats = np.array(ds.latitude)[keep]
+
+    return df[keep], lons, lats
@@ -29,6 +29,8 @@ import xarray as xr
 from mpl_toolkits.basemap import Basemap
 from scipy.interpolate import griddata
 from scipy.interpolate import interp1d  # to remove NaNs in profiles
+## AZMP custom imports
+import azmp_catalog_tools as azc
 
 
     
@@ -168,18 +170,8 @@ def get_bottomT_climato(INFILES, LON_REG,  LAT_REG, year_lims=[1981, 2010], seas
         # Selection of a subset region
         ds = ds.where((ds.longitude>lonLims[0]) & (ds.longitude<lonLims[1]), drop=True)
         ds = ds.where((ds.latitude>latLims[0]) & (ds.latitude<latLims[1]), drop=True)
-        # Select time (save several options here)
-        if season == 'summer':
-            #ds = ds.sel(time=ds['time.season']=='JJA')
-            ds = ds.sel(time=((ds['time.month']>=7)) & ((ds['time.month']<=9)))
-        elif season == 'spring':
-            #ds = ds.sel(time=ds['time.season']=='MAM')
-            ds = ds.sel(time=((ds['time.month']>=4)) & ((ds['time.month']<=6)))
-        elif season == 'fall':
-            #ds = ds.sel(time=ds['time.season']=='SON')
-            ds = ds.sel(time=((ds['time.month']>=10)) & ((ds['time.month']<=12)))
-        else:
-            print('!! no season specified, used them all! !!')
+        # Select season (see azmp_catalog_tools.SEASONS)
+        ds = azc.select_season(ds, season)
 
         # Time period for climatology
         ds = ds.sel(time=ds['time.year']>=year_lims[0])
@@ -363,18 +355,8 @@ def get_bottomS_climato(INFILES, LON_REG,  LAT_REG, year_lims=[1981, 2010], seas
         # Selection of a subset region
         ds = ds.where((ds.longitude>lonLims[0]) & (ds.longitude<lonLims[1]), drop=True)
         ds = ds.where((ds.latitude>latLims[0]) & (ds.latitude<latLims[1]), drop=True)
-        # Select time (save several options here)
-        if season == 'summer':
-            #ds = ds.sel(time=ds['time.season']=='JJA')
-            ds = ds.sel(time=((ds['time.month']>=7)) & ((ds['time.month']<=9)))
-        elif season == 'spring':
-            #ds = ds.sel(time=ds['time.season']=='MAM')
-            ds = ds.sel(time=((ds['time.month']>=4)) & ((ds['time.month']<=6)))
-        elif season == 'fall':
-            #ds = ds.sel(time=ds['time.season']=='SON')
-            ds = ds.sel(time=((ds['time.month']>=10)) & ((ds['time.month']<=12)))
-        else:
-            print('!! no season specified, used them all! !!')
+        # Select season (see azmp_catalog_tools.SEASONS)
+        ds = azc.select_season(ds, season)
 
         # Time period for climatology
         ds = ds.sel(time=ds['time.year']>=year_lims[0])
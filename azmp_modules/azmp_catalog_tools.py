@@ -0,0 +1,523 @@
+"""Cast catalog of the yearly netCDF database (one row per cast)
+
+Contains following functions:
+- catalog_netcdf_file(nc_file, batch_size=5000)
+- build_cast_catalog(nc_files=NC_FILES, catalog_file=CATALOG_FILE)
+- load_cast_catalog(catalog_file=CATALOG_FILE)
+- query_casts(catalog, lonLims=None, latLims=None, time_lims=None, months=None, station=None, ...)
+- open_casts(casts, variables=None, zlims=None)
+- read_instrument_class(ds)
+- remove_gts(ds)
+- season_of_month(months)
+- select_season(ds, season)
+- cast_index_file(catalog_file)
+- build_cast_index(catalog, index_file=None)
+- load_cast_index(catalog_file=CATALOG_FILE)
+- casts_within_radius(catalog, lon, lat, radius, cast_index=None)
+- nearest_casts(catalog, lon, lat, k=1, cast_index=None)
+- casts_near_section(catalog, lons, lats, buffer, cast_index=None)
+- export_to_zarr(nc_files=NC_FILES, store=ZARR_STORE, chunks=ZARR_CHUNKS, overwrite=False)
+- open_database(store=ZARR_STORE)
+
+Instead of opening all yearly files with xr.open_mfdataset() and chaining ds.where(..., drop=True)
+(which loads every cast of every year), the selection is done on the small catalog and only the
+selected casts (file, row) are read from the netCDF files.
+
+The catalog columns are: file, row, time, latitude, longitude, instrument_type, instrument_ID,
+instrument_class (0, or >0 for GTS messages), trip_ID, comments (station name), sounder_depth and
+max_depth (deepest level with data).
+
+A KD-tree of cast positions (see azmp_grid_tools.lonlat_to_xyz) is saved next to the catalog
+for radius, k-nearest and along-section queries (distances in km, great circle).
+
+The whole database can also be exported in a single chunked Zarr store (consolidated metadata),
+which opens in seconds instead of concatenating 100+ yearly files with open_mfdataset.
+
+----------
+
+Atlantic Zone Monitoring Program @NAFC:
+https://azmp-nl.github.io/
+
+"""
+
+__author__ = 'Frederic.Cyr@dfo-mpo.gc.ca'
+__version__ = '0.1'
+
+import os
+import glob
+import pickle
+import numpy as np
+import pandas as pd
+import netCDF4 as nc
+import xarray as xr
+from scipy.spatial import cKDTree
+## AZMP custom imports
+import azmp_grid_tools as azg
+
+NC_FILES = '/home/cyrf0006/data/dev_database/netCDF/*.nc'
+CATALOG_FILE = '/home/cyrf0006/data/dev_database/netCDF/cast_catalog.pkl'
+# GTS messages (BATHY and TESAC) of the files written before the 'instrument_class' variable
+# (frozen: newer files store the class of each cast, see pfile_tools.create_netcdf)
+LEGACY_GTS_INSTRUMENTS = ['MEDBA', 'MEDTE']
+ZARR_STORE = '/home/cyrf0006/data/dev_database/hydro_database.zarr'
+# Chunks (casts x levels) are a compromise between reading profiles (a few casts, all levels)
+# and depth slices (one level, all casts): ~4000 casts x 250 dbar (5 dbar bins) per chunk.
+ZARR_CHUNKS = {'time' : 4096, 'level' : 50}
+
+# Single definition of the seasons (months) used by all climatologies, sections, etc.
+SEASONS = {'winter' : [1, 2, 3], 'spring' : [4, 5, 6], 'summer' : [7, 8, 9], 'fall' : [10, 11, 12]}
+
+CATALOG_COLUMNS = ['file', 'row', 'time', 'latitude', 'longitude', 'instrument_type', 'instrument_ID',
+                   'instrument_class', 'trip_ID', 'comments', 'sounder_depth', 'max_depth']
+
+
+def catalog_netcdf_file(nc_file, batch_size=5000):
+    """ Return the catalog (DataFrame, one row per cast) of a yearly netCDF file
+    generated by pfile_tools.
+
+    Only the 1D variables are read. The max_depth column (deepest level with data in any
+    variable) is computed by reading the profiles by batches of casts.
+
+    """
+    nc_in = nc.Dataset(nc_file, 'r')
+    ntimes = len(nc_in.dimensions['time'])
+    levels = np.array(nc_in.variables['level'][:], dtype=float)
+    times = nc_in.variables['time']
+
+    dict = {}
+    dict['file'] = np.repeat(os.path.abspath(nc_file), ntimes)
+    dict['row'] = np.arange(ntimes)
+    dict['time'] = pd.to_datetime([str(t) for t in nc.num2date(times[:], units=times.units, calendar=times.calendar)])
+    for var in ['latitude', 'longitude', 'sounder_depth']:
+        dict[var] = np.ma.filled(nc_in.variables[var][:].astype(float), np.nan)
+    for var in ['instrument_type', 'instrument_ID', 'trip_ID', 'comments']:
+        dict[var] = np.array(nc_in.variables[var][:], dtype=object)
+    dict['instrument_class'] = read_instrument_class(nc_in)
+
+    # Deepest level with data
+    profile_vars = [var for var in nc_in.variables.keys() if nc_in.variables[var].dimensions == ('time', 'level')]
+    max_depth = np.full(ntimes, np.nan)
+    for i in range(0, ntimes, batch_size):
+        i_end = np.min([i+batch_size, ntimes])
+        has_data = np.zeros((i_end-i, levels.size), dtype=bool)
+        for var in profile_vars:
+            has_data = has_data | np.isfinite(np.ma.filled(nc_in.variables[var][i:i_end,:].astype(float), np.nan))
+        idx_deep = levels.size - 1 - np.argmax(has_data[:,::-1], axis=1)
+        max_depth[i:i_end] = np.where(has_data.any(axis=1), levels[idx_deep], np.nan)
+    dict['max_depth'] = max_depth
+    nc_in.close()
+
+    return pd.DataFrame(dict, columns=CATALOG_COLUMNS)
+
+
+def build_cast_catalog(nc_files=NC_FILES, catalog_file=CATALOG_FILE):
+    """ Build (or update) the cast catalog of the netCDF database and save it in catalog_file (pickle).
+
+    nc_files is a glob expression or a list of files. If catalog_file exists, only the
+    netCDF files that are new or modified (size or mtime) since the last call are read again,
+    so it can be called after each update of the database (e.g. yearly_netcdf_gen.py --update).
+
+    Usage ex:
+    import azmp_catalog_tools as azc
+    azc.build_cast_catalog('/home/cyrf0006/data/dev_database/netCDF/*.nc')
+
+    """
+    if isinstance(nc_files, str):
+        nc_files = sorted(glob.glob(nc_files))
+    nc_files = [os.path.abspath(f) for f in nc_files]
+
+    # Previous catalog
+    if os.path.isfile(catalog_file):
+        catalog = pd.read_pickle(catalog_file)
+        file_stats = catalog.attrs.get('file_stats', {})
+        if list(catalog.columns) != CATALOG_COLUMNS: # older catalog version, rebuild
+            file_stats = {}
+    else:
+        catalog = pd.DataFrame(columns=CATALOG_COLUMNS)
+        file_stats = {}
+
+    catalogs = []
+    new_stats = {}
+    for nc_file in nc_files:
+        stat = os.stat(nc_file)
+        new_stats[nc_file] = (stat.st_size, stat.st_mtime)
+        if file_stats.get(nc_file) == new_stats[nc_file]:
+            catalogs.append(catalog[catalog.file == nc_file])
+        else:
+            print(' -> ' + nc_file)
+            catalogs.append(catalog_netcdf_file(nc_file))
+
+    if len(catalogs) > 0:
+        catalog = pd.concat(catalogs, ignore_index=True)
+    else:
+        catalog = pd.DataFrame(columns=CATALOG_COLUMNS)
+    catalog.attrs['file_stats'] = new_stats
+    catalog.to_pickle(catalog_file)
+    build_cast_index(catalog, cast_index_file(catalog_file))
+    print(str(len(catalog)) + ' casts in ' + catalog_file)
+
+    return catalog
+
+
+def load_cast_catalog(catalog_file=CATALOG_FILE):
+    """ Load the catalog saved by build_cast_catalog()
+
+    """
+    return pd.read_pickle(catalog_file)
+
+
+def cast_index_file(catalog_file):
+    """ Name of the KD-tree file saved next to catalog_file
+
+    """
+    return os.path.splitext(catalog_file)[0] + '_kdtree.pkl'
+
+
+def build_cast_index(catalog, index_file=None):
+    """ Build the KD-tree of the cast positions of catalog (saved in index_file if given)
+
+    Returns a dict with the tree and the (positional) catalog rows of its points (casts
+    without position are not in the tree).
+
+    """
+    rows = np.where(np.isfinite(catalog.longitude.values.astype(float)) & np.isfinite(catalog.latitude.values.astype(float)))[0]
+    dict = {}
+    dict['tree'] = cKDTree(azg.lonlat_to_xyz(catalog.longitude.values[rows], catalog.latitude.values[rows]))
+    dict['rows'] = rows
+    dict['ncasts'] = len(catalog)
+    if index_file is not None:
+        with open(index_file, 'wb') as f:
+            pickle.dump(dict, f)
+
+    return dict
+
+
+def load_cast_index(catalog_file=CATALOG_FILE):
+    """ Load the KD-tree saved by build_cast_catalog()
+
+    """
+    with open(cast_index_file(catalog_file), 'rb') as f:
+        return pickle.load(f)
+
+
+def _catalog_and_index(catalog, cast_index):
+    """ Load catalog (if a file name) and its KD-tree (saved one, or built for this catalog)
+
+    """
+    if isinstance(catalog, str):
+        if (cast_index is None) and os.path.isfile(cast_index_file(catalog)):
+            cast_index = load_cast_index(catalog)
+        catalog = load_cast_catalog(catalog)
+    if (cast_index is None) or (cast_index['ncasts'] != len(catalog)):
+        cast_index = build_cast_index(catalog)
+
+    return catalog, cast_index
+
+
+def casts_within_radius(catalog, lon, lat, radius, cast_index=None):
+    """ Catalog rows of the casts within radius [km] of (lon, lat), with their 'distance' [km].
+
+    catalog can be the catalog file (the saved KD-tree is then used), the catalog or any
+    subset of it (e.g. from query_casts).
+
+    Usage ex:
+    import azmp_catalog_tools as azc
+    casts = azc.casts_within_radius(azc.CATALOG_FILE, -52.58667, 47.54667, 2)
+    casts = azc.query_casts(casts, time_lims=['1991-01-01', '2020-12-31'])
+
+    """
+    catalog, cast_index = _catalog_and_index(catalog, cast_index)
+    idx = cast_index['tree'].query_ball_point(azg.lonlat_to_xyz(lon, lat)[0], azg.chord_length(radius))
+    rows = cast_index['rows'][np.sort(np.array(idx, dtype=int))]
+    casts = catalog.iloc[rows].copy()
+    casts['distance'] = haversine_distance(lon, lat, casts.longitude.values, casts.latitude.values)
+
+    return casts.sort_values(['file', 'row'])
+
+
+def nearest_casts(catalog, lon, lat, k=1, cast_index=None):
+    """ Catalog rows of the k casts nearest to (lon, lat) (sorted by 'distance' [km])
+
+    """
+    catalog, cast_index = _catalog_and_index(catalog, cast_index)
+    k = np.min([k, len(cast_index['rows'])])
+    dist, idx = cast_index['tree'].query(azg.lonlat_to_xyz(lon, lat)[0], k=[n+1 for n in range(k)])
+    casts = catalog.iloc[cast_index['rows'][idx]].copy()
+    casts['distance'] = haversine_distance(lon, lat, casts.longitude.values, casts.latitude.values)
+
+    return casts
+
+
+def casts_near_section(catalog, lons, lats, buffer, cast_index=None):
+    """ Catalog rows of the casts within buffer [km] of the section lons/lats (e.g. station positions),
+    with their 'distance' [km] to the section.
+
+    The section is sampled every buffer/4 between consecutive points and the casts within buffer
+    of any sample are kept (the buffer is accurate to ~3%).
+
+    Usage ex:
+    import azmp_catalog_tools as azc
+    casts = azc.casts_near_section(azc.CATALOG_FILE, df_stn.LON.values, df_stn.LAT.values, 10)
+
+    """
+    catalog, cast_index = _catalog_and_index(catalog, cast_index)
+    lons = np.atleast_1d(np.asarray(lons, dtype=float))
+    lats = np.atleast_1d(np.asarray(lats, dtype=float))
+    lon_pts = [lons[0:1]]
+    lat_pts = [lats[0:1]]
+    for i in range(1, lons.size):
+        npts = int(np.ceil(haversine_distance(lons[i-1], lats[i-1], lons[i], lats[i]) / (buffer/4.0)))
+        frac = np.arange(1, npts+1) / float(np.max([npts, 1]))
+        lon_pts.append(lons[i-1] + frac*(lons[i]-lons[i-1]))
+        lat_pts.append(lats[i-1] + frac*(lats[i]-lats[i-1]))
+    lon_pts = np.concatenate(lon_pts)
+    lat_pts = np.concatenate(lat_pts)
+
+    section_tree = cKDTree(azg.lonlat_to_xyz(lon_pts, lat_pts))
+    idx = section_tree.query_ball_tree(cast_index['tree'], azg.chord_length(buffer))
+    idx = np.unique(np.concatenate([np.array(ii, dtype=int) for ii in idx]))
+    casts = catalog.iloc[cast_index['rows'][idx]].copy()
+    dist, idx_pts = section_tree.query(azg.lonlat_to_xyz(casts.longitude.values, casts.latitude.values))
+    casts['distance'] = haversine_distance(lon_pts[idx_pts], lat_pts[idx_pts], casts.longitude.values, casts.latitude.values)
+
+    return casts.sort_values(['file', 'row'])
+
+
+def haversine_distance(lon1, lat1, lon2, lat2):
+    """ Great circle distance [km] (vectorized)
+
+    """
+    lon1, lat1, lon2, lat2 = [np.radians(np.asarray(x, dtype=float)) for x in [lon1, lat1, lon2, lat2]]
+    a = np.sin((lat2-lat1)/2)**2 + np.cos(lat1)*np.cos(lat2)*np.sin((lon2-lon1)/2)**2
+    return 2*azg.EARTH_RADIUS*np.arcsin(np.sqrt(a))
+
+
+def query_casts(catalog, lonLims=None, latLims=None, time_lims=None, months=None, station=None,
+                exclude_gts=True, exclude_instruments=None, instrument_type=None, min_depth=None):
+    """ Select casts in the catalog (DataFrame from load_cast_catalog, or catalog file name)
+
+    Input params (all optional):
+        - lonLims, latLims: bounding box, e.g. [-60, -45], [42, 56] (limits excluded)
+        - time_lims: e.g. ['1991-01-01', '2020-12-31'] (limits included)
+        - months: list of months, e.g. [4,5,6], or season name (see SEASONS)
+        - station: regular expression on 'comments' (station name), e.g. 'BB-' or '^(S27|STN27)'
+        - exclude_gts: remove GTS messages (instrument_class > 0)
+        - exclude_instruments: list of other instrument_ID to remove
+        - instrument_type: list of instrument_type to keep, e.g. ['CD']
+        - min_depth: keep casts with data at least down to this level
+
+    Returns the catalog rows of the selected casts (sorted by file and row), see open_casts.
+
+    Usage ex:
+    import azmp_catalog_tools as azc
+    catalog = azc.load_cast_catalog()
+    casts = azc.query_casts(catalog, lonLims=[-53, -52], latLims=[47, 48], months=[7,8,9])
+    ds = azc.open_casts(casts, variables=['temperature', 'salinity'])
+
+    """
+    if isinstance(catalog, str):
+        catalog = load_cast_catalog(catalog)
+
+    idx = np.ones(len(catalog), dtype=bool)
+    if lonLims is not None:
+        idx = idx & (catalog.longitude.values > lonLims[0]) & (catalog.longitude.values < lonLims[1])
+    if latLims is not None:
+        idx = idx & (catalog.latitude.values > latLims[0]) & (catalog.latitude.values < latLims[1])
+    if time_lims is not None:
+        idx = idx & (catalog.time.values >= np.datetime64(pd.Timestamp(time_lims[0]))) & (catalog.time.values <= np.datetime64(pd.Timestamp(time_lims[1])))
+    if isinstance(months, str):
+        months = SEASONS[months]
+    if months is not None:
+        idx = idx & catalog.time.dt.month.isin(months).values
+    if station is not None:
+        idx = idx & catalog.comments.astype(str).str.contains(station, regex=True).values
+    if exclude_gts:
+        idx = idx & (catalog.instrument_class.values == 0)
+    if exclude_instruments is not None:
+        idx = idx & ~catalog.instrument_ID.isin(exclude_instruments).values
+    if instrument_type is not None:
+        idx = idx & catalog.instrument_type.isin(instrument_type).values
+    if min_depth is not None:
+        idx = idx & (catalog.max_depth.values >= min_depth)
+
+    return catalog[idx].sort_values(['file', 'row'])
+
+
+def read_instrument_class(ds):
+    """ Instrument class of every cast of a file of the database (netCDF4 or xarray Dataset):
+    0 for all instruments but GTS messages (>0).
+
+    The 'instrument_class' variable written by pfile_tools is read as is (its GTS classes are
+    listed in its flag_values/flag_meanings attributes). For files written before it existed,
+    classes are derived from 'instrument_ID' (LEGACY_GTS_INSTRUMENTS are classes 1, 2).
+
+    """
+    if 'instrument_class' in ds.variables:
+        return np.asarray(ds.variables['instrument_class'][:]).astype(np.int8)
+    instrument_ids = np.asarray(ds.variables['instrument_ID'][:]).astype(str)
+    classes = np.zeros(instrument_ids.shape, dtype=np.int8)
+    for k, gts in enumerate(LEGACY_GTS_INSTRUMENTS):
+        classes[instrument_ids == gts] = k+1
+
+    return classes
+
+
+def remove_gts(ds):
+    """ Remove GTS messages (MEDBA & MEDTE) from a Dataset of the database.
+
+    Only the 'instrument_class' variable (or 'instrument_ID' for files written before it
+    existed) is read and the casts are dropped by index (isel), instead of
+    ds.where(ds.instrument_ID!='MEDBA', drop=True) on every variable.
+
+    Usage ex:
+    import azmp_catalog_tools as azc
+    ds = xr.open_mfdataset(INFILES)
+    ds = azc.remove_gts(ds)
+
+    """
+    keep = read_instrument_class(ds) == 0
+
+    return ds.isel(time=np.where(keep)[0])
+
+
+def season_of_month(months):
+    """ Season name (see SEASONS) of each month
+
+    """
+    months = np.asarray(months)
+    seasons = np.full(months.shape, '', dtype=object)
+    for season in SEASONS.keys():
+        seasons[np.isin(months, SEASONS[season])] = season
+
+    return seasons
+
+
+def select_season(ds, season):
+    """ Select the casts of a season (see SEASONS) in a Dataset of the database (by index).
+    All casts are kept if season is not in SEASONS (e.g. 'all' or []).
+
+    Usage ex:
+    import azmp_catalog_tools as azc
+    ds = azc.select_season(ds, 'summer')
+
+    """
+    if (not isinstance(season, str)) or (season not in SEASONS.keys()):
+        print('!! no season specified, used them all! !!')
+        return ds
+    months = pd.DatetimeIndex(ds['time'].values).month
+
+    return ds.isel(time=np.where(np.isin(months, SEASONS[season]))[0])
+
+
+def open_casts(casts, variables=None, zlims=None):
+    """ Read the casts selected by query_casts() from the netCDF files.
+
+    Only the selected rows of each file are read (isel on 'time'). Returns an xarray Dataset
+    with the same structure as the netCDF files (sorted by time).
+
+    Input params:
+        - casts: output of query_casts()
+        - variables: list of profile variables to keep (default: all)
+        - zlims: e.g. [0, 180] to keep levels 0 < level < 180
+
+    """
+    datasets = []
+    for nc_file, df in casts.groupby('file', sort=True):
+        ds = xr.open_dataset(nc_file)
+        if variables is not None:
+            profile_vars = [var for var in ds.data_vars if 'level' in ds[var].dims]
+            ds = ds.drop_vars([var for var in profile_vars if var not in variables])
+        if zlims is not None:
+            ds = ds.sel(level=(ds['level']>zlims[0]) & (ds['level']<zlims[1]))
+        datasets.append(ds.isel(time=df.row.values).load())
+        ds.close()
+
+    if len(datasets) == 0:
+        return xr.Dataset()
+    ds = xr.concat(datasets, dim='time')
+
+    return ds.sortby('time')
+
+
+def export_to_zarr(nc_files=NC_FILES, store=ZARR_STORE, chunks=ZARR_CHUNKS, overwrite=False):
+    """ Export the yearly netCDF files in a single chunked Zarr store (one file at a time).
+
+    If the store already exists, only the files not yet exported are appended along 'time',
+    so it can be called every time a new year is added. Files must be appended in
+    chronological order; if an exported file was modified (or an older year is added), the store
+    must be rebuilt with overwrite=True. All files are put on the same levels (those of the
+    store, or all levels found in nc_files when it is created).
+
+    Usage ex:
+    import azmp_catalog_tools as azc
+    azc.export_to_zarr('/home/cyrf0006/data/dev_database/netCDF/*.nc', overwrite=True)
+    ds = azc.open_database()
+
+    """
+    import zarr # only needed here (and by xarray for the store)
+    if isinstance(nc_files, str):
+        nc_files = sorted(glob.glob(nc_files))
+    nc_files = [os.path.abspath(f) for f in nc_files]
+
+    # Files already in store
+    if overwrite | (not os.path.isdir(store)):
+        file_stats = {}
+        levels = []
+        for nc_file in nc_files:
+            nc_in = nc.Dataset(nc_file, 'r')
+            levels.append(np.array(nc_in.variables['level'][:]))
+            nc_in.close()
+        levels = np.unique(np.concatenate(levels))
+        first = True
+    else:
+        root = zarr.open_group(store, mode='r')
+        file_stats = dict(root.attrs.get('file_stats', {}))
+        levels = np.array(root['level'][:])
+        first = False
+    for nc_file in nc_files:
+        stat = os.stat(nc_file)
+        if (nc_file in file_stats) & (file_stats.get(nc_file) != [stat.st_size, stat.st_mtime]):
+            print(' -> ' + nc_file + ' changed since export, use overwrite=True to rebuild the store')
+
+    for nc_file in nc_files:
+        if nc_file in file_stats:
+            continue
+        print(' -> ' + nc_file)
+        ds = xr.open_dataset(nc_file)
+        if np.setdiff1d(ds.level.values, levels).size > 0:
+            ds.close()
+            raise ValueError(nc_file + ' has levels not in ' + store + ' (use overwrite=True)')
+        ds = ds.reindex(level=levels).load()
+        if first:
+            encoding = {}
+            for var in ds.data_vars:
+                if ds[var].dims == ('time', 'level'):
+                    encoding[var] = {'chunks' : (chunks['time'], chunks['level'])}
+                else:
+                    encoding[var] = {'chunks' : (chunks['time'],)}
+            ds.to_zarr(store, mode='w', encoding=encoding, consolidated=True)
+            first = False
+        else:
+            ds.to_zarr(store, append_dim='time', consolidated=True)
+        ds.close()
+        stat = os.stat(nc_file)
+        file_stats[nc_file] = [stat.st_size, stat.st_mtime]
+
+        # Keep track of exported files
+        root = zarr.open_group(store, mode='a')
+        root.attrs['file_stats'] = file_stats
+        zarr.consolidate_metadata(store)
+
+    return None
+
+
+def open_database(store=ZARR_STORE):
+    """ Open the Zarr store of the database (see export_to_zarr) as an xarray Dataset (lazy, dask arrays).
+
+    Usage ex:
+    import azmp_catalog_tools as azc
+    ds = azc.open_database()
+    T100 = ds.temperature.sel(level=100) # depth slice of all casts
+
+    """
+    return xr.open_zarr(store, consolidated=True)
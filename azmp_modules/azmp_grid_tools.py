@@ -0,0 +1,544 @@
+"""Gridding tools shared by the AZMP climatologies and sections
+
+Contains following functions:
+- grid_cell_index(lons, lats, lon_reg, lat_reg)
+- bin_casts_to_grid(lons, lats, data, lon_reg, lat_reg)
+- accumulate_casts_to_grid(lons, lats, data, lon_reg, lat_reg, sums=None, counts=None)
+- grid_mean(sums, counts)
+- fill_vertical_gaps(V, z, vmax=None)
+- interp_levels(V, lon_reg, lat_reg, min_pts=10, tri_cache=None)
+- bottom_values(V, z, bottom_depth, max_dist=50, min_good=1)
+- grid_hash(lon_reg, lat_reg)
+- points_in_polygon(lons, lats, polygon)
+- polygon_mask(lon_reg, lat_reg, polygon)
+- get_grid_masks(lon_reg, lat_reg, shapes, mask_dir='.')
+- cell_area(lon_reg, lat_reg)
+- lonlat_to_xyz(lons, lats)
+- chord_length(dist)
+- nearest_grid_node(lon_reg, lat_reg, lons, lats)
+
+These only depend on numpy/scipy/matplotlib so they can be imported by any module
+(azmp_utils, azmp_sections_tools, mpa_tools, scripts).
+
+----------
+
+Atlantic Zone Monitoring Program @NAFC:
+https://azmp-nl.github.io/
+
+"""
+
+__author__ = 'Frederic.Cyr@dfo-mpo.gc.ca'
+__version__ = '0.1'
+
+import hashlib
+import os
+import numpy as np
+from matplotlib.path import Path
+from scipy.interpolate import griddata
+from scipy.spatial import Delaunay, QhullError, cKDTree
+
+EARTH_RADIUS = 6371.0072 # authalic radius [km] (sphere of same surface as WGS84 ellipsoid)
+
+# Cell areas already computed (key: grid_hash)
+_cell_area_cache = {}
+# KD-trees of grid nodes already built (key: grid_hash)
+_grid_tree_cache = {}
+
+
+def grid_cell_index(lons, lats, lon_reg, lat_reg):
+    """ Return the (j, i) cell indices of every cast on the regular grid.
+
+    lon_reg and lat_reg are the cell centers (as built in get_bottomT_climato, e.g.
+    lon_reg = np.arange(lonLims[0]+dc/2, lonLims[1]-dc/2, dc)), so a cast belongs to cell i if
+    lon_reg[i]-dc/2 <= lon < lon_reg[i]+dc/2 (same rule as the former np.where loop).
+    Casts falling outside the grid get index -1.
+
+    Usage ex:
+    import azmp_grid_tools as azg
+    jj, ii = azg.grid_cell_index(lons, lats, lon_reg, lat_reg)
+
+    """
+    lons = np.asarray(lons, dtype=float)
+    lats = np.asarray(lats, dtype=float)
+    dlon = lon_reg[1] - lon_reg[0]
+    dlat = lat_reg[1] - lat_reg[0]
+
+    ii = np.floor((lons - (lon_reg[0] - dlon/2)) / dlon).astype(int)
+    jj = np.floor((lats - (lat_reg[0] - dlat/2)) / dlat).astype(int)
+
+    outside = (ii < 0) | (ii >= lon_reg.size) | (jj < 0) | (jj >= lat_reg.size) | np.isnan(lons) | np.isnan(lats)
+    ii[outside] = -1
+    jj[outside] = -1
+
+    return jj, ii
+
+
+def bin_casts_to_grid(lons, lats, data, lon_reg, lat_reg):
+    """ Average all casts falling in each cell of a regular grid (grouped nanmean).
+
+    Input:
+    lons, lats - cast positions (ncasts)
+    data - binned profiles (ncasts x nz), e.g. df_temp.values
+    lon_reg, lat_reg - regular grid (cell centers)
+
+    Output:
+    V - cube (lat_reg.size x lon_reg.size x nz) with the mean of all casts in each cell,
+        NaN where no cast (or no valid value at this depth) is available.
+
+    This replaces the double loop on lon_reg/lat_reg (np.where + df.iloc[idx].mean()) previously
+    used to fill the 3D cube. Every cast is assigned to its cell once and all cells are reduced
+    together with np.bincount.
+
+    Usage ex:
+    import azmp_grid_tools as azg
+    V = azg.bin_casts_to_grid(lons, lats, df_temp.values, lon_reg, lat_reg)
+
+    """
+    sums, counts = accumulate_casts_to_grid(lons, lats, data, lon_reg, lat_reg)
+
+    return grid_mean(sums, counts)
+
+
+def accumulate_casts_to_grid(lons, lats, data, lon_reg, lat_reg, sums=None, counts=None):
+    """ Add casts to running per-cell sums and counts (lat_reg.size x lon_reg.size x nz).
+
+    Casts can then be added in batches (e.g. one year at a time) without ever holding them
+    all in memory; grid_mean(sums, counts) gives the same cube as bin_casts_to_grid on all casts.
+
+    Usage ex:
+    import azmp_grid_tools as azg
+    sums, counts = None, None
+    for ...:
+        sums, counts = azg.accumulate_casts_to_grid(lons, lats, df_temp.values, lon_reg, lat_reg, sums, counts)
+    V = azg.grid_mean(sums, counts)
+
+    """
+    data = np.asarray(data, dtype=float)
+    if data.ndim == 1:
+        data = data[:, np.newaxis]
+    nz = data.shape[1]
+    ncells = lat_reg.size * lon_reg.size
+    if sums is None:
+        sums = np.zeros((lat_reg.size, lon_reg.size, nz))
+        counts = np.zeros((lat_reg.size, lon_reg.size, nz), dtype=np.int64)
+
+    # Cell index of every cast (drop those outside the grid)
+    jj, ii = grid_cell_index(lons, lats, lon_reg, lat_reg)
+    idx_in = np.where(ii >= 0)[0]
+    cell = jj[idx_in] * lon_reg.size + ii[idx_in]
+    data = data[idx_in, :]
+
+    # Flat (cell, depth) index for every value
+    flat_idx = (cell[:, np.newaxis] * nz + np.arange(nz)).ravel()
+    values = data.ravel()
+    good = ~np.isnan(values)
+
+    # Grouped sums and counts (NaNs ignored, like pandas mean)
+    sums += np.bincount(flat_idx[good], weights=values[good], minlength=ncells*nz).reshape(sums.shape)
+    counts += np.bincount(flat_idx[good], minlength=ncells*nz).reshape(counts.shape)
+
+    return sums, counts
+
+
+def grid_mean(sums, counts):
+    """ Cell averages from accumulate_casts_to_grid (NaN where no data)
+
+    """
+    V = np.full(sums.shape, np.nan)
+    idx_filled = counts > 0
+    V[idx_filled] = sums[idx_filled] / counts[idx_filled]
+
+    return V
+
+
+def fill_vertical_gaps(V, z, vmax=None):
+    """ Linearly interpolate interior NaNs of every profile of a cube along its last (z) axis.
+
+    Same rule as the former per-cell interp1d: values are interpolated only between the first
+    and the last good depth bin of each profile (no extrapolation). A value is "good" if it is
+    not NaN and, if vmax is provided, smaller than vmax (e.g. vmax=30 to reject bad temperatures).
+    Profiles with a single good value are returned untouched.
+
+    Works on any shape (..., nz), e.g. the (lat, lon, z) cube or a (ncasts, nz) array.
+    For every bin, the closest good bin above and below are found with cumulative max/min
+    of their indices, so all profiles are filled at once.
+
+    Usage ex:
+    import azmp_grid_tools as azg
+    V = azg.bin_casts_to_grid(lons, lats, df_temp.values, lon_reg, lat_reg)
+    V = azg.fill_vertical_gaps(V, z, vmax=30)
+
+    """
+    V = np.asarray(V, dtype=float)
+    z = np.asarray(z, dtype=float)
+    nz = z.size
+    with np.errstate(invalid='ignore'):
+        good = ~np.isnan(V)
+        if vmax is not None:
+            good &= (V < vmax)
+    ngood = good.sum(axis=-1)
+
+    # Index of the previous (above) and next (below) good bin
+    k = np.arange(nz)
+    idx_prev = np.maximum.accumulate(np.where(good, k, -1), axis=-1)
+    idx_next = np.flip(np.minimum.accumulate(np.flip(np.where(good, k, nz), axis=-1), axis=-1), axis=-1)
+    inside = (idx_prev >= 0) & (idx_next < nz)
+
+    idx_prev = np.clip(idx_prev, 0, nz-1)
+    idx_next = np.clip(idx_next, 0, nz-1)
+    v_prev = np.take_along_axis(V, idx_prev, axis=-1)
+    v_next = np.take_along_axis(V, idx_next, axis=-1)
+    z_prev = z[idx_prev]
+    z_next = z[idx_next]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        weight = np.where(idx_next > idx_prev, (z - z_prev) / (z_next - z_prev), 0.)
+    V_itp = np.where(inside, v_prev + weight*(v_next - v_prev), np.nan)
+
+    # Single good value: keep the original profile (as before)
+    single = (ngood == 1)
+    V_itp[single] = V[single]
+    # No good value at all: empty profile
+    V_itp[ngood == 0] = np.nan
+
+    return V_itp
+
+
+def delaunay_weights(points, xi):
+    """ Triangulate scattered points and return, for every target point xi, the vertices of the
+    enclosing triangle and their barycentric weights (NaN outside the convex hull).
+
+    Applying them as (values[vertices]*weights).sum(1) gives the same result as
+    griddata(points, values, xi, method='linear'), but the triangulation can be reused.
+
+    """
+    tri = Delaunay(points)
+    simplex = tri.find_simplex(xi)
+    T = tri.transform[simplex]
+    b = np.einsum('ijk,ik->ij', T[:, :2, :], xi - T[:, 2, :])
+    weights = np.c_[b, 1 - b.sum(axis=1)]
+    weights[simplex == -1, :] = np.nan
+    vertices = tri.simplices[simplex]
+
+    return vertices, weights
+
+
+def interp_levels(V, lon_reg, lat_reg, min_pts=10, tri_cache=None):
+    """ Horizontal (linear) interpolation of every depth level of one or several cubes.
+
+    Replaces the loop calling griddata(..., method='linear') at each level. The Delaunay
+    triangulation and barycentric weights are computed once per distinct set of valid cells
+    and applied to all levels (and all variables) sharing this set.
+
+    Input:
+    V - cube (lat_reg.size x lon_reg.size x nz), or a list of cubes (e.g. [V_temp, V_sal])
+    lon_reg, lat_reg - regular grid
+    min_pts - levels with min_pts valid cells or less are left untouched (no data)
+    tri_cache - optional dict to share triangulations between calls (e.g. between T and S,
+                or from one year to the next on the same grid)
+
+    Levels where the valid cells are all on the same latitude or longitude cannot be
+    triangulated and use griddata(..., method='nearest') instead (as done in get_section).
+
+    Output:
+    Interpolated cube (or list of cubes, same order as input)
+
+    Usage ex:
+    import azmp_grid_tools as azg
+    V = azg.interp_levels(V, lon_reg, lat_reg, min_pts=10)
+    OR
+    V_temp, V_sal = azg.interp_levels([V_temp, V_sal], lon_reg, lat_reg)
+
+    """
+    single_cube = not isinstance(V, (list, tuple))
+    cubes = [V] if single_cube else list(V)
+    if tri_cache is None:
+        tri_cache = {}
+
+    lon_grid, lat_grid = np.meshgrid(lon_reg, lat_reg)
+    lon_vec = np.reshape(lon_grid, lon_grid.size)
+    lat_vec = np.reshape(lat_grid, lat_grid.size)
+    xi = np.c_[lon_vec, lat_vec]
+    grid_key = hashlib.sha1(xi.tobytes()).hexdigest() # cache only valid for this grid
+
+    # Group all levels (of all variables) by their mask of valid cells
+    groups = {}
+    for n, cube in enumerate(cubes):
+        cube_vec = cube.reshape(lon_grid.size, cube.shape[2])
+        for k in range(cube.shape[2]):
+            mask = ~np.isnan(cube_vec[:, k])
+            if mask.sum() <= min_pts: # will ignore depth where no data exist
+                continue
+            key = grid_key + hashlib.sha1(np.packbits(mask).tobytes()).hexdigest()
+            groups.setdefault(key, [mask, []])[1].append((n, k))
+
+    # Interpolate (one triangulation per mask)
+    out = [cube.copy() for cube in cubes]
+    for key, (mask, levels) in groups.items():
+        idx_good = np.where(mask)[0]
+        LN = lon_vec[idx_good]
+        LT = lat_vec[idx_good]
+        values = np.stack([cubes[n].reshape(lon_grid.size, -1)[idx_good, k] for n, k in levels], axis=1)
+
+        if (np.unique(LT).size == 1) | (np.unique(LN).size == 1): # cannot grid single latitude (e.g. 47N)
+            itp = griddata((LN, LT), values, (lon_vec, lat_vec), method='nearest')
+        else:
+            if key not in tri_cache:
+                try:
+                    tri_cache[key] = delaunay_weights(np.c_[LN, LT], xi)
+                except QhullError:
+                    tri_cache[key] = None
+            if tri_cache[key] is None: # degenerate (e.g. colinear points)
+                itp = griddata((LN, LT), values, (lon_vec, lat_vec), method='nearest')
+            else:
+                vertices, weights = tri_cache[key]
+                itp = np.einsum('ijl,ij->il', values[vertices], weights)
+
+        for m, (n, k) in enumerate(levels):
+            out[n][:, :, k] = itp[:, m].reshape(lon_grid.shape)
+
+    if single_cube:
+        return out[0]
+    return out
+
+
+def bottom_values(V, z, bottom_depth, max_dist=50, min_good=1):
+    """ Extract the bottom field of a (lat, lon, z) cube.
+
+    In each cell, the selected value is the one of the good (non-NaN) depth bin closest to
+    bottom_depth (e.g. -Zitp from GEBCO), provided it lies within max_dist meters of it.
+    Ties are resolved toward the shallowest bin (as np.argmin did in the former loop).
+    Cells with less than min_good good bins are left empty.
+
+    Input:
+    V - cube (lat_reg.size x lon_reg.size x nz)
+    z - depth bins (nz), positive down
+    bottom_depth - bottom depth of each cell (lat_reg.size x lon_reg.size), positive down
+    max_dist - maximum distance [m] between the selected bin and the bottom
+    min_good - minimum number of good bins in the profile
+
+    Output:
+    Vbot - bottom field (NaN where no bin qualifies)
+    dist - bottom_depth minus the depth of the closest good bin [m] (positive when this bin is
+           above the bottom), given even if larger than max_dist, so the selection can be audited.
+
+    Usage ex:
+    import azmp_grid_tools as azg
+    Tbot, Tbot_dist = azg.bottom_values(V, z, -Zitp)
+
+    """
+    V = np.asarray(V, dtype=float)
+    z = np.asarray(z, dtype=float)
+    bottom_depth = np.asarray(bottom_depth, dtype=float)
+    good = ~np.isnan(V)
+    ngood = good.sum(axis=-1)
+
+    # Distance of every good bin to the bottom (inf if no data)
+    with np.errstate(invalid='ignore'):
+        dist_all = np.where(good, np.abs(bottom_depth[..., np.newaxis] - z), np.inf)
+    dist_all[np.isnan(dist_all)] = np.inf # bottom depth unknown
+    idx_closest = np.argmin(dist_all, axis=-1)
+
+    Vbot = np.take_along_axis(V, idx_closest[..., np.newaxis], axis=-1)[..., 0]
+    dist = bottom_depth - z[idx_closest]
+    dist[ngood < max(min_good, 1)] = np.nan
+
+    with np.errstate(invalid='ignore'):
+        Vbot[~(np.abs(dist) <= max_dist)] = np.nan
+
+    return Vbot, dist
+
+
+def grid_hash(lon_reg, lat_reg):
+    """ Short hash identifying a regular grid (used to name cached masks, areas, etc.)
+
+    Usage ex:
+    import azmp_grid_tools as azg
+    key = azg.grid_hash(lon_reg, lat_reg)
+
+    """
+    h = hashlib.sha1()
+    h.update(np.asarray(lon_reg, dtype=float).tobytes())
+    h.update(np.asarray(lat_reg, dtype=float).tobytes())
+    return h.hexdigest()[:12]
+
+
+def _polygon_rings(polygon):
+    """ Return the (exterior rings, interior rings) of a polygon given as
+    - a dict with 'lon' and 'lat' keys (e.g. azu.get_nafo_divisions()['3L']),
+    - a (N x 2) array of lon/lat (e.g. azu.get_NLshelf(), mpa_tools.get_closures()[5]),
+    - a shapely Polygon or MultiPolygon (e.g. from cascaded_union).
+
+    """
+    if isinstance(polygon, dict):
+        return [np.c_[polygon['lon'], polygon['lat']]], []
+    if hasattr(polygon, 'geoms'): # MultiPolygon
+        exteriors, interiors = [], []
+        for geom in polygon.geoms:
+            ext, inte = _polygon_rings(geom)
+            exteriors += ext
+            interiors += inte
+        return exteriors, interiors
+    if hasattr(polygon, 'exterior'): # Polygon
+        return [np.array(polygon.exterior.coords)], [np.array(ring.coords) for ring in polygon.interiors]
+    return [np.asarray(polygon, dtype=float)], []
+
+
+def points_in_polygon(lons, lats, polygon):
+    """ Vectorized point-in-polygon test (matplotlib Path), replacing loops on
+    shapely polygon.contains(Point(lon, lat)).
+
+    See _polygon_rings() for accepted polygon types. Holes of shapely polygons are excluded.
+
+    Usage ex:
+    import azmp_grid_tools as azg
+    idx_in = azg.points_in_polygon(lons, lats, nafo_div['3L'])
+
+    """
+    points = np.c_[np.ravel(lons), np.ravel(lats)]
+    exteriors, interiors = _polygon_rings(polygon)
+    inside = np.zeros(points.shape[0], dtype=bool)
+    for ring in exteriors:
+        inside |= Path(ring).contains_points(points)
+    for ring in interiors:
+        inside &= ~Path(ring).contains_points(points)
+    return inside.reshape(np.shape(lons))
+
+
+def polygon_mask(lon_reg, lat_reg, polygon):
+    """ Rasterize a polygon on a regular grid: boolean mask (lat_reg.size x lon_reg.size),
+    True for the grid nodes inside the polygon.
+
+    Usage ex:
+    import azmp_grid_tools as azg
+    mask_3L = azg.polygon_mask(lon_reg, lat_reg, nafo_div['3L'])
+    Tbot[~mask_3L] = np.nan
+
+    """
+    lon_grid, lat_grid = np.meshgrid(lon_reg, lat_reg)
+    return points_in_polygon(lon_grid, lat_grid, polygon)
+
+
+def get_grid_masks(lon_reg, lat_reg, shapes, mask_dir='.'):
+    """ Return a dict of boolean masks (one per shape) on the grid lon_reg/lat_reg.
+
+    Masks are rasterized only once per grid and saved in mask_dir/masks_<grid_hash>.npz
+    (replaced atomically, so the file can be shared by parallel processes).
+    Each mask is stored under its name and the hash of its vertices, so editing a
+    polygon (e.g. a NAFO division) triggers a new rasterization.
+
+    Input:
+    lon_reg, lat_reg - regular grid
+    shapes - dict {name : polygon} (see _polygon_rings() for accepted polygon types)
+    mask_dir - where to save the masks
+
+    Usage ex:
+    import azmp_grid_tools as azg
+    masks = azg.get_grid_masks(lon_reg, lat_reg, azu.get_nafo_divisions())
+    Tbot[~(masks['3L'] | masks['3N'] | masks['3O'])] = np.nan
+
+    """
+    mask_file = os.path.join(mask_dir, 'masks_' + grid_hash(lon_reg, lat_reg) + '.npz')
+    saved = {}
+    if os.path.isfile(mask_file):
+        with np.load(mask_file) as npz:
+            saved = {key : npz[key] for key in npz.files}
+
+    masks = {}
+    new_mask = False
+    for name, polygon in shapes.items():
+        exteriors, interiors = _polygon_rings(polygon)
+        h = hashlib.sha1()
+        for ring in exteriors + interiors:
+            h.update(np.asarray(ring, dtype=float).tobytes())
+        key = str(name) + '_' + h.hexdigest()[:12]
+        if key not in saved:
+            saved[key] = polygon_mask(lon_reg, lat_reg, polygon)
+            new_mask = True
+        masks[name] = saved[key]
+
+    if new_mask:
+        if not os.path.isdir(mask_dir):
+            os.makedirs(mask_dir, exist_ok=True)
+        # keep the masks added by other processes since the file was read
+        if os.path.isfile(mask_file):
+            with np.load(mask_file) as npz:
+                for key in npz.files:
+                    if key not in saved:
+                        saved[key] = npz[key]
+        # write a copy and replace the file (other processes may read or write it)
+        tmp_file = mask_file + '.' + str(os.getpid())
+        with open(tmp_file, 'wb') as f:
+            np.savez_compressed(f, **saved)
+        os.replace(tmp_file, mask_file)
+
+    return masks
+
+
+def cell_area(lon_reg, lat_reg):
+    """ Area [km2] of every cell of the regular grid lon_reg/lat_reg (cell centers).
+
+    Spherical area of the cell between its edges (lon +- dlon/2, lat +- dlat/2):
+    R^2 * dlon * (sin(lat_north) - sin(lat_south)), i.e. it only depends on the latitude row.
+    The grid (lat_reg.size x lon_reg.size) is computed once per grid and kept in memory,
+    so it is read-only.
+
+    Usage ex:
+    import azmp_grid_tools as azg
+    pixel_area = azg.cell_area(lon_reg, lat_reg)
+    area_colder0 = pixel_area[(Tbot<=0) & mask].sum()
+
+    """
+    key = grid_hash(lon_reg, lat_reg)
+    if key not in _cell_area_cache:
+        dlon = np.abs(lon_reg[1] - lon_reg[0])
+        dlat = np.abs(lat_reg[1] - lat_reg[0])
+        lat_south = np.radians(np.clip(lat_reg - dlat/2, -90, 90))
+        lat_north = np.radians(np.clip(lat_reg + dlat/2, -90, 90))
+        row_area = EARTH_RADIUS**2 * np.radians(dlon) * np.abs(np.sin(lat_north) - np.sin(lat_south))
+        A = np.repeat(row_area[:, np.newaxis], lon_reg.size, axis=1)
+        A.flags.writeable = False
+        _cell_area_cache[key] = A
+
+    return _cell_area_cache[key]
+
+
+def lonlat_to_xyz(lons, lats):
+    """ Cartesian coordinates [km] (n x 3) of positions on the sphere of radius EARTH_RADIUS.
+
+    The straight (chord) distance between two points increases with their great circle
+    distance, so nearest-neighbour and radius queries can be done with a KD-tree on these
+    coordinates (see chord_length).
+
+    """
+    lons = np.radians(np.asarray(lons, dtype=float))
+    lats = np.radians(np.asarray(lats, dtype=float))
+    return EARTH_RADIUS * np.c_[np.cos(lats)*np.cos(lons), np.cos(lats)*np.sin(lons), np.sin(lats)]
+
+
+def chord_length(dist):
+    """ Chord length [km] corresponding to a great circle distance dist [km] (see lonlat_to_xyz)
+
+    """
+    return 2*EARTH_RADIUS*np.sin(np.asarray(dist, dtype=float)/(2*EARTH_RADIUS))
+
+
+def nearest_grid_node(lon_reg, lat_reg, lons, lats):
+    """ Index (j, i) of the node of the regular grid lon_reg/lat_reg nearest to each position
+    (great circle distance), i.e. V[j,i] is the closest value of a field V (lat_reg.size x lon_reg.size).
+
+    The KD-tree of the grid nodes is built once per grid and kept in memory.
+
+    Usage ex:
+    import azmp_grid_tools as azg
+    jj, ii = azg.nearest_grid_node(lon_reg, lat_reg, df_stn.LON.values, df_stn.LAT.values)
+    profiles = V[jj, ii, :]
+
+    """
+    key = grid_hash(lon_reg, lat_reg)
+    if key not in _grid_tree_cache:
+        lon_grid, lat_grid = np.meshgrid(lon_reg, lat_reg)
+        _grid_tree_cache[key] = cKDTree(lonlat_to_xyz(lon_grid.ravel(), lat_grid.ravel()))
+    dist, idx = _grid_tree_cache[key].query(lonlat_to_xyz(np.atleast_1d(lons), np.atleast_1d(lats)))
+
+    return np.unravel_index(idx, (len(lat_reg), len(lon_reg)))
@@ -0,0 +1,295 @@
+"""Report pipeline: products with declared inputs/outputs, run in parallel and skipped when up to date
+
+Contains following functions:
+- product(name, func=None, args=(), kwargs={}, script=None, inputs=[], outputs=[], deps=[], workdir='.', copy_to=None, always=False)
+- run_script(script, workdir='.')
+- section_figures(section, season, year, variables=['temperature', 'salinity'], station_based=[True], zmax=500)
+- product_signature(prod, dep_signatures=[])
+- run_pipeline(products, nprocs=4, state_file=PIPELINE_STATE_FILE, force=[], dry_run=False)
+
+A product is a dict declaring what to run (a function with its arguments, or a python script),
+the files it reads (inputs, glob patterns allowed), the files it writes (outputs) and the
+products it must wait for (deps). run_pipeline() runs the products in a pool of processes as
+soon as their deps are done. A product is skipped if all its outputs exist, none of its deps
+was re-run, and its signature (function/script, arguments, path/size/mtime of every input and
+signatures of its deps) did not change since it was last successfully run (saved in state_file).
+Products with always=True (e.g. scripts downloading remote data) are always run, and so are
+the products depending on them.
+
+Functions must be defined at module level (e.g. azrt.bottom_temperature) to be sent to the
+processes. Products writing the same files must be chained with deps.
+
+See usage example in azmp_genReport.py
+
+----------
+
+Atlantic Zone Monitoring Program @NAFC:
+https://azmp-nl.github.io/
+
+"""
+
+__author__ = 'Frederic.Cyr@dfo-mpo.gc.ca'
+__version__ = '0.1'
+
+import os
+import sys
+import glob
+import json
+import shutil
+import hashlib
+import subprocess
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+PIPELINE_STATE_FILE = 'report_pipeline_state.json'
+
+
+def product(name, func=None, args=(), kwargs={}, script=None, inputs=[], outputs=[], deps=[], workdir='.',
+            copy_to=None, always=False):
+    """ Declare a report product (see run_pipeline)
+
+    Input params:
+        - name: unique name of the product
+        - func, args, kwargs: function to call (func(*args, **kwargs)) OR
+        - script: python script to run (replaces %my_run)
+        - inputs: files read (glob patterns allowed, relative to workdir)
+        - outputs: files written (relative to workdir)
+        - deps: names of products that must be done before
+        - workdir: where the product is run
+        - copy_to: directory where the outputs are copied when done (e.g. '../2020')
+        - always: run even if up to date (e.g. remote data)
+
+    Usage ex:
+    import azmp_pipeline_tools as azpl
+    import azmp_report_tools as azrt
+    prod = azpl.product('bottomT_spring', azrt.bottom_temperature, kwargs={'season' : 'spring', 'year' : '2020'},
+                        inputs=['Tbot_climato_spring_0.10.h5', '/home/cyrf0006/data/dev_database/netCDF/2020.nc'],
+                        outputs=['bottom_temp_spring_2020.png'], copy_to='../2020')
+
+    """
+    if (func is None) == (script is None):
+        raise ValueError('product ' + name + ': give either func or script')
+
+    return {'name' : name, 'func' : func, 'args' : tuple(args), 'kwargs' : dict(kwargs), 'script' : script,
+            'inputs' : list(inputs), 'outputs' : list(outputs), 'deps' : list(deps),
+            'workdir' : os.path.abspath(workdir), 'copy_to' : copy_to, 'always' : always}
+
+
+def run_script(script, workdir='.'):
+    """ Run a python script in its own process (in workdir) """
+    subprocess.run([sys.executable, script], cwd=workdir, check=True)
+
+
+def section_figures(section, season, year, variables=['temperature', 'salinity'], station_based=[True], zmax=500):
+    """ Section figures of the ResDoc for one section, season and year.
+
+    All variables are extracted at once (azst.get_section) and used for the station-based and/or
+    interpolated plots, then assembled in <section>_<stn|itp>_<season>_<year>.png (and _FR.png).
+
+    """
+    import matplotlib.pyplot as plt
+    import azmp_sections_tools as azst # (only needed here)
+    import azmp_render_tools as azrd
+
+    dict_stn, dict_itp = azst.get_section(section, year, season, variables)
+    for STATION_BASED in station_based:
+        for var in variables:
+            azst.seasonal_section_plot(VAR=var, SECTION=section, SEASON=season, YEAR=year, ZMAX=zmax, STATION_BASED=STATION_BASED,
+                                       section_data=(dict_stn[var], dict_itp[var]))
+            plt.close('all')
+        kind = 'stn' if STATION_BASED else 'itp'
+        for lang in ['', '_FR']:
+            infiles = [var + '_' + section + '_' + season + '_' + str(year) + lang + '.png' for var in variables]
+            infiles = [f for f in infiles if os.path.isfile(f)] # (not saved if empty section)
+            if len(infiles) > 0:
+                azrd.montage(infiles, section + '_' + kind + '_' + season + '_' + str(year) + lang + '.png', tile=str(len(infiles)) + 'x1')
+
+
+def _expand(patterns, workdir):
+    """ Files matching the patterns (relative to workdir), sorted """
+    files = []
+    for pattern in patterns:
+        matches = glob.glob(os.path.join(workdir, pattern))
+        files = files + (matches if len(matches) > 0 else [os.path.join(workdir, pattern)])
+    return sorted(set(files))
+
+
+def product_signature(prod, dep_signatures=[]):
+    """ Hash of what the product does (function or script, arguments), of its inputs (path, size, mtime)
+    and of the signatures of its deps (as saved when they were last run). Missing inputs are included as such.
+
+    """
+    h = hashlib.sha1()
+    for dep_signature in dep_signatures:
+        h.update(('dep:' + str(dep_signature)).encode())
+    if prod['script'] is not None:
+        h.update(('script:' + prod['script']).encode())
+        inputs = _expand([prod['script']] + prod['inputs'], prod['workdir'])
+    else:
+        h.update(('func:' + prod['func'].__module__ + '.' + prod['func'].__qualname__).encode())
+        inputs = _expand(prod['inputs'], prod['workdir'])
+    h.update(repr(prod['args']).encode())
+    h.update(repr(sorted(prod['kwargs'].items())).encode())
+    for f in inputs:
+        if os.path.isfile(f):
+            stat = os.stat(f)
+            h.update((f + ':' + str(stat.st_size) + ':' + str(stat.st_mtime_ns)).encode())
+        else:
+            h.update((f + ':missing').encode())
+
+    return h.hexdigest()
+
+
+def _run_product(prod):
+    """ Run one product (in a pool process) """
+    import matplotlib
+    matplotlib.use('Agg') # no display in pool processes
+    os.chdir(prod['workdir'])
+    if prod['script'] is not None:
+        run_script(prod['script'], prod['workdir'])
+    else:
+        prod['func'](*prod['args'], **prod['kwargs'])
+        import matplotlib.pyplot as plt
+        plt.close('all')
+    missing = [f for f in prod['outputs'] if not os.path.isfile(f)]
+    if len(missing) > 0:
+        raise RuntimeError('outputs not produced: ' + ', '.join(missing))
+    if prod['copy_to'] is not None:
+        if not os.path.isdir(prod['copy_to']):
+            os.makedirs(prod['copy_to'])
+        for f in prod['outputs']:
+            shutil.copy(f, prod['copy_to'])
+
+    return prod['name']
+
+
+def run_pipeline(products, nprocs=4, state_file=PIPELINE_STATE_FILE, force=[], dry_run=False):
+    """ Run the products (see product()) in a pool of nprocs processes, each as soon as its deps are done.
+
+    Up-to-date products are skipped (see product_signature). A product is re-run if one of its
+    deps was re-run in this pass (e.g. after a download product). Products named in force are re-run.
+    The signature of each product is saved in state_file as soon as it succeeds, so an interrupted
+    run restarts where it stopped. Products depending on a failed product are not run.
+    Two products writing the same output are refused (ValueError) unless one depends on the other.
+
+    Returns dict of product names per status ('run', 'skipped', 'failed', 'not run').
+
+    Usage ex:
+    import azmp_pipeline_tools as azpl
+    status = azpl.run_pipeline(products, nprocs=8)
+
+    """
+    names = [prod['name'] for prod in products]
+    if len(set(names)) != len(names):
+        raise ValueError('product names must be unique')
+    for prod in products:
+        unknown = [d for d in prod['deps'] if d not in names]
+        if len(unknown) > 0:
+            raise ValueError('product ' + prod['name'] + ': unknown deps ' + ', '.join(unknown))
+
+    ## ---- Same output written by two products: one must depend on the other ---- ##
+    direct_deps = {prod['name'] : prod['deps'] for prod in products}
+    def all_deps(name, seen):
+        for d in direct_deps[name]:
+            if d not in seen:
+                seen.add(d)
+                all_deps(d, seen)
+        return seen
+    writers = {}
+    for prod in products:
+        for f in prod['outputs']:
+            writers.setdefault(os.path.join(prod['workdir'], f), []).append(prod['name'])
+    for outfile, prods in writers.items():
+        for i, name in enumerate(prods):
+            for other in prods[i+1:]:
+                if (other not in all_deps(name, set())) & (name not in all_deps(other, set())):
+                    raise ValueError('products ' + name + ' and ' + other + ' both write ' + outfile + ' (add a dep between them)')
+
+    state = {}
+    if os.path.isfile(state_file):
+        with open(state_file, 'r') as f:
+            state = json.load(f)
+
+    status = {'run' : [], 'skipped' : [], 'failed' : [], 'not run' : []}
+
+    def signature_of(prod):
+        return product_signature(prod, [state.get(d) for d in prod['deps']])
+
+    def is_up_to_date(prod, signature):
+        outputs_ok = all([os.path.isfile(os.path.join(prod['workdir'], f)) for f in prod['outputs']])
+        deps_ok = not any([d in status['run'] for d in prod['deps']]) # deps re-run in this pass
+        return (not prod['always']) & (prod['name'] not in force) & outputs_ok & deps_ok & (state.get(prod['name']) == signature)
+
+    ## ---- Dry run: only list what would be run (products after re-run deps included) ---- ##
+    if dry_run:
+        pending = list(products)
+        while len(pending) > 0:
+            ready = [prod for prod in pending if all([d in status['run'] + status['skipped'] for d in prod['deps']])]
+            if len(ready) == 0:
+                raise ValueError('circular deps between: ' + ', '.join([prod['name'] for prod in pending]))
+            for prod in ready:
+                pending.remove(prod)
+                if is_up_to_date(prod, signature_of(prod)):
+                    status['skipped'].append(prod['name'])
+                else:
+                    status['run'].append(prod['name'])
+                    print(' -> would run ' + prod['name'])
+        return status
+
+    ## ---- Run ---- ##
+    pending = {prod['name'] : prod for prod in products}
+    done = set()
+    running = {}
+    with ProcessPoolExecutor(max_workers=nprocs) as pool:
+        while (len(pending) > 0) | (len(running) > 0):
+            # products after a failed product are not run (also indirectly)
+            changed = True
+            while changed:
+                changed = False
+                for name in list(pending.keys()):
+                    if any([d in status['failed'] + status['not run'] for d in pending[name]['deps']]):
+                        print(' !! ' + name + ' not run (failed deps)')
+                        status['not run'].append(name)
+                        del pending[name]
+                        changed = True
+
+            # submit all ready products
+            for name in list(pending.keys()):
+                prod = pending[name]
+                if not all([d in done for d in prod['deps']]):
+                    continue
+                del pending[name]
+                signature = signature_of(prod)
+                if is_up_to_date(prod, signature):
+                    print(' -> ' + name + ' up to date')
+                    status['skipped'].append(name)
+                    done.add(name)
+                    continue
+                print(' -> run ' + name)
+                running[pool.submit(_run_product, prod)] = (name, signature)
+
+            if len(running) == 0:
+                if len(pending) > 0:
+                    raise ValueError('circular deps between: ' + ', '.join(pending.keys()))
+                break
+
+            # wait for the first product to finish
+            finished, _ = wait(list(running.keys()), return_when=FIRST_COMPLETED)
+            for future in finished:
+                name, signature = running.pop(future)
+                try:
+                    future.result()
+                except Exception as e:
+                    print(' !! ' + name + ' failed: ' + str(e))
+                    status['failed'].append(name)
+                    state.pop(name, None)
+                else:
+                    print(' -> ' + name + ' done')
+                    status['run'].append(name)
+                    done.add(name)
+                    state[name] = signature
+                with open(state_file, 'w') as f:
+                    json.dump(state, f, indent=1, sort_keys=True)
+
+    print('Done! (' + ', '.join([str(len(status[k])) + ' ' + k for k in status.keys()]) + ')')
+
+    return status
@@ -0,0 +1,199 @@
+"""Figure rendering tools for AZMP reports (headless, shared map backgrounds, bilingual output)
+
+Contains following functions:
+- get_basemap(lonLims, latLims, lon_0, lat_0, projection='merc', resolution='i', cache_dir=BASEMAP_CACHE_DIR)
+- draw_nafo_map(ax, m, divisions=[], parallel_labels=[0,0,0,0], meridian_labels=[0,0,0,1])
+- fr_filename(outfile)
+- table_texts(table, labels_fr)
+- save_bilingual(fig, outfile, texts_fr, dpi=300, trim=True)
+- montage(infiles, outfile, tile='3x1', border=10)
+
+Building a Basemap at resolution='i' (coastlines clipped and projected) is the slowest
+part of most report maps. Basemaps are built once per region/projection, kept in memory
+and pickled in cache_dir for the other processes and the next runs. NAFO divisions are
+projected once per Basemap.
+
+English and French figures are drawn once: only the text artists (titles, labels, table
+cells) are swapped between the two savefig, and whitespace is trimmed by matplotlib
+(bbox_inches='tight') instead of 'convert -trim'.
+
+----------
+
+Atlantic Zone Monitoring Program @NAFC:
+https://azmp-nl.github.io/
+
+"""
+
+__author__ = 'Frederic.Cyr@dfo-mpo.gc.ca'
+__version__ = '0.1'
+
+import os
+import pickle
+import numpy as np
+import matplotlib
+if os.environ.get('DISPLAY', '') == '':
+    matplotlib.use('Agg') # headless (report pipeline, cron jobs)
+import matplotlib.pyplot as plt
+import matplotlib.image as mpimg
+
+BASEMAP_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.azmp_basemaps')
+
+# Basemaps and projected NAFO divisions already built in this process
+_basemaps = {}
+_nafo_xy = {}
+
+
+def get_basemap(lonLims, latLims, lon_0, lat_0, projection='merc', resolution='i', cache_dir=BASEMAP_CACHE_DIR):
+    """ Basemap of a region, built only once (same as
+    Basemap(projection=projection, lon_0=lon_0, lat_0=lat_0, llcrnrlon=lonLims[0], llcrnrlat=latLims[0], urcrnrlon=lonLims[1], urcrnrlat=latLims[1], resolution=resolution))
+
+    The Basemap is not attached to an axis (see draw_nafo_map or m.ax = ax).
+
+    Usage ex:
+    import azmp_render_tools as azrd
+    m = azrd.get_basemap([-63, -45], [42, 58], -54, 50)
+    xi, yi = m(*np.meshgrid(lon_reg, lat_reg))
+
+    """
+    key = (projection, resolution) + tuple(np.round(np.array([lonLims[0], lonLims[1], latLims[0], latLims[1], lon_0, lat_0], dtype=float), 4))
+    if key in _basemaps:
+        return _basemaps[key]
+    # maps (only needed here)
+    os.environ['PROJ_LIB'] = '/home/cyrf0006/anaconda3/share/proj'
+    from mpl_toolkits.basemap import Basemap
+
+    cache_file = None
+    if cache_dir is not None:
+        cache_file = os.path.join(cache_dir, 'basemap_' + '_'.join([str(k) for k in key]) + '.pkl')
+    if (cache_file is not None) and os.path.isfile(cache_file):
+        with open(cache_file, 'rb') as f:
+            m = pickle.load(f)
+    else:
+        m = Basemap(projection=projection, lon_0=lon_0, lat_0=lat_0, llcrnrlon=lonLims[0], llcrnrlat=latLims[0],
+                    urcrnrlon=lonLims[1], urcrnrlat=latLims[1], resolution=resolution)
+        if cache_file is not None:
+            if not os.path.isdir(cache_dir):
+                os.makedirs(cache_dir)
+            tmp_file = cache_file + '.' + str(os.getpid()) # (other processes may write the same file)
+            with open(tmp_file, 'wb') as f:
+                pickle.dump(m, f, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_file, cache_file)
+    m.ax = None
+    _basemaps[key] = m
+
+    return m
+
+
+def _projected_divisions(m):
+    """ NAFO divisions (azu.get_nafo_divisions) projected on Basemap m, done once per Basemap """
+    if id(m) not in _nafo_xy:
+        import azmp_utils as azu
+        nafo_div = azu.get_nafo_divisions()
+        dict = {}
+        for div in nafo_div.keys():
+            dict[div] = m(nafo_div[div]['lon'], nafo_div[div]['lat'])
+        _nafo_xy[id(m)] = dict
+
+    return _nafo_xy[id(m)]
+
+
+def draw_nafo_map(ax, m, divisions=[], parallel_labels=[0,0,0,0], meridian_labels=[0,0,0,1]):
+    """ Map background of the bottom maps on ax: continents, parallels/meridians and NAFO
+    division outlines with their names.
+
+    Usage ex:
+    fig, ax = plt.subplots(nrows=1, ncols=1)
+    m = azrd.get_basemap(lonLims, latLims, lon_0, lat_0)
+    xi, yi = m(*np.meshgrid(lon_reg, lat_reg))
+    c = ax.contourf(xi, yi, Tbot, levels, cmap=plt.cm.RdBu_r, extend='both')
+    azrd.draw_nafo_map(ax, m, ['2J', '3K', '3L'])
+
+    """
+    m.ax = ax
+    m.fillcontinents(color='tan');
+    m.drawparallels([40, 45, 50, 55, 60], labels=parallel_labels, fontsize=12, fontweight='normal');
+    m.drawmeridians([-60, -55, -50, -45], labels=meridian_labels, fontsize=12, fontweight='normal');
+    nafo_xy = _projected_divisions(m)
+    for div in divisions:
+        div_lon, div_lat = nafo_xy[div]
+        ax.plot(div_lon, div_lat, 'k', linewidth=2)
+        ax.text(np.mean(div_lon), np.mean(div_lat), div, fontsize=12, color='black', fontweight='bold')
+
+
+def fr_filename(outfile):
+    """ 'name.png' -> 'name_FR.png' """
+    root, ext = os.path.splitext(outfile)
+    return root + '_FR' + ext
+
+
+def table_texts(table, labels_fr):
+    """ (text, french) pairs of the cells of a matplotlib table whose text is in labels_fr
+    (for save_bilingual)
+
+    """
+    texts_fr = []
+    for key, cell in table.get_celld().items():
+        text = cell.get_text()
+        if text.get_text() in labels_fr:
+            texts_fr.append((text, labels_fr[text.get_text()]))
+
+    return texts_fr
+
+
+def save_bilingual(fig, outfile, texts_fr, dpi=300, trim=True):
+    """ Save the English figure, swap the text artists to French and save the French figure
+    (see fr_filename), then put back the English texts.
+
+    texts_fr: list of (matplotlib Text, french string), e.g. [(ax.title, u'Température au fond')]
+    trim: remove the whitespace around the figure (as 'convert -trim')
+
+    Returns [outfile, outfile_FR]
+
+    Usage ex:
+    azrd.save_bilingual(fig, 'bottom_temp_fall_2020.png', [(ax.title, u'Température au fond - Automne 2020')])
+
+    """
+    bbox = 'tight' if trim else None
+    fig.savefig(outfile, dpi=dpi, bbox_inches=bbox)
+    texts_en = [text.get_text() for text, french in texts_fr]
+    for text, french in texts_fr:
+        text.set_text(french)
+    outfile_fr = fr_filename(outfile)
+    fig.savefig(outfile_fr, dpi=dpi, bbox_inches=bbox)
+    for (text, french), english in zip(texts_fr, texts_en):
+        text.set_text(english)
+
+    return [outfile, outfile_fr]
+
+
+def montage(infiles, outfile, tile='3x1', border=10):
+    """ Assemble png figures on a grid (same as ImageMagick
+    'montage infiles -tile 3x1 -geometry +10+10 -background white outfile', without the fork).
+
+    Each figure is centered in a cell of the size of the largest figure, plus border pixels
+    on each side. tile is 'colsxrows' (e.g. '1x4' to stack vertically).
+
+    """
+    ncols, nrows = [int(n) for n in tile.split('x')]
+    images = []
+    for infile in infiles:
+        img = mpimg.imread(infile)
+        if img.dtype == np.uint8:
+            img = img/255.0
+        if img.ndim == 2:
+            img = np.stack([img]*3, axis=-1)
+        if img.shape[2] == 4: # on white background
+            img = img[:,:,0:3]*img[:,:,3:4] + (1 - img[:,:,3:4])
+        images.append(img)
+    nrows = min(nrows, int(np.ceil(len(images)/float(ncols))))
+    H = np.max([img.shape[0] for img in images]) + 2*border
+    W = np.max([img.shape[1] for img in images]) + 2*border
+    canvas = np.ones((nrows*H, ncols*W, 3))
+    for idx, img in enumerate(images[0:nrows*ncols]):
+        row, col = divmod(idx, ncols)
+        i0 = row*H + (H - img.shape[0])//2
+        j0 = col*W + (W - img.shape[1])//2
+        canvas[i0:i0+img.shape[0], j0:j0+img.shape[1], :] = img
+    plt.imsave(outfile, canvas)
+
+    return outfile
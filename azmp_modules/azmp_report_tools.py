@@ -17,15 +17,13 @@ import numpy as np
 import matplotlib.pyplot as plt
 import os
 import sys
+import shutil
 #from sys import version_info
 # read/write tools
 import netCDF4
 import h5py
 import xarray as xr
 import pandas as pd
-# maps
-os.environ['PROJ_LIB'] = '/home/cyrf0006/anaconda3/share/proj'
-from mpl_toolkits.basemap import Basemap
 # interpolation tools
 from scipy.interpolate import griddata
 from scipy.interpolate import interp1d
@@ -35,10 +33,18 @@ from shapely.geometry.polygon import Polygon
 from shapely.ops import cascaded_union
 ## AZMP custom imports
 import azmp_utils as azu
+import azmp_grid_tools as azg
+import azmp_catalog_tools as azc
+import azmp_render_tools as azrd # (cached basemaps, bilingual figures)
 ## for scorecards
 import unicodedata
 from matplotlib.colors import from_levels_and_colors
 
+# French labels of the bottom temperature scorecards (see azrd.table_texts)
+SCORECARDS_FR = {r'$\rm T_{bot}$' : r'$\rm T_{fond}$', r'$\rm T_{bot_{<200m}}$' : r'$\rm T_{fond_{<200m}}$',
+                 r'$\rm Area_{>2^{\circ}C}$' : r'$\rm Aire_{>2^{\circ}C}$', r'$\rm Area_{<1^{\circ}C}$' : r'$\rm Aire_{<1^{\circ}C}$',
+                 'sd' : u'ET'}
+
 
 def is_number(s):
     '''
@@ -71,7 +77,7 @@ def add_path(PATH):
 
     sys.path.append(PATH)  # or .insert(0, YOUR_PATH) may give higher priority
     
-def bottom_temperature(season, year, zmin=0, zmax=1000, dz=5, proj='merc', netcdf_path='/home/cyrf0006/data/dev_database/netCDF/', climato_file=''):
+def bottom_temperature(season, year, zmin=0, zmax=1000, dz=5, proj='merc', netcdf_path='/home/cyrf0006/data/dev_database/netCDF/', climato_file='', exclude_gts=True):
 
     
     '''
@@ -133,34 +139,20 @@ def bottom_temperature(season, year, zmin=0, zmax=1000, dz=5, proj='merc', netcd
     lon_grid, lat_grid = np.meshgrid(lon_reg,lat_reg)
     dc = np.diff(lon_reg[0:2])
 
-    ## ---- NAFO divisions ---- ##
-    nafo_div = azu.get_nafo_divisions()
-
     ## ---- Get CTD data --- ##
     print('Get ' + year_file)
     ds = xr.open_dataset(year_file)
 
-    # Remome problematic datasets
-    print('!!Remove MEDBA data!!')
-    print('  ---> I Should be improme because I remove good data!!!!')
-    ds = ds.where(ds.instrument_ID!='MEDBA', drop=True)
-    ds = ds.where(ds.instrument_ID!='MEDTE', drop=True)
+    # Remome GTS datasets (BATHY & TESAC messages, removed by index)
+    if exclude_gts:
+        print('!!Remove MEDBA & MEDTE data!!')
+        ds = azc.remove_gts(ds)
 
     # Selection of a subset region
     ds = ds.where((ds.longitude>lonLims[0]) & (ds.longitude<lonLims[1]), drop=True)
     ds = ds.where((ds.latitude>latLims[0]) & (ds.latitude<latLims[1]), drop=True)
-    # Select time (save several options here)
-    if season == 'summer':
-        #ds = ds.sel(time=ds['time.season']=='JJA')
-        ds = ds.sel(time=((ds['time.month']>=6)) & ((ds['time.month']<=9)))
-    elif season == 'spring':
-        #ds = ds.sel(time=ds['time.season']=='MAM')
-        ds = ds.sel(time=((ds['time.month']>=4)) & ((ds['time.month']<=6)))
-    elif season == 'fall':
-        #ds = ds.sel(time=ds['time.season']=='SON')
-        ds = ds.sel(time=((ds['time.month']>=9)) & ((ds['time.month']<=12)))
-    else:
-        print('!! no season specified, used them all! !!')
+    # Select season (see azmp_catalog_tools.SEASONS)
+    ds = azc.select_season(ds, season)
 
     # Vertical binning (on dataArray; more appropriate here)
     da_temp = ds['temperature']
@@ -182,114 +174,38 @@ def bottom_temperature(season, year, zmin=0, zmax=1000, dz=5, proj='merc', netcd
     ## --- fill 3D cube --- ##  
     print('Fill regular cube')
     z = df_temp.columns.values
-    V = np.full((lat_reg.size, lon_reg.size, z.size), np.nan)
-
-    # Aggregate on regular grid
-    for i, xx in enumerate(lon_reg):
-        for j, yy in enumerate(lat_reg):    
-            idx = np.where((lons>=xx-dc/2) & (lons<xx+dc/2) & (lats>=yy-dc/2) & (lats<yy+dc/2))
-            tmp = np.array(df_temp.iloc[idx].mean(axis=0))
-            idx_good = np.argwhere((~np.isnan(tmp)) & (tmp<30))
-            if np.size(idx_good)==1:
-                V[j,i,:] = np.array(df_temp.iloc[idx].mean(axis=0))
-            elif np.size(idx_good)>1: # vertical interpolation between pts
-                interp = interp1d(np.squeeze(z[idx_good]), np.squeeze(tmp[idx_good]))
-                idx_interp = np.arange(np.int(idx_good[0]),np.int(idx_good[-1]+1))
-                V[j,i,idx_interp] = interp(z[idx_interp]) # interpolate only where possible (1st to last good idx)
-
-    # horizontal interpolation at each depth
-    lon_grid, lat_grid = np.meshgrid(lon_reg,lat_reg)
-    lon_vec = np.reshape(lon_grid, lon_grid.size)
-    lat_vec = np.reshape(lat_grid, lat_grid.size)
-    for k, zz in enumerate(z):
-        # Meshgrid 1D data (after removing NaNs)
-        tmp_grid = V[:,:,k]
-        tmp_vec = np.reshape(tmp_grid, tmp_grid.size)
-        # griddata (after removing nans)
-        idx_good = np.argwhere(~np.isnan(tmp_vec))
-        if idx_good.size > 5: # will ignore depth where no data exist
-            LN = np.squeeze(lon_vec[idx_good])
-            LT = np.squeeze(lat_vec[idx_good])
-            TT = np.squeeze(tmp_vec[idx_good])
-            zi = griddata((LN, LT), TT, (lon_grid, lat_grid), method='linear')
-            V[:,:,k] = zi
-        else:
-            continue
+    # Aggregate on regular grid (all casts at once)
+    V = azg.bin_casts_to_grid(lons, lats, df_temp.values, lon_reg, lat_reg)
+    # vertical interpolation between pts (only between 1st and last good idx)
+    V = azg.fill_vertical_gaps(V, z, vmax=30)
+
+    # horizontal interpolation at each depth (one triangulation per set of valid cells)
+    V = azg.interp_levels(V, lon_reg, lat_reg, min_pts=5)
     print(' -> Done!')    
 
     # mask using bathymetry (I don't think it is necessary, but make nice figures)
-    for i, xx in enumerate(lon_reg):
-        for j,yy in enumerate(lat_reg):
-            if Zitp[j,i] > -10: # remove shallower than 10m
-                V[j,i,:] = np.nan
-
-    # getting bottom temperature
-    print('Getting bottom Temp.')    
-    Tbot = np.full([lat_reg.size,lon_reg.size], np.nan) 
-    for i, xx in enumerate(lon_reg):
-        for j,yy in enumerate(lat_reg):
-            bottom_depth = -Zitp[j,i] # minus to turn positive
-            temp_vec = V[j,i,:]
-            idx_good = np.squeeze(np.where(~np.isnan(temp_vec)))
-            if idx_good.size:
-                idx_closest = np.argmin(np.abs(bottom_depth-z[idx_good]))
-            else:
-                continue
+    V[Zitp > -10, :] = np.nan # remove shallower than 10m
 
-            if np.abs([idx_closest] - bottom_depth) <= 20:
-                Tbot[j,i] = temp_vec[idx_good[idx_closest]]
-            elif np.abs(z[idx_closest] - bottom_depth) <= 50:
-                #print('used data located [30,50]m from bottom')
-                Tbot[j,i] = temp_vec[idx_good[idx_closest]]
+    # getting bottom temperature (closest good bin within 50m of GEBCO depth)
+    print('Getting bottom Temp.')
+    Tbot, Tbot_dist = azg.bottom_values(V, z, -Zitp)
 
     print(' -> Done!')    
 
-    # Mask data outside Nafo div.
+    # Mask data outside Nafo div. (masks rasterized once per grid, see azu.get_region_masks)
     print('Mask according to NAFO division for ' + season)
-    # Polygons
-    polygon4R = Polygon(zip(nafo_div['4R']['lon'], nafo_div['4R']['lat']))
-    polygon3K = Polygon(zip(nafo_div['3Kx']['lon'], nafo_div['3Kx']['lat']))
-    polygon3L = Polygon(zip(nafo_div['3L']['lon'], nafo_div['3L']['lat']))
-    polygon3N = Polygon(zip(nafo_div['3N']['lon'], nafo_div['3N']['lat']))
-    polygon3O = Polygon(zip(nafo_div['3O']['lon'], nafo_div['3O']['lat']))
-    polygon3Ps = Polygon(zip(nafo_div['3Ps']['lon'], nafo_div['3Ps']['lat']))
-    polygon2J = Polygon(zip(nafo_div['2J']['lon'], nafo_div['2J']['lat']))
-    polygon2H = Polygon(zip(nafo_div['2H']['lon'], nafo_div['2H']['lat']))
-
-    # Contour of data to mask
-    contour_mask = np.load('100m_contour_labrador.npy')
-    polygon_mask = Polygon(contour_mask)
+    masks = azu.get_region_masks(lon_reg, lat_reg, contour_file='100m_contour_labrador.npy')
 
     if season == 'spring':
-        for i, xx in enumerate(lon_reg):
-            for j,yy in enumerate(lat_reg):
-                point = Point(lon_reg[i], lat_reg[j])
-                #if (~polygon3L.contains(point)) & (~polygon3N.contains(point)) & (~polygon3O.contains(point)) & (~polygon3Ps.contains(point)):
-                if polygon3L.contains(point) | polygon3N.contains(point) | polygon3O.contains(point) | polygon3Ps.contains(point) | polygon4R.contains(point):
-                    pass #nothing to do but cannot implement negative statement "if not" above
-                else:
-                    Tbot[j,i] = np.nan
+        Tbot[~(masks['3L'] | masks['3N'] | masks['3O'] | masks['3Ps'] | masks['4R'])] = np.nan
 
     elif season == 'fall':
-        for i, xx in enumerate(lon_reg):
-            for j,yy in enumerate(lat_reg):
-                point = Point(lon_reg[i], lat_reg[j])
-                if polygon2H.contains(point) | polygon2J.contains(point) | polygon3K.contains(point) | polygon3L.contains(point) | polygon3N.contains(point) | polygon3O.contains(point):
-                    pass #nothing to do but cannot implement negative statement "if not" above
-                else:
-                    Tbot[j,i] = np.nan ### <--------------------- Do mask the fall / OR / 
-                    #Tbot[j,i] = np.nan ### <--------------------- Do not mask the fall!!!!!
-
-                if polygon_mask.contains(point): # mask data near Labrador in fall
-                    Tbot[j,i] = np.nan 
+        Tbot[~(masks['2H'] | masks['2J'] | masks['3Kx'] | masks['3L'] | masks['3N'] | masks['3O'])] = np.nan
+        Tbot[masks['labrador_100m']] = np.nan # mask data near Labrador in fall
 
     elif season == 'summer':
-        for i, xx in enumerate(lon_reg):
-            for j,yy in enumerate(lat_reg):
-                point = Point(lon_reg[i], lat_reg[j])
-                # Just mask labrador
-                if polygon_mask.contains(point): # mask data near Labrador in fall
-                    Tbot[j,i] = np.nan 
+        # Just mask labrador
+        Tbot[masks['labrador_100m']] = np.nan
 
     else:
         print('no division mask, all data taken')
@@ -302,7 +218,8 @@ def bottom_temperature(season, year, zmin=0, zmax=1000, dz=5, proj='merc', netcd
 
     ## ---- Plot Anomaly ---- ##
     fig, ax = plt.subplots(nrows=1, ncols=1)
-    m = Basemap(ax=ax, projection='merc',lon_0=lon_0,lat_0=lat_0, llcrnrlon=lonLims[0],llcrnrlat=latLims[0],urcrnrlon=lonLims[1],urcrnrlat=latLims[1], resolution= 'i')
+    m = azrd.get_basemap(lonLims, latLims, lon_0, lat_0) # (built once per region)
+    m.ax = ax
     levels = np.linspace(-3.5, 3.5, 8)
     #levels = np.linspace(-3.5, 3.5, 16)
     xi, yi = m(*np.meshgrid(lon_reg, lat_reg))
@@ -315,39 +232,25 @@ def bottom_temperature(season, year, zmin=0, zmax=1000, dz=5, proj='merc', netcd
         plt.title('Spring Bottom Temperature ' + year + ' Anomaly')
     else:
         plt.title('Bottom Temperature ' + year + '  Anomaly')
-    m.fillcontinents(color='tan');
-    m.drawparallels([40, 45, 50, 55, 60], labels=[0,0,0,0], fontsize=12, fontweight='normal');
-    m.drawmeridians([-60, -55, -50, -45], labels=[0,0,0,1], fontsize=12, fontweight='normal');
+    azrd.draw_nafo_map(ax, m, div_toplot, parallel_labels=[0,0,0,0])
     cax = fig.add_axes([0.16, 0.05, 0.7, 0.025])
     cb = plt.colorbar(c, cax=cax, orientation='horizontal')
     cb.set_label(r'$\rm T(^{\circ}C)$', fontsize=12, fontweight='normal')
-    for div in div_toplot:
-        div_lon, div_lat = m(nafo_div[div]['lon'], nafo_div[div]['lat'])
-        m.plot(div_lon, div_lat, 'k', linewidth=2)
-        ax.text(np.mean(div_lon), np.mean(div_lat), div, fontsize=12, color='black', fontweight='bold')    
-    # Save Figure
-    fig.set_size_inches(w=6, h=9)
-    fig.set_dpi(300)
-    outfile = 'bottom_temp_anomaly_' + season + '_' + year + '.png'
-    fig.savefig(outfile)
-    os.system('convert -trim ' + outfile + ' ' + outfile)
-    # Save French Figure
-    plt.sca(ax)
+    # Save Figure (English and French, only the title is swapped)
     if season=='fall':
-        plt.title(u'Anomalie de température au fond - Automne ' + year )
+        title_fr = u'Anomalie de température au fond - Automne ' + year
     elif season=='spring':
-        plt.title(u'Anomalie de température au fond - Printemp ' + year )
+        title_fr = u'Anomalie de température au fond - Printemp ' + year
     else:
-        plt.title(u'Anomalie de température au fond ' + year )
+        title_fr = u'Anomalie de température au fond ' + year
     fig.set_size_inches(w=6, h=9)
-    fig.set_dpi(300)
-    outfile = 'bottom_temp_anomaly_' + season + '_' + year + '_FR.png'
-    fig.savefig(outfile)
-    os.system('convert -trim ' + outfile + ' ' + outfile)
+    outfile = 'bottom_temp_anomaly_' + season + '_' + year + '.png'
+    azrd.save_bilingual(fig, outfile, [(ax.title, title_fr)], dpi=300)
 
     ## ---- Plot Temperature ---- ##
     fig, ax = plt.subplots(nrows=1, ncols=1)
-    m = Basemap(ax=ax, projection='merc',lon_0=lon_0,lat_0=lat_0, llcrnrlon=lonLims[0],llcrnrlat=latLims[0],urcrnrlon=lonLims[1],urcrnrlat=latLims[1], resolution= 'i')
+    m = azrd.get_basemap(lonLims, latLims, lon_0, lat_0) # (built once per region)
+    m.ax = ax
     #levels = np.linspace(-2, 6, 9)
     levels = np.linspace(-2, 6, 17)
     xi, yi = m(*np.meshgrid(lon_reg, lat_reg))
@@ -360,43 +263,29 @@ def bottom_temperature(season, year, zmin=0, zmax=1000, dz=5, proj='merc', netcd
         plt.title('Spring Bottom Temperature ' + year)
     else:
         plt.title('Bottom Temperature ' + year)
-    m.fillcontinents(color='tan');
-    m.drawparallels([40, 45, 50, 55, 60], labels=[0,0,0,0], fontsize=12, fontweight='normal');
-    m.drawmeridians([-60, -55, -50, -45], labels=[0,0,0,1], fontsize=12, fontweight='normal');
+    azrd.draw_nafo_map(ax, m, div_toplot, parallel_labels=[0,0,0,0])
     x, y = m(lons, lats)
     m.scatter(x,y, s=50, marker='.',color='k')
     cax = fig.add_axes([0.16, 0.05, 0.7, 0.025])
     #cax = plt.axes([0.85,0.15,0.04,0.7], facecolor='grey')
     cb = plt.colorbar(c, cax=cax, orientation='horizontal')
     cb.set_label(r'$\rm T(^{\circ}C)$', fontsize=12, fontweight='normal')
-    for div in div_toplot:
-        div_lon, div_lat = m(nafo_div[div]['lon'], nafo_div[div]['lat'])
-        m.plot(div_lon, div_lat, 'k', linewidth=2)
-        ax.text(np.mean(div_lon), np.mean(div_lat), div, fontsize=12, color='black', fontweight='bold')
-    # Save Figure
-    fig.set_size_inches(w=6, h=9)
-    fig.set_dpi(200)
-    outfile = 'bottom_temp_' + season + '_' + year + '.png'
-    fig.savefig(outfile)
-    os.system('convert -trim ' + outfile + ' ' + outfile)
-    # Save French Figure
-    plt.sca(ax)
+    # Save Figure (English and French, only the title is swapped)
     if season=='fall':
-        plt.title(u'Température au fond - Automne ' + year )
+        title_fr = u'Température au fond - Automne ' + year
     elif season=='spring':
-        plt.title(u'Température au fond - Printemp ' + year )
+        title_fr = u'Température au fond - Printemp ' + year
     else:
-        plt.title(u'Température au fond ' + year )
+        title_fr = u'Température au fond ' + year
     fig.set_size_inches(w=6, h=9)
-    fig.set_dpi(300)
-    outfile = 'bottom_temp_' + season + '_' + year + '_FR.png'
-    fig.savefig(outfile)
-    os.system('convert -trim ' + outfile + ' ' + outfile)
+    outfile = 'bottom_temp_' + season + '_' + year + '.png'
+    azrd.save_bilingual(fig, outfile, [(ax.title, title_fr)], dpi=300)
 
 
     ## ---- Plot Climato ---- ##
     fig, ax = plt.subplots(nrows=1, ncols=1)
-    m = Basemap(ax=ax, projection='merc',lon_0=lon_0,lat_0=lat_0, llcrnrlon=lonLims[0],llcrnrlat=latLims[0],urcrnrlon=lonLims[1],urcrnrlat=latLims[1], resolution= 'i')
+    m = azrd.get_basemap(lonLims, latLims, lon_0, lat_0) # (built once per region)
+    m.ax = ax
     #levels = np.linspace(-2, 6, 9)
     levels = np.linspace(-2, 6, 17)
     xi, yi = m(*np.meshgrid(lon_reg, lat_reg))
@@ -409,47 +298,33 @@ def bottom_temperature(season, year, zmin=0, zmax=1000, dz=5, proj='merc', netcd
         plt.title('Spring Bottom Temperature Climatology')
     else:
         plt.title('Bottom Temperature Climatology')
-    m.fillcontinents(color='tan');
-    m.drawparallels([40, 45, 50, 55, 60], labels=[1,0,0,0], fontsize=12, fontweight='normal');
-    m.drawmeridians([-60, -55, -50, -45], labels=[0,0,0,1], fontsize=12, fontweight='normal');
+    azrd.draw_nafo_map(ax, m, div_toplot, parallel_labels=[1,0,0,0])
     cax = fig.add_axes([0.16, 0.05, 0.7, 0.025])
     cb = plt.colorbar(c, cax=cax, orientation='horizontal')
     cb.set_label(r'$\rm T(^{\circ}C)$', fontsize=12, fontweight='normal')
-    for div in div_toplot:
-        div_lon, div_lat = m(nafo_div[div]['lon'], nafo_div[div]['lat'])
-        m.plot(div_lon, div_lat, 'k', linewidth=2)
-        ax.text(np.mean(div_lon), np.mean(div_lat), div, fontsize=12, color='black', fontweight='bold')    
-    # Save Figure
-    fig.set_size_inches(w=6, h=9)
-    fig.set_dpi(300)
-    outfile = 'bottom_temp_climato_' + season + '_' + year + '.png'
-    fig.savefig(outfile)
-    os.system('convert -trim ' + outfile + ' ' + outfile)
-    # Save French Figure
-    plt.sca(ax)
+    # Save Figure (English and French, only the title is swapped)
     if season=='fall':
-        plt.title(u'Climatologie de température au fond - Automne ' + year )
+        title_fr = u'Climatologie de température au fond - Automne ' + year
     elif season=='spring':
-        plt.title(u'Climatologie de température au fond - Printemps ' + year )
+        title_fr = u'Climatologie de température au fond - Printemps ' + year
     else:
-        plt.title(u'Climatologie de température au fond ' + year )
+        title_fr = u'Climatologie de température au fond ' + year
     fig.set_size_inches(w=6, h=9)
-    fig.set_dpi(300)
-    outfile = 'bottom_temp_climato_' + season + '_' + year + '_FR.png'
-    fig.savefig(outfile)
-    os.system('convert -trim ' + outfile + ' ' + outfile)
+    outfile = 'bottom_temp_climato_' + season + '_' + year + '.png'
+    azrd.save_bilingual(fig, outfile, [(ax.title, title_fr)], dpi=300)
 
 
     # Convert to a subplot
-    os.system('montage bottom_temp_climato_' + season + '_' + year + '.png bottom_temp_' + season + '_' + year + '.png bottom_temp_anomaly_' + season + '_' + year + '.png  -tile 3x1 -geometry +10+10  -background white  bottomT_' + season + year + '.png') 
-    # in French
-    os.system('montage bottom_temp_climato_' + season + '_' + year + '_FR.png bottom_temp_' + season + '_' + year + '_FR.png bottom_temp_anomaly_' + season + '_' + year + '_FR.png  -tile 3x1 -geometry +10+10  -background white  bottomT_' + season + year + '_FR.png') 
-    # Move to year folder
-    os.system('cp bottomT_' + season + year + '.png bottomT_' + season + year + '_FR.png ../' + year)
+    for lang in ['', '_FR']:
+        infiles = ['bottom_temp_climato_' + season + '_' + year + lang + '.png', 'bottom_temp_' + season + '_' + year + lang + '.png', 'bottom_temp_anomaly_' + season + '_' + year + lang + '.png']
+        azrd.montage(infiles, 'bottomT_' + season + year + lang + '.png', tile='3x1')
+        # Move to year folder
+        if os.path.isdir('../' + year):
+            shutil.copy('bottomT_' + season + year + lang + '.png', '../' + year)
 
 
 #### bottom_salinity
-def bottom_salinity(season, year, zmin=0, zmax=1000, dz=5, proj='merc', netcdf_path='/home/cyrf0006/data/dev_database/netCDF/'):
+def bottom_salinity(season, year, zmin=0, zmax=1000, dz=5, proj='merc', netcdf_path='/home/cyrf0006/data/dev_database/netCDF/', exclude_gts=True):
 
     
     '''
@@ -491,29 +366,18 @@ def bottom_salinity(season, year, zmin=0, zmax=1000, dz=5, proj='merc', netcdf_p
     lon_grid, lat_grid = np.meshgrid(lon_reg,lat_reg)
     dc = np.diff(lon_reg[0:2])
 
-    ## ---- NAFO divisions ---- ##
-    nafo_div = azu.get_nafo_divisions()
-
     ## ---- Get CTD data --- ##
     print('Get ' + year_file)
     ds = xr.open_mfdataset(year_file)
-    # Remome problematic datasets
-    print('!!Remove MEDBA data!!')
-    print('  ---> I Should be improme because I remove good data!!!!')
-    ds = ds.where(ds.instrument_ID!='MEDBA', drop=True)
-    ds = ds.where(ds.instrument_ID!='MEDTE', drop=True)
+    # Remome GTS datasets (BATHY & TESAC messages, removed by index)
+    if exclude_gts:
+        print('!!Remove MEDBA & MEDTE data!!')
+        ds = azc.remove_gts(ds)
     # Selection of a subset region
     ds = ds.where((ds.longitude>lonLims[0]) & (ds.longitude<lonLims[1]), drop=True)
     ds = ds.where((ds.latitude>latLims[0]) & (ds.latitude<latLims[1]), drop=True)
-    # Select time (save several options here)
-    if season == 'summer':
-        ds = ds.sel(time=((ds['time.month']>=6)) & ((ds['time.month']<=9)))
-    elif season == 'spring':
-        ds = ds.sel(time=((ds['time.month']>=4)) & ((ds['time.month']<=6)))
-    elif season == 'fall':
-        ds = ds.sel(time=((ds['time.month']>=9)) & ((ds['time.month']<=12)))
-    else:
-        print('!! no season specified, used them all! !!')
+    # Select season (see azmp_catalog_tools.SEASONS)
+    ds = azc.select_season(ds, season)
 
     # Restrict max depth to zmax defined earlier
     ds = ds.sel(level=ds['level']<zmax)
@@ -536,104 +400,35 @@ def bottom_salinity(season, year, zmin=0, zmax=1000, dz=5, proj='merc', netcdf_p
     ## --- fill 3D cube --- ##  
     print('Fill regular cube')
     z = df_sal.columns.values
-    V = np.full((lat_reg.size, lon_reg.size, z.size), np.nan)
-
-    # Aggregate on regular grid
-    for i, xx in enumerate(lon_reg):
-        for j, yy in enumerate(lat_reg):    
-            idx = np.where((lons>=xx-dc/2) & (lons<xx+dc/2) & (lats>=yy-dc/2) & (lats<yy+dc/2))
-            tmp = np.array(df_sal.iloc[idx].mean(axis=0))
-            idx_good = np.argwhere(~np.isnan(tmp))
-            if np.size(idx_good)==1:
-                V[j,i,:] = np.array(df_sal.iloc[idx].mean(axis=0))
-            elif np.size(idx_good)>1: # vertical interpolation between pts
-                interp = interp1d(np.squeeze(z[idx_good]), np.squeeze(tmp[idx_good]))
-                idx_interp = np.arange(np.int(idx_good[0]),np.int(idx_good[-1]+1))
-                V[j,i,idx_interp] = interp(z[idx_interp]) # interpolate only where possible (1st to last good idx)
-
-    # horizontal interpolation at each depth
-    lon_grid, lat_grid = np.meshgrid(lon_reg,lat_reg)
-    lon_vec = np.reshape(lon_grid, lon_grid.size)
-    lat_vec = np.reshape(lat_grid, lat_grid.size)
-    for k, zz in enumerate(z):
-        # Meshgrid 1D data (after removing NaNs)
-        tmp_grid = V[:,:,k]
-        tmp_vec = np.reshape(tmp_grid, tmp_grid.size)
-        # griddata (after removing nans)
-        idx_good = np.argwhere(~np.isnan(tmp_vec))
-        if idx_good.size>5: # will ignore depth where no data exist
-            LN = np.squeeze(lon_vec[idx_good])
-            LT = np.squeeze(lat_vec[idx_good])
-            TT = np.squeeze(tmp_vec[idx_good])
-            zi = griddata((LN, LT), TT, (lon_grid, lat_grid), method='linear')
-            V[:,:,k] = zi
-        else:
-            continue
+    # Aggregate on regular grid (all casts at once)
+    V = azg.bin_casts_to_grid(lons, lats, df_sal.values, lon_reg, lat_reg)
+    # vertical interpolation between pts (only between 1st and last good idx)
+    V = azg.fill_vertical_gaps(V, z)
+
+    # horizontal interpolation at each depth (one triangulation per set of valid cells)
+    V = azg.interp_levels(V, lon_reg, lat_reg, min_pts=5)
     print(' -> Done!')    
 
     # mask using bathymetry (I don't think it is necessary, but make nice figures)
-    for i, xx in enumerate(lon_reg):
-        for j,yy in enumerate(lat_reg):
-            if Zitp[j,i] > -10: # remove shallower than 10m
-                V[j,i,:] = np.nan
-
-    # getting bottom temperature
-    print('Getting bottom Temp.')    
-    Sbot = np.full([lat_reg.size,lon_reg.size], np.nan) 
-    for i, xx in enumerate(lon_reg):
-        for j,yy in enumerate(lat_reg):
-            bottom_depth = -Zitp[j,i] # minus to turn positive
-            temp_vec = V[j,i,:]
-            idx_good = np.squeeze(np.where(~np.isnan(temp_vec)))
-            if idx_good.size:
-                idx_closest = np.argmin(np.abs(bottom_depth-z[idx_good]))
-            else:
-                continue
+    V[Zitp > -10, :] = np.nan # remove shallower than 10m
 
-            if np.abs([idx_closest] - bottom_depth) <= 20:
-                Sbot[j,i] = temp_vec[idx_good[idx_closest]]
-            elif np.abs(z[idx_closest] - bottom_depth) <= 50:
-                #print('used data located [30,50]m from bottom')
-                Sbot[j,i] = temp_vec[idx_good[idx_closest]]
+    # getting bottom temperature (closest good bin within 50m of GEBCO depth)
+    print('Getting bottom Temp.')
+    Sbot, Sbot_dist = azg.bottom_values(V, z, -Zitp)
 
     print(' -> Done!')    
 
-    # Mask data outside Nafo div.
+    # Mask data outside Nafo div. (masks rasterized once per grid, see azu.get_region_masks)
     print('Mask according to NAFO division for ' + season)
-    # Polygons
-    polygon4R = Polygon(zip(nafo_div['4R']['lon'], nafo_div['4R']['lat']))
-    polygon3K = Polygon(zip(nafo_div['3Kx']['lon'], nafo_div['3Kx']['lat']))
-    polygon3L = Polygon(zip(nafo_div['3L']['lon'], nafo_div['3L']['lat']))
-    polygon3N = Polygon(zip(nafo_div['3N']['lon'], nafo_div['3N']['lat']))
-    polygon3O = Polygon(zip(nafo_div['3O']['lon'], nafo_div['3O']['lat']))
-    polygon3Ps = Polygon(zip(nafo_div['3Ps']['lon'], nafo_div['3Ps']['lat']))
-    polygon2J = Polygon(zip(nafo_div['2J']['lon'], nafo_div['2J']['lat']))
-    polygon2H = Polygon(zip(nafo_div['2H']['lon'], nafo_div['2H']['lat']))
-
-    # Contour of data to mask
-    contour_mask = np.load('100m_contour_labrador.npy')
-    polygon_mask = Polygon(contour_mask)
+    masks = azu.get_region_masks(lon_reg, lat_reg, contour_file='100m_contour_labrador.npy')
 
     if season == 'spring':
-        for i, xx in enumerate(lon_reg):
-            for j,yy in enumerate(lat_reg):
-                point = Point(lon_reg[i], lat_reg[j])
-                if polygon3L.contains(point) | polygon3N.contains(point) | polygon3O.contains(point) | polygon3Ps.contains(point) | polygon4R.contains(point):
-                    pass #nothing to do but cannot implement negative statement "if not" above
-                else:
-                    Sbot[j,i] = np.nan
+        Sbot[~(masks['3L'] | masks['3N'] | masks['3O'] | masks['3Ps'] | masks['4R'])] = np.nan
 
     elif season == 'fall':
-        for i, xx in enumerate(lon_reg):
-            for j,yy in enumerate(lat_reg):
-                point = Point(lon_reg[i], lat_reg[j])
-                if polygon2H.contains(point) | polygon2J.contains(point) | polygon3K.contains(point) | polygon3L.contains(point) | polygon3N.contains(point) | polygon3O.contains(point):
-                    pass #nothing to do but cannot implement negative statement "if not" above
-                else:
-                    Sbot[j,i] = np.nan ### <--------------------- Do not mask the fall!!!!!
-
-                if polygon_mask.contains(point): # mask data near Labrador in fall
-                    Sbot[j,i] = np.nan 
+        Sbot[~(masks['2H'] | masks['2J'] | masks['3Kx'] | masks['3L'] | masks['3N'] | masks['3O'])] = np.nan
+        Sbot[masks['labrador_100m']] = np.nan # mask data near Labrador in fall
+
     else:
         print('no division mask, all data taken')
 
@@ -645,7 +440,8 @@ def bottom_salinity(season, year, zmin=0, zmax=1000, dz=5, proj='merc', netcdf_p
 
     ## ---- Plot Anomaly ---- ##
     fig, ax = plt.subplots(nrows=1, ncols=1)
-    m = Basemap(ax=ax, projection='merc',lon_0=lon_0,lat_0=lat_0, llcrnrlon=lonLims[0],llcrnrlat=latLims[0],urcrnrlon=lonLims[1],urcrnrlat=latLims[1], resolution= 'i')
+    m = azrd.get_basemap(lonLims, latLims, lon_0, lat_0) # (built once per region)
+    m.ax = ax
     #levels = np.linspace(-1, 1, 6)
     levels = np.array([-1, -.8, -.6, -.4, -.2, .2, .4, .6, .8, 1])
     xi, yi = m(*np.meshgrid(lon_reg, lat_reg))
@@ -658,39 +454,25 @@ def bottom_salinity(season, year, zmin=0, zmax=1000, dz=5, proj='merc', netcdf_p
         plt.title('Spring Bottom Salinity ' + year + ' Anomaly')
     else:
         plt.title('Bottom Salinity ' + year + '  Anomaly')
-    m.fillcontinents(color='tan');
-    m.drawparallels([40, 45, 50, 55, 60], labels=[0,0,0,0], fontsize=12, fontweight='normal');
-    m.drawmeridians([-60, -55, -50, -45], labels=[0,0,0,1], fontsize=12, fontweight='normal');
+    azrd.draw_nafo_map(ax, m, div_toplot, parallel_labels=[0,0,0,0])
     cax = fig.add_axes([0.16, 0.05, 0.7, 0.025])
     cb = plt.colorbar(c, cax=cax, orientation='horizontal')
     cb.set_label(r'$\rm S$', fontsize=12, fontweight='normal')
-    for div in div_toplot:
-        div_lon, div_lat = m(nafo_div[div]['lon'], nafo_div[div]['lat'])
-        m.plot(div_lon, div_lat, 'k', linewidth=2)
-        ax.text(np.mean(div_lon), np.mean(div_lat), div, fontsize=12, color='black', fontweight='bold')    
-    # Save Figure
-    fig.set_size_inches(w=6, h=9)
-    fig.set_dpi(200)
-    outfile = 'bottom_sal_anomaly_' + season + '_' + year + '.png'
-    fig.savefig(outfile)
-    os.system('convert -trim ' + outfile + ' ' + outfile)
-    # Save French Figure
-    plt.sca(ax)
+    # Save Figure (English and French, only the title is swapped)
     if season=='fall':
-        plt.title(u'Anomalie de salinité au fond - Automne ' + year )
+        title_fr = u'Anomalie de salinité au fond - Automne ' + year
     elif season=='spring':
-        plt.title(u'Anomalie de salinité au fond - Printemp ' + year )
+        title_fr = u'Anomalie de salinité au fond - Printemp ' + year
     else:
-        plt.title(u'Anomalie de salinité au fond ' + year )
+        title_fr = u'Anomalie de salinité au fond ' + year
     fig.set_size_inches(w=6, h=9)
-    fig.set_dpi(300)
-    outfile = 'bottom_sal_anomaly_' + season + '_' + year + '_FR.png'
-    fig.savefig(outfile)
-    os.system('convert -trim ' + outfile + ' ' + outfile)
+    outfile = 'bottom_sal_anomaly_' + season + '_' + year + '.png'
+    azrd.save_bilingual(fig, outfile, [(ax.title, title_fr)], dpi=300)
 
     ## ---- Plot Salinity ---- ##
     fig, ax = plt.subplots(nrows=1, ncols=1)
-    m = Basemap(ax=ax, projection='merc',lon_0=lon_0,lat_0=lat_0, llcrnrlon=lonLims[0],llcrnrlat=latLims[0],urcrnrlon=lonLims[1],urcrnrlat=latLims[1], resolution= 'i')
+    m = azrd.get_basemap(lonLims, latLims, lon_0, lat_0) # (built once per region)
+    m.ax = ax
     levels = np.linspace(30, 36, 13)
     xi, yi = m(*np.meshgrid(lon_reg, lat_reg))
     c = m.contourf(xi, yi, Sbot, levels, cmap=plt.cm.RdBu_r, extend='both')
@@ -702,41 +484,27 @@ def bottom_salinity(season, year, zmin=0, zmax=1000, dz=5, proj='merc', netcdf_p
         plt.title('Spring Bottom Salinity ' + year)
     else:
         plt.title('Bottom Salinity ' + year)
-    m.fillcontinents(color='tan');
-    m.drawparallels([40, 45, 50, 55, 60], labels=[0,0,0,0], fontsize=12, fontweight='normal');
-    m.drawmeridians([-60, -55, -50, -45], labels=[0,0,0,1], fontsize=12, fontweight='normal');
+    azrd.draw_nafo_map(ax, m, div_toplot, parallel_labels=[0,0,0,0])
     x, y = m(lons, lats)
     m.scatter(x,y, s=50, marker='.',color='k')
     cax = fig.add_axes([0.16, 0.05, 0.7, 0.025])
     cb = plt.colorbar(c, cax=cax, orientation='horizontal')
     cb.set_label(r'$\rm S$', fontsize=12, fontweight='normal')
-    for div in div_toplot:
-        div_lon, div_lat = m(nafo_div[div]['lon'], nafo_div[div]['lat'])
-        m.plot(div_lon, div_lat, 'k', linewidth=2)
-        ax.text(np.mean(div_lon), np.mean(div_lat), div, fontsize=12, color='black', fontweight='bold')
-    # Save Figure
-    fig.set_size_inches(w=6, h=9)
-    fig.set_dpi(200)
-    outfile = 'bottom_sal_' + season + '_' + year + '.png'
-    fig.savefig(outfile)
-    os.system('convert -trim ' + outfile + ' ' + outfile)
-    # Save French Figure
-    plt.sca(ax)
+    # Save Figure (English and French, only the title is swapped)
     if season=='fall':
-        plt.title(u'Salinité au fond - Automne ' + year )
+        title_fr = u'Salinité au fond - Automne ' + year
     elif season=='spring':
-        plt.title(u'Salinité au fond - Printemp ' + year )
+        title_fr = u'Salinité au fond - Printemp ' + year
     else:
-        plt.title(u'Salinité au fond ' + year )
+        title_fr = u'Salinité au fond ' + year
     fig.set_size_inches(w=6, h=9)
-    fig.set_dpi(300)
-    outfile = 'bottom_sal_' + season + '_' + year + '_FR.png'
-    fig.savefig(outfile)
-    os.system('convert -trim ' + outfile + ' ' + outfile)
+    outfile = 'bottom_sal_' + season + '_' + year + '.png'
+    azrd.save_bilingual(fig, outfile, [(ax.title, title_fr)], dpi=300)
 
     ## ---- Plot Climato ---- ##
     fig, ax = plt.subplots(nrows=1, ncols=1)
-    m = Basemap(ax=ax, projection='merc',lon_0=lon_0,lat_0=lat_0, llcrnrlon=lonLims[0],llcrnrlat=latLims[0],urcrnrlon=lonLims[1],urcrnrlat=latLims[1], resolution= 'i')
+    m = azrd.get_basemap(lonLims, latLims, lon_0, lat_0) # (built once per region)
+    m.ax = ax
     levels = np.linspace(30, 36, 13)
     #levels = np.linspace(30, 36, 7)
     xi, yi = m(*np.meshgrid(lon_reg, lat_reg))
@@ -749,42 +517,28 @@ def bottom_salinity(season, year, zmin=0, zmax=1000, dz=5, proj='merc', netcdf_p
         plt.title('Spring Bottom Salinity Climatology')
     else:
         plt.title('Bottom Salinity Climatology')
-    m.fillcontinents(color='tan');
-    m.drawparallels([40, 45, 50, 55, 60], labels=[1,0,0,0], fontsize=12, fontweight='normal');
-    m.drawmeridians([-60, -55, -50, -45], labels=[0,0,0,1], fontsize=12, fontweight='normal');
+    azrd.draw_nafo_map(ax, m, div_toplot, parallel_labels=[1,0,0,0])
     cax = fig.add_axes([0.16, 0.05, 0.7, 0.025])
     cb = plt.colorbar(c, cax=cax, orientation='horizontal')
     cb.set_label(r'$\rm S$', fontsize=12, fontweight='normal')
-    for div in div_toplot:
-        div_lon, div_lat = m(nafo_div[div]['lon'], nafo_div[div]['lat'])
-        m.plot(div_lon, div_lat, 'k', linewidth=2)
-        ax.text(np.mean(div_lon), np.mean(div_lat), div, fontsize=12, color='black', fontweight='bold')    
-    # Save Figure
-    fig.set_size_inches(w=6, h=9)
-    fig.set_dpi(200)
-    outfile = 'bottom_sal_climato_' + season + '_' + year + '.png'
-    fig.savefig(outfile)
-    os.system('convert -trim ' + outfile + ' ' + outfile)
-    # Save French Figure
-    plt.sca(ax)
+    # Save Figure (English and French, only the title is swapped)
     if season=='fall':
-        plt.title(u'Climatoligie de salinité au fond - Automne ' + year )
+        title_fr = u'Climatoligie de salinité au fond - Automne ' + year
     elif season=='spring':
-        plt.title(u'Climatologie de salinité au fond - Printemp ' + year )
+        title_fr = u'Climatologie de salinité au fond - Printemp ' + year
     else:
-        plt.title(u'Climatologie de salinité au fond ' + year )
+        title_fr = u'Climatologie de salinité au fond ' + year
     fig.set_size_inches(w=6, h=9)
-    fig.set_dpi(300)
-    outfile = 'bottom_sal_climato_' + season + '_' + year + '_FR.png'
-    fig.savefig(outfile)
-    os.system('convert -trim ' + outfile + ' ' + outfile)
+    outfile = 'bottom_sal_climato_' + season + '_' + year + '.png'
+    azrd.save_bilingual(fig, outfile, [(ax.title, title_fr)], dpi=300)
 
     # Convert to a subplot
-    os.system('montage bottom_sal_climato_' + season + '_' + year + '.png bottom_sal_' + season + '_' + year + '.png bottom_sal_anomaly_' + season + '_' + year + '.png  -tile 3x1 -geometry +10+10  -background white  bottomS_' + season + year + '.png') 
-    # French
-    os.system('montage bottom_sal_climato_' + season + '_' + year + '_FR.png bottom_sal_' + season + '_' + year + '_FR.png bottom_sal_anomaly_' + season + '_' + year + '_FR.png  -tile 3x1 -geometry +10+10  -background white  bottomS_' + season + year + '_FR.png') 
-    # Move to year folder
-    os.system('cp bottomS_' + season + year + '.png bottomS_' + season + year + '_FR.png ../' + year)
+    for lang in ['', '_FR']:
+        infiles = ['bottom_sal_climato_' + season + '_' + year + lang + '.png', 'bottom_sal_' + season + '_' + year + lang + '.png', 'bottom_sal_anomaly_' + season + '_' + year + lang + '.png']
+        azrd.montage(infiles, 'bottomS_' + season + year + lang + '.png', tile='3x1')
+        # Move to year folder
+        if os.path.isdir('../' + year):
+            shutil.copy('bottomS_' + season + year + lang + '.png', '../' + year)
 
 
 #### bottom_stats
@@ -839,64 +593,53 @@ def bottom_stats(years, season, proj='merc', plot=False, netcdf_path='/home/cyrf
     latLims = [lat_reg[0], lat_reg[-1]]
 
     # NAFO divisions
-    nafo_div = azu.get_nafo_divisions()
-    polygon3L = Polygon(zip(nafo_div['3L']['lon'], nafo_div['3L']['lat']))
-    polygon3N = Polygon(zip(nafo_div['3N']['lon'], nafo_div['3N']['lat']))
-    polygon3O = Polygon(zip(nafo_div['3O']['lon'], nafo_div['3O']['lat']))
-    shape = [polygon3L, polygon3N, polygon3O]
-    shape_3LNO = cascaded_union(shape)
-    shape_3M = Polygon(zip(nafo_div['3M']['lon'], nafo_div['3M']['lat']))
-    shape_3Ps = Polygon(zip(nafo_div['3Ps']['lon'], nafo_div['3Ps']['lat']))
-    shape_2G = Polygon(zip(nafo_div['2G']['lon'], nafo_div['2G']['lat']))
-    shape_2H = Polygon(zip(nafo_div['2H']['lon'], nafo_div['2H']['lat']))
-    shape_2J = Polygon(zip(nafo_div['2J']['lon'], nafo_div['2J']['lat']))
-    shape_3K = Polygon(zip(nafo_div['3K']['lon'], nafo_div['3K']['lat']))
-    shape_3L = Polygon(zip(nafo_div['3L']['lon'], nafo_div['3L']['lat']))
-    shape_3O = Polygon(zip(nafo_div['3O']['lon'], nafo_div['3O']['lat']))
-    shape = [shape_2J, shape_2H]
-    shape_2HJ = cascaded_union(shape)
-    shape = [shape_2G, shape_2H]
-    shape_2GH = cascaded_union(shape)
-    shape_4R = Polygon(zip(nafo_div['4R']['lon'], nafo_div['4R']['lat']))
-    shape_4S = Polygon(zip(nafo_div['4S']['lon'], nafo_div['4S']['lat']))
-    shape_4T = Polygon(zip(nafo_div['4T']['lon'], nafo_div['4T']['lat']))
-    shape = [shape_4R, shape_4S]
-    shape_4RS = cascaded_union(shape)
-    shape = [shape_4R, shape_4S, shape_4T]
-    shape_4RST = cascaded_union(shape)
-    polygon4Vs = Polygon(zip(nafo_div['4Vs']['lon'], nafo_div['4Vs']['lat']))
-    polygon4Vn = Polygon(zip(nafo_div['4Vn']['lon'], nafo_div['4Vn']['lat']))
-    polygon4W = Polygon(zip(nafo_div['4W']['lon'], nafo_div['4W']['lat']))
-    polygon4X = Polygon(zip(nafo_div['4X']['lon'], nafo_div['4X']['lat']))
-    shape = [polygon4Vs.buffer(0), polygon4Vn.buffer(0), polygon4W.buffer(0), polygon4X.buffer(0)]
-    shape_4VWX = cascaded_union(shape)
-    shape_5Y = Polygon(zip(nafo_div['5Y']['lon'], nafo_div['5Y']['lat']))
-
-    dict_stats_3LNO = {}
-    dict_stats_3M = {}
-    dict_stats_3Ps = {}
-    dict_stats_3K = {}
-    dict_stats_3L = {}
-    dict_stats_3O = {}
-    dict_stats_2G = {}
-    dict_stats_2H = {}
-    dict_stats_2J = {}
-    dict_stats_2HJ = {}
-    dict_stats_2GH = {}
-    dict_stats_4R = {}
-    dict_stats_4S = {}
-    dict_stats_4RS = {}
-    dict_stats_4RT = {}
-    dict_stats_4RST = {}
-    dict_stats_4T = {}
-    dict_stats_4VWX = {}
-    dict_stats_5Y = {}
+    masks = azu.get_region_masks(lon_reg, lat_reg) # rasterized once per grid
+    shape_3LNO = masks['3L'] | masks['3N'] | masks['3O']
+    shape_3M = masks['3M']
+    shape_3Ps = masks['3Ps']
+    shape_2G = masks['2G']
+    shape_2H = masks['2H']
+    shape_2J = masks['2J']
+    shape_3K = masks['3K']
+    shape_3L = masks['3L']
+    shape_3O = masks['3O']
+    shape_2HJ = masks['2J'] | masks['2H']
+    shape_2GH = masks['2G'] | masks['2H']
+    shape_4R = masks['4R']
+    shape_4S = masks['4S']
+    shape_4T = masks['4T']
+    shape_4RS = masks['4R'] | masks['4S']
+    shape_4RST = masks['4R'] | masks['4S'] | masks['4T']
+    shape_4VWX = masks['4Vs'] | masks['4Vn'] | masks['4W'] | masks['4X']
+    shape_5Y = masks['5Y']
+
+    # Divisions for stats (computed for all years at once, after the loop)
+    shapes = {}
+    shapes['2GH'] = shape_2GH
+    shapes['2G'] = shape_2G
+    shapes['2H'] = shape_2H
+    shapes['2J'] = shape_2J
+    shapes['2HJ'] = shape_2HJ
+    shapes['3LNO'] = shape_3LNO
+    shapes['3M'] = shape_3M
+    shapes['3Ps'] = shape_3Ps
+    shapes['3K'] = shape_3K
+    shapes['3L'] = shape_3L
+    shapes['3O'] = shape_3O
+    ## shapes['4R'] = shape_4R
+    ## shapes['4S'] = shape_4S
+    ## shapes['4RS'] = shape_4RS
+    ## shapes['4RST'] = shape_4RST
+    ## shapes['4T'] = shape_4T
+    ## shapes['4VWX'] = shape_4VWX
+    #shapes['5Y'] = shape_5Y
+    Tbot_list = []
 
     # Loop on years
     df_list = []
     for year in years:
-        print(' ---- ' + np.str(year) + ' ---- ')
-        year_file = netcdf_path + np.str(year) + '.nc'
+        print(' ---- ' + str(year) + ' ---- ')
+        year_file = netcdf_path + str(year) + '.nc'
         Tdict = azu.get_bottomT(year_file, season, climato_file)    
         Tbot = Tdict['Tbot']
         lons = Tdict['lons']
@@ -904,25 +647,8 @@ def bottom_stats(years, season, proj='merc', plot=False, netcdf_path='/home/cyrf
         anom = Tbot-Tbot_climato
 
 
-        # NAFO division stats    
-        dict_stats_2GH[np.str(year)] = azu.polygon_temperature_stats(Tdict, shape_2GH)
-        dict_stats_2G[np.str(year)] = azu.polygon_temperature_stats(Tdict, shape_2G)
-        dict_stats_2H[np.str(year)] = azu.polygon_temperature_stats(Tdict, shape_2H)
-        dict_stats_2J[np.str(year)] = azu.polygon_temperature_stats(Tdict, shape_2J)
-        dict_stats_2HJ[np.str(year)] = azu.polygon_temperature_stats(Tdict, shape_2HJ)
-        dict_stats_3LNO[np.str(year)] = azu.polygon_temperature_stats(Tdict, shape_3LNO)
-        dict_stats_3M[np.str(year)] = azu.polygon_temperature_stats(Tdict, shape_3M)
-        dict_stats_3Ps[np.str(year)] = azu.polygon_temperature_stats(Tdict, shape_3Ps)
-        dict_stats_3K[np.str(year)] = azu.polygon_temperature_stats(Tdict, shape_3K)
-        dict_stats_3L[np.str(year)] = azu.polygon_temperature_stats(Tdict, shape_3L)
-        dict_stats_3O[np.str(year)] = azu.polygon_temperature_stats(Tdict, shape_3O)
-        ## dict_stats_4R[np.str(year)] = azu.polygon_temperature_stats(Tdict, shape_4R)
-        ## dict_stats_4S[np.str(year)] = azu.polygon_temperature_stats(Tdict, shape_4S)
-        ## dict_stats_4RS[np.str(year)] = azu.polygon_temperature_stats(Tdict, shape_4RS)
-        ## dict_stats_4RST[np.str(year)] = azu.polygon_temperature_stats(Tdict, shape_4RST)
-        ## dict_stats_4T[np.str(year)] = azu.polygon_temperature_stats(Tdict, shape_4T)
-        ## dict_stats_4VWX[np.str(year)] = azu.polygon_temperature_stats(Tdict, shape_4VWX)
-        #dict_stats_5Y[np.str(year)] = azu.polygon_temperature_stats(Tdict, shape_5Y)
+        # Keep bottom temperature for NAFO division stats
+        Tbot_list.append(Tbot)
 
         # Append bottom temperature for multi-index export
         df = pd.DataFrame(index=lat_reg, columns=lon_reg)
@@ -937,7 +663,8 @@ def bottom_stats(years, season, proj='merc', plot=False, netcdf_path='/home/cyrf
     
             # 1.1 - Plot Anomaly
             fig, ax = plt.subplots(nrows=1, ncols=1)
-            m = Basemap(ax=ax, projection='merc',lon_0=lon_0,lat_0=lat_0, llcrnrlon=lonLims[0],llcrnrlat=latLims[0],urcrnrlon=lonLims[1],urcrnrlat=latLims[1], resolution= 'i')
+            m = azrd.get_basemap(lonLims, latLims, lon_0, lat_0) # (built once per region)
+            m.ax = ax
             levels = np.linspace(-3.5, 3.5, 8)
             xi, yi = m(*np.meshgrid(lon_reg, lat_reg))
             c = m.contourf(xi, yi, anom, levels, cmap=plt.cm.RdBu_r, extend='both')
@@ -949,25 +676,20 @@ def bottom_stats(years, season, proj='merc', plot=False, netcdf_path='/home/cyrf
                 plt.title('Spring Bottom Temperature Anomaly')
             else:
                 plt.title('Bottom Temperature Anomaly')
-            m.fillcontinents(color='tan');
-            m.drawparallels([40, 45, 50, 55, 60], labels=[1,0,0,0], fontsize=12, fontweight='normal');
-            m.drawmeridians([-60, -55, -50, -45], labels=[0,0,0,1], fontsize=12, fontweight='normal');
+            azrd.draw_nafo_map(ax, m, div_toplot, parallel_labels=[1,0,0,0])
             cax = plt.axes([0.85,0.15,0.04,0.7], facecolor='grey')
             cb = plt.colorbar(c, cax=cax)
             cb.set_label(r'$\rm T(^{\circ}C)$', fontsize=12, fontweight='normal')
-            for div in div_toplot:
-                div_lon, div_lat = m(nafo_div[div]['lon'], nafo_div[div]['lat'])
-                m.plot(div_lon, div_lat, 'k', linewidth=2)
-                ax.text(np.mean(div_lon), np.mean(div_lat), div, fontsize=12, color='black', fontweight='bold')    
             # Save Figure
             fig.set_size_inches(w=7, h=8)
             fig.set_dpi(200)
-            outfile = 'bottom_temp_anomaly_' + season + '_' + np.str(year) + '.png'
+            outfile = 'bottom_temp_anomaly_' + season + '_' + str(year) + '.png'
             fig.savefig(outfile)
 
             # 1.2 - Plot Temperature
             fig, ax = plt.subplots(nrows=1, ncols=1)
-            m = Basemap(ax=ax, projection='merc',lon_0=lon_0,lat_0=lat_0, llcrnrlon=lonLims[0],llcrnrlat=latLims[0],urcrnrlon=lonLims[1],urcrnrlat=latLims[1], resolution= 'i')
+            m = azrd.get_basemap(lonLims, latLims, lon_0, lat_0) # (built once per region)
+            m.ax = ax
             levels = np.linspace(-2, 6, 9)
             xi, yi = m(*np.meshgrid(lon_reg, lat_reg))
             c = m.contourf(xi, yi, Tbot, levels, cmap=plt.cm.RdBu_r, extend='both')
@@ -979,45 +701,42 @@ def bottom_stats(years, season, proj='merc', plot=False, netcdf_path='/home/cyrf
                 plt.title('Spring Bottom Temperature')
             else:
                 plt.title('Bottom Temperature')
-            m.fillcontinents(color='tan');
-            m.drawparallels([40, 45, 50, 55, 60], labels=[1,0,0,0], fontsize=12, fontweight='normal');
-            m.drawmeridians([-60, -55, -50, -45], labels=[0,0,0,1], fontsize=12, fontweight='normal');
+            azrd.draw_nafo_map(ax, m, div_toplot, parallel_labels=[1,0,0,0])
             x, y = m(lons, lats)
             m.scatter(x,y, s=50, marker='.',color='k')
             cax = plt.axes([0.85,0.15,0.04,0.7], facecolor='grey')
             cb = plt.colorbar(c, cax=cax)
             cb.set_label(r'$\rm T(^{\circ}C)$', fontsize=12, fontweight='normal')
-            for div in div_toplot:
-                div_lon, div_lat = m(nafo_div[div]['lon'], nafo_div[div]['lat'])
-                m.plot(div_lon, div_lat, 'k', linewidth=2)
-                ax.text(np.mean(div_lon), np.mean(div_lat), div, fontsize=12, color='black', fontweight='bold')
             # Save Figure
             fig.set_size_inches(w=7, h=8)
             fig.set_dpi(200)
-            outfile = 'bottom_temp_' + season + '_' + np.str(year) + '.png'
+            outfile = 'bottom_temp_' + season + '_' + str(year) + '.png'
             fig.savefig(outfile)
             plt.close('all')
 
-    df_2G = pd.DataFrame.from_dict(dict_stats_2G, orient='index')
-    df_2H = pd.DataFrame.from_dict(dict_stats_2H, orient='index')
-    df_2J = pd.DataFrame.from_dict(dict_stats_2J, orient='index')
-    df_2HJ = pd.DataFrame.from_dict(dict_stats_2HJ, orient='index')
-    df_2GH = pd.DataFrame.from_dict(dict_stats_2GH, orient='index')
-    df_3Ps = pd.DataFrame.from_dict(dict_stats_3Ps, orient='index')
-    df_3LNO = pd.DataFrame.from_dict(dict_stats_3LNO, orient='index')
-    df_3M = pd.DataFrame.from_dict(dict_stats_3M, orient='index')
-    df_3K = pd.DataFrame.from_dict(dict_stats_3K, orient='index')
-    df_3L = pd.DataFrame.from_dict(dict_stats_3L, orient='index')
-    df_3O = pd.DataFrame.from_dict(dict_stats_3O, orient='index')
-    df_4R = pd.DataFrame.from_dict(dict_stats_4R, orient='index')
-    df_4S = pd.DataFrame.from_dict(dict_stats_4S, orient='index')
-    df_4RS = pd.DataFrame.from_dict(dict_stats_4RS, orient='index')
-    df_4RST = pd.DataFrame.from_dict(dict_stats_4RST, orient='index')
-    df_4T = pd.DataFrame.from_dict(dict_stats_4T, orient='index')
-    df_4VWX = pd.DataFrame.from_dict(dict_stats_4VWX, orient='index')
-    #df_5Y = pd.DataFrame.from_dict(dict_stats_5Y, orient='index')
-
-    ## outname = 'stats_3Ps_' + season + '.pkl'
+    # NAFO division stats (all divisions, all years at once)
+    pixel_area = azu.get_pixel_area(lon_reg, lat_reg)
+    df_stats = azu.polygon_temperature_stats_batch(np.array(Tbot_list), Zitp, shapes, pixel_area, index=[str(year) for year in years])
+    df_2G = df_stats['2G']
+    df_2H = df_stats['2H']
+    df_2J = df_stats['2J']
+    df_2HJ = df_stats['2HJ']
+    df_2GH = df_stats['2GH']
+    df_3Ps = df_stats['3Ps']
+    df_3LNO = df_stats['3LNO']
+    df_3M = df_stats['3M']
+    df_3K = df_stats['3K']
+    df_3L = df_stats['3L']
+    df_3O = df_stats['3O']
+    ## df_4R = df_stats['4R']
+    ## df_4S = df_stats['4S']
+    ## df_4RS = df_stats['4RS']
+    ## df_4RST = df_stats['4RST']
+    ## df_4T = df_stats['4T']
+    ## df_4VWX = df_stats['4VWX']
+    #df_5Y = df_stats['5Y']
+
+    outname = 'stats_3Ps_' + season + '.pkl'
     df_3Ps.to_pickle(outname)
     outname = 'stats_3LNO_' + season + '.pkl'
     df_3LNO.to_pickle(outname)
@@ -1170,45 +889,9 @@ def bottom_scorecards(years, clim_year=[1981, 2010]):
             cell._set_facecolor('lightgray')
             cell._text.set_color('lightgray')
 
-    plt.savefig("scorecards_fall_2H.png", dpi=300)
-    os.system('convert -trim scorecards_fall_2H.png scorecards_fall_2H.png')
-
-    # French table
-    std_anom = std_anom.rename({r'$\rm T_{bot}$' : r'$\rm T_{fond}$', r'$\rm T_{bot_{<200m}}$' : r'$\rm T_{fond_{<200m}}$', r'$\rm Area_{>2^{\circ}C}$' : r'$\rm Aire_{>2^{\circ}C}$', r'$\rm Area_{<1^{\circ}C}$' : r'$\rm Aire_{<1^{\circ}C}$'})
-    year_list[-1] = u'ET'
-
-    header = ax.table(cellText=[['']],
-                          colLabels=['-- Division 2H de l\'OPANO --'],
-                          loc='center'
-                          )
-    header.set_fontsize(13)
-    #the_table=ax.table(cellText=vals, rowLabels=std_anom.index, colLabels=std_anom.columns, 
-    the_table=ax.table(cellText=vals, rowLabels=std_anom.index, colLabels=year_list,
-                        loc='center', cellColours=cmap(normal(vals_color)), cellLoc='center',
-                        bbox=[0, 0, 1, 0.5]
-                        )
-    # change font color to white where needed:
-    the_table.auto_set_font_size(False)
-    the_table.set_fontsize(12.5)
-    table_props = the_table.properties()
-    table_cells = table_props['child_artists']
-    last_columns = np.arange(vals.shape[1]-2, vals.shape[1]) # last columns
-    for key, cell in the_table.get_celld().items():
-        cell_text = cell.get_text().get_text()
-        if is_number(cell_text) == False:
-            pass
-        elif key[0] == 0: #year's row = no color
-            pass
-        elif key[1] in last_columns:
-             cell._text.set_color('darkslategray')
-        elif (np.float(cell_text) <= -1.5) | (np.float(cell_text) >= 1.5) :
-            cell._text.set_color('white')
-        elif (cell_text=='nan'):
-            cell._set_facecolor('lightgray')
-            cell._text.set_color('lightgray')
-
-    plt.savefig("scorecards_fall_2H_FR.png", dpi=300)
-    os.system('convert -trim scorecards_fall_2H_FR.png scorecards_fall_2H_FR.png')
+    # Save (English and French, only the labels are swapped)
+    texts_fr = azrd.table_texts(header, {'-- NAFO division 2H --' : '-- Division 2H de l\'OPANO --'}) + azrd.table_texts(the_table, SCORECARDS_FR)
+    azrd.save_bilingual(fig, 'scorecards_fall_2H.png', texts_fr, dpi=300)
 
  # 1.
     infile = 'stats_2J_fall.pkl'
@@ -1273,43 +956,9 @@ def bottom_scorecards(years, clim_year=[1981, 2010]):
             cell._set_facecolor('lightgray')
             cell._text.set_color('lightgray')
 
-    plt.savefig("scorecards_fall_2J.png", dpi=300)
-    os.system('convert -trim scorecards_fall_2J.png scorecards_fall_2J.png')
-
-    # French table
-    std_anom = std_anom.rename({r'$\rm T_{bot}$' : r'$\rm T_{fond}$', r'$\rm T_{bot_{<200m}}$' : r'$\rm T_{fond_{<200m}}$', r'$\rm Area_{>2^{\circ}C}$' : r'$\rm Aire_{>2^{\circ}C}$', r'$\rm Area_{<1^{\circ}C}$' : r'$\rm Aire_{<1^{\circ}C}$'})
-    header = ax.table(cellText=[['']],
-                          colLabels=['-- Division 2J de l\'OPANO --'],
-                          loc='center'
-                          )
-    #the_table=ax.table(cellText=vals, rowLabels=std_anom.index, colLabels=std_anom.columns, 
-    header.set_fontsize(12.5)
-    the_table=ax.table(cellText=vals, rowLabels=std_anom.index, colLabels=None, 
-                        loc='center', cellColours=cmap(normal(vals_color)), cellLoc='center',
-                        bbox=[0, 0, 1.0, 0.50]
-                        )
-    the_table.auto_set_font_size(False)
-    the_table.set_fontsize(12.5)
-    # change font color to white where needed:
-    table_props = the_table.properties()
-    table_cells = table_props['child_artists']
-    last_columns = np.arange(vals.shape[1]-2, vals.shape[1]) # last columns
-    for key, cell in the_table.get_celld().items():
-        cell_text = cell.get_text().get_text()
-        if is_number(cell_text) == False:
-            pass
-        #elif key[0] == 0:# <--- remove when no years
-        #    pass
-        elif key[1] in last_columns:
-             cell._text.set_color('darkslategray')
-        elif (np.float(cell_text) <= -1.5) | (np.float(cell_text) >= 1.5) :
-            cell._text.set_color('white')
-        elif (cell_text=='nan'):
-            cell._set_facecolor('lightgray')
-            cell._text.set_color('lightgray')
-
-    plt.savefig("scorecards_fall_2J_FR.png", dpi=300)
-    os.system('convert -trim scorecards_fall_2J_FR.png scorecards_fall_2J_FR.png')
+    # Save (English and French, only the labels are swapped)
+    texts_fr = azrd.table_texts(header, {'-- NAFO division 2J --' : '-- Division 2J de l\'OPANO --'}) + azrd.table_texts(the_table, SCORECARDS_FR)
+    azrd.save_bilingual(fig, 'scorecards_fall_2J.png', texts_fr, dpi=300)
 
 
     
@@ -1377,43 +1026,9 @@ def bottom_scorecards(years, clim_year=[1981, 2010]):
             cell._set_facecolor('lightgray')
             cell._text.set_color('lightgray')
 
-    plt.savefig("scorecards_fall_3K.png", dpi=300)
-    os.system('convert -trim scorecards_fall_3K.png scorecards_fall_3K.png')
-
-    # French table
-    std_anom = std_anom.rename({r'$\rm T_{bot}$' : r'$\rm T_{fond}$', r'$\rm T_{bot_{<200m}}$' : r'$\rm T_{fond_{<200m}}$', r'$\rm Area_{>2^{\circ}C}$' : r'$\rm Aire_{>2^{\circ}C}$', r'$\rm Area_{<1^{\circ}C}$' : r'$\rm Aire_{<1^{\circ}C}$'})
-    header = ax.table(cellText=[['']],
-                          colLabels=['-- Division 3K de l\'OPANO --'],
-                          loc='center'
-                          )
-    #the_table=ax.table(cellText=vals, rowLabels=std_anom.index, colLabels=std_anom.columns, 
-    header.set_fontsize(12.5)
-    the_table=ax.table(cellText=vals, rowLabels=std_anom.index, colLabels=None, 
-                        loc='center', cellColours=cmap(normal(vals_color)), cellLoc='center',
-                        bbox=[0, 0, 1.0, 0.50]
-                        )
-    the_table.auto_set_font_size(False)
-    the_table.set_fontsize(12.5)
-    # change font color to white where needed:
-    table_props = the_table.properties()
-    table_cells = table_props['child_artists']
-    last_columns = np.arange(vals.shape[1]-2, vals.shape[1]) # last columns
-    for key, cell in the_table.get_celld().items():
-        cell_text = cell.get_text().get_text()
-        if is_number(cell_text) == False:
-            pass
-        #elif key[0] == 0:# <--- remove when no years
-        #    pass
-        elif key[1] in last_columns:
-             cell._text.set_color('darkslategray')
-        elif (np.float(cell_text) <= -1.5) | (np.float(cell_text) >= 1.5) :
-            cell._text.set_color('white')
-        elif (cell_text=='nan'):
-            cell._set_facecolor('lightgray')
-            cell._text.set_color('lightgray')
-
-    plt.savefig("scorecards_fall_3K_FR.png", dpi=300)
-    os.system('convert -trim scorecards_fall_3K_FR.png scorecards_fall_3K_FR.png')
+    # Save (English and French, only the labels are swapped)
+    texts_fr = azrd.table_texts(header, {'-- NAFO division 3K --' : '-- Division 3K de l\'OPANO --'}) + azrd.table_texts(the_table, SCORECARDS_FR)
+    azrd.save_bilingual(fig, 'scorecards_fall_3K.png', texts_fr, dpi=300)
 
     # 3.
     infile = 'stats_3LNO_fall.pkl'
@@ -1475,50 +1090,15 @@ def bottom_scorecards(years, clim_year=[1981, 2010]):
             cell._set_facecolor('lightgray')
             cell._text.set_color('lightgray')
 
-    plt.savefig("scorecards_fall_3LNO.png", dpi=300)
-    os.system('convert -trim scorecards_fall_3LNO.png scorecards_fall_3LNO.png')
-
-    # French table
-    std_anom = std_anom.rename({r'$\rm T_{bot}$' : r'$\rm T_{fond}$', r'$\rm T_{bot_{<200m}}$' : r'$\rm T_{fond_{<200m}}$', r'$\rm Area_{>2^{\circ}C}$' : r'$\rm Aire_{>2^{\circ}C}$', r'$\rm Area_{<1^{\circ}C}$' : r'$\rm Aire_{<1^{\circ}C}$'})
-    header = ax.table(cellText=[['']],
-                          colLabels=['-- Divisions 3LNO de l\'OPANO --'],
-                          loc='center'
-                          )
-
-    header.set_fontsize(12.5)
-
-    the_table=ax.table(cellText=vals, rowLabels=std_anom.index, colLabels=None, 
-                        loc='center', cellColours=cmap(normal(vals_color)), cellLoc='center',
-                        bbox=[0, 0, 1.0, 0.50]
-                        )
-    # change font color to white where needed:
-    the_table.auto_set_font_size(False)
-    the_table.set_fontsize(12.5)
-    table_props = the_table.properties()
-    table_cells = table_props['child_artists']
-    last_columns = np.arange(vals.shape[1]-2, vals.shape[1]) # last columns
-    for key, cell in the_table.get_celld().items():
-        cell_text = cell.get_text().get_text()
-        if is_number(cell_text) == False:
-            pass
-        #elif key[0] == 0:# <--- remove when no years
-        #    pass
-        elif key[1] in last_columns:
-             cell._text.set_color('darkslategray')
-        elif (np.float(cell_text) <= -1.5) | (np.float(cell_text) >= 1.5) :
-            cell._text.set_color('white')
-        elif (cell_text=='nan'):
-            cell._set_facecolor('lightgray')
-            cell._text.set_color('lightgray')
-
-    plt.savefig("scorecards_fall_3LNO_FR.png", dpi=300)
-    os.system('convert -trim scorecards_fall_3LNO_FR.png scorecards_fall_3LNO_FR.png')
+    # Save (English and French, only the labels are swapped)
+    texts_fr = azrd.table_texts(header, {'-- NAFO division 3LNO --' : '-- Divisions 3LNO de l\'OPANO --'}) + azrd.table_texts(the_table, SCORECARDS_FR)
+    azrd.save_bilingual(fig, 'scorecards_fall_3LNO.png', texts_fr, dpi=300)
 
     plt.close('all')
     # English
-    os.system('montage  scorecards_fall_2H.png scorecards_fall_2J.png scorecards_fall_3K.png scorecards_fall_3LNO.png -tile 1x4 -geometry +1+1  -background white  scorecards_botT_fall.png') 
+    azrd.montage(['scorecards_fall_2H.png', 'scorecards_fall_2J.png', 'scorecards_fall_3K.png', 'scorecards_fall_3LNO.png'], 'scorecards_botT_fall.png', tile='1x4', border=1)
     # French
-    os.system('montage  scorecards_fall_2H_FR.png scorecards_fall_2J.png scorecards_fall_3K_FR.png scorecards_fall_3LNO_FR.png -tile 1x4 -geometry +1+1  -background white  scorecards_botT_fall_FR.png') 
+    azrd.montage(['scorecards_fall_2H_FR.png', 'scorecards_fall_2J_FR.png', 'scorecards_fall_3K_FR.png', 'scorecards_fall_3LNO_FR.png'], 'scorecards_botT_fall_FR.png', tile='1x4', border=1)
 
 
 
@@ -1589,45 +1169,9 @@ def bottom_scorecards(years, clim_year=[1981, 2010]):
             cell._set_facecolor('lightgray')
             cell._text.set_color('lightgray')
 
-    plt.savefig("scorecards_spring_3LNO.png", dpi=300)
-    os.system('convert -trim scorecards_spring_3LNO.png scorecards_spring_3LNO.png')
-
-    # French table
-    std_anom = std_anom.rename({r'$\rm T_{bot}$' : r'$\rm T_{fond}$', r'$\rm T_{bot_{<200m}}$' : r'$\rm T_{fond_{<200m}}$', r'$\rm Area_{>2^{\circ}C}$' : r'$\rm Aire_{>2^{\circ}C}$', r'$\rm Area_{<1^{\circ}C}$' : r'$\rm Aire_{<1^{\circ}C}$'})
-    year_list[-1] = u'ET'
-
-    header = ax.table(cellText=[['']],
-                          colLabels=['-- Divisions 3LNO de l\'OPANO --'],
-                          loc='center'
-                          )
-    header.set_fontsize(13)
-    #the_table=ax.table(cellText=vals, rowLabels=std_anom.index, colLabels=std_anom.columns, 
-    the_table=ax.table(cellText=vals, rowLabels=std_anom.index, colLabels=year_list,
-                        loc='center', cellColours=cmap(normal(vals_color)), cellLoc='center',
-                        bbox=[0, 0, 1, 0.5]
-                        )
-    # change font color to white where needed:
-    the_table.auto_set_font_size(False)
-    the_table.set_fontsize(12.5)
-    table_props = the_table.properties()
-    table_cells = table_props['child_artists']
-    last_columns = np.arange(vals.shape[1]-2, vals.shape[1]) # last columns
-    for key, cell in the_table.get_celld().items():
-        cell_text = cell.get_text().get_text()
-        if is_number(cell_text) == False:
-            pass
-        elif key[0] == 0: #year's row = no color
-            pass
-        elif key[1] in last_columns:
-             cell._text.set_color('darkslategray')
-        elif (np.float(cell_text) <= -1.5) | (np.float(cell_text) >= 1.5) :
-            cell._text.set_color('white')
-        elif (cell_text=='nan'):
-            cell._set_facecolor('lightgray')
-            cell._text.set_color('lightgray')
-
-    plt.savefig("scorecards_spring_3LNO_FR.png", dpi=300)
-    os.system('convert -trim scorecards_spring_3LNO_FR.png scorecards_spring_3LNO_FR.png')
+    # Save (English and French, only the labels are swapped)
+    texts_fr = azrd.table_texts(header, {'-- NAFO division 3LNO --' : '-- Divisions 3LNO de l\'OPANO --'}) + azrd.table_texts(the_table, SCORECARDS_FR)
+    azrd.save_bilingual(fig, 'scorecards_spring_3LNO.png', texts_fr, dpi=300)
 
 
     # 2.
@@ -1694,49 +1238,14 @@ def bottom_scorecards(years, clim_year=[1981, 2010]):
             cell._set_facecolor('lightgray')
             cell._text.set_color('lightgray')
             
-    plt.savefig("scorecards_spring_3Ps.png", dpi=300)
-    os.system('convert -trim scorecards_spring_3Ps.png scorecards_spring_3Ps.png')
-
-    # French table
-    std_anom = std_anom.rename({r'$\rm T_{bot}$' : r'$\rm T_{fond}$', r'$\rm T_{bot_{<200m}}$' : r'$\rm T_{fond_{<200m}}$', r'$\rm Area_{>2^{\circ}C}$' : r'$\rm Aire_{>2^{\circ}C}$', r'$\rm Area_{<1^{\circ}C}$' : r'$\rm Aire_{<1^{\circ}C}$'})
-    header = ax.table(cellText=[['']],
-                          colLabels=['-- Division 3Ps de l\'OPANO --'],
-                          loc='center'
-                          )
-
-    header.set_fontsize(12.5)
-
-    the_table=ax.table(cellText=vals, rowLabels=std_anom.index, colLabels=None, 
-                        loc='center', cellColours=cmap(normal(vals_color)), cellLoc='center',
-                        bbox=[0, 0, 1.0, 0.50]
-                        )
-    # change font color to white where needed:
-    the_table.auto_set_font_size(False)
-    the_table.set_fontsize(12.5)
-    table_props = the_table.properties()
-    table_cells = table_props['child_artists']
-    last_columns = np.arange(vals.shape[1]-2, vals.shape[1]) # last columns
-    for key, cell in the_table.get_celld().items():
-        cell_text = cell.get_text().get_text()
-        if is_number(cell_text) == False:
-            pass
-        #elif key[0] == 0:# <--- remove when no years
-        #    pass
-        elif key[1] in last_columns:
-             cell._text.set_color('darkslategray')
-        elif (np.float(cell_text) <= -1.5) | (np.float(cell_text) >= 1.5) :
-            cell._text.set_color('white')
-        elif (cell_text=='nan'):
-            cell._set_facecolor('lightgray')
-            cell._text.set_color('lightgray')
-            
-    plt.savefig("scorecards_spring_3Ps_FR.png", dpi=300)
-    os.system('convert -trim scorecards_spring_3Ps_FR.png scorecards_spring_3Ps_FR.png')
+    # Save (English and French, only the labels are swapped)
+    texts_fr = azrd.table_texts(header, {'-- NAFO division 3Ps --' : '-- Division 3Ps de l\'OPANO --'}) + azrd.table_texts(the_table, SCORECARDS_FR)
+    azrd.save_bilingual(fig, 'scorecards_spring_3Ps.png', texts_fr, dpi=300)
 
     plt.close('all')
     # English montage
-    os.system('montage  scorecards_spring_3LNO.png scorecards_spring_3Ps.png -tile 1x3 -geometry +1+1  -background white  scorecards_botT_spring.png')
+    azrd.montage(['scorecards_spring_3LNO.png', 'scorecards_spring_3Ps.png'], 'scorecards_botT_spring.png', tile='1x3', border=1)
     # French montage
-    os.system('montage  scorecards_spring_3LNO_FR.png scorecards_spring_3Ps_FR.png -tile 1x3 -geometry +1+1  -background white  scorecards_botT_spring_FR.png')
+    azrd.montage(['scorecards_spring_3LNO_FR.png', 'scorecards_spring_3Ps_FR.png'], 'scorecards_botT_spring_FR.png', tile='1x3', border=1)
 
     
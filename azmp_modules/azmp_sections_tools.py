@@ -23,13 +23,21 @@ import matplotlib.pyplot as plt
 import numpy as np
 #import time as tt
 import xarray as xr
-import netCDF4
 import os
+import glob
 #from sys import version_info
 import cmocean
 from math import radians, cos, sin, asin, sqrt
 from scipy.interpolate import interp1d  # to remove NaNs in profiles
-from scipy.interpolate import griddata
+## AZMP custom imports
+import azmp_grid_tools as azg
+import azmp_bathy_tools as azb
+import azmp_catalog_tools as azc
+import azmp_binned_tools as azbt
+import azmp_render_tools as azrd
+
+SECTION_VARIABLES = ['temperature', 'salinity', 'sigma-t']
+
 
 def haversine(lon1, lat1, lon2, lat2):
     """
@@ -46,6 +54,51 @@ def haversine(lon1, lat1, lon2, lat2):
     return km
 
 
+def station_grid_index(df_stn, lon_reg, lat_reg):
+    """
+    Index of the regular grid node nearest to each station of df_stn (columns STATION, LAT, LON),
+    in the flattened grid (i.e. V.reshape(lat_reg.size*lon_reg.size, nz)).
+    Uses a KD-tree of the grid nodes (see azmp_grid_tools.nearest_grid_node).
+
+    usage example:
+    stn_nodes = azst.station_grid_index(df_stn, lon_reg, lat_reg)
+    Tprofile = VV[stn_nodes['BB-01'],:]
+    """
+    jj, ii = azg.nearest_grid_node(lon_reg, lat_reg, df_stn.LON.values, df_stn.LAT.values)
+    return pd.Series(jj*len(lon_reg) + ii, index=df_stn.STATION.values)
+
+
+def section_casts(section_name, buffer=10, catalog_file=azc.CATALOG_FILE):
+    """
+    Casts (rows of the cast catalog) within 'buffer' km of a standard section.
+    Uses the KD-tree saved with the catalog (see azmp_catalog_tools.casts_near_section).
+
+    usage example:
+    import azmp_sections_tools as azst
+    import azmp_catalog_tools as azc
+    casts = azst.section_casts('BB', buffer=10)
+    casts = azc.query_casts(casts, time_lims=['2018-01-01', '2018-12-31'], months=[7,8])
+    ds = azc.open_casts(casts)
+    """
+    df_stn = pd.read_excel('/home/cyrf0006/github/AZMP-NL/data/STANDARD_SECTIONS.xlsx')
+    df_stn = df_stn.drop(['SECTION', 'LONG'], axis=1)
+    df_stn = df_stn.rename(columns={'LONG.1': 'LON'})
+    df_stn = df_stn.dropna()
+    df_stn = df_stn[df_stn.STATION.str.contains(section_name+'-')]
+    return azc.casts_near_section(catalog_file, df_stn.LON.values, df_stn.LAT.values, buffer)
+
+
+def station_casts(lon, lat, radius=2, catalog_file=azc.CATALOG_FILE):
+    """
+    Casts (rows of the cast catalog) within 'radius' km of a station (e.g. Station 27),
+    see azmp_catalog_tools.casts_within_radius.
+
+    usage example:
+    casts = azst.station_casts(-52.58667, 47.54667, radius=2)
+    """
+    return azc.casts_within_radius(catalog_file, lon, lat, radius)
+
+
 def section_bathymetry(section_name):
     """
     Retrieve high-resultion bathymetry (depth vs along-distance from 1st station on section) along AZMP-NL sections.
@@ -77,7 +130,8 @@ def section_bathymetry(section_name):
     return bathymetry
 
 
-def get_section(section_name, year, season, var_name, dlat=2, dlon=2, dc=.2, dz=5, zmin=2):
+def get_section(section_name, year, season, var_name, dlat=2, dlon=2, dc=.2, dz=5, zmin=2, zmax=500, exclude_gts=True, binned_dir=None,
+                vmax=None, min_pts=7):
     """
     To get a transect plot of a certain variable along a certain section and for a defined year and season.
 
@@ -85,20 +139,33 @@ def get_section(section_name, year, season, var_name, dlat=2, dlon=2, dc=.2, dz=
     section_name - Abbreviation of the section ('BB', 'FC, 'SEGB', etc.)
     year - the year (e.g., 2018)
     season - 'spring', 'summer', 'fall', 'all'
-    var_name - Name of variable in netCDF files (e.g., 'temperature', 'salinity')
+    var_name - Name of variable in netCDF files (e.g., 'temperature', 'salinity'), or a list of variables
     dlat, dlon - How far from the station (in degrees) we search (default 2) 
     dc - Disretization of the regulat grid for field 3D interpolation (e.g., the temperature cube around section, default 2x2)
     dz - vertical discretization (z bin size; default 1)
+    zmin, zmax - depth range of the bins (default 2-500m)
+    binned_dir - if given, read the pre-binned profiles of azmp_binned_tools instead of the yearly netCDF file
+    vmax - values >= vmax are rejected before the vertical interpolation (default None), or dict per variable (e.g., {'temperature' : 30})
+    min_pts - levels with min_pts valid cells or less are not interpolated horizontally (default 7), or dict per variable
 
     Output:
     df_stn - DataFrame of stations vs depth by looking at station names only (work not well for the period before AZMP)
     df_itp - DataFrame of stations vs depth obtained from the interpolation of all available data.
+    (if var_name is a list, df_stn and df_itp are dict of DataFrames with variables as keys)
+
+    When several variables are requested, the file is read, the casts selected and binned, and the
+    horizontal triangulations computed only once for all of them.
     
     usage example:
     import azmp_sections_tools as azst
     df_stn, df_itp = azst.get_section('BB', 2018, 'summer', 'temperature')
+    OR
+    dict_stn, dict_itp = azst.get_section('BB', 2018, 'summer', ['temperature', 'salinity', 'sigma-t'])
     
     """
+    single_var = isinstance(var_name, str)
+    var_names = [var_name] if single_var else list(var_name)
+
     ## ---- Get Stations ---- ## 
     df_stn = pd.read_excel('/home/cyrf0006/github/AZMP-NL/data/STANDARD_SECTIONS.xlsx')
     df_stn = df_stn.drop(['SECTION', 'LONG'], axis=1)
@@ -115,190 +182,317 @@ def get_section(section_name, year, season, var_name, dlat=2, dlon=2, dc=.2, dz=
     lat_reg = np.arange(latLims[0]+dc/2, latLims[1]-dc/2, dc)
 
     ## --------- Get Bathymetry -------- ####
-    bathy_file = './' + section_name + '_bathy.npy'
-    if os.path.isfile(bathy_file):
-            print('Load saved bathymetry!')
-            Zitp = np.load(bathy_file)
-
-    else:
-            print('Get bathy...')
-            dataFile = '/home/cyrf0006/data/GEBCO/GEBCO_2014_1D.nc' # Maybe find a better way to handle this file
-            lon_grid, lat_grid = np.meshgrid(lon_reg,lat_reg)
-            # Load data
-            dataset = netCDF4.Dataset(dataFile)
-            x = [-179-59.75/60, 179+59.75/60] # to correct bug in 30'' dataset?
-            y = [-89-59.75/60, 89+59.75/60]
-            spacing = dataset.variables['spacing']
-            # Compute Lat/Lon
-            nx = int((x[-1]-x[0])/spacing[0]) + 1  # num pts in x-dir
-            ny = int((y[-1]-y[0])/spacing[1]) + 1  # num pts in y-dir
-            lon = np.linspace(x[0],x[-1],nx)
-            lat = np.linspace(y[0],y[-1],ny)
-            # interpolate data on regular grid 
-            # Reshape data
-            zz = dataset.variables['z']
-            Z = zz[:].reshape(ny, nx)
-            Z = np.flipud(Z) # <------------ important!!!
-            # Reduce data according to Region params
-            idx_lon = np.where((lon>=lonLims[0]) & (lon<=lonLims[1]))
-            idx_lat = np.where((lat>=latLims[0]) & (lat<=latLims[1]))
-            Z = Z[idx_lat[0][0]:idx_lat[0][-1]+1, idx_lon[0][0]:idx_lon[0][-1]+1]
-            lon = lon[idx_lon[0]]
-            lat = lat[idx_lat[0]]
-            # interpolate data on regular grid 
-            lon_grid_bathy, lat_grid_bathy = np.meshgrid(lon,lat)
-            lon_vec_bathy = np.reshape(lon_grid_bathy, lon_grid_bathy.size)
-            lat_vec_bathy = np.reshape(lat_grid_bathy, lat_grid_bathy.size)
-            z_vec = np.reshape(Z, Z.size)
-            Zitp = griddata((lon_vec_bathy, lat_vec_bathy), z_vec, (lon_grid, lat_grid), method='linear')
-            np.save(bathy_file, Zitp)
-            print(' -> Done!')
+    Zitp = azb.get_bathymetry(lon_reg, lat_reg)
 
 
     ## -------- Get CTD data -------- ##
-    year_file = '/home/cyrf0006/data/dev_database/netCDF/' + str(year) + '.nc'
-    print('Get ' + year_file)
-    ds = xr.open_dataset(year_file)
-
-    # Remame problematic datasets
-    print('!!Remove MEDBA & MEDTE data!!')
-    print('  ---> I Should be improme because I remove good data!!!!')
-    ds = ds.where(ds.instrument_ID!='MEDBA', drop=True)
-    ds = ds.where(ds.instrument_ID!='MEDTE', drop=True)
-
-    # Select Region
-    ds = ds.where((ds.longitude>lonLims[0]) & (ds.longitude<lonLims[1]), drop=True)
-    ds = ds.where((ds.latitude>latLims[0]) & (ds.latitude<latLims[1]), drop=True)
-
-    # Select time (save several options here)
-    if season == 'summer':
-        ds = ds.sel(time=((ds['time.month']>=6)) & ((ds['time.month']<=9)))
-    elif season == 'spring':
-        ds = ds.sel(time=((ds['time.month']>=3)) & ((ds['time.month']<=5)))
-    elif season == 'fall':
-        ds = ds.sel(time=((ds['time.month']>=10)) & ((ds['time.month']<=12)))
+    if binned_dir is not None:
+        # pre-binned profiles (see azmp_binned_tools.build_binned_profiles; bins start at dz/2, not zmin)
+        print('Get binned profiles from ' + binned_dir)
+        ds = azbt.load_binned_profiles([year, year], season, var_names, lonLims, latLims, zmax, exclude_gts, binned_dir, dz)
+        ds_bin = ds
     else:
-        print('!! no season specified, used them all! !!')
+        year_file = '/home/cyrf0006/data/dev_database/netCDF/' + str(year) + '.nc'
+        print('Get ' + year_file)
+        ds = xr.open_dataset(year_file)
+
+        # Remome GTS datasets (BATHY & TESAC messages, removed by index)
+        if exclude_gts:
+            print('!!Remove MEDBA & MEDTE data!!')
+            ds = azc.remove_gts(ds)
 
-    # Extract variable
-    da = ds[var_name]
+        # Select Region
+        ds = ds.where((ds.longitude>lonLims[0]) & (ds.longitude<lonLims[1]), drop=True)
+        ds = ds.where((ds.latitude>latLims[0]) & (ds.latitude<latLims[1]), drop=True)
+
+        # Select season (see azmp_catalog_tools.SEASONS)
+        ds = azc.select_season(ds, season)
+
+        # Bin all variables at once
+        bins = np.arange(zmin, zmax, dz)
+        ds_bin = ds[var_names].groupby_bins('level', bins).mean(dim='level')
+        ds_bin = ds_bin.rename({'level_bins' : 'level'}).assign_coords(level=bins[0:-1]) #rename levels with 'bins'
     lons = np.array(ds.longitude)
     lats = np.array(ds.latitude)
-    bins = np.arange(zmin, 500, dz)
-    da = da.groupby_bins('level', bins).mean(dim='level')
-    #To Pandas Dataframe
-    df = da.to_pandas()
-    df.columns = bins[0:-1] #rename columns with 'bins'
-    # Remove empty columns
-    idx_empty_rows = df.isnull().all(1).nonzero()[0]
-    df = df.dropna(axis=0,how='all')
-    lons = np.delete(lons,idx_empty_rows)
-    lats = np.delete(lats,idx_empty_rows)
     print(' -> Done!')
 
 
     ## --- fill 3D cube --- ##  
     print('Fill regular cube')
-    z = df.columns.values
-    V = np.full((lat_reg.size, lon_reg.size, z.size), np.nan)
-
-    # Aggregate on regular grid
-    for i, xx in enumerate(lon_reg):
-        for j, yy in enumerate(lat_reg):    
-            idx = np.where((lons>=xx-dc/2) & (lons<xx+dc/2) & (lats>=yy-dc/2) & (lats<yy+dc/2))
-            tmp = np.array(df.iloc[idx].mean(axis=0))
-            #idx_good = np.argwhere((~np.isnan(tmp)) & (tmp<30))
-            idx_good = np.argwhere((~np.isnan(tmp)))
-            if np.size(idx_good)==1:
-                V[j,i,:] = np.array(df.iloc[idx].mean(axis=0))
-            elif np.size(idx_good)>1: # vertical interpolation between pts
-                interp = interp1d(np.squeeze(z[idx_good]), np.squeeze(tmp[idx_good]))  # <---- Attention: strange syntax but works
-                idx_interp = np.arange(np.int(idx_good[0]),np.int(idx_good[-1]+1))
-                V[j,i,idx_interp] = interp(z[idx_interp]) # interpolate only where possible (1st to last good idx)
-
-    # horizontal interpolation at each depth
-    lon_grid, lat_grid = np.meshgrid(lon_reg,lat_reg)
-    lon_vec = np.reshape(lon_grid, lon_grid.size)
-    lat_vec = np.reshape(lat_grid, lat_grid.size)
-    for k, zz in enumerate(z):
-        # Meshgrid 1D data (after removing NaNs)
-        tmp_grid = V[:,:,k]
-        tmp_vec = np.reshape(tmp_grid, tmp_grid.size)
-        # griddata (after removing nans)
-        idx_good = np.argwhere(~np.isnan(tmp_vec))
-        if idx_good.size>7: # will ignore depth where no data exist
-            LN = np.squeeze(lon_vec[idx_good])
-            LT = np.squeeze(lat_vec[idx_good])
-            TT = np.squeeze(tmp_vec[idx_good])
-            if (np.unique(LT).size == 1) | (np.unique(LN).size == 1): # May happend for sampling along 47N section (cannot grid single latitude)
-                zi = griddata((LN, LT), TT, (lon_grid, lat_grid), method='nearest')
-            else:
-                zi = griddata((LN, LT), TT, (lon_grid, lat_grid), method='linear')
-            V[:,:,k] = zi
-        else:
-            continue
+    z = np.array(ds_bin.level)
+    vmax_of = vmax if isinstance(vmax, dict) else {var : vmax for var in var_names}
+    min_pts_of = min_pts if isinstance(min_pts, dict) else {var : min_pts for var in var_names}
+    V_list = []
+    for var in var_names:
+        X = ds_bin[var].transpose('time', 'level').values
+        # Aggregate on regular grid (all casts at once; empty casts are ignored)
+        V = azg.bin_casts_to_grid(lons, lats, X, lon_reg, lat_reg)
+        # vertical interpolation between pts (only between 1st and last good idx)
+        V_list.append(azg.fill_vertical_gaps(V, z, vmax=vmax_of.get(var)))
+
+    # horizontal interpolation at each depth (one triangulation per set of valid cells, shared by all variables)
+    tri_cache = {}
+    for n_pts in sorted(set([min_pts_of.get(var, 7) for var in var_names])):
+        idx = [i for i, var in enumerate(var_names) if min_pts_of.get(var, 7) == n_pts]
+        V_itp = azg.interp_levels([V_list[i] for i in idx], lon_reg, lat_reg, min_pts=n_pts, tri_cache=tri_cache)
+        for i, V in zip(idx, V_itp):
+            V_list[i] = V
     print(' -> Done!')    
 
     # mask using bathymetry (I don't think it is necessary, but make nice figures)
-    for i, xx in enumerate(lon_reg):
-        for j,yy in enumerate(lat_reg):
-            if Zitp[j,i] > -10: # remove shallower than 10m
-                V[j,i,:] = np.nan
+    for V in V_list:
+        V[Zitp > -10, :] = np.nan # remove shallower than 10m
 
 
     ## ---- Extract section info (test 2 options) ---- ##
-    temp_coords = np.array([[x,y] for x in lat_reg for y in lon_reg])
-    VV = V.reshape(temp_coords.shape[0],V.shape[2])
-    ZZ = Zitp.reshape(temp_coords.shape[0],1)
+    # 1. Section only (by station name)
     section_only = []
-    df_section_itp = pd.DataFrame(index=stn_list, columns=z)
     for stn in stn_list:
-        # 1. Section only (by station name)
         ds_tmp = ds.where(ds.comments == stn, drop=True)  
         section_only.append(ds_tmp)
-
-        #2.  From interpolated field (closest to station)
-        station = df_stn[df_stn.STATION==stn]
-        #idx_opti = np.argmin(np.sum(np.abs(temp_coords - np.array(zip(station.LAT,station.LON))), axis=1))
-        idx_opti = np.argmin(np.sum(np.abs(temp_coords - np.array(list(zip(station.LAT,station.LON)))), axis=1))
-        Tprofile = VV[idx_opti,:]
-        # remove data below bottom
-        bottom_depth = -ZZ[idx_opti]
-        Tprofile[z>=bottom_depth]=np.nan
-        # store in dataframe
-        df_section_itp.loc[stn] = Tprofile
-
-    df_section_itp.index.name = 'station'    
-   
-    # convert option #1 to dataframe    
     ds_section = xr.concat(section_only, dim='time')
 
-    da = ds_section[var_name]
-    df_section_stn = da.to_pandas()
-    df_section_stn.index = ds_section.comments.values
-    df_section_stn.index.name = 'station'    
-    
     # Compute distance vector for option #1 - exact station
-    distance_stn = np.full((df_section_stn.index.shape), np.nan)
-    for i, stn in enumerate(df_section_stn.index):
+    stn_index = ds_section.comments.values
+    distance_stn = np.full((stn_index.shape), np.nan)
+    for i, stn in enumerate(stn_index):
         distance_stn[i] = haversine(df_stn.LON[0], df_stn.LAT[0],
-                                    df_stn[df_stn.STATION==df_section_stn.index[i]].LON,
-                                    df_stn[df_stn.STATION==df_section_stn.index[i]].LAT)
+                                    df_stn[df_stn.STATION==stn].LON,
+                                    df_stn[df_stn.STATION==stn].LAT)
     
     # Compute distance vector for option #2 - interp field
-    distance_itp = np.full((df_section_itp.index.shape), np.nan)
-    for i, stn in enumerate(df_section_itp.index):
+    distance_itp = np.full((stn_list.shape), np.nan)
+    for i, stn in enumerate(stn_list):
         distance_itp[i] = haversine(df_stn.LON[0], df_stn.LAT[0],
-                                    df_stn[df_stn.STATION==df_section_itp.index[i]].LON,
-                                    df_stn[df_stn.STATION==df_section_itp.index[i]].LAT)
-
-    # Add a second index with distance
-    df_section_stn['distance'] = np.round(distance_stn, 1)
-    df_section_stn.set_index('distance', append=True, inplace=True)
-    df_section_itp['distance'] = np.round(distance_itp, 1)
-    df_section_itp.set_index('distance', append=True, inplace=True)
-    
-    return df_section_stn, df_section_itp
+                                    df_stn[df_stn.STATION==stn].LON,
+                                    df_stn[df_stn.STATION==stn].LAT)
+
+    #2.  From interpolated field (closest to station)
+    stn_nodes = station_grid_index(df_stn, lon_reg, lat_reg)
+    ZZ = Zitp.reshape(Zitp.size,1)
+    dict_stn = {}
+    dict_itp = {}
+    for var, V in zip(var_names, V_list):
+        VV = V.reshape(Zitp.size,V.shape[2])
+        df_section_itp = pd.DataFrame(index=stn_list, columns=z)
+        for stn in stn_list:
+            idx_opti = stn_nodes[stn]
+            Tprofile = VV[idx_opti,:]
+            # remove data below bottom
+            bottom_depth = -ZZ[idx_opti]
+            Tprofile[z>=bottom_depth]=np.nan
+            # store in dataframe
+            df_section_itp.loc[stn] = Tprofile
+        df_section_itp.index.name = 'station'    
+
+        # convert option #1 to dataframe    
+        df_section_stn = ds_section[var].to_pandas()
+        df_section_stn.index = stn_index
+        df_section_stn.index.name = 'station'    
+
+        # Add a second index with distance
+        df_section_stn['distance'] = np.round(distance_stn, 1)
+        df_section_stn.set_index('distance', append=True, inplace=True)
+        df_section_itp['distance'] = np.round(distance_itp, 1)
+        df_section_itp.set_index('distance', append=True, inplace=True)
+        dict_stn[var] = df_section_stn
+        dict_itp[var] = df_section_itp
+
+    if single_var:
+        return dict_stn[var_name], dict_itp[var_name]
+    return dict_stn, dict_itp
+
+def section_store_file(store_dir, var_name, section_name, season, year, kind='itp'):
+    """ File of one section of the store (same name as the pickles of seasonal_section_plot)
+
+    """
+    return os.path.join(store_dir, var_name + '_' + section_name + '_' + season + '_' + str(year) + '_' + kind + '.pkl')
+
+
+def update_section_store(section_name, season, years, variables=SECTION_VARIABLES, store_dir='.', overwrite=False, **kwargs):
+    """
+    Compute and save the sections (station-based and interpolated) of all years and variables not
+    already in the store.
+
+    A year is re-done only if one of its files is missing, if the yearly netCDF file is more recent
+    than the stored sections, or if the get_section parameters (kwargs) changed. All variables of
+    a year are computed in one call to get_section.
+
+    Input:
+    section_name, season - e.g. 'BB', 'summer'
+    years - list of years
+    variables - list of variables to store (default SECTION_VARIABLES)
+    store_dir - where the pickles <VAR>_<SECTION>_<SEASON>_<YEAR>_stn/itp.pkl are saved
+    kwargs - passed to get_section (e.g., dz=5, zmin=2, zmax=2000). If none are given, the
+             settings of the sections already stored for this section and season are used.
+
+    Output:
+    list of years (re)computed
+
+    usage example:
+    import azmp_sections_tools as azst
+    azst.update_section_store('BB', 'summer', np.arange(1950, 2021), store_dir='section_store', zmax=2000)
+
+    """
+    if not os.path.isdir(store_dir):
+        os.makedirs(store_dir)
+    settings = dict(kwargs)
+    if len(settings) == 0:
+        stored = sorted(glob.glob(os.path.join(store_dir, '*_' + section_name + '_' + season + '_*_itp.pkl')))
+        if len(stored) > 0:
+            settings = pd.read_pickle(stored[-1]).attrs.get('settings', {})
+    updated = []
+    for year in years:
+        year_file = os.path.join(os.path.dirname(azc.NC_FILES), str(year) + '.nc')
+        if not os.path.isfile(year_file):
+            continue
+        files = [section_store_file(store_dir, var, section_name, season, year, kind) for var in variables for kind in ['stn', 'itp']]
+        up_to_date = (not overwrite) & np.all([os.path.isfile(f) and (os.path.getmtime(f) > os.path.getmtime(year_file)) for f in files])
+        if up_to_date:
+            up_to_date = np.all([pd.read_pickle(f).attrs.get('settings') == settings for f in files[1::2]])
+        if up_to_date:
+            continue
+        print(' -> ' + section_name + ' ' + season + ' ' + str(year))
+        dict_stn, dict_itp = get_section(section_name, year, season, list(variables), **settings)
+        for var in variables:
+            for kind, df in zip(['stn', 'itp'], [dict_stn[var], dict_itp[var]]):
+                df.attrs['settings'] = settings
+                df.to_pickle(section_store_file(store_dir, var, section_name, season, year, kind))
+        updated.append(year)
+
+    return updated
+
+
+def load_section_store(section_name, season, years, var_name, store_dir='.', kind='itp'):
+    """
+    Sections of several years from the store, in one DataFrame indexed by (year, station, distance).
+    Years not in the store are ignored.
+
+    """
+    dfs = []
+    keys = []
+    for year in years:
+        section_file = section_store_file(store_dir, var_name, section_name, season, year, kind)
+        if os.path.isfile(section_file):
+            df = pd.read_pickle(section_file).astype(float)
+            df.attrs = {}
+            dfs.append(df)
+            keys.append(year)
+    if len(dfs) == 0:
+        return pd.DataFrame()
+
+    return pd.concat(dfs, keys=keys, names=['year'])
+
+
+def section_climatology(section_name, season, var_name, year_lims=[1981, 2010], store_dir='.'):
+    """
+    Climatology (station x depth) of interpolated sections, as the average of the stored sections
+    of years year_lims[0] to year_lims[1] (see update_section_store). No re-gridding is needed
+    to change the climatological period.
+
+    usage example:
+    import azmp_sections_tools as azst
+    df_clim = azst.section_climatology('BB', 'summer', 'temperature', [1991, 2020], store_dir='section_store')
+
+    """
+    years = np.arange(year_lims[0], year_lims[1]+1)
+    df_itp_mindex = load_section_store(section_name, season, years, var_name, store_dir)
+    if df_itp_mindex.size == 0:
+        return pd.DataFrame()
+    df_clim = df_itp_mindex.groupby(level='station').mean()
+    df_clim = df_clim.dropna(axis=0, how='all')
+    df_clim.columns.name = 'depth'
+
+    return df_clim
+
+
+def _fraction_below(f1, f2, f3):
+    """ Fraction of triangles (values f1, f2, f3 at vertices, linear inside) where f < 0
+
+    """
+    f = np.sort(np.stack([f1, f2, f3]), axis=0)
+    s0, s1, s2 = f[0], f[1], f[2]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        one_below = (s0/(s0-s1)) * (s0/(s0-s2)) # only s0 < 0
+        two_below = 1 - (s2/(s2-s0)) * (s2/(s2-s1)) # s0, s1 < 0
+    return np.select([s2 < 0, s0 >= 0, s1 >= 0], [1.0, 0.0, one_below], default=two_below)
+
+
+def cil_metrics(T, distance, z, threshold=0, core_zlims=[25, 250]):
+    """
+    CIL metrics of one or a stack of temperature sections, without contouring.
+
+    Input:
+    T - section(s) of temperature, distance x depth (e.g., df_section_itp.values), or years x distance x depth
+    distance - distance along the section (km, strictly increasing or decreasing)
+    z - depth (m) of columns
+    threshold - CIL definition (T < threshold)
+    core_zlims - depth range where the CIL core is searched
+
+    Each grid cell (2 distances x 2 depths) is split in 2 triangles on which T is linear, and the exact
+    area where T < threshold is summed (same as the area inside the plt.contour(..., [0,]) line,
+    without rendering it). Cells with a missing corner are ignored.
+
+    Output:
+    DataFrame (one row per section) with
+    'area' - CIL area (km^2)
+    'core' - CIL core temperature (minimum T in core_zlims)
+    'core_depth' - depth of the core (shallowest if several)
+    'mean' - section mean temperature (mean of depth averages)
+    Sections with data at less than 2 depths give NaNs (e.g., only surface obs).
+
+    usage example:
+    import azmp_sections_tools as azst
+    df_CIL = azst.cil_metrics(df_section_itp.values.astype(float), df_section_itp.index.droplevel(0), df_section_itp.columns)
+    OR (all years at once)
+    df_CIL = azst.cil_metrics(T_stack, distance, z)
+
+    """
+    T = np.asarray(T, dtype=float)
+    single = T.ndim == 2
+    if single:
+        T = T[np.newaxis, :, :]
+    distance = np.asarray(distance, dtype=float)
+    z = np.asarray(z, dtype=float)
+    if np.all(np.diff(distance) < 0): # section given from the end
+        distance = distance[::-1]
+        T = T[:, ::-1, :]
+    if np.any(np.diff(distance) <= 0):
+        raise ValueError('cil_metrics: distance must be strictly increasing or decreasing (average repeated stations first)')
+
+    ## ---- CIL area ---- ##
+    f = T - threshold
+    f00 = f[:, :-1, :-1]
+    f10 = f[:, 1:, :-1]
+    f01 = f[:, :-1, 1:]
+    f11 = f[:, 1:, 1:]
+    frac = 0.5*_fraction_below(f00, f10, f11) + 0.5*_fraction_below(f00, f11, f01)
+    frac[np.isnan(f00) | np.isnan(f10) | np.isnan(f01) | np.isnan(f11)] = 0
+    cell_area = np.outer(np.diff(distance), np.diff(z)) # km x m
+    cil_area = np.sum(frac*cell_area, axis=(1,2))/1000
+
+    ## ---- CIL core ---- ##
+    idx_core = np.where((z>=core_zlims[0]) & (z<=core_zlims[1]))[0]
+    T_core = T[:, :, idx_core]
+    core = np.full(T.shape[0], np.nan)
+    core_depth = np.full(T.shape[0], np.nan)
+    has_core = ~np.isnan(T_core).all(axis=(1,2))
+    if idx_core.size > 0:
+        core[has_core] = np.nanmin(T_core[has_core], axis=(1,2))
+        is_core = T_core == core[:, np.newaxis, np.newaxis]
+        core_depth[has_core] = z[idx_core][np.argmax(is_core.any(axis=1), axis=1)][has_core]
+
+    ## ---- Section mean ---- ##
+    counts = np.sum(~np.isnan(T), axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        depth_mean = np.nansum(T, axis=1) / counts # NaN where no data
+        valid_depths = np.sum(counts > 0, axis=1)
+        section_mean = np.nansum(depth_mean, axis=1) / valid_depths
+
+    df = pd.DataFrame({'area' : cil_area, 'core' : core, 'core_depth' : core_depth, 'mean' : section_mean})
+    df.loc[valid_depths < 2, :] = np.nan
+
+    return df
 
 def standard_section_plot(nc_file, survey_name, section_name, var_name):
     """
@@ -401,7 +595,7 @@ def standard_section_plot(nc_file, survey_name, section_name, var_name):
     return None
 
 
-def extract_section_casts(nc_file, section_name, year_lims=[], survey_name=[], nc_outfile='out.nc', STATION_BASED=True):
+def extract_section_casts(nc_file, section_name, year_lims=[], survey_name=[], nc_outfile='out.nc', STATION_BASED=True, catalog_file=azc.CATALOG_FILE, exclude_gts=True):
     """
     To extract hydrographic data from a certain section.
     [Menu to be finished]
@@ -421,19 +615,20 @@ def extract_section_casts(nc_file, section_name, year_lims=[], survey_name=[], n
     nc_file = '/home/cyrf0006/data/dev_database/netCDF/*.nc'
     azst.extract_section_casts(nc_file, section_name='SI', nc_outfile='SI_all.nc', STATION_BASED=False)
     
+    Casts are selected in the cast catalog (see azmp_catalog_tools) and only those are read.
+
     Frederic.Cyr@dfo-mpo.gc.ca
     Created: December 2018
     Revision: November 2020
     
     """
-    # Open netCDF file using xarray
-    ds = xr.open_mfdataset(nc_file)
+    # Casts from nc_file in the catalog
+    catalog = azc.load_cast_catalog(catalog_file)
+    catalog = catalog[catalog.file.isin([os.path.abspath(f) for f in glob.glob(nc_file)])]
 
-    # Remome problematic datasets
-    print('!!Remove MEDBA data!!')
-    print('  ---> I Should be improme because I remove good data!!!!')
-    ds = ds.where(ds.instrument_ID!='MEDBA', drop=True)
-    ds = ds.where(ds.instrument_ID!='MEDTE', drop=True)
+    # GTS datasets (BATHY & TESAC messages) are removed in the catalog query
+    if exclude_gts:
+        print('!!Remove MEDBA & MEDTE data!!')
 
     if STATION_BASED:
         print('Station-based search (will only work since year ~2000)')
@@ -444,15 +639,14 @@ def extract_section_casts(nc_file, section_name, year_lims=[], survey_name=[], n
         df_stn = df_stn.dropna()
         df_stn = df_stn[df_stn.STATION.str.contains(section_name)]
         df_stn = df_stn.reset_index(drop=True)
-        stn_list = df_stn.STATION.values
-        # loop on stations and append datasets in a list
-        datasets = []
-        for stn in stn_list:
-            ds_section = ds.where(ds.comments == stn, drop=True)  
-            datasets.append(ds_section)
-            
-        # concatenate the list of datasets
-        ds_combined = xr.concat(datasets, dim='time')
+        stn_list = list(df_stn.STATION.values)
+        # select casts on stations
+        casts = azc.query_casts(catalog, exclude_gts=exclude_gts)
+        casts = casts[casts.comments.isin(stn_list)]
+        ds = azc.open_casts(casts)
+        # order by station (as in the section file)
+        stn_order = np.argsort([stn_list.index(stn) for stn in ds.comments.values], kind='stable')
+        ds_combined = ds.isel(time=stn_order)
         # save combined dataset in NetCDF
         ds_combined.to_netcdf(nc_outfile)
        
@@ -471,20 +665,29 @@ def extract_section_casts(nc_file, section_name, year_lims=[], survey_name=[], n
         dlon=2
         latLims = np.array([df_stn.LAT.min() - dlat, df_stn.LAT.max() + dlat])
         lonLims = np.array([df_stn.LON.min() - dlon, df_stn.LON.max() + dlon])
-        ds = ds.where((ds.longitude>lonLims[0]) & (ds.longitude<lonLims[1]), drop=True)
-        ds = ds.where((ds.latitude>latLims[0]) & (ds.latitude<latLims[1]), drop=True)
+        casts = azc.query_casts(catalog, lonLims=lonLims, latLims=latLims, exclude_gts=exclude_gts)
+        ds = azc.open_casts(casts)
         # Save file
         ds.to_netcdf(nc_outfile)
     
     
     return None
 
-def seasonal_section_plot(VAR, SECTION, SEASON, YEAR, ZMAX=400, STATION_BASED=False):
+def seasonal_section_plot(VAR, SECTION, SEASON, YEAR, ZMAX=400, STATION_BASED=False, section_data=None, store_dir=None, CLIM_YEAR=[1981, 2010]):
     """
     Contour plot on standard AZMP-NL sections for a certain year (specified with nc_file), season (specified as survey), section and variable.
     This is a function version of script "azmp_section_report_plot.py" used for ResDocs figures.
 
-    Pickled climatologies are generated by azmp_section_clim.py
+    section_data - optional (df_section_stn, df_section_itp) already returned by get_section, e.g.
+    when all variables are extracted at once:
+    dict_stn, dict_itp = get_section(SECTION, YEAR, SEASON, ['temperature', 'salinity'])
+    seasonal_section_plot('temperature', SECTION, SEASON, YEAR, section_data=(dict_stn['temperature'], dict_itp['temperature']))
+
+    store_dir - optional section store (see update_section_store): this year's section is read
+    from the store (computed only if missing or outdated) and the CLIM_YEAR climatology is derived
+    from the stored sections.
+
+    Otherwise, pickled climatologies are generated by azmp_section_clim.py
 
     See usage example in azmp_genReport.py
 
@@ -519,20 +722,15 @@ def seasonal_section_plot(VAR, SECTION, SEASON, YEAR, ZMAX=400, STATION_BASED=Fa
     SECTION_BATHY = SECTION
     
 
-    # CIL surface (Note that there is a bias because )
-    def area(vs):
-        a = 0
-        x0,y0 = vs[0]
-        for [x1,y1] in vs[1:]:
-            dx = x1-x0
-            dy = y1-y0
-            a += 0.5*(y0*dx - x0*dy)
-            x0 = x1
-            y0 = y1
-        return a
-
     ## ---- Get this year's section ---- ## 
-    df_section_stn, df_section_itp = get_section(SECTION, YEAR, SEASON, VAR)
+    if (section_data is None) & (store_dir is not None):
+        update_section_store(SECTION, SEASON, [YEAR], [VAR], store_dir) # (same settings as stored years)
+        df_section_stn = pd.read_pickle(section_store_file(store_dir, VAR, SECTION, SEASON, YEAR, 'stn'))
+        df_section_itp = pd.read_pickle(section_store_file(store_dir, VAR, SECTION, SEASON, YEAR, 'itp'))
+    elif section_data is None:
+        df_section_stn, df_section_itp = get_section(SECTION, YEAR, SEASON, VAR)
+    else:
+        df_section_stn, df_section_itp = section_data[0].copy(), section_data[1].copy() # modified in place below
 
     #if df_section_itp.dropna(how='all', axis=0).size == 0: # Not sure why this is needed...
     #    return
@@ -549,8 +747,11 @@ def seasonal_section_plot(VAR, SECTION, SEASON, YEAR, ZMAX=400, STATION_BASED=Fa
         return None
 
     ## ---- Get climatology ---- ## 
-    clim_name = 'df_' + VAR + '_' + SECTION + '_' + SEASON + '_clim.pkl' 
-    df_clim = pd.read_pickle(clim_name)
+    if store_dir is not None:
+        df_clim = section_climatology(SECTION, SEASON, VAR, CLIM_YEAR, store_dir)
+    else:
+        clim_name = 'df_' + VAR + '_' + SECTION + '_' + SEASON + '_clim.pkl' 
+        df_clim = pd.read_pickle(clim_name)
     # Update index to add distance (in addition to existing station name)    
     df_clim.index = df_section_itp.loc[df_clim.index].index
     
@@ -596,7 +797,7 @@ def seasonal_section_plot(VAR, SECTION, SEASON, YEAR, ZMAX=400, STATION_BASED=Fa
     ax2.add_patch(Bgon)
     ax2.xaxis.label.set_visible(False)
     ax2.tick_params(labelbottom='off')
-    ax2.set_title('1981-2010 climatology')
+    ax2.set_title(str(CLIM_YEAR[0]) + '-' + str(CLIM_YEAR[1]) + ' climatology')
 
     # ax3
     ax3 = plt.subplot2grid((3, 1), (2, 0))
@@ -614,25 +815,19 @@ def seasonal_section_plot(VAR, SECTION, SEASON, YEAR, ZMAX=400, STATION_BASED=Fa
     ax3.set_title(r'Anomaly')
 
     fig.set_size_inches(w=8,h=12)
-    fig_name = VAR + '_' + SECTION + '_' + SEASON + '_' + str(YEAR) + '.png' 
-    fig.savefig(fig_name, dpi=200)
-    os.system('convert -trim ' + fig_name + ' ' + fig_name)
 
-    # Save in French
+    # Save Figure (English and French, only the texts are swapped)
+    texts_fr = []
     if (VAR == 'temperature') & (SEASON == 'summer'):
-            ax.set_title('Température à la section ' + SECTION + ' - été ' + str(YEAR))
+        texts_fr.append((ax.title, 'Température à la section ' + SECTION + ' - été ' + str(YEAR)))
     elif (VAR == 'salinity') & (SEASON == 'summer'):
-            ax.set_title('Salinité à la section ' + SECTION + ' - été ' + str(YEAR))    
-
-    ax.set_ylabel('Profondeur (m)', fontWeight = 'bold')    
-    ax2.set_ylabel('Profondeur (m)', fontWeight = 'bold')
-    ax3.set_ylabel('Profondeur (m)', fontWeight = 'bold')
-    
-    ax2.set_title(r'Climatologie 1981-2010')
-    ax3.set_title(r'Anomalie')
-    fig_name = VAR + '_' + SECTION + '_' + SEASON + '_' + str(YEAR) + '_FR.png' 
-    fig.savefig(fig_name, dpi=200)
-    os.system('convert -trim ' + fig_name + ' ' + fig_name)    
+        texts_fr.append((ax.title, 'Salinité à la section ' + SECTION + ' - été ' + str(YEAR)))
+    for axis in [ax, ax2, ax3]:
+        texts_fr.append((axis.yaxis.label, 'Profondeur (m)'))
+    texts_fr.append((ax2.title, r'Climatologie ' + str(CLIM_YEAR[0]) + '-' + str(CLIM_YEAR[1])))
+    texts_fr.append((ax3.title, r'Anomalie'))
+    fig_name = VAR + '_' + SECTION + '_' + SEASON + '_' + str(YEAR) + '.png'
+    azrd.save_bilingual(fig, fig_name, texts_fr, dpi=200)
 
     # Export data in csv.    
     stn_file = VAR + '_' + SECTION + '_' + SEASON + '_' + str(YEAR) + '_stn.csv' 
@@ -827,8 +1022,7 @@ def btl_section_plot(VAR, SECTION, SEASON, YEAR, ZMAX=400):
 
         fig.set_size_inches(w=8,h=12)
         fig_name = 'btl_' + VAR + '_' + SECTION + '_' + SEASON + '_' + str(YEAR) + '.png' 
-        fig.savefig(fig_name, dpi=200)
-        os.system('convert -trim ' + fig_name + ' ' + fig_name)
+        fig.savefig(fig_name, dpi=200, bbox_inches='tight')
 
         ## ---- Export data in csv ---- ##
         # add new index   
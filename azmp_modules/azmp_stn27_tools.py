@@ -0,0 +1,183 @@
+"""Station 27 products (profile store and monthly/weekly climatologies)
+
+Contains following functions:
+- get_stn27_casts(variable, time_min=None, catalog_file=azc.CATALOG_FILE)
+- get_viking_casts(variable, time_min=None, viking_files=VIKING_FILES)
+- update_stn27_store(variable, store_dir='.', year_clim=[1981, 2010], use_viking=True, ...)
+
+The store (S27_<variable>_casts.pkl) holds all profiles (time x level, sorted by time) of
+the hydrographic database (and Viking buoy). Each update only reads the casts newer than the
+last ones stored, and only the monthly averages of the months with new casts are recomputed
+(S27_<variable>_monthly.pkl). The climatologies (S27_<variable>_monthly_clim.pkl and
+S27_<variable>_weekly_clim.pkl) are recomputed only if these months are in year_clim (or if
+they are missing).
+
+----------
+
+Atlantic Zone Monitoring Program @NAFC:
+https://azmp-nl.github.io/
+
+"""
+
+__author__ = 'Frederic.Cyr@dfo-mpo.gc.ca'
+__version__ = '0.1'
+
+import os
+import glob
+import numpy as np
+import pandas as pd
+import xarray as xr
+## AZMP custom imports
+import azmp_catalog_tools as azc
+
+S27 = [47.54667, -52.58667] # lat, lon
+S27_DC = .025 # box size around station (degrees)
+S27_ZLIMS = [0, 180]
+VIKING_FILES = '/home/cyrf0006/data/dev_database/viking_nc/*_viking.nc'
+
+
+def get_stn27_casts(variable, time_min=None, catalog_file=azc.CATALOG_FILE):
+    """ Station 27 profiles of 'variable' (DataFrame time x level) in the hydrographic database
+    (box of S27_DC around S27, GTS data removed), only those after time_min if given.
+
+    """
+    casts = azc.query_casts(catalog_file, lonLims=[S27[1]-S27_DC/2, S27[1]+S27_DC/2], latLims=[S27[0]-S27_DC/2, S27[0]+S27_DC/2])
+    if time_min is not None:
+        casts = casts[casts.time > time_min]
+    if len(casts) == 0:
+        return pd.DataFrame()
+    ds = azc.open_casts(casts, variables=[variable], zlims=S27_ZLIMS)
+    df = ds[variable].to_pandas()
+
+    return df.dropna(axis=0, how='all')
+
+
+def get_viking_casts(variable, time_min=None, viking_files=VIKING_FILES):
+    """ Viking buoy profiles of 'variable' (DataFrame time x level), only those after time_min if given.
+
+    Yearly files are named YYYY_viking.nc, so only the files of the years >= time_min are read.
+
+    """
+    files = sorted(glob.glob(viking_files))
+    if time_min is not None:
+        files = [f for f in files if int(os.path.basename(f)[0:4]) >= time_min.year]
+    if len(files) == 0:
+        return pd.DataFrame()
+    ds_vik = xr.open_mfdataset(files)
+    # Select a depth range
+    ds_vik = ds_vik.sel(level=ds_vik['level']<S27_ZLIMS[1])
+    ds_vik = ds_vik.sel(level=ds_vik['level']>S27_ZLIMS[0])
+    df_vik = ds_vik[variable].to_pandas()
+    df_vik = df_vik.dropna(how='all')
+    if time_min is not None:
+        df_vik = df_vik[df_vik.index > time_min]
+
+    return df_vik
+
+
+def update_stn27_store(variable, store_dir='.', year_clim=[1981, 2010], use_viking=True,
+                       catalog_file=azc.CATALOG_FILE, viking_files=VIKING_FILES):
+    """ Append new Station 27 casts to the store and update the monthly averages and climatologies.
+
+    Returns df (all casts), df_monthly (monthly averages, 15th of the month), monthly_clim
+    and weekly_clim (index in year 1900), also saved in store_dir.
+
+    If the store was built with another use_viking or year_clim, everything is recomputed.
+
+    Usage ex:
+    import azmp_stn27_tools as azs27
+    df, df_monthly, monthly_clim, weekly_clim = azs27.update_stn27_store('temperature', year_clim=[1981, 2010])
+
+    """
+    store_file = os.path.join(store_dir, 'S27_' + variable + '_casts.pkl')
+    monthly_file = os.path.join(store_dir, 'S27_' + variable + '_monthly.pkl')
+    monthly_clim_file = os.path.join(store_dir, 'S27_' + variable + '_monthly_clim.pkl')
+    weekly_clim_file = os.path.join(store_dir, 'S27_' + variable + '_weekly_clim.pkl')
+
+    ## ---- Previous store ---- ##
+    settings = {'use_viking' : use_viking, 'year_clim' : list(year_clim)}
+    if os.path.isfile(store_file) & os.path.isfile(monthly_file):
+        df = pd.read_pickle(store_file)
+        if df.attrs.get('settings') != settings:
+            print(store_file + ' built with other settings, rebuild')
+            df = pd.DataFrame()
+    else:
+        df = pd.DataFrame()
+    last_hydro = df.attrs.get('last_hydro') if len(df) > 0 else None
+    last_viking = df.attrs.get('last_viking') if len(df) > 0 else None
+
+    ## ---- New casts ---- ##
+    df_hydro = get_stn27_casts(variable, last_hydro, catalog_file)
+    if len(df_hydro) > 0:
+        last_hydro = df_hydro.index.max()
+    df_new = df_hydro
+    if use_viking:
+        df_vik = get_viking_casts(variable, last_viking, viking_files)
+        if len(df_vik) > 0:
+            last_viking = df_vik.index.max()
+        # concatenate (better if they share same vertical resolution)
+        df_new = pd.concat([df_hydro, df_vik])
+
+    if len(df_new) == 0:
+        print('No new casts at Station 27')
+        if len(df) == 0:
+            return df, pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
+        df_monthly = pd.read_pickle(monthly_file)
+        if os.path.isfile(monthly_clim_file) & os.path.isfile(weekly_clim_file):
+            return df, df_monthly, pd.read_pickle(monthly_clim_file), pd.read_pickle(weekly_clim_file)
+        monthly_clim, weekly_clim = _stn27_climatologies(df_monthly, year_clim, monthly_clim_file, weekly_clim_file)
+        return df, df_monthly, monthly_clim, weekly_clim
+    print(str(len(df_new)) + ' new casts at Station 27 (' + variable + ')')
+
+    ## ---- Append to store (time-sorted) ---- ##
+    n_old = len(df)
+    df = pd.concat([df, df_new]).sort_index(axis=1) # levels of the store and of the new casts
+    if use_viking:
+        # here interpolate the new casts on all levels and leave NaNs.
+        df_new = df.iloc[n_old:]
+        df_new = df_new.interpolate(axis=1).where(df_new.bfill(axis=1).notnull())
+        df = pd.concat([df.iloc[0:n_old], df_new])
+    df = df.sort_index()
+    df.attrs['settings'] = settings
+    df.attrs['last_hydro'] = last_hydro
+    df.attrs['last_viking'] = last_viking
+    df.to_pickle(store_file)
+
+    ## ---- Monthly average (15th of the month), only months with new casts ---- ##
+    first_month = df_new.index.min().to_period('M').to_timestamp()
+    df_monthly_new = df[df.index >= first_month].resample('MS').mean()
+    df_monthly_new.index = df_monthly_new.index + pd.Timedelta(14, 'd')
+    if os.path.isfile(monthly_file) & (n_old > 0):
+        df_monthly = pd.read_pickle(monthly_file)
+        df_monthly = pd.concat([df_monthly[df_monthly.index < first_month], df_monthly_new])
+    else:
+        df_monthly = df_monthly_new
+    df_monthly.to_pickle(monthly_file)
+
+    ## ---- Climatologies (only if new casts in climatology period) ---- ##
+    if (n_old == 0) | (df_monthly_new.index.year.min() <= year_clim[1]) | (not os.path.isfile(monthly_clim_file)) | (not os.path.isfile(weekly_clim_file)):
+        monthly_clim, weekly_clim = _stn27_climatologies(df_monthly, year_clim, monthly_clim_file, weekly_clim_file)
+    else:
+        monthly_clim = pd.read_pickle(monthly_clim_file)
+        weekly_clim = pd.read_pickle(weekly_clim_file)
+
+    return df, df_monthly, monthly_clim, weekly_clim
+
+
+def _stn27_climatologies(df_monthly, year_clim, monthly_clim_file, weekly_clim_file):
+    """ Monthly and weekly climatologies (index in year 1900) of the monthly averages, saved in
+    monthly_clim_file and weekly_clim_file.
+
+    """
+    # Select years for climato
+    df_clim_period = df_monthly[(df_monthly.index.year>=year_clim[0]) & (df_monthly.index.year<=year_clim[1])]
+    # Monthly clim
+    monthly_clim = df_clim_period.groupby(df_clim_period.index.month).mean()
+    # set index (year 1900)
+    monthly_clim.index = pd.to_datetime(monthly_clim.index.values, format='%m')
+    monthly_clim.to_pickle(monthly_clim_file)
+    # Weekly clim (upsample monthly clim to weekly)
+    weekly_clim = monthly_clim.resample('W').mean().interpolate(method='linear')
+    weekly_clim.to_pickle(weekly_clim_file)
+
+    return monthly_clim, weekly_clim
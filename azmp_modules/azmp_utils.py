@@ -2,12 +2,18 @@
 
 Contains following functions:
 - get_nafo_divisions()
+- get_region_masks(lon_reg, lat_reg, mask_dir='.', nlshelf_file=..., contour_file=...)
+- get_climato_cube(INFILES, lon_reg, lat_reg, var_name, year_lims=[1981, 2010], season=[], zmax=1000, dz=5, ...)
 - get_bottomT_climato(INFILES, LON_REG,  LAT_REG, year_lims=[1981, 2010], season=[], zlims=[10, 1000], dz=5, h5_outputfile=[])
 - get_bottomS_climato(INFILES, LON_REG,  LAT_REG, year_lims=[1981, 2010], season=[], zlims=[10, 1000], dz=5, h5_outputfile=[])
 - get_bottomT(year_file, season, climato_file):
 - get_bottomS(year_file, season, climato_file):
 - bottomT_quickplot(h5_outputfile, figure_file=[])
 - Tbot_to_GIS_ascii(h5file, ascfile)
+- get_pixel_area(lon_reg, lat_reg)
+- polygon_temperature_stats(dict, shape)
+- polygon_temperature_stats_batch(Tbot, bathy, masks, pixel_area, index=None)
+- polygon_salinity_stats(dict, shape)
 -
 
 ** idea: add function 'plot_nafo_division(dict)'
@@ -25,18 +31,21 @@ __version__ = '0.1'
 import h5py
 import os
 import sys
-import netCDF4
+import glob
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import xarray as xr
-from scipy.interpolate import griddata
 from scipy.interpolate import interp1d  # to remove NaNs in profiles
 from shapely.geometry import Point
 from shapely.geometry.polygon import Polygon
 from shapely.ops import cascaded_union
-from area import area # external fns to compute surface area
 from seawater import extras as swx
+# AZMP gridding tools
+import azmp_grid_tools as azg
+import azmp_bathy_tools as azb
+import azmp_catalog_tools as azc
+import azmp_binned_tools as azbt
 # maps
 os.environ['PROJ_LIB'] = '/home/cyrf0006/anaconda3/share/proj'
 from mpl_toolkits.basemap import Basemap
@@ -197,35 +206,7 @@ def build_NLshelf_definition():
     latLims = [42, 56]
     lon_reg = np.arange(lonLims[0]+dc/2, lonLims[1]-dc/2, dc)
     lat_reg = np.arange(latLims[0]+dc/2, latLims[1]-dc/2, dc)
-    dataFile = '/home/cyrf0006/data/GEBCO/GEBCO_2014_1D.nc' # Maybe find a better way to handle this file
-    lon_grid, lat_grid = np.meshgrid(lon_reg,lat_reg)
-    # Load data
-    dataset = netCDF4.Dataset(dataFile)
-    x = [-179-59.75/60, 179+59.75/60] # to correct bug in 30'' dataset?
-    y = [-89-59.75/60, 89+59.75/60]
-    spacing = dataset.variables['spacing']
-    # Compute Lat/Lon
-    nx = int((x[-1]-x[0])/spacing[0]) + 1  # num pts in x-dir
-    ny = int((y[-1]-y[0])/spacing[1]) + 1  # num pts in y-dir
-    lon = np.linspace(x[0],x[-1],nx)
-    lat = np.linspace(y[0],y[-1],ny)
-    # interpolate data on regular grid (temperature grid)
-    # Reshape data
-    zz = dataset.variables['z']
-    Z = zz[:].reshape(ny, nx)
-    Z = np.flipud(Z) # <------------ important!!!
-    # Reduce data according to Region params
-    idx_lon = np.where((lon>=lonLims[0]) & (lon<=lonLims[1]))
-    idx_lat = np.where((lat>=latLims[0]) & (lat<=latLims[1]))
-    Z = Z[idx_lat[0][0]:idx_lat[0][-1]+1, idx_lon[0][0]:idx_lon[0][-1]+1]
-    lon = lon[idx_lon[0]]
-    lat = lat[idx_lat[0]]
-    # interpolate data on regular grid (temperature grid)
-    lon_grid_bathy, lat_grid_bathy = np.meshgrid(lon,lat)
-    lon_vec_bathy = np.reshape(lon_grid_bathy, lon_grid_bathy.size)
-    lat_vec_bathy = np.reshape(lat_grid_bathy, lat_grid_bathy.size)
-    z_vec = np.reshape(Z, Z.size)
-    Zitp = griddata((lon_vec_bathy, lat_vec_bathy), z_vec, (lon_grid, lat_grid), method='linear')
+    Zitp = azb.get_bathymetry(lon_reg, lat_reg)
 
     # Use matplotlib contour to extract 1000m isobath
     cc = plt.contour(lon_reg, lat_reg, -Zitp, [1000])
@@ -269,7 +250,7 @@ def get_NLshelf(infile):
         print(infile + ' does not exist! Let''s buil it...')
         A = build_NLshelf_definition()
         np.save(infile, A)
-        print ['  -> Done!']
+        print('  -> Done!')
   
     return A
 
@@ -305,9 +286,116 @@ def get_ice_regions():
     return dict
 
 
-def get_bottomT_climato(INFILES, LON_REG,  LAT_REG, year_lims=[1981, 2010], season=[], zlims=[10, 1000], dz=5, h5_outputfile=[]):
+def get_region_masks(lon_reg, lat_reg, mask_dir='.', nlshelf_file='/home/cyrf0006/github/AZMP-NL/data/NLshelf_definition.npy', contour_file='/home/cyrf0006/AZMP/state_reports/bottomT/100m_contour_labrador.npy'):
+    """ Will return a dict with boolean masks (lat_reg.size x lon_reg.size) of:
+    - every NAFO division of get_nafo_divisions() (same keys, e.g. '3L', '3Ps')
+    - the NL shelf (key 'NLshelf', see get_NLshelf())
+    - the Labrador 100m contour (key 'labrador_100m')
+
+    Masks are rasterized once per grid and saved in mask_dir (see azmp_grid_tools.get_grid_masks),
+    so they replace the loops on shapely polygon.contains(Point) in bottom T/S and stats functions.
+
+    Usage ex:
+    import azmp_utils as azu
+    masks = azu.get_region_masks(lon_reg, lat_reg)
+    Tbot[~(masks['3L'] | masks['3N'] | masks['3O'] | masks['3Ps'])] = np.nan
+    Tbot[masks['labrador_100m']] = np.nan
+
+    """
+    shapes = get_nafo_divisions()
+    shapes['NLshelf'] = get_NLshelf(nlshelf_file)
+    shapes['labrador_100m'] = np.load(contour_file)
+
+    return azg.get_grid_masks(lon_reg, lat_reg, shapes, mask_dir=mask_dir)
+
+
+def get_climato_cube(INFILES, lon_reg, lat_reg, var_name, year_lims=[1981, 2010], season=[], zmax=1000, dz=5, exclude_gts=True,
+                     valid_range=None, binned_dir=None, batch_size=5000):
+    """ Average the casts of a climatology period in a regular cube (lat_reg x lon_reg x z), year by year.
+
+    Casts are read one yearly file (and at most batch_size casts) at a time, vertically binned
+    (bins np.arange(dz/2.0, zmax, dz), as in groupby_bins) and added to running per-cell sums
+    and counts (azmp_grid_tools.accumulate_casts_to_grid). The full archive is never held in
+    memory, only the sums and counts of the cube. Files named YYYY.nc outside year_lims are not opened.
+
+    Input params:
+        - var_name: variable in netCDF files (e.g., 'temperature')
+        - valid_range: e.g. [28, 36.75]; binned values outside are discarded
+        - binned_dir: if given, read the pre-binned profiles of azmp_binned_tools instead of INFILES
+
+    Returns V (cube of averages, NaN where no data), z (bins), lons, lats (non-empty casts used).
+
+    Usage ex:
+    import azmp_utils as azu
+    V, z, lons, lats = azu.get_climato_cube('/home/cyrf0006/data/dev_database/netCDF/*.nc', lon_reg, lat_reg, 'temperature', season='fall')
+
+    """
+    lonLims = [lon_reg[0], lon_reg[-1]]
+    latLims = [lat_reg[0], lat_reg[-1]]
+    edges = azbt.bin_edges(dz, zmax)
+    z = edges[0:-1]
+    sums, counts = None, None
+    lons_list, lats_list = [], []
+
+    def add_casts(X, lons, lats, sums, counts):
+        # discard outliers and empty casts, then add to cube
+        if valid_range is not None:
+            X[(X < valid_range[0]) | (X > valid_range[1])] = np.nan
+        non_empty = ~np.isnan(X).all(axis=1)
+        lons_list.append(lons[non_empty])
+        lats_list.append(lats[non_empty])
+        return azg.accumulate_casts_to_grid(lons[non_empty], lats[non_empty], X[non_empty,:], lon_reg, lat_reg, sums, counts)
+
+    if binned_dir is not None:
+        # pre-binned profiles (see azmp_binned_tools.build_binned_profiles)
+        for year in range(year_lims[0], year_lims[1]+1):
+            ds = azbt.load_binned_profiles([year, year], season, [var_name], lonLims, latLims, zmax, exclude_gts, binned_dir, dz)
+            if len(ds.variables) == 0:
+                continue
+            df = ds[var_name].to_pandas().reindex(columns=z)
+            sums, counts = add_casts(df.values, np.array(ds.longitude), np.array(ds.latitude), sums, counts)
+            del ds, df
+    else:
+        if isinstance(INFILES, str):
+            INFILES = sorted(glob.glob(INFILES))
+        for nc_file in INFILES:
+            file_year = os.path.splitext(os.path.basename(nc_file))[0]
+            if file_year.isdigit() and ((int(file_year) < year_lims[0]) | (int(file_year) > year_lims[1])):
+                continue
+            ds = xr.open_dataset(nc_file)
+            # Select casts from coordinates only (region, season, period, no GTS)
+            lons = np.array(ds.longitude)
+            lats = np.array(ds.latitude)
+            time = pd.DatetimeIndex(ds['time'].values)
+            keep = (lons>lonLims[0]) & (lons<lonLims[1]) & (lats>latLims[0]) & (lats<latLims[1])
+            keep = keep & (time.year>=year_lims[0]) & (time.year<=year_lims[1])
+            if isinstance(season, str) and (season in azc.SEASONS.keys()):
+                keep = keep & np.isin(time.month, azc.SEASONS[season])
+            if exclude_gts:
+                keep = keep & (azc.read_instrument_class(ds) == 0)
+            idx_keep = np.where(keep)[0]
+            levels = np.array(ds.level)
+            idx_level = np.where(levels < zmax)[0]
+            # Read and bin selected casts by batch
+            for i in range(0, idx_keep.size, batch_size):
+                idx = idx_keep[i:i+batch_size]
+                X = ds[var_name].isel(time=idx, level=idx_level).values.astype(float)
+                X = azbt.rebin_profiles(X, levels[idx_level], edges)
+                sums, counts = add_casts(X, lons[idx], lats[idx], sums, counts)
+            ds.close()
+            print(' -> ' + nc_file + ' (' + str(idx_keep.size) + ' casts)')
+
+    if sums is None:
+        V = np.full((lat_reg.size, lon_reg.size, z.size), np.nan)
+    else:
+        V = azg.grid_mean(sums, counts)
+
+    return V, z, np.concatenate(lons_list + [np.array([])]), np.concatenate(lats_list + [np.array([])])
+
+
+def get_bottomT_climato(INFILES, LON_REG,  LAT_REG, year_lims=[1981, 2010], season=[], zlims=[10, 1000], dz=5, h5_outputfile=[], exclude_gts=True, binned_dir=None):
     """ Generate and returns the climatological bottom temperature map.
-    This script uses GEBCO dada. User should update the path below.
+    This script uses GEBCO data (see azmp_bathy_tools.GEBCO_FILE).
     Maybe this is something I could work on...
 
     If the pickled filename exists, the function will by-pass the processing and return only saved climatology.
@@ -341,6 +429,10 @@ def get_bottomT_climato(INFILES, LON_REG,  LAT_REG, year_lims=[1981, 2010], seas
         print(h5_outputfile + ' exist! Reading directly')
         h5f = h5py.File(h5_outputfile,'r')
         Tbot = h5f['Tbot'][:]
+        if 'Tbot_dist' in h5f.keys(): # not in older files
+            Tbot_dist = h5f['Tbot_dist'][:]
+        else:
+            Tbot_dist = np.full(Tbot.shape, np.nan)
         lon_reg = h5f['lon_reg'][:]
         lat_reg = h5f['lat_reg'][:]
         lon_orig = h5f['lon_orig'][:]
@@ -351,8 +443,6 @@ def get_bottomT_climato(INFILES, LON_REG,  LAT_REG, year_lims=[1981, 2010], seas
     else:
 
         ## ---- Region parameters ---- ##
-        #    add_path('/home/cyrf0006/data/GEBCO/')
-        dataFile = '/home/cyrf0006/data/GEBCO/GEBCO_2014_1D.nc' # Maybe find a better way to handle this file
         lonLims = [LON_REG[0], LON_REG[-1]]
         latLims = [LAT_REG[0], LAT_REG[-1]]
         zmin = zlims[0] # do try to compute bottom temp above that depth
@@ -364,158 +454,35 @@ def get_bottomT_climato(INFILES, LON_REG,  LAT_REG, year_lims=[1981, 2010], seas
 
         ## ---- Bathymetry ---- ####
         print('Load and grid bathymetry')
-        # Load data
-        dataset = netCDF4.Dataset(dataFile)
-        # Extract variables
-        #x = dataset.variables['x_range'] 
-        #y = dataset.variables['y_range']
-        x = [-179-59.75/60, 179+59.75/60] # to correct bug in 30'' dataset?
-        y = [-89-59.75/60, 89+59.75/60]
-        spacing = dataset.variables['spacing']
-        # Compute Lat/Lon
-        nx = int((x[-1]-x[0])/spacing[0]) + 1  # num pts in x-dir
-        ny = int((y[-1]-y[0])/spacing[1]) + 1  # num pts in y-dir
-        lon = np.linspace(x[0],x[-1],nx)
-        lat = np.linspace(y[0],y[-1],ny)
-        # interpolate data on regular grid (temperature grid)
-        # Reshape data
-        zz = dataset.variables['z']
-        Z = zz[:].reshape(ny, nx)
-        Z = np.flipud(Z) # <------------ important!!!
-        # Reduce data according to Region params
-        idx_lon = np.where((lon>=lonLims[0]) & (lon<=lonLims[1]))
-        idx_lat = np.where((lat>=latLims[0]) & (lat<=latLims[1]))
-        Z = Z[idx_lat[0][0]:idx_lat[0][-1]+1, idx_lon[0][0]:idx_lon[0][-1]+1]
-        lon = lon[idx_lon[0]]
-        lat = lat[idx_lat[0]]
-        # interpolate data on regular grid (temperature grid)
-        lon_grid_bathy, lat_grid_bathy = np.meshgrid(lon,lat)
-        lon_vec_bathy = np.reshape(lon_grid_bathy, lon_grid_bathy.size)
-        lat_vec_bathy = np.reshape(lat_grid_bathy, lat_grid_bathy.size)
-        z_vec = np.reshape(Z, Z.size)
-        Zitp = griddata((lon_vec_bathy, lat_vec_bathy), z_vec, (lon_grid, lat_grid), method='linear')
-        del Z, lon, lat, zz, dataset
+        Zitp = azb.get_bathymetry(lon_reg, lat_reg)
         print(' -> Done!')
 
-        ## ---- Get CTD data --- ##
-        print('Get historical data')
-        ds = xr.open_mfdataset(INFILES)
-        # Selection of a subset region
-        ds = ds.where((ds.longitude>lonLims[0]) & (ds.longitude<lonLims[1]), drop=True)
-        ds = ds.where((ds.latitude>latLims[0]) & (ds.latitude<latLims[1]), drop=True)
-        # Select time (save several options here)
-        if season == 'summer':
-            #ds = ds.sel(time=ds['time.season']=='JJA')
-            ds = ds.sel(time=((ds['time.month']>=7)) & ((ds['time.month']<=9)))
-        elif season == 'spring':
-            #ds = ds.sel(time=ds['time.season']=='MAM')
-            ds = ds.sel(time=((ds['time.month']>=4)) & ((ds['time.month']<=6)))
-        elif season == 'fall':
-            #ds = ds.sel(time=ds['time.season']=='SON')
-            ds = ds.sel(time=((ds['time.month']>=9)) & ((ds['time.month']<=12)))
-        else:
-            print('!! no season specified, used them all! !!')
-
-        # Remome problematic datasets
-        print('!!Remove MEDBA data!!')
-        print('  ---> I Should be improme because I remove good data!!!!')
-        ds = ds.where(ds.instrument_ID!='MEDBA', drop=True)
-        ds = ds.where(ds.instrument_ID!='MEDTE', drop=True)
- 
-            
-        # Time period for climatology
-        ds = ds.sel(time=ds['time.year']>=year_lims[0])
-        ds = ds.sel(time=ds['time.year']<=year_lims[1])
-        ds = ds.sel(level=ds['level']<zmax)
-        # Vertical binning (on dataArray; more appropriate here
-        da_temp = ds['temperature']
-        lons = np.array(ds.longitude)
-        lats = np.array(ds.latitude)
-        bins = np.arange(dz/2.0, ds.level.max(), dz)
-        da_temp = da_temp.groupby_bins('level', bins).mean(dim='level')
-        #To Pandas Dataframe
-        df_temp = da_temp.to_pandas()
-        df_temp.columns = bins[0:-1] #rename columns with 'bins'
-        idx_empty_rows = df_temp.isnull().all(1).nonzero()[0]
-        df_temp = df_temp.dropna(axis=0,how='all')
-        lons = np.delete(lons,idx_empty_rows)
-        lats = np.delete(lats,idx_empty_rows)
-        del ds, da_temp
-        print(' -> Done!')        
-
-        ## --- fill 3D cube --- ##  
-        print('Fill regular cube')
-        z = df_temp.columns.values
-        V = np.full((lat_reg.size, lon_reg.size, z.size), np.nan)
+        ## ---- Get CTD data and fill 3D cube (year by year) --- ##
+        print('Get historical data and fill regular cube')
+        V, z, lons, lats = get_climato_cube(INFILES, lon_reg, lat_reg, 'temperature', year_lims, season, zmax, dz, exclude_gts, binned_dir=binned_dir)
+        print(' -> Done!')
 
-        # Aggregate on regular grid
-        for i, xx in enumerate(lon_reg):
-            for j, yy in enumerate(lat_reg):    
-                idx = np.where((lons>=xx-dc/2) & (lons<xx+dc/2) & (lats>=yy-dc/2) & (lats<yy+dc/2))
-                tmp = np.array(df_temp.iloc[idx].mean(axis=0))
-                idx_good = np.argwhere((~np.isnan(tmp)) & (tmp<30))
-                if np.size(idx_good)==1:
-                    V[j,i,:] = np.array(df_temp.iloc[idx].mean(axis=0))
-                elif np.size(idx_good)>1: # vertical interpolation between pts
-                    interp = interp1d(np.squeeze(z[idx_good]), np.squeeze(tmp[idx_good]))
-                    idx_interp = np.arange(np.int(idx_good[0]),np.int(idx_good[-1]+1))
-                    V[j,i,idx_interp] = interp(z[idx_interp]) # interpolate only where possible (1st to last good idx)
-
-
-        # horiozntal interpolation at each depth
-        lon_grid, lat_grid = np.meshgrid(lon_reg,lat_reg)
-        lon_vec = np.reshape(lon_grid, lon_grid.size)
-        lat_vec = np.reshape(lat_grid, lat_grid.size)
-        for k, zz in enumerate(z):
-            # Meshgrid 1D data (after removing NaNs)
-            tmp_grid = V[:,:,k]
-            tmp_vec = np.reshape(tmp_grid, tmp_grid.size)
-            #print 'interpolate depth layer ' + np.str(k) + ' / ' + np.str(z.size) 
-            # griddata (after removing nans)
-            idx_good = np.argwhere(~np.isnan(tmp_vec))
-            if idx_good.size>10: # will ignore depth where no data exist
-                LN = np.squeeze(lon_vec[idx_good])
-                LT = np.squeeze(lat_vec[idx_good])
-                TT = np.squeeze(tmp_vec[idx_good])
-                zi = griddata((LN, LT), TT, (lon_grid, lat_grid), method='linear')
-                V[:,:,k] = zi
-            else:
-                continue
+        # vertical interpolation between pts (only between 1st and last good idx)
+        V = azg.fill_vertical_gaps(V, z, vmax=30)
+
+
+        # horizontal interpolation at each depth (one triangulation per set of valid cells)
+        V = azg.interp_levels(V, lon_reg, lat_reg, min_pts=10)
         print(' -> Done!')    
 
         # mask using bathymetry
-        for i, xx in enumerate(lon_reg):
-            for j,yy in enumerate(lat_reg):
-                if Zitp[j,i] > -10: # remove shallower than 10m
-                    V[j,i,:] = np.nan
+        V[Zitp > -10, :] = np.nan # remove shallower than 10m
 
-        # getting bottom temperature
-        print('Getting bottom Temp.')    
-        Tbot = np.full([lat_reg.size,lon_reg.size], np.nan) 
-        for i, xx in enumerate(lon_reg):
-            for j,yy in enumerate(lat_reg):
-                bottom_depth = -Zitp[j,i] # minus to turn positive
-                temp_vec = V[j,i,:]
-                ## idx_no_good = np.argwhere(temp_vec>30)
-                ## if idx_no_good.size:
-                ##     temp_vec[idx_no_good] = np.nan
-                idx_good = np.squeeze(np.where(~np.isnan(temp_vec)))
-                if idx_good.size:
-                    idx_closest = np.argmin(np.abs(bottom_depth-z[idx_good]))
-                else:
-                    continue
-
-                if np.abs([idx_closest] - bottom_depth) <= 20:
-                    Tbot[j,i] = temp_vec[idx_good[idx_closest]]
-                elif np.abs(z[idx_closest] - bottom_depth) <= 50:
-                    #print('used data located [30,50]m from bottom')
-                    Tbot[j,i] = temp_vec[idx_good[idx_closest]]
+        # getting bottom temperature (closest good bin within 50m of GEBCO depth)
+        print('Getting bottom Temp.')
+        Tbot, Tbot_dist = azg.bottom_values(V, z, -Zitp)
         print(' -> Done!')    
 
         # Save data for further use
         if np.size(h5_outputfile):
             h5f = h5py.File(h5_outputfile, 'w')
             h5f.create_dataset('Tbot', data=Tbot)
+            h5f.create_dataset('Tbot_dist', data=Tbot_dist)
             h5f.create_dataset('lon_reg', data=lon_reg)
             h5f.create_dataset('lat_reg', data=lat_reg)
             h5f.create_dataset('lon_orig', data=lons)
@@ -527,6 +494,7 @@ def get_bottomT_climato(INFILES, LON_REG,  LAT_REG, year_lims=[1981, 2010], seas
     # Fill dict for output
     dict = {}
     dict['Tbot'] = Tbot
+    dict['Tbot_dist'] = Tbot_dist # bottom depth minus depth of the selected bin
     dict['bathy'] = Zitp
     dict['lon_reg'] = lon_reg
     dict['lat_reg'] = lat_reg
@@ -536,9 +504,9 @@ def get_bottomT_climato(INFILES, LON_REG,  LAT_REG, year_lims=[1981, 2010], seas
     return dict
 
 
-def get_bottomS_climato(INFILES, LON_REG,  LAT_REG, year_lims=[1981, 2010], season=[], zlims=[10, 1000], dz=5, h5_outputfile=[]):
+def get_bottomS_climato(INFILES, LON_REG,  LAT_REG, year_lims=[1981, 2010], season=[], zlims=[10, 1000], dz=5, h5_outputfile=[], exclude_gts=True, binned_dir=None):
     """ Generate and returns the climatological bottom salinity map.
-    This script uses GEBCO dada. User should update the path below.
+    This script uses GEBCO data (see azmp_bathy_tools.GEBCO_FILE).
     Maybe this is something I could work on...
 
     If the pickled filename exists, the function will by-pass the processing and return only saved climatology.
@@ -564,6 +532,10 @@ def get_bottomS_climato(INFILES, LON_REG,  LAT_REG, year_lims=[1981, 2010], seas
         print [h5_outputfile + ' exist! Reading directly']
         h5f = h5py.File(h5_outputfile,'r')
         Sbot = h5f['Sbot'][:]
+        if 'Sbot_dist' in h5f.keys(): # not in older files
+            Sbot_dist = h5f['Sbot_dist'][:]
+        else:
+            Sbot_dist = np.full(Sbot.shape, np.nan)
         lon_reg = h5f['lon_reg'][:]
         lat_reg = h5f['lat_reg'][:]
         lon_orig = h5f['lon_orig'][:]
@@ -574,8 +546,6 @@ def get_bottomS_climato(INFILES, LON_REG,  LAT_REG, year_lims=[1981, 2010], seas
     else:
 
         ## ---- Region parameters ---- ##
-        #    add_path('/home/cyrf0006/data/GEBCO/')
-        dataFile = '/home/cyrf0006/data/GEBCO/GEBCO_2014_1D.nc' # Maybe find a better way to handle this file
         lonLims = [LON_REG[0], LON_REG[-1]]
         latLims = [LAT_REG[0], LAT_REG[-1]]
         zmin = zlims[0] # do try to compute bottom temp above that depth
@@ -587,170 +557,35 @@ def get_bottomS_climato(INFILES, LON_REG,  LAT_REG, year_lims=[1981, 2010], seas
 
         ## ---- Bathymetry ---- ####
         print('Load and grid bathymetry')
-        # Load data
-        dataset = netCDF4.Dataset(dataFile)
-        # Extract variables
-        #x = dataset.variables['x_range'] 
-        #y = dataset.variables['y_range']
-        x = [-179-59.75/60, 179+59.75/60] # to correct bug in 30'' dataset?
-        y = [-89-59.75/60, 89+59.75/60]
-        spacing = dataset.variables['spacing']
-        # Compute Lat/Lon
-        nx = int((x[-1]-x[0])/spacing[0]) + 1  # num pts in x-dir
-        ny = int((y[-1]-y[0])/spacing[1]) + 1  # num pts in y-dir
-        lon = np.linspace(x[0],x[-1],nx)
-        lat = np.linspace(y[0],y[-1],ny)
-        # interpolate data on regular grid (temperature grid)
-        # Reshape data
-        zz = dataset.variables['z']
-        Z = zz[:].reshape(ny, nx)
-        Z = np.flipud(Z) # <------------ important!!!
-        # Reduce data according to Region params
-        idx_lon = np.where((lon>=lonLims[0]) & (lon<=lonLims[1]))
-        idx_lat = np.where((lat>=latLims[0]) & (lat<=latLims[1]))
-        Z = Z[idx_lat[0][0]:idx_lat[0][-1]+1, idx_lon[0][0]:idx_lon[0][-1]+1]
-        lon = lon[idx_lon[0]]
-        lat = lat[idx_lat[0]]
-        # interpolate data on regular grid (temperature grid)
-        lon_grid_bathy, lat_grid_bathy = np.meshgrid(lon,lat)
-        lon_vec_bathy = np.reshape(lon_grid_bathy, lon_grid_bathy.size)
-        lat_vec_bathy = np.reshape(lat_grid_bathy, lat_grid_bathy.size)
-        z_vec = np.reshape(Z, Z.size)
-        Zitp = griddata((lon_vec_bathy, lat_vec_bathy), z_vec, (lon_grid, lat_grid), method='linear')
+        Zitp = azb.get_bathymetry(lon_reg, lat_reg)
         print(' -> Done!')
 
-        ## ---- Get CTD data --- ##
-        print('Get historical data')
-        ds = xr.open_mfdataset(INFILES)
-        # Selection of a subset region
-        ds = ds.where((ds.longitude>lonLims[0]) & (ds.longitude<lonLims[1]), drop=True)
-        ds = ds.where((ds.latitude>latLims[0]) & (ds.latitude<latLims[1]), drop=True)
-        # Select time (save several options here)
-        if season == 'summer':
-            #ds = ds.sel(time=ds['time.season']=='JJA')
-            ds = ds.sel(time=((ds['time.month']>=7)) & ((ds['time.month']<=9)))
-        elif season == 'spring':
-            #ds = ds.sel(time=ds['time.season']=='MAM')
-            ds = ds.sel(time=((ds['time.month']>=4)) & ((ds['time.month']<=6)))
-        elif season == 'fall':
-            #ds = ds.sel(time=ds['time.season']=='SON')
-            ds = ds.sel(time=((ds['time.month']>=9)) & ((ds['time.month']<=12)))
-        else:
-            print('!! no season specified, used them all! !!')
-
-        # Remome problematic datasets
-        print('!!Remove MEDBA data!!')
-        print('  ---> I Should be improme because I remove good data!!!!')
-        ds = ds.where(ds.instrument_ID!='MEDBA', drop=True)
-        ds = ds.where(ds.instrument_ID!='MEDTE', drop=True)
-
-        # Time period for climatology
-        ds = ds.sel(time=ds['time.year']>=year_lims[0])
-        ds = ds.sel(time=ds['time.year']<=year_lims[1])
-        ds = ds.sel(level=ds['level']<zmax)
-        # Vertical binning (on dataArray; more appropriate here
-        da_sal = ds['salinity']
-        lons = np.array(ds.longitude)
-        lats = np.array(ds.latitude)
-        bins = np.arange(dz/2.0, ds.level.max(), dz)
-        da_sal = da_sal.groupby_bins('level', bins).mean(dim='level')
-        #To Pandas Dataframe
-        df_sal = da_sal.to_pandas()
-        df_sal.columns = bins[0:-1] #rename columns with 'bins'
-        # Remove empty columns
-        idx_empty_rows = df_sal.isnull().all(1).nonzero()[0]
-        df_sal = df_sal.dropna(axis=0,how='all')
-        lons = np.delete(lons,idx_empty_rows)
-        lats = np.delete(lats,idx_empty_rows)        
+        ## ---- Get CTD data and fill 3D cube (year by year) --- ##
+        print('Get historical data and fill regular cube')
+        V, z, lons, lats = get_climato_cube(INFILES, lon_reg, lat_reg, 'salinity', year_lims, season, zmax, dz, exclude_gts, valid_range=[28, 36.75], binned_dir=binned_dir)
         print(' -> Done!')
 
-        ## ---- Try to remove outliers ---- ##
-        # METHOD 1
-        ## print('For climato, keep only profile with average salinity in [28,38]')
-        ## df_sal_vert_ave = df_sal.mean(axis=1)
-        ## mu =  df_sal_vert_ave.mean()
-        ## sigma = df_sal_vert_ave.std()
-        ## print mu, sigma
-        ## idx = np.where((df_sal_vert_ave>=mu-5*sigma) & (df_sal_vert_ave<=mu+5*sigma))
-        ## idx = np.where((df_sal_vert_ave>=mu-5*sigma) & (df_sal_vert_ave<=mu+5*sigma))
-        ## lons = lons[idx]
-        ## lats = lats[idx]
-        ## df_sal = df_sal[(df_sal_vert_ave>=mu-5*sigma) & (df_sal_vert_ave<=mu*5*sigma)]
-        # METHOD 2
-        df_sal = df_sal.apply(lambda x: [y if y <= 36.75 else np.nan for y in x])
-        df_sal = df_sal.apply(lambda x: [y if y >= 28 else np.nan for y in x])        
-        print(' -> Done!')        
-
-        ## --- fill 3D cube --- ##  
-        print('Fill regular cube')
-        z = df_sal.columns.values
-        V = np.full((lat_reg.size, lon_reg.size, z.size), np.nan)
+        # vertical interpolation between pts (only between 1st and last good idx)
+        V = azg.fill_vertical_gaps(V, z)
 
-        # Aggregate on regular grid
-        for i, xx in enumerate(lon_reg):
-            for j, yy in enumerate(lat_reg):    
-                idx = np.where((lons>=xx-dc/2) & (lons<xx+dc/2) & (lats>=yy-dc/2) & (lats<yy+dc/2))
-                tmp = np.array(df_sal.iloc[idx].mean(axis=0))
-                idx_good = np.argwhere((~np.isnan(tmp)))
-                if np.size(idx_good)==1:
-                    V[j,i,:] = np.array(df_sal.iloc[idx].mean(axis=0))
-                elif np.size(idx_good)>1: # vertical interpolation between pts
-                    interp = interp1d(np.squeeze(z[idx_good]), np.squeeze(tmp[idx_good]))
-                    idx_interp = np.arange(np.int(idx_good[0]),np.int(idx_good[-1]+1))
-                    V[j,i,idx_interp] = interp(z[idx_interp]) # interpolate only where possible (1st to last good idx)
-
-
-        # horizontal interpolation at each depth
-        lon_grid, lat_grid = np.meshgrid(lon_reg,lat_reg)
-        lon_vec = np.reshape(lon_grid, lon_grid.size)
-        lat_vec = np.reshape(lat_grid, lat_grid.size)
-        for k, zz in enumerate(z):
-            # Meshgrid 1D data (after removing NaNs)
-            tmp_grid = V[:,:,k]
-            tmp_vec = np.reshape(tmp_grid, tmp_grid.size)
-            #print 'interpolate depth layer ' + np.str(k) + ' / ' + np.str(z.size) 
-            # griddata (after removing nans)
-            idx_good = np.argwhere(~np.isnan(tmp_vec))
-            if idx_good.size>10: # will ignore depth where no data exist
-                LN = np.squeeze(lon_vec[idx_good])
-                LT = np.squeeze(lat_vec[idx_good])
-                TT = np.squeeze(tmp_vec[idx_good])
-                zi = griddata((LN, LT), TT, (lon_grid, lat_grid), method='linear')
-                V[:,:,k] = zi
-            else:
-                continue
+
+        # horizontal interpolation at each depth (one triangulation per set of valid cells)
+        V = azg.interp_levels(V, lon_reg, lat_reg, min_pts=10)
         print(' -> Done!')    
 
         # mask using bathymetry
-        for i, xx in enumerate(lon_reg):
-            for j,yy in enumerate(lat_reg):
-                if Zitp[j,i] > -10: # remove shallower than 10m
-                    V[j,i,:] = np.nan
+        V[Zitp > -10, :] = np.nan # remove shallower than 10m
 
-        # getting bottom salinity
-        print('Getting bottom Sal.')    
-        Sbot = np.full([lat_reg.size,lon_reg.size], np.nan) 
-        for i, xx in enumerate(lon_reg):
-            for j,yy in enumerate(lat_reg):
-                bottom_depth = -Zitp[j,i] # minus to turn positive
-                sal_vec = V[j,i,:]
-                idx_good = np.squeeze(np.where(~np.isnan(sal_vec)))
-                if idx_good.size:
-                    idx_closest = np.argmin(np.abs(bottom_depth-z[idx_good]))
-                else:
-                    continue
-
-                if np.abs([idx_closest] - bottom_depth) <= 20:
-                    Sbot[j,i] = sal_vec[idx_good[idx_closest]]
-                elif np.abs(z[idx_closest] - bottom_depth) <= 50:
-                    #print('used data located [30,50]m from bottom')
-                    Sbot[j,i] = sal_vec[idx_good[idx_closest]]
+        # getting bottom salinity (closest good bin within 50m of GEBCO depth)
+        print('Getting bottom Sal.')
+        Sbot, Sbot_dist = azg.bottom_values(V, z, -Zitp)
         print(' -> Done!')    
 
         # Save data for further use
         if np.size(h5_outputfile):
             h5f = h5py.File(h5_outputfile, 'w')
             h5f.create_dataset('Sbot', data=Sbot)
+            h5f.create_dataset('Sbot_dist', data=Sbot_dist)
             h5f.create_dataset('lon_reg', data=lon_reg)
             h5f.create_dataset('lat_reg', data=lat_reg)
             h5f.create_dataset('lon_orig', data=lons)
@@ -762,6 +597,7 @@ def get_bottomS_climato(INFILES, LON_REG,  LAT_REG, year_lims=[1981, 2010], seas
     # Fill dict for output
     dict = {}
     dict['Sbot'] = Sbot
+    dict['Sbot_dist'] = Sbot_dist # bottom depth minus depth of the selected bin
     dict['bathy'] = Zitp
     dict['lon_reg'] = lon_reg
     dict['lat_reg'] = lat_reg
@@ -771,7 +607,7 @@ def get_bottomS_climato(INFILES, LON_REG,  LAT_REG, year_lims=[1981, 2010], seas
     return dict
     
 
-def get_bottomT(year_file, season, climato_file, nafo_mask=True, lab_mask=True):
+def get_bottomT(year_file, season, climato_file, nafo_mask=True, lab_mask=True, exclude_gts=True):
     """ Generate and returns bottom temperature data corresponding to a certain climatology map
     (previously generated with get_bottomT_climato)
     Function returns:
@@ -823,24 +659,13 @@ def get_bottomT(year_file, season, climato_file, nafo_mask=True, lab_mask=True):
     # Selection of a subset region
     ds = ds.where((ds.longitude>lonLims[0]) & (ds.longitude<lonLims[1]), drop=True)
     ds = ds.where((ds.latitude>latLims[0]) & (ds.latitude<latLims[1]), drop=True)
-    # Select time (save several options here)
-    if season == 'summer':
-        #ds = ds.sel(time=ds['time.season']=='JJA')
-        ds = ds.sel(time=((ds['time.month']>=7)) & ((ds['time.month']<=9)))
-    elif season == 'spring':
-        #ds = ds.sel(time=ds['time.season']=='MAM')
-        ds = ds.sel(time=((ds['time.month']>=4)) & ((ds['time.month']<=6)))
-    elif season == 'fall':
-        #ds = ds.sel(time=ds['time.season']=='SON')
-        ds = ds.sel(time=((ds['time.month']>=10)) & ((ds['time.month']<=12)))
-    else:
-        print('!! no season specified, used them all! !!')
+    # Select season (see azmp_catalog_tools.SEASONS)
+    ds = azc.select_season(ds, season)
 
-    # Remome problematic datasets
-    print('!!Remove MEDBA data!!')
-    print('  ---> I Should be improme because I remove good data!!!!')
-    ds = ds.where(ds.instrument_ID!='MEDBA', drop=True)        
-    ds = ds.where(ds.instrument_ID!='MEDTE', drop=True)
+    # Remome GTS datasets (BATHY & TESAC messages, removed by index)
+    if exclude_gts:
+        print('!!Remove MEDBA & MEDTE data!!')
+        ds = azc.remove_gts(ds)
     
     # Restrict max depth to zmax defined earlier
     ds = ds.sel(level=ds['level']<zmax)
@@ -866,124 +691,51 @@ def get_bottomT(year_file, season, climato_file, nafo_mask=True, lab_mask=True):
     ## --- fill 3D cube --- ##  
     print('Fill regular cube')
     z = df_temp.columns.values
-    V = np.full((lat_reg.size, lon_reg.size, z.size), np.nan)
-
-    # Aggregate on regular grid
-    for i, xx in enumerate(lon_reg):
-        for j, yy in enumerate(lat_reg):    
-            idx = np.where((lons>=xx-dc/2) & (lons<xx+dc/2) & (lats>=yy-dc/2) & (lats<yy+dc/2))
-            tmp = np.array(df_temp.iloc[idx].mean(axis=0))
-            idx_good = np.argwhere((~np.isnan(tmp)) & (tmp<30))
-            if np.size(idx_good)==1:
-                V[j,i,:] = np.array(df_temp.iloc[idx].mean(axis=0))
-            elif np.size(idx_good)>1: # vertical interpolation between pts
-                interp = interp1d(np.squeeze(z[idx_good]), np.squeeze(tmp[idx_good]))
-                idx_interp = np.arange(np.int(idx_good[0]),np.int(idx_good[-1]+1))
-                V[j,i,idx_interp] = interp(z[idx_interp]) # interpolate only where possible (1st to last good idx)
+    # Aggregate on regular grid (all casts at once)
+    V = azg.bin_casts_to_grid(lons, lats, df_temp.values, lon_reg, lat_reg)
+    # vertical interpolation between pts (only between 1st and last good idx)
+    V = azg.fill_vertical_gaps(V, z, vmax=30)
     
-    # horizontal interpolation at each depth
-    lon_grid, lat_grid = np.meshgrid(lon_reg,lat_reg)
-    lon_vec = np.reshape(lon_grid, lon_grid.size)
-    lat_vec = np.reshape(lat_grid, lat_grid.size)
-    for k, zz in enumerate(z):
-        # Meshgrid 1D data (after removing NaNs)
-        tmp_grid = V[:,:,k]
-        tmp_vec = np.reshape(tmp_grid, tmp_grid.size)
-        # griddata (after removing nans)
-        idx_good = np.argwhere(~np.isnan(tmp_vec))
-        if idx_good.size>5: # will ignore depth where no data exist
-            LN = np.squeeze(lon_vec[idx_good])
-            LT = np.squeeze(lat_vec[idx_good])
-            TT = np.squeeze(tmp_vec[idx_good])
-            zi = griddata((LN, LT), TT, (lon_grid, lat_grid), method='linear')
-            V[:,:,k] = zi
-        else:
-            continue
+    # horizontal interpolation at each depth (one triangulation per set of valid cells)
+    V = azg.interp_levels(V, lon_reg, lat_reg, min_pts=5)
     print(' -> Done!')    
 
     # mask using bathymetry (I don't think it is necessary, but make nice figures)
-    for i, xx in enumerate(lon_reg):
-        for j,yy in enumerate(lat_reg):
-            if Zitp[j,i] > -10: # remove shallower than 10m
-                V[j,i,:] = np.nan
-
-    # getting bottom temperature
-    print('Getting bottom Temp.')    
-    Tbot = np.full([lat_reg.size,lon_reg.size], np.nan) 
-    for i, xx in enumerate(lon_reg):
-        for j,yy in enumerate(lat_reg):
-            bottom_depth = -Zitp[j,i] # minus to turn positive
-            temp_vec = V[j,i,:]
-            ## idx_no_good = np.argwhere(temp_vec>30)
-            ## if idx_no_good.size:
-            ##     temp_vec[idx_no_good] = np.nan
-            idx_good = np.squeeze(np.where(~np.isnan(temp_vec)))
-            if idx_good.size>1:
-                idx_closest = np.argmin(np.abs(bottom_depth-z[idx_good]))
-            else:
-                continue
+    V[Zitp > -10, :] = np.nan # remove shallower than 10m
 
-            if np.abs([idx_closest] - bottom_depth) <= 20:
-                Tbot[j,i] = temp_vec[idx_good[idx_closest]]
-            elif np.abs(z[idx_closest] - bottom_depth) <= 50:
-                #print('used data located [30,50]m from bottom')
-                Tbot[j,i] = temp_vec[idx_good[idx_closest]]
+    # getting bottom temperature (closest good bin within 50m of GEBCO depth)
+    print('Getting bottom Temp.')
+    Tbot, Tbot_dist = azg.bottom_values(V, z, -Zitp, min_good=2)
 
     print(' -> Done!')
 
+    # Masks (rasterized once per grid, see get_region_masks)
+    if (lab_mask == True) | (nafo_mask == True):
+        masks = get_region_masks(lon_reg, lat_reg)
+
     # Mask data on coastal Labrador
     if lab_mask == True:
         print('Mask coastal labrador')
-        contour_mask = np.load('/home/cyrf0006/AZMP/state_reports/bottomT/100m_contour_labrador.npy')
-        polygon_mask = Polygon(contour_mask)
-        for i, xx in enumerate(lon_reg):
-            for j,yy in enumerate(lat_reg):
-                point = Point(lon_reg[i], lat_reg[j])
-                if polygon_mask.contains(point): # mask data near Labrador in fall
-                    Tbot[j,i] = np.nan 
+        Tbot[masks['labrador_100m']] = np.nan
 
+    # Mask data outside Nafo div.
     if nafo_mask == True:
-        # Mask data outside Nafo div.
         print('Mask according to NAFO division for ' + season)
-        # Polygons
-        polygon3K = Polygon(zip(nafo_div['3K']['lon'], nafo_div['3K']['lat']))
-        polygon3L = Polygon(zip(nafo_div['3L']['lon'], nafo_div['3L']['lat']))
-        polygon3N = Polygon(zip(nafo_div['3N']['lon'], nafo_div['3N']['lat']))
-        polygon3O = Polygon(zip(nafo_div['3O']['lon'], nafo_div['3O']['lat']))
-        polygon3Ps = Polygon(zip(nafo_div['3Ps']['lon'], nafo_div['3Ps']['lat']))
-        polygon2J = Polygon(zip(nafo_div['2J']['lon'], nafo_div['2J']['lat']))
-
         if season == 'spring':
-            for i, xx in enumerate(lon_reg):
-                for j,yy in enumerate(lat_reg):
-                    point = Point(lon_reg[i], lat_reg[j])
-                    #if (~polygon3L.contains(point)) & (~polygon3N.contains(point)) & (~polygon3O.contains(point)) & (~polygon3Ps.contains(point)):
-                    if polygon3L.contains(point) | polygon3N.contains(point) | polygon3O.contains(point) | polygon3Ps.contains(point):
-                        pass #nothing to do but cannot implement negative statement "if not" above
-                    else:
-                        Tbot[j,i] = np.nan
-
+            Tbot[~(masks['3L'] | masks['3N'] | masks['3O'] | masks['3Ps'])] = np.nan
         elif season == 'fall':
-            for i, xx in enumerate(lon_reg):
-                for j,yy in enumerate(lat_reg):
-                    point = Point(lon_reg[i], lat_reg[j])
-                    #if (~polygon3L.contains(point)) & (~polygon3N.contains(point)) & (~polygon3O.contains(point)) & (~polygon3Ps.contains(point)):
-                    if polygon2J.contains(point) | polygon3K.contains(point) | polygon3L.contains(point) | polygon3N.contains(point) | polygon3O.contains(point) | polygon3Ps.contains(point):
-                        pass #nothing to do but cannot implement negative statement "if not" above
-                    else:
-                        pass
-                        #Tbot[j,i] = np.nan ### <--------------------- Do not mask the fall!!!!!
-
+            pass # Do not mask the fall!!!!! (would be 2J3KLNOPs)
         else:
             print('no division mask, all data taken')
     else:
-            print('no division mask, all data taken')
+        print('no division mask, all data taken')
 
     print(' -> Done!')    
 
     # Fill dict for output
     dict = {}
     dict['Tbot'] = Tbot
+    dict['Tbot_dist'] = Tbot_dist # bottom depth minus depth of the selected bin
     dict['bathy'] = Zitp
     dict['lon_reg'] = lon_reg
     dict['lat_reg'] = lat_reg
@@ -992,7 +744,7 @@ def get_bottomT(year_file, season, climato_file, nafo_mask=True, lab_mask=True):
     
     return dict
 
-def get_bottomS(year_file, season, climato_file, nafo_mask=True, lab_mask=True):    
+def get_bottomS(year_file, season, climato_file, nafo_mask=True, lab_mask=True, exclude_gts=True):
     """ Generate and returns bottom temperature data corresponding to a certain climatology map
     (previously generated with get_bottomS_climato)
     Function returns:
@@ -1045,25 +797,14 @@ def get_bottomS(year_file, season, climato_file, nafo_mask=True, lab_mask=True):
     # Selection of a subset region
     ds = ds.where((ds.longitude>lonLims[0]) & (ds.longitude<lonLims[1]), drop=True)
     ds = ds.where((ds.latitude>latLims[0]) & (ds.latitude<latLims[1]), drop=True)
-    # Select time (save several options here)
-    if season == 'summer':
-        #ds = ds.sel(time=ds['time.season']=='JJA')
-        ds = ds.sel(time=((ds['time.month']>=7)) & ((ds['time.month']<=9)))
-    elif season == 'spring':
-        #ds = ds.sel(time=ds['time.season']=='MAM')
-        ds = ds.sel(time=((ds['time.month']>=4)) & ((ds['time.month']<=6)))
-    elif season == 'fall':
-        #ds = ds.sel(time=ds['time.season']=='SON')
-        ds = ds.sel(time=((ds['time.month']>=10)) & ((ds['time.month']<=12)))
-    else:
-        print('!! no season specified, used them all! !!')
+    # Select season (see azmp_catalog_tools.SEASONS)
+    ds = azc.select_season(ds, season)
 
 
-    # Remome problematic datasets
-    print('!!Remove MEDBA data!!')
-    print('  ---> I Should be improme because I remove good data!!!!')
-    ds = ds.where(ds.instrument_ID!='MEDBA', drop=True)
-    ds = ds.where(ds.instrument_ID!='MEDTE', drop=True)
+    # Remome GTS datasets (BATHY & TESAC messages, removed by index)
+    if exclude_gts:
+        print('!!Remove MEDBA & MEDTE data!!')
+        ds = azc.remove_gts(ds)
 
     
     # Vertical binning (on dataset; slower here as we don't need it)
@@ -1091,117 +832,41 @@ def get_bottomS(year_file, season, climato_file, nafo_mask=True, lab_mask=True):
     ## --- fill 3D cube --- ##  
     print('Fill regular cube')
     z = df_sal.columns.values
-    V = np.full((lat_reg.size, lon_reg.size, z.size), np.nan)
-
-    # Aggregate on regular grid
-    for i, xx in enumerate(lon_reg):
-        for j, yy in enumerate(lat_reg):    
-            idx = np.where((lons>=xx-dc/2) & (lons<xx+dc/2) & (lats>=yy-dc/2) & (lats<yy+dc/2))
-            tmp = np.array(df_sal.iloc[idx].mean(axis=0))
-            idx_good = np.argwhere(~np.isnan(tmp))
-            if np.size(idx_good)==1:
-                V[j,i,:] = np.array(df_sal.iloc[idx].mean(axis=0))
-            elif np.size(idx_good)>1: # vertical interpolation between pts
-                #V[j,i,:] = np.interp((z), np.squeeze(z[idx_good]), np.squeeze(tmp[idx_good]))  <--- this method propagate nans below max depth (extrapolation)
-                interp = interp1d(np.squeeze(z[idx_good]), np.squeeze(tmp[idx_good]))  # <---------- Pay attention here, this is a bit unusual, but seems to work!
-                idx_interp = np.arange(np.int(idx_good[0]),np.int(idx_good[-1]+1))
-                V[j,i,idx_interp] = interp(z[idx_interp]) # interpolate only where possible (1st to last good idx)
-
-    # horizontal interpolation at each depth
-    lon_grid, lat_grid = np.meshgrid(lon_reg,lat_reg)
-    lon_vec = np.reshape(lon_grid, lon_grid.size)
-    lat_vec = np.reshape(lat_grid, lat_grid.size)
-    for k, zz in enumerate(z):
-        # Meshgrid 1D data (after removing NaNs)
-        tmp_grid = V[:,:,k]
-        tmp_vec = np.reshape(tmp_grid, tmp_grid.size)
-        #print 'interpolate depth layer ' + np.str(k) + ' / ' + np.str(z.size) 
-        # griddata (after removing nans)
-        idx_good = np.argwhere(~np.isnan(tmp_vec))
-        if idx_good.size>3: # will ignore depth where no data exist
-            LN = np.squeeze(lon_vec[idx_good])
-            LT = np.squeeze(lat_vec[idx_good])
-            TT = np.squeeze(tmp_vec[idx_good])
-            zi = griddata((LN, LT), TT, (lon_grid, lat_grid), method='linear')
-            V[:,:,k] = zi
-        else:
-            continue
+    # Aggregate on regular grid (all casts at once)
+    V = azg.bin_casts_to_grid(lons, lats, df_sal.values, lon_reg, lat_reg)
+    # vertical interpolation between pts (only between 1st and last good idx)
+    V = azg.fill_vertical_gaps(V, z)
+
+    # horizontal interpolation at each depth (one triangulation per set of valid cells)
+    V = azg.interp_levels(V, lon_reg, lat_reg, min_pts=3)
     print(' -> Done!')    
 
     # mask using bathymetry (I don't think it is necessary, but make nice figures)
-    for i, xx in enumerate(lon_reg):
-        for j,yy in enumerate(lat_reg):
-            if Zitp[j,i] > -10: # remove shallower than 10m
-                V[j,i,:] = np.nan
-
-    # getting bottom temperature
-    print('Getting bottom Temp.')    
-    Sbot = np.full([lat_reg.size,lon_reg.size], np.nan) 
-    for i, xx in enumerate(lon_reg):
-        for j,yy in enumerate(lat_reg):
-            bottom_depth = -Zitp[j,i] # minus to turn positive
-            temp_vec = V[j,i,:]
-            ## idx_no_good = np.argwhere(temp_vec>30)
-            ## if idx_no_good.size:
-            ##     temp_vec[idx_no_good] = np.nan
-            idx_good = np.squeeze(np.where(~np.isnan(temp_vec)))
-            if idx_good.size:
-                idx_closest = np.argmin(np.abs(bottom_depth-z[idx_good]))
-            else:
-                continue
+    V[Zitp > -10, :] = np.nan # remove shallower than 10m
 
-            if np.abs([idx_closest] - bottom_depth) <= 20:
-                Sbot[j,i] = temp_vec[idx_good[idx_closest]]
-            elif np.abs(z[idx_closest] - bottom_depth) <= 50:
-                #print('used data located [30,50]m from bottom')
-                Sbot[j,i] = temp_vec[idx_good[idx_closest]]
+    # getting bottom temperature (closest good bin within 50m of GEBCO depth)
+    print('Getting bottom Temp.')
+    Sbot, Sbot_dist = azg.bottom_values(V, z, -Zitp)
 
     print(' -> Done!')    
 
     
+    # Masks (rasterized once per grid, see get_region_masks)
+    if (lab_mask == True) | (nafo_mask == True):
+        masks = get_region_masks(lon_reg, lat_reg)
+
     # Mask data on coastal Labrador
     if lab_mask == True:
         print('Mask coastal labrador')
-        contour_mask = np.load('/home/cyrf0006/AZMP/state_reports/bottomT/100m_contour_labrador.npy')
-        polygon_mask = Polygon(contour_mask)
-        for i, xx in enumerate(lon_reg):
-            for j,yy in enumerate(lat_reg):
-                point = Point(lon_reg[i], lat_reg[j])
-                if polygon_mask.contains(point): # mask data near Labrador in fall
-                    Sbot[j,i] = np.nan 
-            
+        Sbot[masks['labrador_100m']] = np.nan
+
     # Mask data outside Nafo div.
     if nafo_mask == True:
         print('Mask according to NAFO division for ' + season)
-        # Polygons
-        polygon3K = Polygon(zip(nafo_div['3K']['lon'], nafo_div['3K']['lat']))
-        polygon3L = Polygon(zip(nafo_div['3L']['lon'], nafo_div['3L']['lat']))
-        polygon3N = Polygon(zip(nafo_div['3N']['lon'], nafo_div['3N']['lat']))
-        polygon3O = Polygon(zip(nafo_div['3O']['lon'], nafo_div['3O']['lat']))
-        polygon3Ps = Polygon(zip(nafo_div['3Ps']['lon'], nafo_div['3Ps']['lat']))
-        polygon2J = Polygon(zip(nafo_div['2J']['lon'], nafo_div['2J']['lat']))
-
         if season == 'spring':
-            for i, xx in enumerate(lon_reg):
-                for j,yy in enumerate(lat_reg):
-                    point = Point(lon_reg[i], lat_reg[j])
-                    #if (~polygon3L.contains(point)) & (~polygon3N.contains(point)) & (~polygon3O.contains(point)) & (~polygon3Ps.contains(point)):
-                    if polygon3L.contains(point) | polygon3N.contains(point) | polygon3O.contains(point) | polygon3Ps.contains(point):
-                        pass #nothing to do but cannot implement negative statement "if not" above
-                    else:
-                        Sbot[j,i] = np.nan
-
+            Sbot[~(masks['3L'] | masks['3N'] | masks['3O'] | masks['3Ps'])] = np.nan
         elif season == 'fall':
-            for i, xx in enumerate(lon_reg):
-                for j,yy in enumerate(lat_reg):
-                    point = Point(lon_reg[i], lat_reg[j])
-                    #if (~polygon3L.contains(point)) & (~polygon3N.contains(point)) & (~polygon3O.contains(point)) & (~polygon3Ps.contains(point)):
-                    if polygon2J.contains(point) | polygon3K.contains(point) | polygon3L.contains(point) | polygon3N.contains(point) | polygon3O.contains(point) | polygon3Ps.contains(point):
-                        pass #nothing to do but cannot implement negative statement "if not" above
-                    else:
-                        pass
-                        #Sbot[j,i] = np.nan ### <--------------------- Do not mask the fall!!!!!
-
+            pass # Do not mask the fall!!!!! (would be 2J3KLNOPs)
         else:
             print('no division mask, all data taken')
     else:
@@ -1212,6 +877,7 @@ def get_bottomS(year_file, season, climato_file, nafo_mask=True, lab_mask=True):
     # Fill dict for output
     dict = {}
     dict['Sbot'] = Sbot
+    dict['Sbot_dist'] = Sbot_dist # bottom depth minus depth of the selected bin
     dict['bathy'] = Zitp
     dict['lon_reg'] = lon_reg
     dict['lat_reg'] = lat_reg
@@ -1221,7 +887,7 @@ def get_bottomS(year_file, season, climato_file, nafo_mask=True, lab_mask=True):
 
     return dict
 
-def get_surfT_climato(INFILES, LON_REG,  LAT_REG, year_lims=[1981, 2010], season=[], zlims=[5, 20], dz=5, h5_outputfile=[]):
+def get_surfT_climato(INFILES, LON_REG,  LAT_REG, year_lims=[1981, 2010], season=[], zlims=[5, 20], dz=5, h5_outputfile=[], exclude_gts=True, binned_dir=None):
     """ Generate and returns the climatological surface temperature map from ship observations.
 
     If the pickled filename exists, the function will by-pass the processing and return only saved climatology.
@@ -1265,8 +931,6 @@ def get_surfT_climato(INFILES, LON_REG,  LAT_REG, year_lims=[1981, 2010], season
     else:
 
         ## ---- Region parameters ---- ##
-        #    add_path('/home/cyrf0006/data/GEBCO/')
-        dataFile = '/home/cyrf0006/data/GEBCO/GEBCO_2014_1D.nc' # Maybe find a better way to handle this file
         lonLims = [LON_REG[0], LON_REG[-1]]
         latLims = [LAT_REG[0], LAT_REG[-1]]
         zmin = zlims[0] # do try to compute bottom temp above that depth
@@ -1278,124 +942,20 @@ def get_surfT_climato(INFILES, LON_REG,  LAT_REG, year_lims=[1981, 2010], season
 
         ## ---- Bathymetry ---- ####
         print('Load and grid bathymetry')
-        # Load data
-        dataset = netCDF4.Dataset(dataFile)
-        # Extract variables
-        #x = dataset.variables['x_range'] 
-        #y = dataset.variables['y_range']
-        x = [-179-59.75/60, 179+59.75/60] # to correct bug in 30'' dataset?
-        y = [-89-59.75/60, 89+59.75/60]
-        spacing = dataset.variables['spacing']
-        # Compute Lat/Lon
-        nx = int((x[-1]-x[0])/spacing[0]) + 1  # num pts in x-dir
-        ny = int((y[-1]-y[0])/spacing[1]) + 1  # num pts in y-dir
-        lon = np.linspace(x[0],x[-1],nx)
-        lat = np.linspace(y[0],y[-1],ny)
-        # interpolate data on regular grid (temperature grid)
-        # Reshape data
-        zz = dataset.variables['z']
-        Z = zz[:].reshape(ny, nx)
-        Z = np.flipud(Z) # <------------ important!!!
-        # Reduce data according to Region params
-        idx_lon = np.where((lon>=lonLims[0]) & (lon<=lonLims[1]))
-        idx_lat = np.where((lat>=latLims[0]) & (lat<=latLims[1]))
-        Z = Z[idx_lat[0][0]:idx_lat[0][-1]+1, idx_lon[0][0]:idx_lon[0][-1]+1]
-        lon = lon[idx_lon[0]]
-        lat = lat[idx_lat[0]]
-        # interpolate data on regular grid (temperature grid)
-        lon_grid_bathy, lat_grid_bathy = np.meshgrid(lon,lat)
-        lon_vec_bathy = np.reshape(lon_grid_bathy, lon_grid_bathy.size)
-        lat_vec_bathy = np.reshape(lat_grid_bathy, lat_grid_bathy.size)
-        z_vec = np.reshape(Z, Z.size)
-        Zitp = griddata((lon_vec_bathy, lat_vec_bathy), z_vec, (lon_grid, lat_grid), method='linear')
-        del Z, lon, lat, zz, dataset
+        Zitp = azb.get_bathymetry(lon_reg, lat_reg)
         print(' -> Done!')
 
-        ## ---- Get CTD data --- ##
-        print('Get historical data')
-        ds = xr.open_mfdataset(INFILES)
-        # Selection of a subset region
-        ds = ds.where((ds.longitude>lonLims[0]) & (ds.longitude<lonLims[1]), drop=True)
-        ds = ds.where((ds.latitude>latLims[0]) & (ds.latitude<latLims[1]), drop=True)
-        # Select time (save several options here)
-        if season == 'summer':
-            #ds = ds.sel(time=ds['time.season']=='JJA')
-            ds = ds.sel(time=((ds['time.month']>=7)) & ((ds['time.month']<=9)))
-        elif season == 'spring':
-            #ds = ds.sel(time=ds['time.season']=='MAM')
-            ds = ds.sel(time=((ds['time.month']>=4)) & ((ds['time.month']<=6)))
-        elif season == 'fall':
-            #ds = ds.sel(time=ds['time.season']=='SON')
-            ds = ds.sel(time=((ds['time.month']>=9)) & ((ds['time.month']<=12)))
-        else:
-            print('!! no season specified, used them all! !!')
-
-        # Remome problematic datasets
-        print('!!Remove MEDBA data!!')
-        print('  ---> I Should be improme because I remove good data!!!!')
-        ds = ds.where(ds.instrument_ID!='MEDBA', drop=True)
-        ds = ds.where(ds.instrument_ID!='MEDTE', drop=True)
- 
-            
-        # Time period for climatology
-        ds = ds.sel(time=ds['time.year']>=year_lims[0])
-        ds = ds.sel(time=ds['time.year']<=year_lims[1])
-        # Vertical limitation (for surface; or CIL, for example)
-        ds = ds.sel(level=ds['level']<=zmax*2) #double the search for zmax (restrict later)
-        # Vertical binning (on dataArray; more appropriate here
-        da_temp = ds['temperature']
-        lons = np.array(ds.longitude)
-        lats = np.array(ds.latitude)
-        bins = np.arange(dz/2.0, ds.level.max(), dz)
-        da_temp = da_temp.groupby_bins('level', bins).mean(dim='level')
-        #To Pandas Dataframe
-        df_temp = da_temp.to_pandas()
-        df_temp.columns = bins[0:-1] #rename columns with 'bins'
-        idx_empty_rows = df_temp.isnull().all(1).nonzero()[0]
-        df_temp = df_temp.dropna(axis=0,how='all')
-        lons = np.delete(lons,idx_empty_rows)
-        lats = np.delete(lats,idx_empty_rows)
-        del ds, da_temp
-        print(' -> Done!')        
-
-        ## --- fill 3D cube --- ##  
-        print('Fill regular cube')
-        z = df_temp.columns.values
-        V = np.full((lat_reg.size, lon_reg.size, z.size), np.nan)
+        ## ---- Get CTD data and fill 3D cube (year by year) --- ##
+        print('Get historical data and fill regular cube')
+        V, z, lons, lats = get_climato_cube(INFILES, lon_reg, lat_reg, 'temperature', year_lims, season, zmax*2, dz, exclude_gts, binned_dir=binned_dir)
+        print(' -> Done!')
 
-        # Aggregate on regular grid
-        for i, xx in enumerate(lon_reg):
-            for j, yy in enumerate(lat_reg):    
-                idx = np.where((lons>=xx-dc/2) & (lons<xx+dc/2) & (lats>=yy-dc/2) & (lats<yy+dc/2))
-                tmp = np.array(df_temp.iloc[idx].mean(axis=0))
-                idx_good = np.argwhere((~np.isnan(tmp)) & (tmp<30))
-                if np.size(idx_good)==1:
-                    V[j,i,:] = np.array(df_temp.iloc[idx].mean(axis=0))
-                elif np.size(idx_good)>1: # vertical interpolation between pts
-                    interp = interp1d(np.squeeze(z[idx_good]), np.squeeze(tmp[idx_good]))
-                    idx_interp = np.arange(np.int(idx_good[0]),np.int(idx_good[-1]+1))
-                    V[j,i,idx_interp] = interp(z[idx_interp]) # interpolate only where possible (1st to last good idx)
-
-
-        # horiozntal interpolation at each depth
-        lon_grid, lat_grid = np.meshgrid(lon_reg,lat_reg)
-        lon_vec = np.reshape(lon_grid, lon_grid.size)
-        lat_vec = np.reshape(lat_grid, lat_grid.size)
-        for k, zz in enumerate(z):
-            # Meshgrid 1D data (after removing NaNs)
-            tmp_grid = V[:,:,k]
-            tmp_vec = np.reshape(tmp_grid, tmp_grid.size)
-            #print 'interpolate depth layer ' + np.str(k) + ' / ' + np.str(z.size) 
-            # griddata (after removing nans)
-            idx_good = np.argwhere(~np.isnan(tmp_vec))
-            if idx_good.size>10: # will ignore depth where no data exist
-                LN = np.squeeze(lon_vec[idx_good])
-                LT = np.squeeze(lat_vec[idx_good])
-                TT = np.squeeze(tmp_vec[idx_good])
-                zi = griddata((LN, LT), TT, (lon_grid, lat_grid), method='linear')
-                V[:,:,k] = zi
-            else:
-                continue
+        # vertical interpolation between pts (only between 1st and last good idx)
+        V = azg.fill_vertical_gaps(V, z, vmax=30)
+
+
+        # horizontal interpolation at each depth (one triangulation per set of valid cells)
+        V = azg.interp_levels(V, lon_reg, lat_reg, min_pts=10)
         print(' -> Done!')    
 
         # mask using bathymetry
@@ -1438,7 +998,7 @@ def get_surfT_climato(INFILES, LON_REG,  LAT_REG, year_lims=[1981, 2010], season
     
     return dict
 
-def get_cilT_climato(INFILES, LON_REG,  LAT_REG, year_lims=[1981, 2010], season=[], zlims=[5, 500], dz=5, h5_outputfile=[]):
+def get_cilT_climato(INFILES, LON_REG,  LAT_REG, year_lims=[1981, 2010], season=[], zlims=[5, 500], dz=5, h5_outputfile=[], exclude_gts=True, binned_dir=None):
     """ Generate and returns the climatological surface temperature map from ship observations.
 
     If the pickled filename exists, the function will by-pass the processing and return only saved climatology.
@@ -1482,8 +1042,6 @@ def get_cilT_climato(INFILES, LON_REG,  LAT_REG, year_lims=[1981, 2010], season=
     else:
 
         ## ---- Region parameters ---- ##
-        #    add_path('/home/cyrf0006/data/GEBCO/')
-        dataFile = '/home/cyrf0006/data/GEBCO/GEBCO_2014_1D.nc' # Maybe find a better way to handle this file
         lonLims = [LON_REG[0], LON_REG[-1]]
         latLims = [LAT_REG[0], LAT_REG[-1]]
         zmin = zlims[0] # do try to compute bottom temp above that depth
@@ -1495,124 +1053,20 @@ def get_cilT_climato(INFILES, LON_REG,  LAT_REG, year_lims=[1981, 2010], season=
 
         ## ---- Bathymetry ---- ####
         print('Load and grid bathymetry')
-        # Load data
-        dataset = netCDF4.Dataset(dataFile)
-        # Extract variables
-        #x = dataset.variables['x_range'] 
-        #y = dataset.variables['y_range']
-        x = [-179-59.75/60, 179+59.75/60] # to correct bug in 30'' dataset?
-        y = [-89-59.75/60, 89+59.75/60]
-        spacing = dataset.variables['spacing']
-        # Compute Lat/Lon
-        nx = int((x[-1]-x[0])/spacing[0]) + 1  # num pts in x-dir
-        ny = int((y[-1]-y[0])/spacing[1]) + 1  # num pts in y-dir
-        lon = np.linspace(x[0],x[-1],nx)
-        lat = np.linspace(y[0],y[-1],ny)
-        # interpolate data on regular grid (temperature grid)
-        # Reshape data
-        zz = dataset.variables['z']
-        Z = zz[:].reshape(ny, nx)
-        Z = np.flipud(Z) # <------------ important!!!
-        # Reduce data according to Region params
-        idx_lon = np.where((lon>=lonLims[0]) & (lon<=lonLims[1]))
-        idx_lat = np.where((lat>=latLims[0]) & (lat<=latLims[1]))
-        Z = Z[idx_lat[0][0]:idx_lat[0][-1]+1, idx_lon[0][0]:idx_lon[0][-1]+1]
-        lon = lon[idx_lon[0]]
-        lat = lat[idx_lat[0]]
-        # interpolate data on regular grid (temperature grid)
-        lon_grid_bathy, lat_grid_bathy = np.meshgrid(lon,lat)
-        lon_vec_bathy = np.reshape(lon_grid_bathy, lon_grid_bathy.size)
-        lat_vec_bathy = np.reshape(lat_grid_bathy, lat_grid_bathy.size)
-        z_vec = np.reshape(Z, Z.size)
-        Zitp = griddata((lon_vec_bathy, lat_vec_bathy), z_vec, (lon_grid, lat_grid), method='linear')
-        del Z, lon, lat, zz, dataset
+        Zitp = azb.get_bathymetry(lon_reg, lat_reg)
         print(' -> Done!')
 
-        ## ---- Get CTD data --- ##
-        print('Get historical data')
-        ds = xr.open_mfdataset(INFILES)
-        # Selection of a subset region
-        ds = ds.where((ds.longitude>lonLims[0]) & (ds.longitude<lonLims[1]), drop=True)
-        ds = ds.where((ds.latitude>latLims[0]) & (ds.latitude<latLims[1]), drop=True)
-        # Select time (save several options here)
-        if season == 'summer':
-            #ds = ds.sel(time=ds['time.season']=='JJA')
-            ds = ds.sel(time=((ds['time.month']>=7)) & ((ds['time.month']<=9)))
-        elif season == 'spring':
-            #ds = ds.sel(time=ds['time.season']=='MAM')
-            ds = ds.sel(time=((ds['time.month']>=4)) & ((ds['time.month']<=6)))
-        elif season == 'fall':
-            #ds = ds.sel(time=ds['time.season']=='SON')
-            ds = ds.sel(time=((ds['time.month']>=9)) & ((ds['time.month']<=12)))
-        else:
-            print('!! no season specified, used them all! !!')
-
-        # Remome problematic datasets
-        print('!!Remove MEDBA data!!')
-        print('  ---> I Should be improme because I remove good data!!!!')
-        ds = ds.where(ds.instrument_ID!='MEDBA', drop=True)
-        ds = ds.where(ds.instrument_ID!='MEDTE', drop=True)
- 
-            
-        # Time period for climatology
-        ds = ds.sel(time=ds['time.year']>=year_lims[0])
-        ds = ds.sel(time=ds['time.year']<=year_lims[1])
-        # Vertical limitation (for surface; or CIL, for example)
-        ds = ds.sel(level=ds['level']<=zmax) #double the search for zmax (restrict later)
-        # Vertical binning (on dataArray; more appropriate here
-        da_temp = ds['temperature']
-        lons = np.array(ds.longitude)
-        lats = np.array(ds.latitude)
-        bins = np.arange(dz/2.0, ds.level.max(), dz)
-        da_temp = da_temp.groupby_bins('level', bins).mean(dim='level')
-        #To Pandas Dataframe
-        df_temp = da_temp.to_pandas()
-        df_temp.columns = bins[0:-1] #rename columns with 'bins'
-        idx_empty_rows = df_temp.isnull().all(1).nonzero()[0]
-        df_temp = df_temp.dropna(axis=0,how='all')
-        lons = np.delete(lons,idx_empty_rows)
-        lats = np.delete(lats,idx_empty_rows)
-        del ds, da_temp
-        print(' -> Done!')        
-
-        ## --- fill 3D cube --- ##  
-        print('Fill regular cube')
-        z = df_temp.columns.values
-        V = np.full((lat_reg.size, lon_reg.size, z.size), np.nan)
+        ## ---- Get CTD data and fill 3D cube (year by year) --- ##
+        print('Get historical data and fill regular cube')
+        V, z, lons, lats = get_climato_cube(INFILES, lon_reg, lat_reg, 'temperature', year_lims, season, zmax, dz, exclude_gts, binned_dir=binned_dir)
+        print(' -> Done!')
 
-        # Aggregate on regular grid
-        for i, xx in enumerate(lon_reg):
-            for j, yy in enumerate(lat_reg):    
-                idx = np.where((lons>=xx-dc/2) & (lons<xx+dc/2) & (lats>=yy-dc/2) & (lats<yy+dc/2))
-                tmp = np.array(df_temp.iloc[idx].mean(axis=0))
-                idx_good = np.argwhere((~np.isnan(tmp)) & (tmp<30))
-                if np.size(idx_good)==1:
-                    V[j,i,:] = np.array(df_temp.iloc[idx].mean(axis=0))
-                elif np.size(idx_good)>1: # vertical interpolation between pts
-                    interp = interp1d(np.squeeze(z[idx_good]), np.squeeze(tmp[idx_good]))
-                    idx_interp = np.arange(np.int(idx_good[0]),np.int(idx_good[-1]+1))
-                    V[j,i,idx_interp] = interp(z[idx_interp]) # interpolate only where possible (1st to last good idx)
-
-
-        # horiozntal interpolation at each depth
-        lon_grid, lat_grid = np.meshgrid(lon_reg,lat_reg)
-        lon_vec = np.reshape(lon_grid, lon_grid.size)
-        lat_vec = np.reshape(lat_grid, lat_grid.size)
-        for k, zz in enumerate(z):
-            # Meshgrid 1D data (after removing NaNs)
-            tmp_grid = V[:,:,k]
-            tmp_vec = np.reshape(tmp_grid, tmp_grid.size)
-            #print 'interpolate depth layer ' + np.str(k) + ' / ' + np.str(z.size) 
-            # griddata (after removing nans)
-            idx_good = np.argwhere(~np.isnan(tmp_vec))
-            if idx_good.size>10: # will ignore depth where no data exist
-                LN = np.squeeze(lon_vec[idx_good])
-                LT = np.squeeze(lat_vec[idx_good])
-                TT = np.squeeze(tmp_vec[idx_good])
-                zi = griddata((LN, LT), TT, (lon_grid, lat_grid), method='linear')
-                V[:,:,k] = zi
-            else:
-                continue
+        # vertical interpolation between pts (only between 1st and last good idx)
+        V = azg.fill_vertical_gaps(V, z, vmax=30)
+
+
+        # horizontal interpolation at each depth (one triangulation per set of valid cells)
+        V = azg.interp_levels(V, lon_reg, lat_reg, min_pts=10)
         print(' -> Done!')    
 
         # mask using bathymetry
@@ -1745,6 +1199,20 @@ def Tbot_to_GIS_ascii(h5file, ascfile):
     np.savetxt(ascfile, Tbot_flip, delimiter=" ", header=header, fmt='%5.2f', comments='')
 
     
+def get_pixel_area(lon_reg, lat_reg):
+    """ Area [km2] of each pixel (lat_reg.size x lon_reg.size) of the regular grid lon_reg/lat_reg.
+
+    Pixels get smaller toward the north, so areas are computed for each latitude row
+    (see azmp_grid_tools.cell_area) instead of using the mean pixel area of the bounding box.
+    The grid is computed once and reused by all stats functions.
+
+    Usage ex:
+    import azmp_utils as azu
+    pixel_area = azu.get_pixel_area(lon_reg, lat_reg)
+
+    """
+    return azg.cell_area(lon_reg, lat_reg)
+
 def polygon_temperature_stats(dict, shape):
     """ to compute some stats about temperature in nafo sub-division
     (e.g., to build ResDoc Scorecards)
@@ -1762,6 +1230,10 @@ def polygon_temperature_stats(dict, shape):
     new_shape = cascaded_union(shape_3LNO)
     dict = azu.polygon_temperature_stats(Tdict, new_shape)
 
+    OR (faster, with masks rasterized once per grid)
+    masks = azu.get_region_masks(Tdict['lon_reg'], Tdict['lat_reg'])
+    dict = azu.polygon_temperature_stats(Tdict, masks['3L'] | masks['3N'] | masks['3O'])
+
     But the stats can be computed on any polygon (cf. shrimp's SFA aras)    
     """
 
@@ -1772,58 +1244,76 @@ def polygon_temperature_stats(dict, shape):
     lat_reg = dict['lat_reg']
 
     # derive mean pixel area
-    obj = {'type':'Polygon','coordinates':[[[lon_reg[0],lat_reg[0]],[lon_reg[0],lat_reg[-1]],[lon_reg[-1],lat_reg[-1]],[lon_reg[-1],lat_reg[0]],[lon_reg[0],lat_reg[0]]]]}
-    pixel_area = area(obj)/1e6/map.size
+    pixel_area = get_pixel_area(lon_reg, lat_reg)
     
     # select data in polygon
-    data_vec = []
-    bathy_vec = []
-    for i, xx in enumerate(lon_reg):
-        for j,yy in enumerate(lat_reg):
-            point = Point(lon_reg[i], lat_reg[j])            
-            if shape.contains(point):
-                data_vec = np.append(data_vec, map[j,i])
-                bathy_vec = np.append(bathy_vec, bathy[j,i])
-            else:                
-                pass
+    if isinstance(shape, np.ndarray): # mask already rasterized (see get_region_masks)
+        mask = shape
+    else:
+        mask = azg.polygon_mask(lon_reg, lat_reg, shape)
 
-    # remove nans            
-    bathy_vec = bathy_vec[~np.isnan(data_vec)]
-    data_vec = data_vec[~np.isnan(data_vec)]
-    
-    # mean temperature all polygon
-    Tmean = data_vec.mean()
+    # Same computation as for many years / divisions
+    df = polygon_temperature_stats_batch(map, bathy, {'polygon' : mask}, pixel_area)['polygon']
 
-    # mean temperature at depth shallower than 100m, 200m, 300m
-    Tmean100 = data_vec[bathy_vec>=-100].mean()
-    Tmean200 = data_vec[bathy_vec>=-200].mean()
-    Tmean300 = data_vec[bathy_vec>=-300].mean()
-    
-    # area with temperature < 0
-    area_colder_0deg = data_vec[data_vec<=0].size*pixel_area
-    # area with temperature < 1
-    area_colder_1deg = data_vec[data_vec<=1].size*pixel_area        
-    # area with temperature > 2
-    area_warmer_2deg = data_vec[data_vec>=2].size*pixel_area
-    # area with temperature > 2 & < 4 (shrimp habitat)
-    area_shrimp = data_vec[(data_vec>=2) & (data_vec<=4)].size*pixel_area
-    # area with temperature < 2 (crab habitat)
-    area_colder_2deg = data_vec[data_vec<=2].size*pixel_area
-    # % area with temperature < 2 (crab habitat)
-    area_colder_2deg_perc = area_colder_2deg/(data_vec.size*pixel_area)*100.0
-          
     # Fill dict for output
+    return df.iloc[0].to_dict()
+
+def polygon_temperature_stats_batch(Tbot, bathy, masks, pixel_area, index=None):
+    """ Same stats as polygon_temperature_stats(), but for a stack of bottom temperature maps
+    (e.g. all years) and many masks (e.g. all NAFO divisions) at once.
+
+    The masked sums and pixel counts of every metric are matrix products between the
+    (year x pixel) and (mask x pixel) arrays, so no polygon test or loop on pixels is needed.
+
+    Input:
+    Tbot - bottom temperature (nyears x lat_reg.size x lon_reg.size), or a single map
+    bathy - bathymetry (lat_reg.size x lon_reg.size), negative below sea level
+    masks - dict of boolean masks (e.g. from get_region_masks())
+    pixel_area - area of each pixel [km2] (scalar or lat_reg.size x lon_reg.size)
+    index - index of the output DataFrames (e.g. years), default 0..nyears-1
+
+    Output:
+    dict of DataFrames (one per mask, same keys) with one row per map and the columns
+    of polygon_temperature_stats() (Tmean, Tmean_sha100, ..., area_colder2_perc).
+
+    Usage ex:
+    import azmp_utils as azu
+    masks = azu.get_region_masks(lon_reg, lat_reg)
+    shapes = {'3LNO' : masks['3L'] | masks['3N'] | masks['3O'], '3Ps' : masks['3Ps']}
+    stats = azu.polygon_temperature_stats_batch(Tbot_stack, Zitp, shapes, pixel_area, index=years)
+    stats['3LNO'].area_colder0
+
+    """
+    names = list(masks.keys())
+    T = np.asarray(Tbot, dtype=float)
+    T = T.reshape(-1, T.shape[-2]*T.shape[-1]) # years x pixels
+    M = np.array([np.ravel(masks[name]) for name in names], dtype=float) # masks x pixels
+    A = M * np.ravel(np.broadcast_to(pixel_area, np.shape(bathy))) # area of each pixel in masks
+    bathy_vec = np.ravel(bathy)
+
+    valid = ~np.isnan(T)
+    T0 = np.where(valid, T, 0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # mean temperature all polygon
+        stats = {}
+        stats['Tmean'] = (T0 @ M.T) / (valid @ M.T)
+        # mean temperature at depth shallower than 100m, 200m, 300m
+        for zlim in [100, 200, 300]:
+            sel = valid & (bathy_vec>=-zlim)
+            stats['Tmean_sha' + str(zlim)] = ((T0*sel) @ M.T) / (sel @ M.T)
+        # areas where conditions on temperature are met
+        stats['area_colder0'] = (valid & (T<=0)) @ A.T # <--- now in km2. They are divisded by 1000 in scorecard.
+        stats['area_colder1'] = (valid & (T<=1)) @ A.T
+        stats['area_warmer2'] = (valid & (T>=2)) @ A.T
+        stats['area_shrimp'] = (valid & (T>=2) & (T<=4)) @ A.T # (shrimp habitat)
+        stats['area_colder2'] = (valid & (T<=2)) @ A.T # (crab habitat)
+        stats['area_colder2_perc'] = stats['area_colder2'] / (valid @ A.T) * 100.0
+
+    if index is None:
+        index = np.arange(T.shape[0])
     dict = {}
-    dict['Tmean'] = Tmean
-    dict['Tmean_sha100'] = Tmean100
-    dict['Tmean_sha200'] = Tmean200
-    dict['Tmean_sha300'] = Tmean300
-    dict['area_colder0'] = area_colder_0deg # <--- now in km2. They are divisded by 1000 in scorecard.
-    dict['area_colder1'] = area_colder_1deg 
-    dict['area_warmer2'] = area_warmer_2deg
-    dict['area_shrimp'] = area_shrimp
-    dict['area_colder2'] = area_colder_2deg 
-    dict['area_colder2_perc'] = area_colder_2deg_perc 
+    for k, name in enumerate(names):
+        dict[name] = pd.DataFrame({key : stats[key][:,k] for key in stats.keys()}, index=index)
 
     return dict
 
@@ -1842,20 +1332,15 @@ def polygon_salinity_stats(dict, shape):
     lat_reg = dict['lat_reg']
 
     # derive mean pixel area
-    obj = {'type':'Polygon','coordinates':[[[lon_reg[0],lat_reg[0]],[lon_reg[0],lat_reg[-1]],[lon_reg[-1],lat_reg[-1]],[lon_reg[-1],lat_reg[0]],[lon_reg[0],lat_reg[0]]]]}
-    pixel_area = area(obj)/1e6/map.size
+    pixel_area = get_pixel_area(lon_reg, lat_reg)
     
     # select data in polygon
-    data_vec = []
-    bathy_vec = []
-    for i, xx in enumerate(lon_reg):
-        for j,yy in enumerate(lat_reg):
-            point = Point(lon_reg[i], lat_reg[j])            
-            if shape.contains(point):
-                data_vec = np.append(data_vec, map[j,i])
-                bathy_vec = np.append(bathy_vec, bathy[j,i])
-            else:                
-                pass
+    if isinstance(shape, np.ndarray): # mask already rasterized (see get_region_masks)
+        idx_in = shape
+    else:
+        idx_in = azg.polygon_mask(lon_reg, lat_reg, shape)
+    data_vec = map[idx_in]
+    bathy_vec = bathy[idx_in]
 
     # remove nans            
     bathy_vec = bathy_vec[~np.isnan(data_vec)]
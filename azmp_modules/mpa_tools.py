@@ -25,11 +25,12 @@ from mpl_toolkits.basemap import Basemap
 from scipy.interpolate import griddata
 from scipy.interpolate import interp1d
 # Shaping tools
-from shapely.geometry import Point
 from shapely.geometry.polygon import Polygon
 from shapely.ops import cascaded_union
 ## AZMP custom imports
 import azmp_utils as azu
+import azmp_grid_tools as azg
+import azmp_catalog_tools as azc
 ## for scorecards
 import unicodedata
 from matplotlib.colors import from_levels_and_colors
@@ -106,8 +107,47 @@ def get_closures(name='mpas'):
             #print(rec)
             mpas[rec[0]] = np.array(shapes[idx].points)            
     return mpas
+
+def casts_in_closures(lons, lats, closure_scenario, mpas, nafo_seamounts, nafo_coral, nafo_3O=None):
+    """ Will return a boolean array, True for the casts (lons, lats) inside the closures of the scenario:
+
+    '1' - group A (DFO closures 5, 6, 7, 35, NAFO 3O if given, seamounts and coral/sponge closures)
+    '2' - group B (DFO closure 15)
+    '3' - groups A & B
+    '4' - groups A, B & C (DFO closures 9 and 14)
+    other (e.g. 'reference') - no closures
+
+    mpas, nafo_seamounts, nafo_coral, nafo_3O are the dict returned by get_closures().
+    All casts are tested at once for each closure (azmp_grid_tools.points_in_polygon).
+
+    Usage ex:
+    import mpa_tools as mpa
+    mpas = mpa.get_closures()
+    nafo_seamounts = mpa.get_closures(name='nafo_seamounts')
+    nafo_coral = mpa.get_closures(name='nafo_coral')
+    idx_toremove = np.where(mpa.casts_in_closures(lons, lats, '4', mpas, nafo_seamounts, nafo_coral))[0]
+
+    """
+    groups = {'1' : ['A'], '2' : ['B'], '3' : ['A', 'B'], '4' : ['A', 'B', 'C']}
+    inside = np.zeros(np.size(lons), dtype=bool)
+    if closure_scenario not in groups.keys():
+        return inside
+
+    closures = {}
+    closures['A'] = [mpas[5], mpas[6], mpas[7], mpas[35]]
+    if nafo_3O is not None:
+        closures['A'] = closures['A'] + [nafo_3O[0]]
+    closures['A'] = closures['A'] + [nafo_seamounts[key] for key in range(1, 7)] + [nafo_coral[key] for key in range(1, 14)]
+    closures['B'] = [mpas[15]]
+    closures['C'] = [mpas[9], mpas[14]]
+
+    for group in groups[closure_scenario]:
+        for polygon in closures[group]:
+            inside = inside | azg.points_in_polygon(lons, lats, polygon)
+
+    return inside
         
-def bottom_temperature(season, year, zmin=0, zmax=1000, dz=5, proj='merc', netcdf_path='/home/cyrf0006/data/dev_database/netCDF/', climato_file='', closure_scenario = '4'):
+def bottom_temperature(season, year, zmin=0, zmax=1000, dz=5, proj='merc', netcdf_path='/home/cyrf0006/data/dev_database/netCDF/', climato_file='', closure_scenario = '4', exclude_gts=True):
 
     '''
     Closed area groupings:
@@ -178,24 +218,16 @@ def bottom_temperature(season, year, zmin=0, zmax=1000, dz=5, proj='merc', netcd
     ## ---- Get CTD data --- ##
     print('Get ' + year_file)
     ds = xr.open_dataset(year_file)
-    # Remome problematic datasets
-    print('!!Remove MEDBA data!!')
-    print('  ---> I Should be improme because I remove good data!!!!')
-    ds = ds.where(ds.instrument_ID!='MEDBA', drop=True)
-    ds = ds.where(ds.instrument_ID!='MEDTE', drop=True)
+    # Remome GTS datasets (BATHY & TESAC messages, removed by index)
+    if exclude_gts:
+        print('!!Remove MEDBA & MEDTE data!!')
+        ds = azc.remove_gts(ds)
 
     # Selection of a subset region
     ds = ds.where((ds.longitude>lonLims[0]) & (ds.longitude<lonLims[1]), drop=True)
     ds = ds.where((ds.latitude>latLims[0]) & (ds.latitude<latLims[1]), drop=True)
-    # Select time (save several options here)
-    if season == 'summer':
-        ds = ds.sel(time=((ds['time.month']>=6)) & ((ds['time.month']<=9)))
-    elif season == 'spring':
-        ds = ds.sel(time=((ds['time.month']>=4)) & ((ds['time.month']<=6)))
-    elif season == 'fall':
-        ds = ds.sel(time=((ds['time.month']>=9)) & ((ds['time.month']<=12)))
-    else:
-        print('!! no season specified, used them all! !!')
+    # Select season (see azmp_catalog_tools.SEASONS)
+    ds = azc.select_season(ds, season)
 
     # Vertical binning (on dataArray; more appropriate here)
     da_temp = ds['temperature']
@@ -221,63 +253,10 @@ def bottom_temperature(season, year, zmin=0, zmax=1000, dz=5, proj='merc', netcd
 
     ## ---- Real difference to traditional bottom_temp. ----#
     print('Apply masks for closures scenario: ' + closure_scenario)
-    # DFO closures
-    polygon5 = Polygon(zip(mpas[5][:,0], mpas[5][:,1]))
-    polygon6 = Polygon(zip(mpas[6][:,0], mpas[6][:,1]))
-    polygon7 = Polygon(zip(mpas[7][:,0], mpas[7][:,1]))
-    polygon35 = Polygon(zip(mpas[35][:,0], mpas[35][:,1]))
-    polygon15 = Polygon(zip(mpas[15][:,0], mpas[15][:,1]))
-    polygon9 = Polygon(zip(mpas[9][:,0], mpas[9][:,1]))
-    polygon14 = Polygon(zip(mpas[14][:,0], mpas[14][:,1]))
-    # NAFO 3O
-    polygon_n3O = Polygon(zip(nafo_3O[0][:,0], nafo_3O[0][:,1]))
-    # NAFO seamounts
-    polygon_ns1 = Polygon(zip(nafo_seamounts[1][:,0], nafo_seamounts[1][:,1]))
-    polygon_ns2 = Polygon(zip(nafo_seamounts[2][:,0], nafo_seamounts[2][:,1]))
-    polygon_ns3 = Polygon(zip(nafo_seamounts[3][:,0], nafo_seamounts[3][:,1]))
-    polygon_ns4 = Polygon(zip(nafo_seamounts[4][:,0], nafo_seamounts[4][:,1]))
-    polygon_ns5 = Polygon(zip(nafo_seamounts[5][:,0], nafo_seamounts[5][:,1]))
-    polygon_ns6 = Polygon(zip(nafo_seamounts[6][:,0], nafo_seamounts[6][:,1]))
-    # NAFO Coral and Sponges
-    polygon_nc1 = Polygon(zip(nafo_coral[1][:,0], nafo_coral[1][:,1]))
-    polygon_nc2 = Polygon(zip(nafo_coral[2][:,0], nafo_coral[2][:,1]))
-    polygon_nc3 = Polygon(zip(nafo_coral[3][:,0], nafo_coral[3][:,1]))
-    polygon_nc4 = Polygon(zip(nafo_coral[4][:,0], nafo_coral[4][:,1]))
-    polygon_nc5 = Polygon(zip(nafo_coral[5][:,0], nafo_coral[5][:,1]))
-    polygon_nc6 = Polygon(zip(nafo_coral[6][:,0], nafo_coral[6][:,1]))
-    polygon_nc7 = Polygon(zip(nafo_coral[7][:,0], nafo_coral[7][:,1]))
-    polygon_nc8 = Polygon(zip(nafo_coral[8][:,0], nafo_coral[8][:,1]))
-    polygon_nc9 = Polygon(zip(nafo_coral[9][:,0], nafo_coral[9][:,1]))
-    polygon_nc10 = Polygon(zip(nafo_coral[10][:,0], nafo_coral[10][:,1]))
-    polygon_nc11 = Polygon(zip(nafo_coral[11][:,0], nafo_coral[11][:,1]))
-    polygon_nc12 = Polygon(zip(nafo_coral[12][:,0], nafo_coral[12][:,1]))
-    polygon_nc13 = Polygon(zip(nafo_coral[13][:,0], nafo_coral[13][:,1]))
-
-    idx_toremove = []
-    for i, lat in enumerate(lats):
-        if (df_comments[i] == '') | (('set' in df_comments[i]) | ('unsucces' in df_comments[i])): # check if string "set" or "unsucces" is there or comments is empty
-        
-            point = Point(lons[i], lats[i])
-            if closure_scenario == '1': # Remove A only
-                if polygon5.contains(point) | polygon6.contains(point) | polygon7.contains(point) | polygon35.contains(point) | polygon_n3O.contains(point) | polygon_ns1.contains(point) | polygon_ns2.contains(point) |  polygon_ns3.contains(point) | polygon_ns4.contains(point) | polygon_ns5.contains(point) | polygon_ns6.contains(point) | polygon_nc1.contains(point) | polygon_nc2.contains(point) | polygon_nc3.contains(point) | polygon_nc4.contains(point) | polygon_nc5.contains(point) | polygon_nc6.contains(point) | polygon_nc7.contains(point) | polygon_nc8.contains(point) | polygon_nc9.contains(point) | polygon_nc10.contains(point) | polygon_nc11.contains(point) | polygon_nc12.contains(point) | polygon_nc13.contains(point):
-
-                    idx_toremove.append(i)
-
-            elif closure_scenario == '2': # Remove B only
-                if polygon15.contains(point):
-
-                    idx_toremove.append(i)
+    # check if string "set" or "unsucces" is there or comments is empty
+    is_set = (df_comments.values == '') | df_comments.str.contains('set', regex=False, na=False).values | df_comments.str.contains('unsucces', regex=False, na=False).values
+    idx_toremove = np.where(is_set & casts_in_closures(lons, lats, closure_scenario, mpas, nafo_seamounts, nafo_coral, nafo_3O))[0]
 
-            elif closure_scenario == '3': # Remove A & B
-                if polygon5.contains(point) | polygon6.contains(point) | polygon7.contains(point) | polygon35.contains(point) | polygon_n3O.contains(point) | polygon_ns1.contains(point) | polygon_ns2.contains(point) |  polygon_ns3.contains(point) | polygon_ns4.contains(point) | polygon_ns5.contains(point) | polygon_ns6.contains(point) | polygon_nc1.contains(point) | polygon_nc2.contains(point) | polygon_nc3.contains(point) | polygon_nc4.contains(point) | polygon_nc5.contains(point) | polygon_nc6.contains(point) | polygon_nc7.contains(point) | polygon_nc8.contains(point) | polygon_nc9.contains(point) | polygon_nc10.contains(point) | polygon_nc11.contains(point) | polygon_nc12.contains(point) | polygon_nc13.contains(point) | polygon15.contains(point):
-
-                    idx_toremove.append(i)
-
-            elif closure_scenario == '4': # Remove A, B & C
-                if polygon5.contains(point) | polygon6.contains(point) | polygon7.contains(point) | polygon35.contains(point) | polygon_n3O.contains(point) | polygon_ns1.contains(point) | polygon_ns2.contains(point) |  polygon_ns3.contains(point) | polygon_ns4.contains(point) | polygon_ns5.contains(point) | polygon_ns6.contains(point) | polygon_nc1.contains(point) | polygon_nc2.contains(point) | polygon_nc3.contains(point) | polygon_nc4.contains(point) | polygon_nc5.contains(point) | polygon_nc6.contains(point) | polygon_nc7.contains(point) | polygon_nc8.contains(point) | polygon_nc9.contains(point) | polygon_nc10.contains(point) | polygon_nc11.contains(point) | polygon_nc12.contains(point) | polygon_nc13.contains(point) | polygon15.contains(point) | polygon9.contains(point) | polygon14.contains(point) :
-
-                    idx_toremove.append(i)
-                
     # Drop now
     df_temp.drop(df_temp.index[idx_toremove], inplace=True) 
     lons = np.delete(lons,idx_toremove)
@@ -286,113 +265,38 @@ def bottom_temperature(season, year, zmin=0, zmax=1000, dz=5, proj='merc', netcd
     ## --- fill 3D cube --- ##  
     print('Fill regular cube')
     z = df_temp.columns.values
-    V = np.full((lat_reg.size, lon_reg.size, z.size), np.nan)
-
-    # Aggregate on regular grid
-    for i, xx in enumerate(lon_reg):
-        for j, yy in enumerate(lat_reg):    
-            idx = np.where((lons>=xx-dc/2) & (lons<xx+dc/2) & (lats>=yy-dc/2) & (lats<yy+dc/2))
-            tmp = np.array(df_temp.iloc[idx].mean(axis=0))
-            idx_good = np.argwhere((~np.isnan(tmp)) & (tmp<30))
-            if np.size(idx_good)==1:
-                V[j,i,:] = np.array(df_temp.iloc[idx].mean(axis=0))
-            elif np.size(idx_good)>1: # vertical interpolation between pts
-                interp = interp1d(np.squeeze(z[idx_good]), np.squeeze(tmp[idx_good]))
-                idx_interp = np.arange(np.int(idx_good[0]),np.int(idx_good[-1]+1))
-                V[j,i,idx_interp] = interp(z[idx_interp]) # interpolate only where possible (1st to last good idx)
-
-    # horizontal interpolation at each depth
-    lon_grid, lat_grid = np.meshgrid(lon_reg,lat_reg)
-    lon_vec = np.reshape(lon_grid, lon_grid.size)
-    lat_vec = np.reshape(lat_grid, lat_grid.size)
-    for k, zz in enumerate(z):
-        # Meshgrid 1D data (after removing NaNs)
-        tmp_grid = V[:,:,k]
-        tmp_vec = np.reshape(tmp_grid, tmp_grid.size)
-        # griddata (after removing nans)
-        idx_good = np.argwhere(~np.isnan(tmp_vec))
-        if idx_good.size > 5: # will ignore depth where no data exist
-            LN = np.squeeze(lon_vec[idx_good])
-            LT = np.squeeze(lat_vec[idx_good])
-            TT = np.squeeze(tmp_vec[idx_good])
-            zi = griddata((LN, LT), TT, (lon_grid, lat_grid), method='linear')
-            V[:,:,k] = zi
-        else:
-            continue
+    # Aggregate on regular grid (all casts at once)
+    V = azg.bin_casts_to_grid(lons, lats, df_temp.values, lon_reg, lat_reg)
+    # vertical interpolation between pts (only between 1st and last good idx)
+    V = azg.fill_vertical_gaps(V, z, vmax=30)
+
+    # horizontal interpolation at each depth (one triangulation per set of valid cells)
+    V = azg.interp_levels(V, lon_reg, lat_reg, min_pts=5)
     print(' -> Done!')    
 
     # mask using bathymetry (I don't think it is necessary, but make nice figures)
-    for i, xx in enumerate(lon_reg):
-        for j,yy in enumerate(lat_reg):
-            if Zitp[j,i] > -10: # remove shallower than 10m
-                V[j,i,:] = np.nan
-
-    # getting bottom temperature
-    print('Getting bottom Temp.')    
-    Tbot = np.full([lat_reg.size,lon_reg.size], np.nan) 
-    for i, xx in enumerate(lon_reg):
-        for j,yy in enumerate(lat_reg):
-            bottom_depth = -Zitp[j,i] # minus to turn positive
-            temp_vec = V[j,i,:]
-            idx_good = np.squeeze(np.where(~np.isnan(temp_vec)))
-            if idx_good.size:
-                idx_closest = np.argmin(np.abs(bottom_depth-z[idx_good]))
-            else:
-                continue
+    V[Zitp > -10, :] = np.nan # remove shallower than 10m
 
-            if np.abs([idx_closest] - bottom_depth) <= 20:
-                Tbot[j,i] = temp_vec[idx_good[idx_closest]]
-            elif np.abs(z[idx_closest] - bottom_depth) <= 50:
-                #print('used data located [30,50]m from bottom')
-                Tbot[j,i] = temp_vec[idx_good[idx_closest]]
+    # getting bottom temperature (closest good bin within 50m of GEBCO depth)
+    print('Getting bottom Temp.')
+    Tbot, Tbot_dist = azg.bottom_values(V, z, -Zitp)
 
     print(' -> Done!')    
 
-    # Mask data outside Nafo div.
+    # Mask data outside Nafo div. (masks rasterized once per grid, see azu.get_region_masks)
     print('Mask according to NAFO division for ' + season)
-    # Polygons
-    polygon4R = Polygon(zip(nafo_div['4R']['lon'], nafo_div['4R']['lat']))
-    polygon3K = Polygon(zip(nafo_div['3Kx']['lon'], nafo_div['3Kx']['lat']))
-    polygon3L = Polygon(zip(nafo_div['3L']['lon'], nafo_div['3L']['lat']))
-    polygon3N = Polygon(zip(nafo_div['3N']['lon'], nafo_div['3N']['lat']))
-    polygon3O = Polygon(zip(nafo_div['3O']['lon'], nafo_div['3O']['lat']))
-    polygon3Ps = Polygon(zip(nafo_div['3Ps']['lon'], nafo_div['3Ps']['lat']))
-    polygon2J = Polygon(zip(nafo_div['2J']['lon'], nafo_div['2J']['lat']))
-    polygon2H = Polygon(zip(nafo_div['2H']['lon'], nafo_div['2H']['lat']))
-
-    # Contour of data to mask
-    contour_mask = np.load('/home/cyrf0006/AZMP/state_reports/bottomT/100m_contour_labrador.npy')
-    polygon_mask = Polygon(contour_mask)
+    masks = azu.get_region_masks(lon_reg, lat_reg)
 
     if season == 'spring':
-        for i, xx in enumerate(lon_reg):
-            for j,yy in enumerate(lat_reg):
-                point = Point(lon_reg[i], lat_reg[j])
-                #if (~polygon3L.contains(point)) & (~polygon3N.contains(point)) & (~polygon3O.contains(point)) & (~polygon3Ps.contains(point)):
-                if polygon3L.contains(point) | polygon3N.contains(point) | polygon3O.contains(point) | polygon3Ps.contains(point) | polygon4R.contains(point):
-                    pass #nothing to do but cannot implement negative statement "if not" above
-                else:
-                    Tbot[j,i] = np.nan
+        Tbot[~(masks['3L'] | masks['3N'] | masks['3O'] | masks['3Ps'] | masks['4R'])] = np.nan
 
     elif season == 'fall':
-        for i, xx in enumerate(lon_reg):
-            for j,yy in enumerate(lat_reg):
-                point = Point(lon_reg[i], lat_reg[j])
-                if polygon2H.contains(point) | polygon2J.contains(point) | polygon3K.contains(point) | polygon3L.contains(point) | polygon3N.contains(point) | polygon3O.contains(point):
-                    pass #nothing to do but cannot implement negative statement "if not" above
-                else:
-                    Tbot[j,i] = np.nan ### <--------------------- Do mask the fall / OR / 
-
-                if polygon_mask.contains(point): # mask data near Labrador in fall
-                    Tbot[j,i] = np.nan 
+        Tbot[~(masks['2H'] | masks['2J'] | masks['3Kx'] | masks['3L'] | masks['3N'] | masks['3O'])] = np.nan
+        Tbot[masks['labrador_100m']] = np.nan # mask data near Labrador in fall
 
     elif season == 'summer':
-        for i, xx in enumerate(lon_reg):
-            for j,yy in enumerate(lat_reg):
-                point = Point(lon_reg[i], lat_reg[j])
-                # Just mask labrador
-                if polygon_mask.contains(point): # mask data near Labrador in fall
-                    Tbot[j,i] = np.nan 
+        # Just mask labrador
+        Tbot[masks['labrador_100m']] = np.nan
 
     else:
         print('no division mask, all data taken')
@@ -600,7 +504,7 @@ def bottom_temperature(season, year, zmin=0, zmax=1000, dz=5, proj='merc', netcd
 
 
 #### get_bottomT (originally from azmp_utils)
-def get_bottomT(year_file, season, climato_file, nafo_mask=True, lab_mask=True, closure_scenario = 'reference'):
+def get_bottomT(year_file, season, climato_file, nafo_mask=True, lab_mask=True, closure_scenario = 'reference', exclude_gts=True):
     """ Generate and returns bottom temperature data corresponding to a certain climatology map
     (previously generated with get_bottomT_climato)
     Function returns:
@@ -658,20 +562,12 @@ def get_bottomT(year_file, season, climato_file, nafo_mask=True, lab_mask=True,
     # Selection of a subset region
     ds = ds.where((ds.longitude>lonLims[0]) & (ds.longitude<lonLims[1]), drop=True)
     ds = ds.where((ds.latitude>latLims[0]) & (ds.latitude<latLims[1]), drop=True)
-    # Remome problematic datasets
-    print('!!Remove MEDBA data!!')
-    print('  ---> I Should be improme because I remove good data!!!!')
-    ds = ds.where(ds.instrument_ID!='MEDBA', drop=True)        
-    ds = ds.where(ds.instrument_ID!='MEDTE', drop=True)
-    # Select time (save several options here)
-    if season == 'summer':
-        ds = ds.sel(time=((ds['time.month']>=7)) & ((ds['time.month']<=9)))
-    elif season == 'spring':
-        ds = ds.sel(time=((ds['time.month']>=4)) & ((ds['time.month']<=6)))
-    elif season == 'fall':
-        ds = ds.sel(time=((ds['time.month']>=9)) & ((ds['time.month']<=12)))
-    else:
-        print('!! no season specified, used them all! !!')
+    # Remome GTS datasets (BATHY & TESAC messages, removed by index)
+    if exclude_gts:
+        print('!!Remove MEDBA & MEDTE data!!')
+        ds = azc.remove_gts(ds)
+    # Select season (see azmp_catalog_tools.SEASONS)
+    ds = azc.select_season(ds, season)
 
     # Restrict max depth to zmax defined earlier
     ds = ds.sel(level=ds['level']<zmax)
@@ -694,6 +590,7 @@ def get_bottomT(year_file, season, climato_file, nafo_mask=True, lab_mask=True,
     # Remove empty columns
     idx_empty_rows = df_temp.isnull().all(1).nonzero()[0]
     df_temp = df_temp.dropna(axis=0,how='all')
+    df_comments = df_comments.drop(df_comments.index[idx_empty_rows])
     lons = np.delete(lons,idx_empty_rows)
     lats = np.delete(lats,idx_empty_rows)
     #df_temp.to_pickle('T_2000-2017.pkl')
@@ -702,68 +599,15 @@ def get_bottomT(year_file, season, climato_file, nafo_mask=True, lab_mask=True,
 
     ## ---- Real difference to traditional bottom_temp. ----#
     print('Apply masks for closures scenario: ' + closure_scenario)
-    # DFO closures
-    polygon5 = Polygon(zip(mpas[5][:,0], mpas[5][:,1]))
-    polygon6 = Polygon(zip(mpas[6][:,0], mpas[6][:,1]))
-    polygon7 = Polygon(zip(mpas[7][:,0], mpas[7][:,1]))
-    polygon35 = Polygon(zip(mpas[35][:,0], mpas[35][:,1]))
-    polygon15 = Polygon(zip(mpas[15][:,0], mpas[15][:,1]))
-    polygon9 = Polygon(zip(mpas[9][:,0], mpas[9][:,1]))
-    polygon14 = Polygon(zip(mpas[14][:,0], mpas[14][:,1]))
-    # NAFO 3O
-    polygon_n3O = Polygon(zip(nafo_3O[0][:,0], nafo_3O[0][:,1]))
-    # NAFO seamounts
-    polygon_ns1 = Polygon(zip(nafo_seamounts[1][:,0], nafo_seamounts[1][:,1]))
-    polygon_ns2 = Polygon(zip(nafo_seamounts[2][:,0], nafo_seamounts[2][:,1]))
-    polygon_ns3 = Polygon(zip(nafo_seamounts[3][:,0], nafo_seamounts[3][:,1]))
-    polygon_ns4 = Polygon(zip(nafo_seamounts[4][:,0], nafo_seamounts[4][:,1]))
-    polygon_ns5 = Polygon(zip(nafo_seamounts[5][:,0], nafo_seamounts[5][:,1]))
-    polygon_ns6 = Polygon(zip(nafo_seamounts[6][:,0], nafo_seamounts[6][:,1]))
-    # NAFO Coral and Sponges
-    polygon_nc1 = Polygon(zip(nafo_coral[1][:,0], nafo_coral[1][:,1]))
-    polygon_nc2 = Polygon(zip(nafo_coral[2][:,0], nafo_coral[2][:,1]))
-    polygon_nc3 = Polygon(zip(nafo_coral[3][:,0], nafo_coral[3][:,1]))
-    polygon_nc4 = Polygon(zip(nafo_coral[4][:,0], nafo_coral[4][:,1]))
-    polygon_nc5 = Polygon(zip(nafo_coral[5][:,0], nafo_coral[5][:,1]))
-    polygon_nc6 = Polygon(zip(nafo_coral[6][:,0], nafo_coral[6][:,1]))
-    polygon_nc7 = Polygon(zip(nafo_coral[7][:,0], nafo_coral[1][:,1]))
-    polygon_nc8 = Polygon(zip(nafo_coral[8][:,0], nafo_coral[1][:,1]))
-    polygon_nc9 = Polygon(zip(nafo_coral[9][:,0], nafo_coral[1][:,1]))
-    polygon_nc10 = Polygon(zip(nafo_coral[10][:,0], nafo_coral[1][:,1]))
-    polygon_nc11 = Polygon(zip(nafo_coral[11][:,0], nafo_coral[1][:,1]))
-    polygon_nc12 = Polygon(zip(nafo_coral[12][:,0], nafo_coral[1][:,1]))
-    polygon_nc13 = Polygon(zip(nafo_coral[13][:,0], nafo_coral[1][:,1]))
-
     # Now remove the sets in closures, except if reference scenario
     if closure_scenario == 'reference':
         print(' -> Reference scenario, nothing to remove.')
         
     else:
-        idx_toremove = []
-        for i, lat in enumerate(lats):
-            if (df_comments[i] == '') | (('set' in df_comments[i]) | ('unsucces' in df_comments[i])):
-                # check if string "set" or "unsucces" is there or comments is empty
-
-                point = Point(lons[i], lats[i])
-                if closure_scenario == '1': # Remove A only
-                    if polygon5.contains(point) | polygon6.contains(point) | polygon7.contains(point) | polygon35.contains(point) | polygon_ns1.contains(point) | polygon_ns2.contains(point) |  polygon_ns3.contains(point) | polygon_ns4.contains(point) | polygon_ns5.contains(point) | polygon_ns6.contains(point) | polygon_nc1.contains(point) | polygon_nc2.contains(point) | polygon_nc3.contains(point) | polygon_nc4.contains(point) | polygon_nc5.contains(point) | polygon_nc6.contains(point) | polygon_nc7.contains(point) | polygon_nc8.contains(point) | polygon_nc9.contains(point) | polygon_nc10.contains(point) | polygon_nc11.contains(point) | polygon_nc12.contains(point) | polygon_nc13.contains(point):
-
-                        idx_toremove.append(i)
-
-                elif closure_scenario == '2': # Remove B only
-                    if polygon15.contains(point):
-
-                        idx_toremove.append(i)
-
-                elif closure_scenario == '3': # Remove A & B
-                    if polygon5.contains(point) | polygon6.contains(point) | polygon7.contains(point) | polygon35.contains(point) |  polygon_ns1.contains(point) | polygon_ns2.contains(point) |  polygon_ns3.contains(point) | polygon_ns4.contains(point) | polygon_ns5.contains(point) | polygon_ns6.contains(point) | polygon_nc1.contains(point) | polygon_nc2.contains(point) | polygon_nc3.contains(point) | polygon_nc4.contains(point) | polygon_nc5.contains(point) | polygon_nc6.contains(point) | polygon_nc7.contains(point) | polygon_nc8.contains(point) | polygon_nc9.contains(point) | polygon_nc10.contains(point) | polygon_nc11.contains(point) | polygon_nc12.contains(point) | polygon_nc13.contains(point) | polygon15.contains(point):
-
-                        idx_toremove.append(i)
-
-                elif closure_scenario == '4': # Remove A, B & C
-                    if polygon5.contains(point) | polygon6.contains(point) | polygon7.contains(point) | polygon35.contains(point) | polygon_ns1.contains(point) | polygon_ns2.contains(point) |  polygon_ns3.contains(point) | polygon_ns4.contains(point) | polygon_ns5.contains(point) | polygon_ns6.contains(point) | polygon_nc1.contains(point) | polygon_nc2.contains(point) | polygon_nc3.contains(point) | polygon_nc4.contains(point) | polygon_nc5.contains(point) | polygon_nc6.contains(point) | polygon_nc7.contains(point) | polygon_nc8.contains(point) | polygon_nc9.contains(point) | polygon_nc10.contains(point) | polygon_nc11.contains(point) | polygon_nc12.contains(point) | polygon_nc13.contains(point) | polygon15.contains(point) | polygon9.contains(point) | polygon14.contains(point) :
-
-                        idx_toremove.append(i)
+        # check if string "set" or "unsucces" is there or comments is empty
+        is_set = (df_comments.values == '') | df_comments.str.contains('set', regex=False, na=False).values | df_comments.str.contains('unsucces', regex=False, na=False).values
+        # (NAFO 3O closure not removed here)
+        idx_toremove = np.where(is_set & casts_in_closures(lons, lats, closure_scenario, mpas, nafo_seamounts, nafo_coral))[0]
 
         # Drop now
         df_temp.drop(df_temp.index[idx_toremove], inplace=True) 
@@ -773,121 +617,51 @@ def get_bottomT(year_file, season, climato_file, nafo_mask=True, lab_mask=True,
     ## --- fill 3D cube --- ##  
     print('Fill regular cube')
     z = df_temp.columns.values
-    V = np.full((lat_reg.size, lon_reg.size, z.size), np.nan)
-
-    # Aggregate on regular grid
-    for i, xx in enumerate(lon_reg):
-        for j, yy in enumerate(lat_reg):    
-            idx = np.where((lons>=xx-dc/2) & (lons<xx+dc/2) & (lats>=yy-dc/2) & (lats<yy+dc/2))
-            tmp = np.array(df_temp.iloc[idx].mean(axis=0))
-            idx_good = np.argwhere((~np.isnan(tmp)) & (tmp<30))
-            if np.size(idx_good)==1:
-                V[j,i,:] = np.array(df_temp.iloc[idx].mean(axis=0))
-            elif np.size(idx_good)>1: # vertical interpolation between pts
-                interp = interp1d(np.squeeze(z[idx_good]), np.squeeze(tmp[idx_good]))
-                idx_interp = np.arange(np.int(idx_good[0]),np.int(idx_good[-1]+1))
-                V[j,i,idx_interp] = interp(z[idx_interp]) # interpolate only where possible
+    # Aggregate on regular grid (all casts at once)
+    V = azg.bin_casts_to_grid(lons, lats, df_temp.values, lon_reg, lat_reg)
+    # vertical interpolation between pts (only between 1st and last good idx)
+    V = azg.fill_vertical_gaps(V, z, vmax=30)
     
-    # horizontal interpolation at each depth
-    lon_grid, lat_grid = np.meshgrid(lon_reg,lat_reg)
-    lon_vec = np.reshape(lon_grid, lon_grid.size)
-    lat_vec = np.reshape(lat_grid, lat_grid.size)
-    for k, zz in enumerate(z):
-        # Meshgrid 1D data (after removing NaNs)
-        tmp_grid = V[:,:,k]
-        tmp_vec = np.reshape(tmp_grid, tmp_grid.size)
-        # griddata (after removing nans)
-        idx_good = np.argwhere(~np.isnan(tmp_vec))
-        if idx_good.size>5: # will ignore depth where no data exist
-            LN = np.squeeze(lon_vec[idx_good])
-            LT = np.squeeze(lat_vec[idx_good])
-            TT = np.squeeze(tmp_vec[idx_good])
-            zi = griddata((LN, LT), TT, (lon_grid, lat_grid), method='linear')
-            V[:,:,k] = zi
-        else:
-            continue
+    # horizontal interpolation at each depth (one triangulation per set of valid cells)
+    V = azg.interp_levels(V, lon_reg, lat_reg, min_pts=5)
     print(' -> Done!')    
 
     # mask using bathymetry (I don't think it is necessary, but make nice figures)
-    for i, xx in enumerate(lon_reg):
-        for j,yy in enumerate(lat_reg):
-            if Zitp[j,i] > -10: # remove shallower than 10m
-                V[j,i,:] = np.nan
-
-    # getting bottom temperature
-    print('Getting bottom Temp.')    
-    Tbot = np.full([lat_reg.size,lon_reg.size], np.nan) 
-    for i, xx in enumerate(lon_reg):
-        for j,yy in enumerate(lat_reg):
-            bottom_depth = -Zitp[j,i] # minus to turn positive
-            temp_vec = V[j,i,:]
-            ## idx_no_good = np.argwhere(temp_vec>30)
-            ## if idx_no_good.size:
-            ##     temp_vec[idx_no_good] = np.nan
-            idx_good = np.squeeze(np.where(~np.isnan(temp_vec)))
-            if idx_good.size>1:
-                idx_closest = np.argmin(np.abs(bottom_depth-z[idx_good]))
-            else:
-                continue
+    V[Zitp > -10, :] = np.nan # remove shallower than 10m
 
-            if np.abs([idx_closest] - bottom_depth) <= 20:
-                Tbot[j,i] = temp_vec[idx_good[idx_closest]]
-            elif np.abs(z[idx_closest] - bottom_depth) <= 50:
-                #print('used data located [30,50]m from bottom')
-                Tbot[j,i] = temp_vec[idx_good[idx_closest]]
+    # getting bottom temperature (closest good bin within 50m of GEBCO depth)
+    print('Getting bottom Temp.')
+    Tbot, Tbot_dist = azg.bottom_values(V, z, -Zitp, min_good=2)
 
     print(' -> Done!')
 
+    # Masks (rasterized once per grid, see azu.get_region_masks)
+    if (lab_mask == True) | (nafo_mask == True):
+        masks = azu.get_region_masks(lon_reg, lat_reg)
+
     # Mask data on coastal Labrador
     if lab_mask == True:
         print('Mask coastal labrador')
-        contour_mask = np.load('/home/cyrf0006/AZMP/state_reports/bottomT/100m_contour_labrador.npy')
-        polygon_mask = Polygon(contour_mask)
-        for i, xx in enumerate(lon_reg):
-            for j,yy in enumerate(lat_reg):
-                point = Point(lon_reg[i], lat_reg[j])
-                if polygon_mask.contains(point): # mask data near Labrador in fall
-                    Tbot[j,i] = np.nan 
+        Tbot[masks['labrador_100m']] = np.nan
 
+    # Mask data outside Nafo div.
     if nafo_mask == True:
-        # Mask data outside Nafo div.
         print('Mask according to NAFO division for ' + season)
-        # Polygons
-        polygon3K = Polygon(zip(nafo_div['3K']['lon'], nafo_div['3K']['lat']))
-        polygon3L = Polygon(zip(nafo_div['3L']['lon'], nafo_div['3L']['lat']))
-        polygon3N = Polygon(zip(nafo_div['3N']['lon'], nafo_div['3N']['lat']))
-        polygon3O = Polygon(zip(nafo_div['3O']['lon'], nafo_div['3O']['lat']))
-        polygon3Ps = Polygon(zip(nafo_div['3Ps']['lon'], nafo_div['3Ps']['lat']))
-        polygon2J = Polygon(zip(nafo_div['2J']['lon'], nafo_div['2J']['lat']))
-
         if season == 'spring':
-            for i, xx in enumerate(lon_reg):
-                for j,yy in enumerate(lat_reg):
-                    point = Point(lon_reg[i], lat_reg[j])
-                    if polygon3L.contains(point) | polygon3N.contains(point) | polygon3O.contains(point) | polygon3Ps.contains(point):
-                        pass #nothing to do
-                    else:
-                        Tbot[j,i] = np.nan
-
+            Tbot[~(masks['3L'] | masks['3N'] | masks['3O'] | masks['3Ps'])] = np.nan
         elif season == 'fall':
-            for i, xx in enumerate(lon_reg):
-                for j,yy in enumerate(lat_reg):
-                    point = Point(lon_reg[i], lat_reg[j])
-                    if polygon2J.contains(point) | polygon3K.contains(point) | polygon3L.contains(point) | polygon3N.contains(point) | polygon3O.contains(point) | polygon3Ps.contains(point):
-                        pass #nothing to do 
-                    else:
-                        pass
-
+            pass # Do not mask the fall!!!!! (would be 2J3KLNOPs)
         else:
             print('no division mask, all data taken')
     else:
-            print('no division mask, all data taken')
+        print('no division mask, all data taken')
 
     print(' -> Done!')    
 
     # Fill dict for output
     dict = {}
     dict['Tbot'] = Tbot
+    dict['Tbot_dist'] = Tbot_dist # bottom depth minus depth of the selected bin
     dict['bathy'] = Zitp
     dict['lon_reg'] = lon_reg
     dict['lat_reg'] = lat_reg
@@ -950,59 +724,47 @@ def bottom_stats(years, season, proj='merc', plot=False, netcdf_path='/home/cyrf
 
     # NAFO divisions
     nafo_div = azu.get_nafo_divisions()
-    polygon3L = Polygon(zip(nafo_div['3L']['lon'], nafo_div['3L']['lat']))
-    polygon3N = Polygon(zip(nafo_div['3N']['lon'], nafo_div['3N']['lat']))
-    polygon3O = Polygon(zip(nafo_div['3O']['lon'], nafo_div['3O']['lat']))
-    shape = [polygon3L, polygon3N, polygon3O]
-    shape_3LNO = cascaded_union(shape)
-    shape_3M = Polygon(zip(nafo_div['3M']['lon'], nafo_div['3M']['lat']))
-    shape_3Ps = Polygon(zip(nafo_div['3Ps']['lon'], nafo_div['3Ps']['lat']))
-    shape_2G = Polygon(zip(nafo_div['2G']['lon'], nafo_div['2G']['lat']))
-    shape_2H = Polygon(zip(nafo_div['2H']['lon'], nafo_div['2H']['lat']))
-    shape_2J = Polygon(zip(nafo_div['2J']['lon'], nafo_div['2J']['lat']))
-    shape_3K = Polygon(zip(nafo_div['3K']['lon'], nafo_div['3K']['lat']))
-    shape_3L = Polygon(zip(nafo_div['3L']['lon'], nafo_div['3L']['lat']))
-    shape_3O = Polygon(zip(nafo_div['3O']['lon'], nafo_div['3O']['lat']))
-    shape = [shape_2J, shape_2H]
-    shape_2HJ = cascaded_union(shape)
-    shape = [shape_2G, shape_2H]
-    shape_2GH = cascaded_union(shape)
-
-    dict_stats_3LNO = {}
-    dict_stats_3M = {}
-    dict_stats_3Ps = {}
-    dict_stats_3K = {}
-    dict_stats_3L = {}
-    dict_stats_3O = {}
-    dict_stats_2G = {}
-    dict_stats_2H = {}
-    dict_stats_2J = {}
-    dict_stats_2HJ = {}
-    dict_stats_2GH = {}
+    masks = azu.get_region_masks(lon_reg, lat_reg) # rasterized once per grid
+    shape_3LNO = masks['3L'] | masks['3N'] | masks['3O']
+    shape_3M = masks['3M']
+    shape_3Ps = masks['3Ps']
+    shape_2G = masks['2G']
+    shape_2H = masks['2H']
+    shape_2J = masks['2J']
+    shape_3K = masks['3K']
+    shape_3L = masks['3L']
+    shape_3O = masks['3O']
+    shape_2HJ = masks['2J'] | masks['2H']
+    shape_2GH = masks['2G'] | masks['2H']
+
+    # Divisions for stats (computed for all years at once, after the loop)
+    shapes = {}
+    shapes['2GH'] = shape_2GH
+    shapes['2G'] = shape_2G
+    shapes['2H'] = shape_2H
+    shapes['2J'] = shape_2J
+    shapes['2HJ'] = shape_2HJ
+    shapes['3LNO'] = shape_3LNO
+    shapes['3M'] = shape_3M
+    shapes['3Ps'] = shape_3Ps
+    shapes['3K'] = shape_3K
+    shapes['3L'] = shape_3L
+    shapes['3O'] = shape_3O
+    Tbot_list = []
 
     # Loop on years
     df_list = []
     for year in years:
-        print(' ---- ' + np.str(year) + ' ---- ')
-        year_file = netcdf_path + np.str(year) + '.nc'
+        print(' ---- ' + str(year) + ' ---- ')
+        year_file = netcdf_path + str(year) + '.nc'
         Tdict = get_bottomT(year_file, season, climato_file, closure_scenario=closure_scenario)    
         Tbot = Tdict['Tbot']
         lons = Tdict['lons']
         lats = Tdict['lats']
         anom = Tbot-Tbot_climato
 
-        # NAFO division stats    
-        dict_stats_2GH[np.str(year)] = azu.polygon_temperature_stats(Tdict, shape_2GH)
-        dict_stats_2G[np.str(year)] = azu.polygon_temperature_stats(Tdict, shape_2G)
-        dict_stats_2H[np.str(year)] = azu.polygon_temperature_stats(Tdict, shape_2H)
-        dict_stats_2J[np.str(year)] = azu.polygon_temperature_stats(Tdict, shape_2J)
-        dict_stats_2HJ[np.str(year)] = azu.polygon_temperature_stats(Tdict, shape_2HJ)
-        dict_stats_3LNO[np.str(year)] = azu.polygon_temperature_stats(Tdict, shape_3LNO)
-        dict_stats_3M[np.str(year)] = azu.polygon_temperature_stats(Tdict, shape_3M)
-        dict_stats_3Ps[np.str(year)] = azu.polygon_temperature_stats(Tdict, shape_3Ps)
-        dict_stats_3K[np.str(year)] = azu.polygon_temperature_stats(Tdict, shape_3K)
-        dict_stats_3L[np.str(year)] = azu.polygon_temperature_stats(Tdict, shape_3L)
-        dict_stats_3O[np.str(year)] = azu.polygon_temperature_stats(Tdict, shape_3O)
+        # Keep bottom temperature for NAFO division stats
+        Tbot_list.append(Tbot)
 
         # Append bottom temperature for multi-index export
         df = pd.DataFrame(index=lat_reg, columns=lon_reg)
@@ -1041,7 +803,7 @@ def bottom_stats(years, season, proj='merc', plot=False, netcdf_path='/home/cyrf
             # Save Figure
             fig.set_size_inches(w=7, h=8)
             fig.set_dpi(200)
-            outfile = 'bottom_temp_anomaly_' + season + '_' + np.str(year) + '.png'
+            outfile = 'bottom_temp_anomaly_' + season + '_' + str(year) + '.png'
             fig.savefig(outfile)
 
             # 1.2 - Plot Temperature
@@ -1073,21 +835,24 @@ def bottom_stats(years, season, proj='merc', plot=False, netcdf_path='/home/cyrf
             # Save Figure
             fig.set_size_inches(w=7, h=8)
             fig.set_dpi(200)
-            outfile = 'bottom_temp_' + season + '_' + np.str(year) + '.png'
+            outfile = 'bottom_temp_' + season + '_' + str(year) + '.png'
             fig.savefig(outfile)
             plt.close('all')
 
-    df_2G = pd.DataFrame.from_dict(dict_stats_2G, orient='index')
-    df_2H = pd.DataFrame.from_dict(dict_stats_2H, orient='index')
-    df_2J = pd.DataFrame.from_dict(dict_stats_2J, orient='index')
-    df_2HJ = pd.DataFrame.from_dict(dict_stats_2HJ, orient='index')
-    df_2GH = pd.DataFrame.from_dict(dict_stats_2GH, orient='index')
-    df_3Ps = pd.DataFrame.from_dict(dict_stats_3Ps, orient='index')
-    df_3LNO = pd.DataFrame.from_dict(dict_stats_3LNO, orient='index')
-    df_3M = pd.DataFrame.from_dict(dict_stats_3M, orient='index')
-    df_3K = pd.DataFrame.from_dict(dict_stats_3K, orient='index')
-    df_3L = pd.DataFrame.from_dict(dict_stats_3L, orient='index')
-    df_3O = pd.DataFrame.from_dict(dict_stats_3O, orient='index')
+    # NAFO division stats (all divisions, all years at once)
+    pixel_area = azu.get_pixel_area(lon_reg, lat_reg)
+    df_stats = azu.polygon_temperature_stats_batch(np.array(Tbot_list), Zitp, shapes, pixel_area, index=[str(year) for year in years])
+    df_2G = df_stats['2G']
+    df_2H = df_stats['2H']
+    df_2J = df_stats['2J']
+    df_2HJ = df_stats['2HJ']
+    df_2GH = df_stats['2GH']
+    df_3Ps = df_stats['3Ps']
+    df_3LNO = df_stats['3LNO']
+    df_3M = df_stats['3M']
+    df_3K = df_stats['3K']
+    df_3L = df_stats['3L']
+    df_3O = df_stats['3O']
 
     outname = 'stats_3Ps_' + season + '_' + closure_scenario + '.pkl'
     df_3Ps.to_pickle(outname)
@@ -22,6 +22,9 @@ import matplotlib.dates as mdates
 from matplotlib.ticker import NullFormatter
 from matplotlib.dates import MonthLocator, DateFormatter
 import cmocean
+## AZMP custom imports
+import azmp_stn27_tools as azs27
+import azmp_render_tools as azrd
 
 ## font = {'family' : 'normal',
 ##         'weight' : 'bold',
@@ -64,35 +67,15 @@ else:
 ## months = mdates.MonthLocator()  # every month
 ## month_fmt = mdates.DateFormatter('%b')
 
-## ---- Open data and select ---- ##
-if os.path.isfile('stn27_all_casts.nc'):
-    ds = xr.open_dataset('stn27_all_casts.nc') 
-    
-else:
-    ds = xr.open_mfdataset('/home/cyrf0006/data/dev_database/netCDF/*.nc')
-    # Remome GTS datasets
-    ds = ds.where(ds.instrument_ID!='MEDBA', drop=True) # BATHY GTS message 
-    ds = ds.where(ds.instrument_ID!='MEDTE', drop=True) # TESAC GTS message 
-    # Select a depth range
-    ds = ds.sel(level=ds['level']<180)
-    ds = ds.sel(level=ds['level']>0)
-    # Select stn27 data according to lat-lon in a box [47.55,-52.59]
-    ds = ds.where((ds.longitude>s27[1]-dc/2) & (ds.longitude<s27[1]+dc/2), drop=True) # original one
-    ds = ds.where((ds.latitude>s27[0]-dc/2) & (ds.latitude<s27[0]+dc/2), drop=True)
-    ds = ds.sortby('time')
-    # Save data
-    ds.to_netcdf('stn27_all_casts.nc')
-
-# select variable
-da = ds[variable]
-df_hydro = da.to_pandas()
-# Drop when all NaNs... but will still be in netCDF...
-df_hydro.dropna(axis=0, how='all', inplace=True)
+## ---- Station 27 casts (hydro + Viking) and climatologies ---- ##
+# Only casts newer than those already in S27_<variable>_casts.pkl are read, and only
+# the months with new casts are averaged again (see azmp_stn27_tools.py)
+df, df_monthly, monthly_clim, weekly_clim = azs27.update_stn27_store(variable, year_clim=year_clim, use_viking=use_viking)
 
 ## ---- Visual QA/QC ---- ##
 ## for i in np.arange(1,13):
 ##     fig = plt.figure()
-##     df_tmp = df_hydro[df_hydro.index.month == i]
+##     df_tmp = df[df.index.month == i]
 ##     ax = df_tmp.mean(axis=0).reset_index().plot(x=0, y='level', color='k', lw=3)
 ##     for idx, iddx in enumerate(df_tmp.index):        
 ##         df_tmp.iloc[idx].reset_index().plot(ax = ax, x=iddx, y='level', alpha=0.5)
@@ -103,39 +86,6 @@ df_hydro.dropna(axis=0, how='all', inplace=True)
 ##     plt.ylabel('Depth (m)')
 ##     fig_name = 'stn27_all_' + variable + '_' + str(i) + '.png'
 ##     fig.savefig(fig_name, dpi=150)
-    
-## ---- Open Viking data and concatenate ---- ##
-if use_viking:
-    # open dataset
-    ds_vik = xr.open_mfdataset('/home/cyrf0006/data/dev_database/viking_nc/*_viking.nc')
-    # Select a depth range
-    ds_vik = ds_vik.sel(level=ds_vik['level']<180)
-    ds_vik = ds_vik.sel(level=ds_vik['level']>0)
-    # get variable
-    da_vik = ds_vik[variable]
-    df_vik = da_vik.to_pandas()
-    df_vik = df_vik.dropna(how='all')
-    # concatenate (better if they sahre same vertical resolution)
-    df = pd.concat([df_hydro, df_vik]) 
-    #df = df.interpolate(axis=1, method='linear', limit_area='inside') # doesnt seems to work as expected
-    df = df.interpolate(axis=1).where(df.bfill(axis=1).notnull()) # here interpolate and leave NaNs.
-else:
-    df = df_hydro.copy()
-    
-## ---- 1. Climatologies ---- ##
-# Weekly average (weekly average before monthly average)
-#df_weekly = df.resample('W').mean()
-
-# Monthly average (15th of the month) +  pickle for further analysis
-df_monthly = df.resample('MS', loffset=pd.Timedelta(14, 'd')).mean()
-df_monthly.to_pickle('S27_' + variable + '_monthly.pkl')
-# Select years for climato
-df_clim_period = df_monthly[(df_monthly.index.year>=year_clim[0]) & (df_monthly.index.year<=year_clim[1])]
-# Monthly clim
-monthly_clim = df_clim_period.groupby(df_clim_period.index.month).mean()
-# set index (year 1900)
-monthly_clim.index = pd.to_datetime(monthly_clim.index.values, format='%m')
-monthly_clim.to_pickle('S27_' + variable + '_monthly_clim.pkl')
 
 # Weekly average (previous version of climatology)
 #df_weekly = df.resample('W').mean()
@@ -144,10 +94,6 @@ monthly_clim.to_pickle('S27_' + variable + '_monthly_clim.pkl')
 # set index (year 1900)
 #weekly_clim.index = pd.to_datetime(weekly_clim.index.values, format='%W')
 
-# Weekly clim (upsample monthly clim to weekly)
-weekly_clim = monthly_clim.resample('W').mean().interpolate(method='linear') 
-weekly_clim.to_pickle('S27_' + variable + '_weekly_clim.pkl')
-
 # Update climatology index to current year
 weekly_clim.index = pd.to_datetime('2019-' +  weekly_clim.index.month.astype(np.str) + '-' + weekly_clim.index.day.astype(np.str))
 #weekly_clim.dropna(how='all', axis=1, inplace=True)
@@ -183,18 +129,11 @@ if variable == 'temperature':
 elif variable == 'salinity':
     cb.set_label(r'S', fontsize=12, fontweight='normal')
 ax.xaxis.label.set_visible(False)
-# Save Figure
+# Save Figure (English and French, only the depth label is swapped)
 fig.set_size_inches(w=12, h=6)
 outfile_clim = 's27_' + variable + '_clim.png'
-fig.savefig(outfile_clim, dpi=200)
-os.system('convert -trim ' + outfile_clim + ' ' + outfile_clim)
-
-# Save French Figure
-ax.set_ylabel('Profondeur (m)', fontsize=15, fontweight='bold')
-fig.set_size_inches(w=12, h=6)
-outfile_climFR = 's27_' + variable + '_clim_FR.png'
-fig.savefig(outfile_climFR, dpi=200)
-os.system('convert -trim ' + outfile_climFR + ' ' + outfile_climFR)
+outfile_climFR = azrd.fr_filename(outfile_clim)
+azrd.save_bilingual(fig, outfile_clim, [(ax.yaxis.label, 'Profondeur (m)')], dpi=200)
 
 
 ## ---- 2. Year average and anomaly ---- ##
@@ -234,18 +173,11 @@ if variable == 'temperature':
 elif variable == 'salinity':
     cb.set_label(r'S', fontsize=12, fontweight='normal')
 ax.xaxis.label.set_visible(False)
-# Save Figure
+# Save Figure (English and French, only the depth label is swapped)
 fig.set_size_inches(w=12, h=6)
 outfile_year = 's27_' + variable + '_' + str(current_year) + '.png'
-fig.savefig(outfile_year, dpi=200)
-os.system('convert -trim ' + outfile_year + ' ' + outfile_year)
-
-# Save French Figure
-ax.set_ylabel('Profondeur (m)', fontsize=15, fontweight='bold')
-fig.set_size_inches(w=12, h=6)
-outfile_yearFR = 's27_' + variable + '_' + str(current_year) + '_FR.png'
-fig.savefig(outfile_yearFR, dpi=200)
-os.system('convert -trim ' + outfile_yearFR + ' ' + outfile_yearFR)
+outfile_yearFR = azrd.fr_filename(outfile_year)
+azrd.save_bilingual(fig, outfile_year, [(ax.yaxis.label, 'Profondeur (m)')], dpi=200)
 
 # plot anomaly
 fig, ax = plt.subplots(nrows=1, ncols=1)
@@ -270,23 +202,21 @@ elif variable == 'salinity':
 # Save Figure
 fig.set_size_inches(w=12, h=6)
 outfile_anom = 's27_' + variable + '_anom_' + str(current_year) + '.png'
-fig.savefig(outfile_anom, dpi=200)
-os.system('convert -trim ' + outfile_anom + ' ' + outfile_anom)
+fig.savefig(outfile_anom, dpi=200, bbox_inches='tight')
 
-# Save French Figure
+# Save French Figure (month numbers)
 ax.xaxis.set_minor_formatter(DateFormatter('%m'))
 ax.set_ylabel('Profondeur (m)', fontsize=15, fontweight='bold')
 fig.set_size_inches(w=12, h=6)
 outfile_anomFR = 's27_' + variable + '_anom_' + str(current_year) + '_FR.png'
-fig.savefig(outfile_anomFR, dpi=200)
-os.system('convert -trim ' + outfile_anomFR + ' ' + outfile_anomFR)
+fig.savefig(outfile_anomFR, dpi=200, bbox_inches='tight')
 
 # Convert to a subplot
-os.system('montage ' + outfile_year + ' ' +  outfile_clim + ' ' + outfile_anom  + ' -tile 1x3 -geometry +10+10  -background white  s27_' + variable + '_subplot_' + str(current_year) + '.png') 
-os.system('montage ' + outfile_yearFR + ' ' +  outfile_climFR + ' ' + outfile_anomFR  + ' -tile 1x3 -geometry +10+10  -background white  s27_' + variable + '_subplot_' + str(current_year) + '_FR.png') 
+azrd.montage([outfile_year, outfile_clim, outfile_anom], 's27_' + variable + '_subplot_' + str(current_year) + '.png', tile='1x3')
+azrd.montage([outfile_yearFR, outfile_climFR, outfile_anomFR], 's27_' + variable + '_subplot_' + str(current_year) + '_FR.png', tile='1x3')
 # remove individual plots
-os.system('rm ' + outfile_year + ' ' +  outfile_clim + ' ' + outfile_anom)
-os.system('rm ' + outfile_yearFR + ' ' +  outfile_climFR + ' ' + outfile_anomFR)
+for outfile in [outfile_year, outfile_clim, outfile_anom, outfile_yearFR, outfile_climFR, outfile_anomFR]:
+    os.remove(outfile)
 
 ## ---- Station occupation plot ---- ##
 da_occu = ds['time']
@@ -302,8 +232,7 @@ plt.xlabel('Station 27 occupation')
 # Save Figure
 fig.set_size_inches(w=12, h=6)
 outfile_occu = 's27_occupation.png'
-fig.savefig(outfile_occu, dpi=200)
-os.system('convert -trim ' + outfile_occu + ' ' + outfile_occu)
+fig.savefig(outfile_occu, dpi=200, bbox_inches='tight')
 
 # plot 2 - weekly occupations + no of week per year
 W = df_occu.resample('w').count()
@@ -324,6 +253,5 @@ ax2.set_ylabel('week of year')
 # Save Figure
 fig.set_size_inches(w=6, h=7)
 outfile_occu = 's27_occupation_stats.png'
-fig.savefig(outfile_occu, dpi=200)
-os.system('convert -trim ' + outfile_occu + ' ' + outfile_occu)
+fig.savefig(outfile_occu, dpi=200, bbox_inches='tight')
 
@@ -125,14 +125,12 @@ plt.grid()
 # Save Figure
 fig.set_size_inches(w=7,h=4)
 fig_name = 's27_vert_temp_anomaly.png'
-fig.savefig(fig_name, dpi=300)
-os.system('convert -trim ' + fig_name + ' ' + fig_name)
+fig.savefig(fig_name, dpi=300, bbox_inches='tight')
 # Save French Figure
 plt.ylabel(u'Anomalie standardizée')
 plt.title(u'Station 27 - Température moyenne (0-176m)')
 fig_name = 's27_vert_temp_anomalyFR.png'
-fig.savefig(fig_name, dpi=300)
-os.system('convert -trim ' + fig_name + ' ' + fig_name)
+fig.savefig(fig_name, dpi=300, bbox_inches='tight')
 
 # UNCORRECTED for missing months (Corrected since March 2020 for 2019 data)
 old_my_ts = my_ts.resample('As').mean()
@@ -158,8 +156,7 @@ plt.grid()
 # Save Figure
 fig.set_size_inches(w=7,h=4)
 fig_name = 's27_vert_temp_anomaly_uncorrected.png'
-fig.savefig(fig_name, dpi=300)
-os.system('convert -trim ' + fig_name + ' ' + fig_name)
+fig.savefig(fig_name, dpi=300, bbox_inches='tight')
 
 
 # Salinity
@@ -203,14 +200,12 @@ plt.grid()
 # Save Figure
 fig.set_size_inches(w=7,h=4)
 fig_name = 's27_vert_sal_anomaly.png'
-fig.savefig(fig_name, dpi=300)
-os.system('convert -trim ' + fig_name + ' ' + fig_name)
+fig.savefig(fig_name, dpi=300, bbox_inches='tight')
 # Save French Figure
 plt.ylabel(u'Anomalie standardizée')
 plt.title(u'Station 27 - Salinité moyenne (0-176m)')
 fig_name = 's27_vert_sal_anomalyFR.png'
-fig.savefig(fig_name, dpi=300)
-os.system('convert -trim ' + fig_name + ' ' + fig_name)
+fig.savefig(fig_name, dpi=300, bbox_inches='tight')
 
 # UNCORRECTED for missing months (Corrected since March 2020 for 2019 data)
 old_my_ts = my_ts.resample('As').mean()
@@ -236,8 +231,7 @@ plt.grid()
 # Save Figure
 fig.set_size_inches(w=7,h=4)
 fig_name = 's27_vert_sal_anomaly_uncorrected.png'
-fig.savefig(fig_name, dpi=300)
-os.system('convert -trim ' + fig_name + ' ' + fig_name)
+fig.savefig(fig_name, dpi=300, bbox_inches='tight')
 
 
 
@@ -301,14 +295,12 @@ plt.grid()
 # Save Figure
 fig.set_size_inches(w=7,h=4)
 fig_name = 's27_CILtemp_anomaly.png'
-fig.savefig(fig_name, dpi=300)
-os.system('convert -trim ' + fig_name + ' ' + fig_name)    
+fig.savefig(fig_name, dpi=300, bbox_inches='tight')
 # Save French Figure
 plt.ylabel(u'Anomalie standardizée')
 plt.title(u'Station 27 - Température moyenne de la CIF')
 fig_name = 's27_CILtemp_anomalyFR.png'
-fig.savefig(fig_name, dpi=300)
-os.system('convert -trim ' + fig_name + ' ' + fig_name)
+fig.savefig(fig_name, dpi=300, bbox_inches='tight')
 
 # **plot core T**
 my_ts = cil_core
@@ -335,14 +327,12 @@ plt.grid()
 # Save Figure
 fig.set_size_inches(w=7,h=4)
 fig_name = 's27_CILcore_anomaly.png'
-fig.savefig(fig_name, dpi=300)
-os.system('convert -trim ' + fig_name + ' ' + fig_name)    
+fig.savefig(fig_name, dpi=300, bbox_inches='tight')
 # Save French Figure
 plt.ylabel(u'Anomalie standardizée')
 plt.title(u'Station 27 - Température du coeur de la CIF')
 fig_name = 's27_CILcore_anomalyFR.png'
-fig.savefig(fig_name, dpi=300)
-os.system('convert -trim ' + fig_name + ' ' + fig_name)
+fig.savefig(fig_name, dpi=300, bbox_inches='tight')
 
 # **plot core depth**
 my_ts = cil_coredepth
@@ -369,14 +359,12 @@ plt.grid()
 # Save Figure
 fig.set_size_inches(w=7,h=4)
 fig_name = 's27_CILcoredepth_anomaly.png'
-fig.savefig(fig_name, dpi=300)
-os.system('convert -trim ' + fig_name + ' ' + fig_name)    
+fig.savefig(fig_name, dpi=300, bbox_inches='tight')
 # Save French Figure
 plt.ylabel(u'Anomalie standardizée')
 plt.title(u'Station 27 - Profondeur du coeur de la CIF')
 fig_name = 's27_CILcoredepth_anomalyFR.png'
-fig.savefig(fig_name, dpi=300)
-os.system('convert -trim ' + fig_name + ' ' + fig_name)
+fig.savefig(fig_name, dpi=300, bbox_inches='tight')
 
 # **plot thickness**
 my_ts = cil_thickness
@@ -404,14 +392,12 @@ plt.grid()
 # Save Figure
 fig.set_size_inches(w=7,h=4)
 fig_name = 's27_CILthickness_anomaly.png'
-fig.savefig(fig_name, dpi=300)
-os.system('convert -trim ' + fig_name + ' ' + fig_name)
+fig.savefig(fig_name, dpi=300, bbox_inches='tight')
 # Save French Figure
 plt.ylabel(u'Anomalie standardizée')
 plt.title(u'Station 27 - Épaisseur de la CIF')
 fig_name = 's27_CILthickness_anomalyFR.png'
-fig.savefig(fig_name, dpi=300)
-os.system('convert -trim ' + fig_name + ' ' + fig_name)
+fig.savefig(fig_name, dpi=300, bbox_inches='tight')
 
 # **plot CIL timeseries**
 fig, host = plt.subplots()
@@ -451,8 +437,7 @@ host.legend(lines, [l.get_label() for l in lines], loc=2)
 plt.grid()
 fig.set_size_inches(w=14,h=8)
 fig_name = 's27_CIL_stats.png'
-fig.savefig(fig_name, dpi=300)
-os.system('convert -trim ' + fig_name + ' ' + fig_name)
+fig.savefig(fig_name, dpi=300, bbox_inches='tight')
 
 
 ## ---- 3. Stratification ---- ##
@@ -504,13 +489,11 @@ plt.grid()
 # Save Figure
 fig.set_size_inches(w=7,h=4)
 fig_name = 's27_stratif_bar.png'
-fig.savefig(fig_name, dpi=300)
-os.system('convert -trim ' + fig_name + ' ' + fig_name)
+fig.savefig(fig_name, dpi=300, bbox_inches='tight')
 # Save French Figure
 plt.ylabel(u'Anomalie standardizée')
 fig_name = 's27_stratif_bar_FR.png'
-fig.savefig(fig_name, dpi=300)
-os.system('convert -trim ' + fig_name + ' ' + fig_name)
+fig.savefig(fig_name, dpi=300, bbox_inches='tight')
 
 # B) timeseries
 fig = plt.figure(1)
@@ -525,13 +508,11 @@ plt.xlabel(' ')
 # Save Figure
 fig.set_size_inches(w=7,h=4)
 fig_name = 's27_stratif_plot.png'
-fig.savefig(fig_name, dpi=300)
-os.system('convert -trim ' + fig_name + ' ' + fig_name)
+fig.savefig(fig_name, dpi=300, bbox_inches='tight')
 # Same in French
 plt.ylabel(r'Anomalie de stratification $\rm (g\,m^{-4})$')
 fig_name = 's27_stratif_plotFR.png'
-fig.savefig(fig_name, dpi=300)
-os.system('convert -trim ' + fig_name + ' ' + fig_name)
+fig.savefig(fig_name, dpi=300, bbox_inches='tight')
 
 # C) Monthly bar plot for current year
 strat_clim_period = strat_monthly[(strat_monthly.index.year>=year_clim[0]) & (strat_monthly.index.year<=year_clim[1])]
@@ -567,13 +548,11 @@ ax.yaxis.grid() # horizontal lines
 # Save Figure
 fig.set_size_inches(w=6,h=3)
 fig_name = 's27_stratif_monthly.png'
-fig.savefig(fig_name, dpi=300)
-os.system('convert -trim ' + fig_name + ' ' + fig_name)
+fig.savefig(fig_name, dpi=300, bbox_inches='tight')
 # Save French Figure
 ax.set_xticklabels(french_months)
 fig_name = 's27_stratif_monthly_FR.png'
-fig.savefig(fig_name, dpi=300)
-os.system('convert -trim ' + fig_name + ' ' + fig_name)
+fig.savefig(fig_name, dpi=300, bbox_inches='tight')
 
 
 
@@ -619,14 +598,12 @@ plt.ylim([-3, 3])
 plt.grid()
 fig.set_size_inches(w=7,h=4)
 fig_name = 's27_mld_bar.png'
-fig.savefig(fig_name, dpi=300)
-os.system('convert -trim ' + fig_name + ' ' + fig_name)
+fig.savefig(fig_name, dpi=300, bbox_inches='tight')
 # French Figure
 plt.ylabel(u'Anomalie standardizée')
 plt.title(u'Station 27 - Profondeur couche de mélange')
 fig_name = 's27_mld_barFR.png'
-fig.savefig(fig_name, dpi=300)
-os.system('convert -trim ' + fig_name + ' ' + fig_name)
+fig.savefig(fig_name, dpi=300, bbox_inches='tight')
 
 
 # B) timeseries
@@ -639,14 +616,12 @@ plt.ylabel(r'MLD anomaly (m)')
 plt.xlabel(' ')
 fig.set_size_inches(w=7,h=4)
 fig_name = 's27_mld_plot.png'
-fig.savefig(fig_name, dpi=200)
-os.system('convert -trim ' + fig_name + ' ' + fig_name)
+fig.savefig(fig_name, dpi=200, bbox_inches='tight')
 
 # French Figure
 plt.ylabel(r'Anomalie de la PCM (m)')
 fig_name = 's27_mld_plotFR.png'
-fig.savefig(fig_name, dpi=200)
-os.system('convert -trim ' + fig_name + ' ' + fig_name)
+fig.savefig(fig_name, dpi=200, bbox_inches='tight')
 
 
 # C) Monthly bar plot for current year
@@ -683,15 +658,13 @@ ax.yaxis.grid() # horizontal lines
 #plt.ylim([0, 330])
 fig.set_size_inches(w=6,h=3)
 fig_name = 's27_mld_monthly.png'
-fig.savefig(fig_name, dpi=300)
-os.system('convert -trim ' + fig_name + ' ' + fig_name)
+fig.savefig(fig_name, dpi=300, bbox_inches='tight')
 # French Figure
 ax.set_ylabel(r'PCM (m)')
 ax.set_title(u'Station 27 - Profondeur couche de mélange')
 ax.set_xticklabels(french_months)
 fig_name = 's27_mld_monthly_FR.png'
-fig.savefig(fig_name, dpi=300)
-os.system('convert -trim ' + fig_name + ' ' + fig_name)
+fig.savefig(fig_name, dpi=300, bbox_inches='tight')
 
 
 ## ---- Montage figures ---- ##
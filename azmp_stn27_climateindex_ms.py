@@ -89,8 +89,7 @@ ax.xaxis.label.set_visible(False)
 # Save Figure
 fig.set_size_inches(w=13, h=6)
 outfile_clim = 's27_temp_clim.png'
-fig.savefig(outfile_clim, dpi=200)
-os.system('convert -trim ' + outfile_clim + ' ' + outfile_clim)
+fig.savefig(outfile_clim, dpi=200, bbox_inches='tight')
 
 
 # plot S
@@ -117,8 +116,7 @@ cb.set_label(r'S', fontsize=14, fontweight='normal')
 # Save Figure
 fig.set_size_inches(w=13, h=6)
 outfile_clim = 's27_sal_clim.png'
-fig.savefig(outfile_clim, dpi=200)
-os.system('convert -trim ' + outfile_clim + ' ' + outfile_clim)
+fig.savefig(outfile_clim, dpi=200, bbox_inches='tight')
 
 # Convert to subplot
 os.system('montage  s27_temp_clim.png s27_sal_clim.png -tile 1x2 -geometry +10+10  -background white  s27_TSclim.png')
@@ -156,8 +154,7 @@ ax.tick_params(labelbottom=False)
 # Save Figure
 fig.set_size_inches(w=8,h=4)
 fig_name = 's27_vert_temp_anomaly.png'
-fig.savefig(fig_name, dpi=300)
-os.system('convert -trim ' + fig_name + ' ' + fig_name)
+fig.savefig(fig_name, dpi=300, bbox_inches='tight')
 
 # Salinity
 my_ts = df_sal.mean(axis=1)
@@ -191,8 +188,7 @@ ax.tick_params(labelbottom=False)
 # Save Figure
 fig.set_size_inches(w=8,h=4)
 fig_name = 's27_vert_sal_anomaly.png'
-fig.savefig(fig_name, dpi=300)
-os.system('convert -trim ' + fig_name + ' ' + fig_name)
+fig.savefig(fig_name, dpi=300, bbox_inches='tight')
 
 
 ## ---- 2.  CIL summer statistics ---- ##
@@ -252,8 +248,7 @@ plt.grid()
 # Save Figure
 fig.set_size_inches(w=8,h=4)
 fig_name = 's27_CILtemp_anomaly.png'
-fig.savefig(fig_name, dpi=300)
-os.system('convert -trim ' + fig_name + ' ' + fig_name)    
+fig.savefig(fig_name, dpi=300, bbox_inches='tight')
 
 # Convert to subplot
 os.system('montage s27_vert_temp_anomaly.png s27_vert_sal_anomaly.png  s27_CILtemp_anomaly.png -tile 1x3 -geometry +10+30  -background white  s27_anom.png')
@@ -93,8 +93,7 @@ ax.legend(custom_lines, ['Surface', '', 'Bottom', ''])
 fig = ax.get_figure()
 fig.set_size_inches(w=12,h=8)
 fig_name = 'S27_anom.png'
-fig.savefig(fig_name, dpi=300)
-os.system('convert -trim ' + fig_name + ' ' + fig_name)
+fig.savefig(fig_name, dpi=300, bbox_inches='tight')
 
 
 
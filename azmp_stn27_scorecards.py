@@ -361,8 +361,7 @@ for key, cell in the_table.get_celld().items():
     elif (cell_text=='nan'):
         cell._set_facecolor('darkgray')
         cell._text.set_color('darkgray')
-plt.savefig("scorecards_s27_T.png", dpi=300)
-os.system('convert -trim scorecards_s27_T.png scorecards_s27_T.png')
+plt.savefig("scorecards_s27_T.png", dpi=300, bbox_inches='tight')
 
 # French table
 header = ax.table(cellText=[['']],
@@ -393,8 +392,7 @@ for key, cell in the_table.get_celld().items():
     elif (cell_text=='nan'):
         cell._set_facecolor('darkgray')
         cell._text.set_color('darkgray')
-plt.savefig("scorecards_s27_T_FR.png", dpi=300)
-os.system('convert -trim scorecards_s27_T_FR.png scorecards_s27_T_FR.png')
+plt.savefig("scorecards_s27_T_FR.png", dpi=300, bbox_inches='tight')
 
 
 
@@ -447,8 +445,7 @@ for key, cell in the_table.get_celld().items():
     elif (cell_text=='nan'):
         cell._set_facecolor('darkgray')
         cell._text.set_color('darkgray')
-plt.savefig("scorecards_s27_S.png", dpi=300)
-os.system('convert -trim scorecards_s27_S.png scorecards_s27_S.png')
+plt.savefig("scorecards_s27_S.png", dpi=300, bbox_inches='tight')
 
 # French table
 header = ax.table(cellText=[['']],
@@ -479,8 +476,7 @@ for key, cell in the_table.get_celld().items():
     elif (cell_text=='nan'):
         cell._set_facecolor('darkgray')
         cell._text.set_color('darkgray')
-plt.savefig("scorecards_s27_S_FR.png", dpi=300)
-os.system('convert -trim scorecards_s27_S_FR.png scorecards_s27_S_FR.png')
+plt.savefig("scorecards_s27_S_FR.png", dpi=300, bbox_inches='tight')
 
 
 ### 3. CIL
@@ -531,8 +527,7 @@ for key, cell in the_table.get_celld().items():
     elif (cell_text=='nan'):
         cell._set_facecolor('darkgray')
         cell._text.set_color('darkgray')
-plt.savefig("scorecards_s27_CIL.png", dpi=300)
-os.system('convert -trim scorecards_s27_CIL.png scorecards_s27_CIL.png')
+plt.savefig("scorecards_s27_CIL.png", dpi=300, bbox_inches='tight')
 
 # French table
 my_df.index = [u'CIF temp', u'CIF T coeur', u'CIF prof coeur', u'CIF épaisseur']
@@ -565,8 +560,7 @@ for key, cell in the_table.get_celld().items():
     elif (cell_text=='nan'):
         cell._set_facecolor('darkgray')
         cell._text.set_color('darkgray')
-plt.savefig("scorecards_s27_CIL_FR.png", dpi=300)
-os.system('convert -trim scorecards_s27_CIL_FR.png scorecards_s27_CIL_FR.png')
+plt.savefig("scorecards_s27_CIL_FR.png", dpi=300, bbox_inches='tight')
 
 
 ### 4. MLD
@@ -614,8 +608,7 @@ for key, cell in the_table.get_celld().items():
     elif (cell_text=='nan'):
         cell._set_facecolor('darkgray')
         cell._text.set_color('darkgray')
-plt.savefig("scorecards_s27_MLD.png", dpi=300)
-os.system('convert -trim scorecards_s27_MLD.png scorecards_s27_MLD.png')
+plt.savefig("scorecards_s27_MLD.png", dpi=300, bbox_inches='tight')
 
 # French table
 my_df.index = [u'PCM hiver', u'PCM printemps', u'PCM été', u'PCM automne', u'PCM annuel']
@@ -648,8 +641,7 @@ for key, cell in the_table.get_celld().items():
     elif (cell_text=='nan'):
         cell._set_facecolor('darkgray')
         cell._text.set_color('darkgray')
-plt.savefig("scorecards_s27_MLD_FR.png", dpi=300)
-os.system('convert -trim scorecards_s27_MLD_FR.png scorecards_s27_MLD_FR.png')
+plt.savefig("scorecards_s27_MLD_FR.png", dpi=300, bbox_inches='tight')
 
 
 ### 5. strat
@@ -702,8 +694,7 @@ for key, cell in the_table.get_celld().items():
     elif (cell_text=='nan'):
         cell._set_facecolor('darkgray')
         cell._text.set_color('darkgray')
-plt.savefig("scorecards_s27_strat.png", dpi=300)
-os.system('convert -trim scorecards_s27_strat.png scorecards_s27_strat.png')
+plt.savefig("scorecards_s27_strat.png", dpi=300, bbox_inches='tight')
 
 # French table
 my_df.index = [u'strat. hiver', u'strat. printemps', u'strat. été', u'strat. automne', u'strat. annuel']
@@ -736,8 +727,7 @@ for key, cell in the_table.get_celld().items():
     elif (cell_text=='nan'):
         cell._set_facecolor('darkgray')
         cell._text.set_color('darkgray')
-plt.savefig("scorecards_s27_strat_FR.png", dpi=300)
-os.system('convert -trim scorecards_s27_strat_FR.png scorecards_s27_strat_FR.png')
+plt.savefig("scorecards_s27_strat_FR.png", dpi=300, bbox_inches='tight')
 
 
 #6. Merge all together
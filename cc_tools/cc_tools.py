@@ -23,11 +23,10 @@ import cartopy.feature as cpf
 from cartopy.mpl.geoaxes import GeoAxes
 import matplotlib.ticker as mticker
 import os
-import netCDF4
 import io
-import h5py
 import sys
 import cc_variable_list as vl
+import azmp_bathy_tools as azb
 
 
 def azmp_map(my_file, my_year, my_season, my_depth, my_variable):
@@ -102,48 +101,8 @@ def azmp_map(my_file, my_year, my_season, my_depth, my_variable):
     
     ### Bathymetry 
     print('Load and grid bathymetry')
-    h5_outputfile = 'cc_bathymetry.h5'
-    
-    if os.path.isfile(h5_outputfile):
-         print [h5_outputfile + ' exists! Reading directly']
-         h5f = h5py.File(h5_outputfile,'r')
-         lon = h5f['lon'][:]
-         lat = h5f['lat'][:]
-         Z = h5f['Z'][:]
-         h5f.close()
-         print(' -> Done!')
-    
-    else:
-        dataset = netCDF4.Dataset(dataFile)
-        # Extract variables
-        x = dataset.variables['x_range']
-        y = dataset.variables['y_range']
-        spacing = dataset.variables['spacing']
-        # Compute Lat/Lon
-        nx = int((x[-1]-x[0])/spacing[0]) + 1  # num pts in x-dir
-        ny = int((y[-1]-y[0])/spacing[1]) + 1  # num pts in y-dir
-        lon = np.linspace(x[0],x[-1],nx)
-        lat = np.linspace(y[0],y[-1],ny)
-        ## interpolate data on regular grid (temperature grid)
-        ## Reshape data
-        zz = dataset.variables['z']
-        Z = zz[:].reshape(ny, nx)
-        Z = np.flipud(Z) # <------------ important!!!
-        # Reduce data according to Region params
-        idx_lon = np.where((lon>=lonLims[0]) & (lon<=lonLims[1]))
-        idx_lat = np.where((lat>=latLims[0]) & (lat<=latLims[1]))
-        Z = Z[idx_lat[0][0]:idx_lat[0][-1]+1, idx_lon[0][0]:idx_lon[0][-1]+1]
-        lon = lon[idx_lon[0]]
-        lat = lat[idx_lat[0]]
-        print(' -> Done!')
-    
-     # Save data for later use
-    if np.size(h5_outputfile):
-           h5f = h5py.File(h5_outputfile, 'w')
-           h5f.create_dataset('lon', data=lon)
-           h5f.create_dataset('lat', data=lat)
-           h5f.create_dataset('Z', data=Z)
-           h5f.close()
+    lon, lat, Z = azb.get_gebco_subset(lonLims, latLims, dataFile, store=os.path.join(os.path.dirname(dataFile), 'bathymetry_store.h5'), use_file_range=True)
+    print(' -> Done!')
     
     #############now make map########################################################
     fig = plt.figure(figsize=(7,5))
@@ -9,6 +9,7 @@ import pandas as pd
 import xarray as xr
 import datetime
 import water_masses as wm
+import pfile_tools as pft
 
 font = {'family' : 'normal',
         'weight' : 'bold',
@@ -187,8 +188,7 @@ Slist = []
 for idx in np.arange(0, T.shape[0]):
     TVec = T[idx,:]
     SVec = T[idx,:]  
-    digitized = np.digitize(TVec, Tbin) #<- this is awesome! 
-    Slist.append([SVec[digitized == i].mean() for i in range(0, len(Tbin))])
+    Slist.append(list(pft.bin_average(TVec, SVec, Tbin)))
 
 
 plt.figure(2)
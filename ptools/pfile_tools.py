@@ -17,6 +17,8 @@ __version__ = '0.1'
 # - From header, xtract lat, lon, station, line, trip, ship and other attributes (meteo?)
 
 import re
+import io
+import hashlib
 import pandas as pd
 import numpy as np
 import time as tt
@@ -82,77 +84,173 @@ def pfile_header(filename):
 
     return header
 
-def pfile_to_dataframe(filename):
-    """Reads a pfile given in 'filename' as returns a Pandas.DataFrame with
-       columns being the variables
+def log_problem(log, fname, error_msg, logfile='.netcdfgen_log.txt'):
+    """Record a problem with a pfile in 'logfile'.
+
+    If 'log' is a list, the (logfile, line) pair is appended to it instead (e.g. to be written
+    later by a single process, see build_yearly_netcdf).
 
     """
-    feoh = eoh()
-    in_header = True
+    line = fname + ' : ' + error_msg
+    if log is None:
+        with open(logfile, 'a') as f:
+            f.write(line + '\n')
+    else:
+        log.append((logfile, line))
 
-    # Read header
-    header = []
-    data = []
-    with open(filename, 'r', encoding="utf8", errors='ignore') as td:
-        for line in td:
-        
-            if re.match(feoh, line): # end-of-header            
-                in_header = False
-                continue # ignore line
-            elif in_header: # read header
-                header.append(line)
-            else: # read data
-                line = re.sub('\n','', line)
-                line = line.strip()
-                line = re.sub(' +',' ', line)
-                data.append(line.split(' '))
+def write_problems(log):
+    """Write the problems collected in 'log' (list of (logfile, line)) to their log files
 
-    # Read columns & remove last line of header
-    columns = header[-1]
-    header = header[:-1]           
+    """
+    logfiles = {}
+    for logfile, line in log:
+        logfiles.setdefault(logfile, []).append(line)
+    for logfile in logfiles.keys():
+        with open(logfile, 'a') as f:
+            f.write('\n'.join(logfiles[logfile]) + '\n')
 
-    # clean columns
-    columns = re.sub('\n','', columns)
-    columns = columns.strip()
-    columns = re.sub(' +',' ', columns)
-    columns = columns.split(' ')
+def read_pfile(filename):
+    """Reads a pfile in a single pass (the file is opened once).
+
+    Returns:
+        - header: lines before '-- DATA --' (same as pfile_header)
+        - columns: variable names (same as pfile_variables)
+        - data: data block (bytes), to be parsed by pfile_data_to_dataframe
+
+    """
+    feoh = eoh().encode()
+    with open(filename, 'rb') as td:
+        raw = td.read()
+
+    # find end-of-header (line starting with eoh key)
+    if raw.startswith(feoh):
+        idx_eoh = 0
+    else:
+        idx_eoh = raw.find(b'\n' + feoh)
+        idx_eoh = len(raw) if idx_eoh < 0 else idx_eoh+1
+    idx_data = raw.find(b'\n', idx_eoh)
+    data = b'' if idx_data < 0 else raw[idx_data+1:]
+
+    # header lines (universal newlines, as when reading in text mode)
+    header = list(io.StringIO(raw[:idx_eoh].decode('utf8', errors='ignore'), newline=None))
+    # Read columns from last line of header
+    columns = header[-1].split()
+
+    return header, columns, data
+
+def pfile_data_to_dataframe(filename, columns, data, log=None):
+    """Parse the data block returned by read_pfile as a Pandas.DataFrame with
+       columns being the variables
+
+    All values are converted at once (no parsing line by line). Files with all data
+    in one line or with rows of different length are flagged and an empty DataFrame
+    is returned. Problems are recorded with log_problem(log, ...).
+
+    """
+    values = np.array(data.split(), dtype=float)
+    rows = re.findall(rb'(?m)^[ \t\r]*(\S[^\n]*)', data) # non-empty lines
+    if values.size:
+        ncols = len(rows[0].split())
+        # same number of values in first and last rows and in total
+        regular = (len(rows[-1].split()) == ncols) & (values.size == len(rows)*ncols)
 
     # to dataFrame
-    
-    if np.size(data) == 0: # empty files
+    if values.size == 0: # empty files
         error_msg = 'Empty file [continue]'
         print(error_msg)
-        expr = 'echo ' + filename + ' : ' + error_msg +' >> emptyfile_problems.txt'
-        os.system(expr)
+        log_problem(log, filename, error_msg, 'emptyfile_problems.txt')
         df = pd.DataFrame([])
-    elif np.ndim(data) < 2: # In some files, there is no line skip (all data in one line)
+    elif not regular: # rows of different length
         error_msg = 'Wrong datafile dimension [continue]'
         print(error_msg)
-        expr = 'echo ' + filename + ' : ' + error_msg +' >> emptyfile_problems.txt'
-        os.system(expr)
+        log_problem(log, filename, error_msg, 'emptyfile_problems.txt')
         df = pd.DataFrame([])
-    elif np.shape(data)[1] == np.size(columns): # same shape
-        df = pd.DataFrame(data, columns=columns, dtype=float)
-    elif (np.shape(data)[1]==9) & (np.size(columns)==10): # very likely ph problem
+    elif ncols == np.size(columns): # same shape
+        df = pd.DataFrame(values.reshape(len(rows), ncols), columns=columns)
+    elif (ncols==9) & (np.size(columns)==10): # very likely ph problem
         columns = columns[0:-1]
-        df = pd.DataFrame(data, columns=columns, dtype=float)
+        df = pd.DataFrame(values.reshape(len(rows), ncols), columns=columns)
         error_msg = 'Missing pH columns [continue]'
         print(error_msg)
-        expr = 'echo ' + filename + ' : ' + error_msg +' >> ph_problems.txt'
-        os.system(expr)
+        log_problem(log, filename, error_msg, 'ph_problems.txt')
+    else: # In some files, there is no line skip (all data in one line)
+        error_msg = 'Wrong datafile dimension [continue]'
+        print(error_msg)
+        log_problem(log, filename, error_msg, 'emptyfile_problems.txt')
+        df = pd.DataFrame([])
     return df
 
+def pfile_to_dataframe(filename, log=None):
+    """Reads a pfile given in 'filename' as returns a Pandas.DataFrame with
+       columns being the variables
+
+    Problems are recorded with log_problem(log, ...).
+
+    """
+    header, columns, data = read_pfile(filename)
+    return pfile_data_to_dataframe(filename, columns, data, log)
+
+def bin_average(x, X, bins):
+    """Average X in the bins of x defined by np.digitize(x, bins)
+
+    X can be a vector or an array (len(x) x nchannels), in which case all channels are
+    reduced at once (np.bincount on [channel, bin] index). Bin i contains
+    bins[i-1] <= x < bins[i] (same as [X[digitized == i].mean() for i in range(len(bins))]).
+    Empty bins are NaN.
+
+    Returns a vector (len(bins)) or an array (nchannels x len(bins)).
+
+    Usage ex:
+    import pfile_tools as p
+    Xbin = p.bin_average(P, np.c_[T, S], Pbin)
+
+  """
+    X = np.asarray(X, dtype=float)
+    vector = X.ndim == 1
+    X = X.reshape(len(x), X.shape[-1] if X.ndim > 1 else 1) # (explicit nchannels: x may be empty)
+    nbins = len(bins)
+    nchannels = X.shape[1]
+
+    digitized = np.digitize(x, bins)
+    keep = digitized < nbins # values beyond last bin are not kept
+    digitized = digitized[keep]
+    X = X[keep,:]
+
+    counts = np.bincount(digitized, minlength=nbins)
+    index = (digitized[np.newaxis,:] + nbins*np.arange(nchannels)[:,np.newaxis]).ravel()
+    sums = np.bincount(index, weights=X.T.ravel(), minlength=nbins*nchannels).reshape(nchannels, nbins)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        Xbin = sums/counts # 0/0 -> NaN for empty bins
+
+    if vector:
+        return Xbin[0]
+    else:
+        return Xbin
+
+def bin_pressure(P, X, Pbin):
+    """Average X (vector or len(P) x nchannels array) in pressure bins Pbin, using only the
+    downcast (samples before maximum pressure). See bin_average().
+
+    Casts without downcast (maximum pressure at first sample, or a single sample) give NaNs
+    (check with: python -m doctest pfile_tools.py):
+    >>> bin_pressure(np.array([5., 3., 2.]), np.c_[[1., 2., 3.], [4., 5., 6.]], np.array([0., 5., 10.])).shape
+    (2, 3)
+    >>> bool(np.isnan(bin_pressure(np.array([5., 3., 2.]), np.c_[[1., 2., 3.], [4., 5., 6.]], np.array([0., 5., 10.]))).all())
+    True
+    >>> bool(np.isnan(bin_pressure(np.array([4.]), np.array([1.]), np.array([0., 5., 10.]))).all())
+    True
+
+  """
+    Ibtm = np.argmax(P)
+    X = np.asarray(X, dtype=float)
+    return bin_average(np.asarray(P)[0:Ibtm], X[0:Ibtm], Pbin)
+
 def bin_pressure_from_dataframe(df, Pbin, var):
     """Extract variable 'var' from dataframe generated by pfile_to_dataframe and digitize it to Pbin
 
   """
-    P = np.array(df['pres'])
-    Ibtm = np.argmax(P)
-    digitized = np.digitize(P[0:Ibtm], Pbin) 
-        
     if var in df.columns: # This if part should be put in a function.
-        X = df[var]
-        X = np.array([X[0:Ibtm][digitized == i].mean() for i in range(0, len(Pbin))])
+        X = bin_pressure(np.array(df['pres']), np.array(df[var]), Pbin)
         X = X.reshape(1, len(X)) # row shape for appending in netCDF
     else:
         X = Pbin*np.nan
@@ -160,64 +258,42 @@ def bin_pressure_from_dataframe(df, Pbin, var):
 
     return X
 
-def pfiles_to_netcdf(infiles, nc_outfile, zbin=1, zmax=1500, zshrink=False): # pfiles_to_pannel
-    """Given a list of pfiles stored in 'infiles', create a netCDF files with attributes
+# Variables binned in yearly netCDF files, with their possible names in pfiles
+# (temperature, salinity, conductivity, sigma-t, fluorescence, oxygen, irradiance, ph)
+PFILE_CHANNELS = [['temp', 'temp90-C'], ['sal', 'sal-PSU'], ['cond', 'cond90-S/m'], ['sigt', 'sigma-t'],
+                  ['flor', 'flor-ug/l'], ['oxy', 'oxy-umol/l'], ['par'], ['ph']]
+NC_VARIABLES = ['temperature', 'salinity', 'conductivity', 'sigma-t', 'fluorescence', 'oxygen', 'irradiance', 'ph']
+# GTS messages (BATHY, TESAC), stored as 'instrument_class' 1, 2 (0 for all other instruments).
+# The classes are written in the flag_values/flag_meanings of the variable, and only the stored
+# classes are read back (azmp_catalog_tools.read_instrument_class).
+GTS_INSTRUMENTS = ['MEDBA', 'MEDTE']
 
-    Input params:
-        - infiles: list of files (e.g. '2017pfiles.list')
-          * '$ ls *.p2017 > 2017pfiles.list' would generate the appropriate file list in Linux
-        - outfile: output file (e.g. 'AZMP2017.nc')
-        - zbin: vertical averaging in final file (zbin=1 is default)
-        - zmax: maximum possible depth of the final product (maximum depth may be smaller if zshrink=True, see below)
-        - zshrink: if 'True', vertical dimension 'Z' will  be shrink to the first non-empty value (Default is 'False') 
-          *NOTE: To open multiple nc files with xarray, Z dim must be the same!
+def instrument_class(instrument_ids):
+    """Integer instrument class of instrument_ids (0: not GTS, 1: MEDBA, 2: MEDTE, see GTS_INSTRUMENTS)
 
     """
-    
-    # Check if outfile already exist
-    if os.path.exists(nc_outfile):
+    instrument_ids = np.asarray(instrument_ids).astype(str)
+    classes = np.zeros(instrument_ids.shape, dtype=np.int8)
+    for k, gts in enumerate(GTS_INSTRUMENTS):
+        classes[instrument_ids == gts] = k+1
 
-        print(nc_outfile + ' already exists!') 
+    return classes
 
-        py3 = version_info[0] > 2 #creates boolean value for test that Python major version > 2
 
-        response_isnt_good = True
-        while response_isnt_good:
-            if py3:
-                response = input(" -> Do you want to remove it? (yes/no?): ")
-            else:
-                response = raw_input(" -> Do you want to remove it? (yes/no?): ")
+def pfiles_to_arrays(filelist, Pbin, log=None):
+    """Read, check and bin to Pbin the pfiles in 'filelist' (first part of pfiles_to_netcdf)
 
-            if response == 'yes':
-                os.remove(nc_outfile)
-                print(' -> ' + nc_outfile + ' removed!')
-                response_isnt_good = False
-            elif response == 'no':
-                print(' -> Nothing to be done then (an error will be raised)')
-                break
-            else:
-                print(' -> Please answer "yes" or "no"')
+    Returns:
+        - cast_info_list: [cast_id, lat, lon, sounder_depth, instrument_type, instrument_id, cast_comment] for each cast
+        - cast_index: cast times (duplicated times not corrected, see shift_duplicated_times)
+        - Xarray: binned variables (ncasts x len(PFILE_CHANNELS) x len(Pbin))
 
-    # Generate the list
-    filelist = np.genfromtxt(infiles, dtype=str)
-    filelist = np.reshape(filelist, filelist.size) # <--------- check if this doesn't cause error
-    
-    # Original binned depth vector
-    Pbin = np.arange(zbin/2.0, zmax, zbin) #will be shrink after if zshrink=True
+    Problems are recorded with log_problem(log, ...).
 
-    
-    ##### ------- Loop and store in lists ------- #####
-    # Initialize lists
+    """
     cast_info_list = []
     cast_index = []
-    Tlist = []
-    Slist = []
-    Clist = []
-    SIGlist = []
-    Flist = []
-    O2list = []
-    PHlist = []
-    PARlist = []
+    Xlist = []
 
     for fname in filelist:
 
@@ -229,14 +305,13 @@ def pfiles_to_netcdf(infiles, nc_outfile, zbin=1, zmax=1500, zshrink=False): # p
         # Else, do normal    
         print(fname)
 
-        # get header
-        header = pfile_header(fname)
+        # get header, columns and data block (single read)
+        header, columns, data = read_pfile(fname)
         #check header
         if 'NAFC_Y2K_HEADER' not in header[0]:
             error_msg = 'Problem with file: header [skip]'
             print(error_msg)
-            expr = 'echo ' + fname + ' : ' + error_msg +' >> .netcdfgen_log.txt'
-            os.system(expr)
+            log_problem(log, fname, error_msg)
             continue 
         
         #get cast info and store the info (inspired from J Holden's pfile_IO.py
@@ -250,20 +325,17 @@ def pfiles_to_netcdf(infiles, nc_outfile, zbin=1, zmax=1500, zshrink=False): # p
         if ((np.int(cast_lon)==0) & (np.int(cast_lat)==0)):
             error_msg = 'Problem with file: (lat,lon) = (0,0) looks wrong [skip]'
             print(error_msg)
-            expr = 'echo ' + fname + ' : ' + error_msg +' >> .netcdfgen_log.txt'
-            os.system(expr)
+            log_problem(log, fname, error_msg)
             continue
         elif ((np.int(cast_lat)>90) | (np.int(cast_lat)<-90)):
             error_msg = 'Problem with file: |lat| > 90 looks wrong [skip]'
             print(error_msg)
-            expr = 'echo ' + fname + ' : ' + error_msg +' >> .netcdfgen_log.txt'
-            os.system(expr)
+            log_problem(log, fname, error_msg)
             continue
         elif ((np.int(cast_lon)>180) | (np.int(cast_lon)<-180)):
             error_msg = 'Problem with file: |lon| > 180 looks wrong [skip]'
             print(error_msg)
-            expr = 'echo ' + fname + ' : ' + error_msg +' >> .netcdfgen_log.txt'
-            os.system(expr)
+            log_problem(log, fname, error_msg)
             continue
         
     
@@ -282,20 +354,17 @@ def pfiles_to_netcdf(infiles, nc_outfile, zbin=1, zmax=1500, zshrink=False): # p
             tmp[44:46]=['0','0']
             #cast_info = cast_info.replace(cast_info[44:46], '00')
             cast_info = "".join(tmp)
-            expr = 'echo ' + fname + ' : time problem >> .netcdfgen_log.txt'
-            os.system(expr)
+            log_problem(log, fname, 'time problem')
         elif np.int(cast_info[41:43])>23:
             tmp = list(cast_info)
             tmp[41:43]=['0','0']
             cast_info = "".join(tmp)
             #cast_info = cast_info.replace(cast_info[41:43], '00')
-            expr = 'echo ' + fname + ' : time problem >> .netcdfgen_log.txt'
-            os.system(expr)
+            log_problem(log, fname, 'time problem')
         elif ((np.int(cast_info[35:37])>12) | (np.int(cast_info[38:40])>31)):
             error_msg = 'Problem with file: wrong date [skip]'
             print(error_msg)
-            expr = 'echo ' + fname + ' : ' + error_msg +' >> .netcdfgen_log.txt'
-            os.system(expr)
+            log_problem(log, fname, error_msg)
             continue
         
         # if tests passed, store the rest    
@@ -318,156 +387,69 @@ def pfiles_to_netcdf(infiles, nc_outfile, zbin=1, zmax=1500, zshrink=False): # p
             cast_insttype = "V" 
         
         # To DataFrame (and check if empty)
-        df = pfile_to_dataframe(fname)
+        df = pfile_data_to_dataframe(fname, columns, data, log)
         if df.empty:
             error_msg = 'Problem with file: empty [skip]'
             print(error_msg)
-            expr = 'echo ' + fname + ' : ' + error_msg +' >> .netcdfgen_log.txt'
-            os.system(expr)
+            log_problem(log, fname, error_msg)
             continue    
         
         ## ----- Fill wanted variables one by one ----- ##
-        # deal with duplicated time (add one sec.)
-        if cast_time in cast_index:
-            cast_time = cast_time + + pd.Timedelta(seconds=1)
-       
         # Pressure
         if 'pres' in df.columns:
             P = np.array(df['pres'])            
-            Ibtm = np.argmax(P)    
-            digitized = np.digitize(P[0:Ibtm], Pbin) #<- this is awesome!
         elif 'depth' in df.columns:
             P = np.array(df['depth'])
-            Ibtm = np.argmax(P)    
-            digitized = np.digitize(P[0:Ibtm], Pbin) #<- this is awesome!
         elif 'pres-db' in df.columns:
             P = np.array(df['pres-db'])
-            Ibtm = np.argmax(P)    
-            digitized = np.digitize(P[0:Ibtm], Pbin) #<- this is awesome!
         else:
             error_msg = 'Problem with file, no pressure channel found [skip]'
             print(error_msg)
-            expr = 'echo ' + fname + ' : ' + error_msg +' >> .netcdfgen_log.txt'
-            os.system(expr)
+            log_problem(log, fname, error_msg)
             continue
             
         # Meta Data        
         cast_info_list.append([cast_id, cast_lat, cast_lon, cast_sounder, cast_insttype, cast_instid, cast_comment])
         cast_index.append(cast_time)
 
-        
-        # Temperature
-        if 'temp' in df.columns:
-            X = np.array(df['temp'])
-            Tlist.append([X[0:Ibtm][digitized == i].mean() for i in range(0, len(Pbin))])
-        elif 'temp90-C' in df.columns:
-            X = np.array(df['temp90-C'])
-            Tlist.append([X[0:Ibtm][digitized == i].mean() for i in range(0, len(Pbin))])
-        else:
-            Tlist.append(list(Pbin*np.nan))
-
-        # Salinity
-        if 'sal' in df.columns:
-            X = np.array(df['sal'])
-            Slist.append([X[0:Ibtm][digitized == i].mean() for i in range(0, len(Pbin))])
-        elif 'sal-PSU' in df.columns:
-            X = np.array(df['sal-PSU'])
-            Slist.append([X[0:Ibtm][digitized == i].mean() for i in range(0, len(Pbin))])
-        else:
-            Slist.append(list(Pbin*np.nan))
-
-        # Conductivity
-        if 'cond' in df.columns:
-            X = np.array(df['cond'])
-            Clist.append([X[0:Ibtm][digitized == i].mean() for i in range(0, len(Pbin))])
-        elif 'cond90-S/m' in df.columns:
-            X = np.array(df['cond90-S/m'])
-            Clist.append([X[0:Ibtm][digitized == i].mean() for i in range(0, len(Pbin))])
-        else:
-            Clist.append(list(Pbin*np.nan))
-
-        # Sigma-t
-        if 'sigt' in df.columns:
-            X = np.array(df['sigt'])
-            SIGlist.append([X[0:Ibtm][digitized == i].mean() for i in range(0, len(Pbin))])
-        elif 'sigma-t' in df.columns:
-            X = np.array(df['sigma-t'])
-            SIGlist.append([X[0:Ibtm][digitized == i].mean() for i in range(0, len(Pbin))])
-        else:
-            SIGlist.append(list(Pbin*np.nan))
-
-        # Fluorescence
-        if 'flor' in df.columns:
-            X = np.array(df['flor'])
-            Flist.append([X[0:Ibtm][digitized == i].mean() for i in range(0, len(Pbin))])
-        elif 'flor-ug/l' in df.columns:
-            X = np.array(df['flor-ug/l'])
-            Flist.append([X[0:Ibtm][digitized == i].mean() for i in range(0, len(Pbin))])
-        else:
-            Flist.append(list(Pbin*np.nan))
-
-        # Oxygen
-        if 'oxy' in df.columns:
-            X = np.array(df['oxy'])
-            O2list.append([X[0:Ibtm][digitized == i].mean() for i in range(0, len(Pbin))])
-        elif 'oxy-umol/l' in df.columns:
-            X = np.array(df['oxy-umol/l'])
-            O2list.append([X[0:Ibtm][digitized == i].mean() for i in range(0, len(Pbin))])
-        else:
-            O2list.append(list(Pbin*np.nan))
+        # Bin all variables at once (NaN if not in file)
+        X = np.full((len(P), len(PFILE_CHANNELS)), np.nan)
+        for k, names in enumerate(PFILE_CHANNELS):
+            for name in names:
+                if name in df.columns:
+                    X[:,k] = np.array(df[name])
+                    break
+        Xlist.append(bin_pressure(P, X, Pbin))
+    #### -------------------------------------------------------- ####
 
-        # PAR
-        if 'par' in df.columns:
-            X = np.array(df['par'])
-            PARlist.append([X[0:Ibtm][digitized == i].mean() for i in range(0, len(Pbin))])
-        else:
-            PARlist.append(list(Pbin*np.nan))
+    Xarray = np.reshape(np.array(Xlist), (len(Xlist), len(PFILE_CHANNELS), len(Pbin)))
+    return cast_info_list, cast_index, Xarray
 
-        # PH
-        if 'ph' in df.columns:
-            X = np.array(df['ph'])
-            PHlist.append([X[0:Ibtm][digitized == i].mean() for i in range(0, len(Pbin))])
-        else:
-            PHlist.append(list(Pbin*np.nan))
-    #### -------------------------------------------------------- ####
+def shift_duplicated_times(cast_index, previous_times=None):
+    """deal with duplicated time (add one sec.) in a list of cast times, in reading order
 
+    'previous_times' (set) is the times of casts already written, if any. It is updated
+    here, so it can be passed from one batch of casts to the next.
 
-    # List to array (for easier manipulation in next step)
-    Tarray = np.array(Tlist)
-    Sarray = np.array(Slist)
-    Carray = np.array(Clist)
-    SIGarray = np.array(SIGlist)
-    Farray = np.array(Flist)
-    O2array = np.array(O2list)
-    PHarray = np.array(PHlist)
-    PARarray = np.array(PARlist)
+    """
+    if previous_times is None:
+        previous_times = set()
+    new_index = []
+    for cast_time in cast_index:
+        if cast_time in previous_times:
+            cast_time = cast_time + pd.Timedelta(seconds=1)
+        previous_times.add(cast_time)
+        new_index.append(cast_time)
 
-    # Resize Lists to unused maximum depth encountered (a bit weak the way I do it)
-    if zshrink:
-        idx_nan = np.squeeze(np.where(np.isnan(np.nanmean(Tarray, axis=0))==True))
-        Tarray = Tarray[:,0:idx_nan[0]-1]
-        Sarray = Sarray[:,0:idx_nan[0]-1]
-        Carray = Carray[:,0:idx_nan[0]-1]
-        SIGarray = SIGarray[:,0:idx_nan[0]-1]
-        Farray = Farray[:,0:idx_nan[0]-1]
-        O2array = O2array[:,0:idx_nan[0]-1]
-        PHarray = PHarray[:,0:idx_nan[0]-1]
-        PARarray = PARarray[:,0:idx_nan[0]-1]
-        Pbin = Pbin[0:idx_nan[0]-1]
+    return new_index
 
-    # Dataframe content
-    columns = ['cast_id', 'lat', 'lon', 'sounder_depth', 'instrument_type', 'instrument_id', 'cast_comment']
-    df_info = pd.DataFrame(cast_info_list, index=cast_index, columns=columns)
-    df_temp = pd.DataFrame(Tarray, index=cast_index, columns=Pbin)
-    df_sali = pd.DataFrame(Sarray, index=cast_index, columns=Pbin)
-    df_cond = pd.DataFrame(Carray, index=cast_index, columns=Pbin)
-    df_sigt = pd.DataFrame(SIGarray, index=cast_index, columns=Pbin)
-    df_fluo = pd.DataFrame(Farray, index=cast_index, columns=Pbin)
-    df_oxyg = pd.DataFrame(O2array, index=cast_index, columns=Pbin)
-    df_parr = pd.DataFrame(PARarray, index=cast_index, columns=Pbin)
-    df_ph = pd.DataFrame(PHarray, index=cast_index, columns=Pbin)
+def create_netcdf(nc_outfile, Pbin):
+    """Create an empty netCDF file for binned pfiles, with unlimited 'time' dimension and
+    levels Pbin. Casts are then added by batches with append_to_netcdf.
 
+    Returns the open netCDF4.Dataset (to be closed by the caller).
 
+    """
     #### ------ Building netCDF file (inspired from MEOPAR & NCAR examples) ------ #####
 
     # File name + global attributes
@@ -490,7 +472,7 @@ def pfiles_to_netcdf(infiles, nc_outfile, zbin=1, zmax=1500, zshrink=False): # p
 
     # Create dimensions
     time = nc_out.createDimension('time', None)
-    level = nc_out.createDimension('level', len(df_temp.columns))
+    level = nc_out.createDimension('level', len(Pbin))
 
     # Create coordinate variables
     times = nc_out.createVariable('time', np.float64, ('time',))
@@ -505,6 +487,7 @@ def pfiles_to_netcdf(infiles, nc_outfile, zbin=1, zmax=1500, zshrink=False): # p
     instrument_types = nc_out.createVariable('instrument_type', str, ('time'), zlib=True)
     instrument_IDs = nc_out.createVariable('instrument_ID', str, ('time'), zlib=True)
     sounder_depths = nc_out.createVariable('sounder_depth', np.float32, ('time'), zlib=True)
+    instrument_classes = nc_out.createVariable('instrument_class', np.int8, ('time'), zlib=True)
 
     # Create 2D variables
     temp = nc_out.createVariable('temperature', np.float32, ('time', 'level'), zlib=True, fill_value=-9999)
@@ -519,6 +502,9 @@ def pfiles_to_netcdf(infiles, nc_outfile, zbin=1, zmax=1500, zshrink=False): # p
     # Variable Attributes
     latitudes.units = 'degree_north'
     longitudes.units = 'degree_east'
+    instrument_classes.long_name = 'GTS message class (to exclude GTS data by index)'
+    instrument_classes.flag_values = np.arange(len(GTS_INSTRUMENTS)+1, dtype=np.int8)
+    instrument_classes.flag_meanings = ' '.join(['not_GTS'] + GTS_INSTRUMENTS)
     times.units = 'hours since 1900-01-01 00:00:00'
     times.calendar = 'gregorian'
     levels.units = 'dbar'
@@ -551,32 +537,413 @@ def pfiles_to_netcdf(infiles, nc_outfile, zbin=1, zmax=1500, zshrink=False): # p
     ph.standard_name = "PH" ;
     ph.units = "unitless" ;
 
+    levels[:] = Pbin
+
+    return nc_out
+
+def append_to_netcdf(nc_out, cast_info_list, cast_index, Xarray):
+    """Append casts (output of pfiles_to_arrays) at the end of the 'time' dimension of nc_out
+
+    """
+    n0 = len(nc_out.dimensions['time'])
+    n1 = n0 + len(cast_index)
+    if n1 == n0:
+        return None
+
+    # Dataframe content
+    columns = ['cast_id', 'lat', 'lon', 'sounder_depth', 'instrument_type', 'instrument_id', 'cast_comment']
+    df_info = pd.DataFrame(cast_info_list, index=cast_index, columns=columns)
+
     # Fill structure
-    #print 'temp shape before adding data = ', temp.shape
-    latitudes[:] = np.array(df_info.lat)
-    longitudes[:] = np.array(df_info.lon)
-    cast_IDs[:] = np.array(df_info.cast_id)
-    comments[:] = np.array(df_info.cast_comment)
-    instrument_types[:] = np.array(df_info.instrument_type)
-    instrument_IDs[:] = np.array(df_info.instrument_id)
-    sounder_depths[:] = np.array(df_info.sounder_depth)
-
-    temp[:,:] = df_temp.values
-    sal[:,:] = df_sali.values
-    cond[:,:] = df_cond.values
-    sigt[:,:] = df_sigt.values
-    o2[:,:] = df_oxyg.values
-    fluo[:,:] = df_fluo.values
-    par[:,:] = df_parr.values
-    ph[:,:] = df_ph.values
+    nc_out.variables['latitude'][n0:n1] = np.array(df_info.lat)
+    nc_out.variables['longitude'][n0:n1] = np.array(df_info.lon)
+    nc_out.variables['trip_ID'][n0:n1] = np.array(df_info.cast_id)
+    nc_out.variables['comments'][n0:n1] = np.array(df_info.cast_comment)
+    nc_out.variables['instrument_type'][n0:n1] = np.array(df_info.instrument_type)
+    nc_out.variables['instrument_ID'][n0:n1] = np.array(df_info.instrument_id)
+    nc_out.variables['instrument_class'][n0:n1] = instrument_class(df_info.instrument_id)
+    nc_out.variables['sounder_depth'][n0:n1] = np.array(df_info.sounder_depth)
+    for k, var in enumerate(NC_VARIABLES):
+        nc_out.variables[var][n0:n1,:] = Xarray[:,k,:]
 
     # Fill time
-    times[:] = nc.date2num(cast_index, units = times.units, calendar = times.calendar)
-    levels[:] = Pbin
-    #### -------------------------------------------------------- ####
+    times = nc_out.variables['time']
+    times[n0:n1] = nc.date2num(list(cast_index), units = times.units, calendar = times.calendar)
+
+    return None
+
+def shrink_netcdf(nc_file, batch_size=5000):
+    """Resize 'level' dimension of a file from create_netcdf to unused maximum depth encountered
+    (the 'zshrink' option, applied as a post-pass). The file is copied by batches of casts.
+
+    """
+    nc_in = nc.Dataset(nc_file, 'r')
+    ntimes = len(nc_in.dimensions['time'])
+    levels = np.array(nc_in.variables['level'][:])
+
+    # Levels with temperature data
+    has_data = np.zeros(levels.size, dtype=bool)
+    for i in range(0, ntimes, batch_size):
+        T = np.ma.filled(nc_in.variables['temperature'][i:i+batch_size,:].astype(float), np.nan)
+        has_data = has_data | np.any(np.isfinite(T), axis=0)
+    idx_nan = np.where(has_data==False)[0]
+    if idx_nan.size == 0:
+        nc_in.close()
+        return None
+    # (a bit weak the way I do it)
+    nlevels = levels[0:idx_nan[0]-1].size
+
+    nc_out = create_netcdf(nc_file + '.tmp', levels[0:nlevels])
+    for i in range(0, ntimes, batch_size):
+        i_end = np.min([i+batch_size, ntimes])
+        for var in nc_in.variables.keys():
+            if var == 'level':
+                continue
+            elif nc_in.variables[var].ndim == 2:
+                nc_out.variables[var][i:i_end,:] = nc_in.variables[var][i:i_end,0:nlevels]
+            else:
+                nc_out.variables[var][i:i_end] = nc_in.variables[var][i:i_end]
+    nc_in.close()
+    nc_out.close()
+    os.replace(nc_file + '.tmp', nc_file)
+
+    return None
+
+def arrays_to_netcdf(nc_outfile, cast_info_list, cast_index, Xarray, Pbin, zshrink=False):
+    """Write the output of pfiles_to_arrays in a netCDF file (see create_netcdf, append_to_netcdf and shrink_netcdf)
+
+    """
+    nc_out = create_netcdf(nc_outfile, Pbin)
+    append_to_netcdf(nc_out, cast_info_list, cast_index, Xarray)
+    nc_out.close()
+    if zshrink:
+        shrink_netcdf(nc_outfile)
     print('Done!')
 
+    return None
+
+
+def pfiles_to_netcdf(infiles, nc_outfile, zbin=1, zmax=1500, zshrink=False, log=None, batch_size=500): # pfiles_to_pannel
+    """Given a list of pfiles stored in 'infiles', create a netCDF files with attributes
+
+    Input params:
+        - infiles: list of files (e.g. '2017pfiles.list')
+          * '$ ls *.p2017 > 2017pfiles.list' would generate the appropriate file list in Linux
+        - outfile: output file (e.g. 'AZMP2017.nc')
+        - zbin: vertical averaging in final file (zbin=1 is default)
+        - zmax: maximum possible depth of the final product (maximum depth may be smaller if zshrink=True, see below)
+        - zshrink: if 'True', vertical dimension 'Z' will  be shrink to the first non-empty value (Default is 'False') 
+          *NOTE: To open multiple nc files with xarray, Z dim must be the same!
+        - log: if a list, problems are appended to it instead of written to '.netcdfgen_log.txt' (see log_problem)
+        - batch_size: number of pfiles binned in memory before being appended to the file
+
+    """
+    # Check if outfile already exist
+    if os.path.exists(nc_outfile):
+
+        print(nc_outfile + ' already exists!') 
+
+        py3 = version_info[0] > 2 #creates boolean value for test that Python major version > 2
+
+        response_isnt_good = True
+        while response_isnt_good:
+            if py3:
+                response = input(" -> Do you want to remove it? (yes/no?): ")
+            else:
+                response = raw_input(" -> Do you want to remove it? (yes/no?): ")
+
+            if response == 'yes':
+                os.remove(nc_outfile)
+                print(' -> ' + nc_outfile + ' removed!')
+                response_isnt_good = False
+            elif response == 'no':
+                print(' -> Nothing to be done then (an error will be raised)')
+                break
+            else:
+                print(' -> Please answer "yes" or "no"')
+
+    # Generate the list
+    filelist = np.genfromtxt(infiles, dtype=str)
+    filelist = np.reshape(filelist, filelist.size) # <--------- check if this doesn't cause error
+    
+    # Original binned depth vector
+    Pbin = np.arange(zbin/2.0, zmax, zbin) #will be shrink after if zshrink=True
+
+    ##### ------- Loop on batches of pfiles and append to netCDF file ------- #####
+    nc_out = create_netcdf(nc_outfile, Pbin)
+    previous_times = set()
+    for i in range(0, filelist.size, batch_size):
+        cast_info_list, cast_index, Xarray = pfiles_to_arrays(filelist[i:i+batch_size], Pbin, log)
+        cast_index = shift_duplicated_times(cast_index, previous_times)
+        append_to_netcdf(nc_out, cast_info_list, cast_index, Xarray)
     nc_out.close()
+
+    # Resize to unused maximum depth encountered
+    if zshrink:
+        shrink_netcdf(nc_outfile)
+    print('Done!')
+    return None
+
+def _pfiles_chunk_to_arrays(args):
+    """Worker of build_yearly_netcdf: bin a chunk of pfiles and return the problems with the result
+
+    """
+    filelist, Pbin = args
+    log = []
+    cast_info_list, cast_index, Xarray = pfiles_to_arrays(filelist, Pbin, log)
+    return cast_info_list, cast_index, Xarray, log
+
+def build_yearly_netcdf(lists, outdir='.', zbin=5, zmax=2000, zshrink=False, nprocs=None, chunk_size=500, overwrite=False, done_dir=None):
+    """Build one netCDF file per pfile list (e.g. '1990.list' -> '1990.nc'), using a pool of processes
+
+    Each list is cut in chunks of 'chunk_size' pfiles binned in parallel (see pfiles_to_arrays).
+    Chunks are appended to the file in the order of the list, so the netCDF files are the same
+    as the ones generated by pfiles_to_netcdf with the same zbin and zmax (the defaults here,
+    5 and 2000, are the ones of the yearly database, not those of pfiles_to_netcdf). Problems reported by the workers are written by this
+    process only ('.netcdfgen_log.txt', 'emptyfile_problems.txt', 'ph_problems.txt').
+
+    Input params:
+        - lists: list of pfile lists (e.g. glob.glob('*.list'))
+        - outdir: where to write netCDF files
+        - zbin, zmax, zshrink: see pfiles_to_netcdf
+        - nprocs: number of processes (default is the number of CPUs)
+        - chunk_size: number of pfiles per task
+        - overwrite: if False, lists for which the netCDF file already exists are skipped
+        - done_dir: if provided, lists are moved there once their netCDF file is written
+
+    Usage ex (see also synchro_tools/yearly_netcdf_gen.py):
+    import glob
+    import pfile_tools as p
+    p.build_yearly_netcdf(sorted(glob.glob('*.list')), zbin=5, zmax=2000, nprocs=8)
+
+    """
+    import multiprocessing as mp
+
+    with open('.netcdfgen_log.txt', 'a') as f:
+        f.write(' --------- New run ------ \n')
+    Pbin = np.arange(zbin/2.0, zmax, zbin) #will be shrink after if zshrink=True
+
+    # Cut lists in tasks
+    tasks = []
+    outfiles = []
+    nchunks = []
+    for infiles in lists:
+        outfile = os.path.join(outdir, os.path.splitext(os.path.basename(infiles))[0] + '.nc')
+        if os.path.exists(outfile) and not overwrite: # (replaced only once the new file is written)
+            print(outfile + ' already exists! [skip]')
+            continue
+        filelist = np.genfromtxt(infiles, dtype=str)
+        filelist = np.reshape(filelist, filelist.size)
+        chunks = [filelist[i:i+chunk_size] for i in range(0, np.max([filelist.size, 1]), chunk_size)]
+        tasks = tasks + [(chunk, Pbin) for chunk in chunks]
+        outfiles.append([infiles, outfile])
+        nchunks.append(len(chunks))
+
+    # Process in parallel and write files as soon as all their chunks are back (ordered).
+    # Each file is written to <outfile>.tmp and renamed when complete, so a failed run
+    # leaves no partial <year>.nc (the pool is terminated on error).
+    with mp.Pool(nprocs) as pool:
+        results = pool.imap(_pfiles_chunk_to_arrays, tasks)
+        for (infiles, outfile), n in zip(outfiles, nchunks):
+            tmp_file = outfile + '.tmp'
+            nc_out = create_netcdf(tmp_file, Pbin)
+            try:
+                previous_times = set()
+                for i in range(n):
+                    cast_info_list, cast_index, Xarray, log = next(results)
+                    write_problems(log)
+                    cast_index = shift_duplicated_times(cast_index, previous_times)
+                    append_to_netcdf(nc_out, cast_info_list, cast_index, Xarray)
+                nc_out.close()
+                if zshrink:
+                    shrink_netcdf(tmp_file)
+            except BaseException:
+                if nc_out.isopen():
+                    nc_out.close()
+                os.remove(tmp_file)
+                raise
+            os.replace(tmp_file, outfile)
+            print(' -> ' + outfile + ' done!')
+            if done_dir is not None:
+                os.rename(infiles, os.path.join(done_dir, os.path.basename(infiles)))
+
+    return None
+
+
+def netcdf_to_arrays(nc_file, start=0, stop=None):
+    """Read back casts start:stop of a netCDF file generated by arrays_to_netcdf (inverse of arrays_to_netcdf)
+
+    Returns cast_info_list, cast_index, Xarray (see pfiles_to_arrays) and levels.
+
+    """
+    nc_in = nc.Dataset(nc_file, 'r')
+    casts = slice(start, stop)
+    times = nc_in.variables['time']
+    cast_index = [pd.Timestamp(str(t)) for t in nc.num2date(times[casts], units=times.units, calendar=times.calendar)]
+    cast_info_list = [list(info) for info in zip(nc_in.variables['trip_ID'][casts],
+                                                 np.array(nc_in.variables['latitude'][casts]),
+                                                 np.array(nc_in.variables['longitude'][casts]),
+                                                 np.array(nc_in.variables['sounder_depth'][casts]),
+                                                 nc_in.variables['instrument_type'][casts],
+                                                 nc_in.variables['instrument_ID'][casts],
+                                                 nc_in.variables['comments'][casts])]
+    Xarray = np.stack([np.ma.filled(nc_in.variables[var][casts,:].astype(float), np.nan) for var in NC_VARIABLES], axis=1)
+    levels = np.array(nc_in.variables['level'][:])
+    nc_in.close()
+
+    return cast_info_list, cast_index, Xarray, levels
+
+def scan_pfiles(pfiles, manifest=None):
+    """Build the manifest of a list of pfiles and compare it with a previous one
+
+    The manifest is a DataFrame indexed by path with columns size, mtime, md5 (content hash),
+    cast_id and year (from the .pYYYY extension). Files are hashed only if their size or
+    mtime changed. A column 'status' is added:
+        - 'new': not in previous manifest
+        - 'changed': content changed
+        - 'unchanged'
+        - 'removed': in previous manifest but not found anymore
+
+    Files of the previous manifest that are not in 'pfiles' but still exist are kept as 'unchanged'.
+
+    """
+    columns = ['size', 'mtime', 'md5', 'cast_id', 'year']
+    if manifest is None:
+        previous = {}
+    else:
+        previous = manifest[columns].to_dict('index')
+
+    rows = {}
+    for fname in pfiles:
+        match = re.search(r'\.p(\d{4})$', fname)
+        if match is None:
+            print(' -> ' + fname + ' is not a pfile (.pYYYY) [skip]')
+            continue
+        if os.path.isfile(fname) is False:
+            print(' ->' + fname + ' not found! [skip]')
+            continue
+        stat = os.stat(fname)
+        if (fname in previous) and (previous[fname]['size'] == stat.st_size) and (previous[fname]['mtime'] == stat.st_mtime):
+            rows[fname] = dict(previous[fname], status='unchanged')
+            continue
+
+        with open(fname, 'rb') as td:
+            raw = td.read()
+        md5 = hashlib.md5(raw).hexdigest()
+        lines = raw.split(b'\n', 2)
+        cast_id = lines[1].decode('utf8', errors='ignore').replace(',',' ')[0:8] if len(lines) > 1 else ''
+        if fname not in previous:
+            status = 'new'
+        elif previous[fname]['md5'] != md5:
+            status = 'changed'
+        else:
+            status = 'unchanged'
+        rows[fname] = {'size' : stat.st_size, 'mtime' : stat.st_mtime, 'md5' : md5, 'cast_id' : cast_id,
+                       'year' : int(match.group(1)), 'status' : status}
+
+    for fname in previous.keys():
+        if fname not in rows:
+            rows[fname] = dict(previous[fname], status=('unchanged' if os.path.isfile(fname) else 'removed'))
+
+    df = pd.DataFrame.from_dict(rows, orient='index', columns=columns + ['status'])
+    df.index.name = 'path'
+    return df
+
+def update_yearly_netcdf(pfiles, outdir='.', manifest_file='pfiles_manifest.pkl', zbin=5, zmax=2000, zshrink=False, nprocs=None, chunk_size=500, batch_size=5000, init=False):
+    """Update yearly netCDF files ('<year>.nc' in outdir) with new or changed pfiles only
+
+    The pfiles are compared with the manifest saved in manifest_file (see scan_pfiles). Only the
+    years with new, changed or removed pfiles are rewritten: casts of these pfiles (same cast_id)
+    are removed from the existing yearly file and the corresponding pfiles are binned again
+    (in parallel, see build_yearly_netcdf) and appended. A year without netCDF file (or with
+    other levels) is built from all its pfiles in the manifest.
+
+    Input params:
+        - pfiles: list of all pfiles (e.g. glob.glob('/home/cyrf0006/data/dev_database/*.p[12][0-9][0-9][0-9]'))
+        - outdir: where yearly netCDF files are
+        - manifest_file: manifest of the pfiles used in the netCDF files (pickled DataFrame)
+        - zbin, zmax, zshrink: see pfiles_to_netcdf (should be the same as for existing files)
+        - nprocs, chunk_size: see build_yearly_netcdf
+        - batch_size: number of casts copied at once from the existing file
+        - init: if True, only save the manifest (e.g. for a database just built with build_yearly_netcdf)
+
+    Usage ex:
+    import glob
+    import pfile_tools as p
+    p.update_yearly_netcdf(glob.glob('/home/cyrf0006/data/dev_database/*.p2019'), zbin=5, zmax=2000)
+
+    """
+    import multiprocessing as mp
+
+    if os.path.isfile(manifest_file):
+        manifest = pd.read_pickle(manifest_file)
+    else:
+        manifest = None
+    df = scan_pfiles(pfiles, manifest)
+    years = np.sort(df.year[df.status != 'unchanged'].unique())
+    print(str(np.sum(df.status != 'unchanged')) + ' new, changed or removed pfiles in ' + str(len(years)) + ' year(s)')
+
+    if init | (len(years) == 0):
+        df[df.status != 'removed'].drop(columns='status').to_pickle(manifest_file)
+        return None
+
+    with open('.netcdfgen_log.txt', 'a') as f:
+        f.write(' --------- New run (update) ------ \n')
+    Pbin = np.arange(zbin/2.0, zmax, zbin)
+    pool = mp.Pool(nprocs)
+    for year in years:
+        outfile = os.path.join(outdir, str(year) + '.nc')
+        df_year = df[(df.year == year)]
+        changed_ids = set(df_year.cast_id[df_year.status != 'unchanged'])
+        if manifest is not None:
+            # cast_id in the existing file (the header of a changed pfile may have a new one)
+            previous_paths = df_year.index[df_year.status.isin(['changed', 'removed']) & df_year.index.isin(manifest.index)]
+            changed_ids.update(manifest.loc[previous_paths, 'cast_id'])
+
+        # Casts kept from existing file (if same levels)
+        nold = 0
+        if os.path.isfile(outfile):
+            nc_in = nc.Dataset(outfile, 'r')
+            levels = np.array(nc_in.variables['level'][:])
+            old_ids = nc_in.variables['trip_ID'][:]
+            nc_in.close()
+            if np.array_equal(levels, Pbin[0:len(levels)].astype(np.int32)):
+                nold = len(old_ids)
+        keep = np.array([cast_id not in changed_ids for cast_id in np.atleast_1d(old_ids)]) if nold else np.zeros(0, dtype=bool)
+        if nold:
+            filelist = df_year.index[(df_year.status != 'removed') & df_year.cast_id.isin(changed_ids)].values
+        else:
+            filelist = df_year.index[df_year.status != 'removed'].values
+        print(outfile + ': ' + str(keep.sum()) + ' casts kept, ' + str(len(filelist)) + ' pfiles to bin')
+
+        # Write a new file (kept casts, then new/changed pfiles) and replace the previous one
+        nc_out = create_netcdf(outfile + '.tmp', Pbin)
+        previous_times = set()
+        for i in range(0, nold, batch_size):
+            old_info, old_index, old_X, levels = netcdf_to_arrays(outfile, i, i+batch_size)
+            idx = np.where(keep[i:i+batch_size])[0]
+            Xarray = np.full((idx.size, len(PFILE_CHANNELS), len(Pbin)), np.nan)
+            Xarray[:,:,0:len(levels)] = old_X[idx,:,:]
+            cast_index = [old_index[j] for j in idx]
+            previous_times.update(cast_index) # already corrected
+            append_to_netcdf(nc_out, [old_info[j] for j in idx], cast_index, Xarray)
+        if len(filelist) > 0:
+            tasks = [(filelist[i:i+chunk_size], Pbin) for i in range(0, len(filelist), chunk_size)]
+            for cast_info_list, cast_index, Xarray, log in pool.imap(_pfiles_chunk_to_arrays, tasks):
+                write_problems(log)
+                cast_index = shift_duplicated_times(cast_index, previous_times)
+                append_to_netcdf(nc_out, cast_info_list, cast_index, Xarray)
+        nc_out.close()
+        if zshrink:
+            shrink_netcdf(outfile + '.tmp')
+        os.replace(outfile + '.tmp', outfile)
+        print(' -> ' + outfile + ' updated!')
+    pool.close()
+    pool.join()
+
+    # Save manifest once all files are written
+    df[df.status != 'removed'].drop(columns='status').to_pickle(manifest_file)
+
     return None
 
 
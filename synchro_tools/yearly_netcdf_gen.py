@@ -1,7 +1,22 @@
 """A script to loop on pfile lists and generate multiple (yearly) netCDF files
 
+Lists are processed in parallel by pfile_tools.build_yearly_netcdf (chunks of pfiles
+distributed over a pool of processes).
 
-I need to make it a function!
+In update mode, all pfiles in the lists are compared with a manifest (path, size, mtime,
+hash, cast_id, year) and only the years with new, changed or removed pfiles are rewritten
+(see pfile_tools.update_yearly_netcdf).
+
+usage:
+$ python yearly_netcdf_gen.py                     # all *.list in current directory
+$ python yearly_netcdf_gen.py 2018.list 2019.list -n 8 --overwrite
+$ python yearly_netcdf_gen.py --update --init-manifest   # record pfiles of an existing database
+$ python yearly_netcdf_gen.py --update                   # e.g. nightly during the survey season
+                                                         # (default: *.list here and in --done-dir)
+$ python yearly_netcdf_gen.py --update --catalog cast_catalog.pkl  # also update the cast catalog
+
+The cast catalog (see azmp_modules/azmp_catalog_tools.py) is updated from the netCDF files
+of outdir when --catalog is given.
 
 ----------
 Frederic.Cyr@dfo-mpo.gc.ca, October 2017
@@ -13,20 +28,53 @@ Frederic.Cyr@dfo-mpo.gc.ca, October 2017
 # (this might cause problems when list too long...)
 
 import pfile_tools as p
+import numpy as np
+import argparse
 import glob
 import os
 
-lists = glob.glob('*.list')
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Generate yearly netCDF files from pfile lists.')
+    parser.add_argument('lists', nargs='*', help='pfile lists (default: *.list, and done-dir/*.list with --update)')
+    parser.add_argument('-n', '--nprocs', type=int, default=None, help='number of processes (default: all CPUs)')
+    parser.add_argument('--chunk-size', type=int, default=500, help='number of pfiles per task')
+    parser.add_argument('--zbin', type=float, default=5)
+    parser.add_argument('--zmax', type=float, default=2000)
+    parser.add_argument('--outdir', default='.')
+    parser.add_argument('--overwrite', action='store_true', help='rebuild existing netCDF files')
+    parser.add_argument('--done-dir', default='./list_done', help='where lists are moved when done')
+    parser.add_argument('--update', action='store_true', help='only rewrite years with new/changed/removed pfiles')
+    parser.add_argument('--manifest', default='pfiles_manifest.pkl', help='pfiles manifest (update mode)')
+    parser.add_argument('--init-manifest', action='store_true', help='only save the manifest (update mode)')
+    parser.add_argument('--catalog', default=None, help='cast catalog to update once netCDF files are written')
+    args = parser.parse_args()
+
+    lists = args.lists
+    if len(lists) == 0:
+        lists = sorted(glob.glob('*.list'))
+        if args.update:
+            # lists already processed were moved to done-dir (those of current directory have priority)
+            done_lists = sorted(glob.glob(os.path.join(args.done_dir, '*.list')))
+            lists = lists + [f for f in done_lists if os.path.basename(f) not in lists]
+    if len(lists) == 0:
+        parser.error('no pfile lists found (*.list' + (' or ' + os.path.join(args.done_dir, '*.list') if args.update else '') + ')')
 
-os.system('echo " --------- New run ------ " >> .netcdfgen_log.txt')
+    if args.update:
+        pfiles = []
+        for infiles in lists:
+            pfiles = pfiles + list(np.atleast_1d(np.genfromtxt(infiles, dtype=str)))
+        p.update_yearly_netcdf(pfiles, outdir=args.outdir, manifest_file=args.manifest, zbin=args.zbin, zmax=args.zmax,
+                               nprocs=args.nprocs, chunk_size=args.chunk_size, init=args.init_manifest)
+    else:
+        if not os.path.isdir(args.done_dir):
+            os.makedirs(args.done_dir)
+        p.build_yearly_netcdf(lists, outdir=args.outdir, zbin=args.zbin, zmax=args.zmax, nprocs=args.nprocs,
+                              chunk_size=args.chunk_size, overwrite=args.overwrite, done_dir=args.done_dir)
 
-for yearfile in lists:
-    outfile = os.path.splitext(yearfile)[0] + '.nc'
-    p.pfiles_to_netcdf(yearfile, outfile, zbin=5, zmax=2000)
-    expr_print = ' -> ' + outfile + ' done!'
-    print(expr_print)
-    expr = 'mv ' + yearfile + ' ./list_done'
-    os.system(expr)
+    if args.catalog is not None:
+        import azmp_catalog_tools as azc # (in azmp_modules, only needed here)
+        azc.build_cast_catalog(sorted(glob.glob(os.path.join(args.outdir, '*.nc'))), args.catalog)
 
 ## #To generate the lists (in /home/cyrf0006/data_orwell/netcdf_gen):
 ## import numpy as np